@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+batch_scoring.py
+================
+経済性・環境負荷・快適性・施工性の評価指標を多数の設計に対してまとめて計算する
+
+generate_building_fem_analyze の calculate_economic_cost / calculate_environmental_impact /
+calculate_comfort_score / calculate_constructability_score は building_info 辞書を1件ずつ受け取り、
+部材ごとのループと if/elif の分岐を Python で実行する。このモジュールは同じ計算を
+NumPy の配列演算で行い、サロゲート候補やアーカイブした設計を数千件単位で一度に採点する。
+
+入力は building_info のキーを列名とする構造化配列・DataFrame・列名 → 配列の辞書で、
+FEM の結果（max_displacement, max_stress, avg_stress, stress_utilization, stress_uniformity）も
+同じ表の列として渡す。列がない場合や値が NaN の場合は、スカラー版の building_info.get() /
+fem_results.get() と同じデフォルト値を使う。設計パラメータ（Lx [m] など）しかない表は
+building_columns_from_params で building_info の列に変換できる。
+安全率は safety_factor_batch（calculate_safety_factor の配列版）で計算する。
+
+使用例:
+    from batch_scoring import score_batch
+    scores = score_batch(table)
+    cost_per_sqm = scores['economic']['cost_per_sqm']
+"""
+
+import math
+
+import numpy as np
+
+from generate_building_fem_analyze import (FIXED_RECYCLE_RATIOS, MATERIAL_PROPERTIES, MATERIAL_TABLE,
+                                           PART_LABOR_FACTORS, PART_MATERIAL_KEYS)
+
+
+# 各部材の体積比率（スカラー版の parts_volume_ratio と同じ順序）
+PARTS_VOLUME_RATIO = (
+    ('columns', 0.15),
+    ('floors', 0.30),
+    ('roof', 0.15),
+    ('walls', 0.25),
+    ('foundation', 0.10),
+    ('balcony', 0.05),
+)
+
+# 部材ごとの労務費係数を材料コードで引く配列
+_LABOR_FACTOR_TABLE = {part: np.array(factors, dtype=float) for part, factors in PART_LABOR_FACTORS.items()}
+
+# 評価に使うFEM結果の列
+FEM_COLUMNS = ('max_displacement', 'max_stress', 'avg_stress', 'stress_utilization', 'stress_uniformity')
+
+# 設計パラメータから building_info を作るときに固定値となる項目（create_realistic_building_model と同じ）
+FIXED_BUILDING_INFO = {
+    'opening_complexity': 2.5,
+    'structural_irregularity': 1.8,
+    'has_cantilever': 0.0,
+    'floor_opening_ratio': 0.7,
+    'piloti_structure': 1.0,
+}
+
+
+class _Columns:
+    """入力表の列を float 配列として取り出す（列がない・NaN の場合はデフォルト値）"""
+
+    def __init__(self, data):
+        if hasattr(data, 'columns') and hasattr(data, 'to_numpy'):
+            self._data = {name: data[name].to_numpy() for name in data.columns}
+        elif isinstance(data, np.ndarray) and data.dtype.names:
+            self._data = {name: data[name] for name in data.dtype.names}
+        else:
+            self._data = {name: np.asarray(values) for name, values in dict(data).items()}
+        lengths = {np.size(values) for values in self._data.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"列の長さが揃っていません: {sorted(lengths)}")
+        self.size = lengths.pop() if lengths else 0
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def present(self, name):
+        """列があり値が NaN でない行（スカラー版の `'key' in building_info` に相当）"""
+        if name not in self._data:
+            return np.zeros(self.size, dtype=bool)
+        return ~np.isnan(np.asarray(self._data[name], dtype=float))
+
+    def get(self, name, default=0.0):
+        if name not in self._data:
+            return np.full(self.size, float(default))
+        values = np.asarray(self._data[name], dtype=float)
+        return np.where(np.isnan(values), float(default), values)
+
+    def flag(self, name):
+        return self.get(name, 0.0) != 0
+
+
+def _material_codes(mat_type):
+    """材料値 → 材料コード（material_code の配列版。0/1/2 以外はコンクリート）"""
+    return np.where(mat_type == 1, 1, np.where(mat_type == 2, 2, 0))
+
+
+def _part_material_codes(cols, part):
+    """部材の材料コード（part_material_code の配列版）"""
+    keys = PART_MATERIAL_KEYS.get(part, ())
+    if not keys:
+        return np.zeros(cols.size, dtype=int)
+    return _material_codes(np.max([cols.get(name, 0) for name in keys], axis=0))
+
+
+def _piecewise(conditions_values, default):
+    """if/elif の分岐（先に書いた条件が優先）"""
+    conditions = [c for c, _ in conditions_values]
+    values = [v for _, v in conditions_values]
+    return np.select(conditions, values, default=default)
+
+
+def _safe_divide(numerator, denominator):
+    """分母が0以下の行は0（スカラー版の `x / y if y > 0 else 0`）"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1.0), 0.0)
+
+
+def economic_cost_batch(data):
+    """
+    calculate_economic_cost の配列版
+
+    Args:
+        data: building_info の列を持つ表（構造化配列・DataFrame・辞書）
+
+    Returns:
+        dict: calculate_economic_cost と同じキー → 各設計の値の配列
+    """
+    cols = data if isinstance(data, _Columns) else _Columns(data)
+    volume_m3 = cols.get('volume', 0.0)
+    mass_kg = cols.get('mass', 0.0)
+
+    Lx = cols.get('Lx_mm', 8000) / 1000
+    Ly = cols.get('Ly_mm', 8000) / 1000
+    total_floor_area_sqm = Lx * Ly
+
+    # 材料費・労務費（部材ごと）
+    total_material_cost = np.zeros(cols.size)
+    total_labor_cost = np.zeros(cols.size)
+    for part, ratio in PARTS_VOLUME_RATIO:
+        part_volume = volume_m3 * ratio
+        code = _part_material_codes(cols, part)
+        labor_factor = _LABOR_FACTOR_TABLE[part][code]
+        recycle_ratio = FIXED_RECYCLE_RATIOS.get(f'recycle_ratio_{part}', 0.0)
+        cost_per_m3 = MATERIAL_TABLE['cost_per_m3'][code]
+        new_material_cost = part_volume * cost_per_m3
+        recycle_material_cost = part_volume * cost_per_m3 * MATERIAL_TABLE['recycle_cost_factor'][code]
+        material_cost = new_material_cost * (1 - recycle_ratio) + recycle_material_cost * recycle_ratio
+        total_material_cost = total_material_cost + material_cost
+        total_labor_cost = total_labor_cost + material_cost * 0.5 * labor_factor
+
+    # 鉄筋・型枠（コンクリート部分のみ）
+    ratios = dict(PARTS_VOLUME_RATIO)
+    mat_col = cols.get('material_columns', 0)
+    concrete_ratio = np.zeros(cols.size) + ratios['foundation']
+    concrete_ratio = concrete_ratio + np.where(mat_col == 0, ratios['columns'], 0.0)
+    concrete_ratio = concrete_ratio + np.where((cols.get('material_floor1', 0) == 0)
+                                              & (cols.get('material_floor2', 0) == 0), ratios['floors'], 0.0)
+    concrete_ratio = concrete_ratio + np.where(cols.get('material_roof', 0) == 0, ratios['roof'], 0.0)
+    concrete_ratio = concrete_ratio + np.where(cols.get('material_walls', 0) == 0, ratios['walls'], 0.0)
+    concrete_ratio = concrete_ratio + np.where(cols.get('material_balcony', 0) == 0, ratios['balcony'], 0.0)
+    concrete_volume = volume_m3 * concrete_ratio
+    rebar_cost = concrete_volume * 125 * 150
+    formwork_cost = concrete_volume * 4 * 8000
+
+    # 構造部材サイズによる割増（列がない行は割増なし）
+    has_columns = cols.present('bc_mm') & cols.present('hc_mm')
+    has_slabs = cols.present('tf_mm') & cols.present('tr_mm')
+    avg_column_size = (cols.get('bc_mm') + cols.get('hc_mm')) / 2
+    avg_slab_thickness = (cols.get('tf_mm') + cols.get('tr_mm')) / 2
+    wall_thickness = cols.get('tw_ext_mm')
+
+    structural_complexity = np.ones(cols.size)
+    structural_complexity = structural_complexity * np.where(has_columns, _piecewise([
+        (avg_column_size > 800, 1.35),
+        (avg_column_size > 700, 1.25),
+        (avg_column_size > 600, 1.15),
+        (avg_column_size > 500, 1.08),
+    ], 1.0), 1.0)
+    structural_complexity = structural_complexity * np.where(has_slabs, _piecewise([
+        (avg_slab_thickness > 400, 1.20),
+        (avg_slab_thickness > 300, 1.10),
+        (avg_slab_thickness > 250, 1.05),
+    ], 1.0), 1.0)
+    structural_complexity = structural_complexity * np.where(cols.present('tw_ext_mm'), _piecewise([
+        (wall_thickness > 400, 1.12),
+        (wall_thickness > 350, 1.06),
+    ], 1.0), 1.0)
+
+    base_building_cost = 150000 * total_floor_area_sqm
+    complexity_factor = 1 + (
+        cols.get('asymmetry_factor', 0) * 0.1 +
+        cols.get('opening_complexity', 0) * 0.05 +
+        cols.get('structural_irregularity', 0) * 0.15 +
+        cols.flag('has_cantilever') * 0.1 +
+        cols.flag('has_stairs') * 0.08
+    )
+
+    special_cost = np.zeros(cols.size)
+    special_cost = special_cost + np.where(np.abs(cols.get('wall_tilt_angle', 0)) > 10,
+                                           total_floor_area_sqm * 20000, 0.0)
+    special_cost = special_cost + np.where(cols.get('roof_morph', 0.5) > 0.7, total_floor_area_sqm * 15000, 0.0)
+
+    # 品質グレード
+    quality_grade_factor = np.ones(cols.size)
+    quality_grade_factor = quality_grade_factor * np.where(has_columns, _piecewise([
+        (avg_column_size > 700, 1.20),
+        (avg_column_size > 600, 1.12),
+        (avg_column_size > 500, 1.06),
+    ], 1.0), 1.0)
+    quality_grade_factor = quality_grade_factor * np.where(has_slabs, _piecewise([
+        (avg_slab_thickness > 350, 1.15),
+        (avg_slab_thickness > 300, 1.08),
+    ], 1.0), 1.0)
+    quality_grade_factor = quality_grade_factor * np.where(mat_col == 2, 1.10, 1.0)
+    quality_grade_factor = quality_grade_factor * np.where((cols.get('material_floor1', 0) == 2)
+                                                          | (cols.get('material_floor2', 0) == 2), 1.08, 1.0)
+
+    # 構造体積に基づく追加係数
+    bc = cols.get('bc_mm', 600)
+    hc = cols.get('hc_mm', 600)
+    tf = cols.get('tf_mm', 300)
+    tr = cols.get('tr_mm', 300)
+    tw_ext = cols.get('tw_ext_mm', 300)
+    column_oversize = np.maximum(1.0, (bc * hc) / (400 * 400))
+    floor_oversize = np.maximum(1.0, tf / 200)
+    roof_oversize = np.maximum(1.0, tr / 200)
+    wall_oversize = np.maximum(1.0, tw_ext / 200)
+    material_factor = np.where(mat_col == 1, 1.5, np.where(mat_col == 2, 0.9, 1.0))
+
+    structural_volume_factor = 1.0 + (
+        0.3 * np.log(column_oversize) +
+        0.2 * np.log(floor_oversize) +
+        0.1 * np.log(roof_oversize) +
+        0.1 * np.log(wall_oversize)
+    ) * material_factor * 0.8
+    structural_volume_factor = structural_volume_factor * np.where(bc * hc > 640000, 1.1, 1.0)
+    structural_volume_factor = structural_volume_factor * np.where((tf > 500) | (tr > 500), 1.08, 1.0)
+    wood_count = sum((cols.get(name, 0) == 1).astype(int) for name in
+                     ('material_columns', 'material_floor1', 'material_floor2', 'material_roof', 'material_walls'))
+    structural_volume_factor = structural_volume_factor * np.where(wood_count >= 5, 1.1,
+                                                                   np.where(wood_count >= 3, 1.05, 1.0))
+    structural_volume_factor = structural_volume_factor * np.where((mat_col == 1) & (bc * hc > 400000), 1.08, 1.0)
+    structural_volume_factor = np.maximum(1.0, structural_volume_factor)
+
+    # 総工事費
+    structural_cost = (total_material_cost + total_labor_cost + rebar_cost + formwork_cost) * structural_complexity
+    structural_cost = structural_cost * (quality_grade_factor * structural_volume_factor)
+    total_construction_cost_yen = structural_cost + base_building_cost * complexity_factor + special_cost
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        structural_cost_ratio = structural_cost / total_construction_cost_yen
+
+    return {
+        'total_construction_cost': total_construction_cost_yen,
+        'cost_per_sqm': _safe_divide(total_construction_cost_yen, total_floor_area_sqm),
+        'mass_per_volume': _safe_divide(mass_kg, volume_m3),
+        'structural_cost_ratio': structural_cost_ratio,
+        'concrete_volume': volume_m3,
+    }
+
+
+def _fem_rows(cols, fem_available):
+    """FEM結果を使う行（スカラー版の `if fem_results:`）"""
+    if fem_available is None:
+        fem_available = any(name in cols for name in FEM_COLUMNS)
+    return np.broadcast_to(np.asarray(fem_available, dtype=bool), (cols.size,))
+
+
+def environmental_impact_batch(data, fem_available=None):
+    """
+    calculate_environmental_impact の配列版
+
+    Args:
+        data: building_info とFEM結果の列を持つ表（構造化配列・DataFrame・辞書）
+        fem_available: FEM結果を渡した扱いにする行（bool または bool 配列）。
+                       Noneの場合はFEM結果の列が1つでもあれば全行
+
+    Returns:
+        dict: calculate_environmental_impact と同じキー → 各設計の値の配列
+    """
+    cols = data if isinstance(data, _Columns) else _Columns(data)
+    volume_m3 = cols.get('volume', 0.0)
+
+    total_co2_from_materials = np.zeros(cols.size)
+    concrete_volume_m3 = np.zeros(cols.size)
+    wood_volume_m3 = np.zeros(cols.size)
+    for part, ratio in PARTS_VOLUME_RATIO:
+        part_volume = volume_m3 * ratio
+        code = _part_material_codes(cols, part)
+        is_wood = MATERIAL_TABLE['is_wood'][code] != 0
+        wood_volume_m3 = wood_volume_m3 + np.where(is_wood, part_volume, 0.0)
+        concrete_volume_m3 = concrete_volume_m3 + np.where(is_wood, 0.0, part_volume)
+
+        recycle_ratio = FIXED_RECYCLE_RATIOS.get(f'recycle_ratio_{part}', 0.0)
+        co2_per_m3 = MATERIAL_TABLE['co2_per_m3'][code]
+        new_material_co2 = part_volume * co2_per_m3
+        recycle_material_co2 = part_volume * co2_per_m3 * MATERIAL_TABLE['recycle_co2_factor'][code]
+        total_co2_from_materials = total_co2_from_materials + (
+            new_material_co2 * (1 - recycle_ratio) + recycle_material_co2 * recycle_ratio)
+
+    rebar_kg_per_m3 = np.where(cols.flag('piloti_structure'), 150, 125)
+    rebar_kg = concrete_volume_m3 * rebar_kg_per_m3
+    rebar_co2 = rebar_kg * 2.0
+
+    concrete_material_kg = concrete_volume_m3 * 2400
+    wood_material_kg = wood_volume_m3 * 500
+    total_material_kg = concrete_material_kg + wood_material_kg + rebar_kg
+    transport_co2 = total_material_kg * 0.05 * 0.1
+
+    construction_co2 = concrete_volume_m3 * 50 + wood_volume_m3 * 30
+
+    total_co2_emission_kg = total_co2_from_materials + rebar_co2 + transport_co2 + construction_co2
+
+    Lx = cols.get('Lx_mm', 8000) / 1000
+    Ly = cols.get('Ly_mm', 8000) / 1000
+    total_floor_area_sqm = Lx * Ly
+
+    # FEM結果を活用した最適化評価
+    use_fem = _fem_rows(cols, fem_available)
+    stress_utilization = cols.get('stress_utilization', 0.5)
+    stress_uniformity = cols.get('stress_uniformity', 0.7)
+    potential = _piecewise([
+        (stress_utilization < 0.3, 0.20),
+        (stress_utilization < 0.5, 0.10),
+        (stress_utilization < 0.7, 0.05),
+    ], 0.0)
+    potential = potential + np.where(stress_uniformity < 0.6, 0.05, 0.0)
+    optimization_potential = np.where(use_fem, np.minimum(0.30, potential), 0.0)
+    material_efficiency_score = np.where(use_fem, stress_utilization * stress_uniformity, 0.5)
+
+    concrete_co2 = concrete_volume_m3 * MATERIAL_PROPERTIES['concrete']['co2_per_m3']
+    optimizable_co2 = concrete_co2 + rebar_co2
+    optimized_co2_emission = total_co2_emission_kg - optimizable_co2 * optimization_potential
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        performance_ratio = (total_co2_emission_kg / total_floor_area_sqm) / 500
+
+    # CO2排出量の上限（2000 kg-CO2/m²）
+    max_co2_per_sqm = 2000
+    co2_per_sqm_actual = _safe_divide(total_co2_emission_kg, total_floor_area_sqm)
+    over = co2_per_sqm_actual > max_co2_per_sqm
+    reduction_factor = np.where(over, max_co2_per_sqm / np.where(over, co2_per_sqm_actual, 1.0), 1.0)
+    total_co2_emission_kg = np.where(over, total_co2_emission_kg * reduction_factor, total_co2_emission_kg)
+    optimized_co2_emission = np.where(over, optimized_co2_emission * reduction_factor, optimized_co2_emission)
+
+    return {
+        'total_co2_emission': total_co2_emission_kg,
+        'co2_per_sqm': _safe_divide(total_co2_emission_kg, total_floor_area_sqm),
+        'optimized_co2_emission': optimized_co2_emission,
+        'optimized_co2_per_sqm': _safe_divide(optimized_co2_emission, total_floor_area_sqm),
+        'optimization_potential': optimization_potential,
+        'material_efficiency_score': material_efficiency_score,
+        'materials_co2': total_co2_from_materials,
+        'concrete_co2': concrete_co2,
+        'wood_co2': np.where(wood_volume_m3 > 0, wood_volume_m3 * MATERIAL_PROPERTIES['wood']['co2_per_m3'], 0.0),
+        'rebar_co2': rebar_co2,
+        'transport_co2': transport_co2,
+        'construction_co2': construction_co2,
+        'performance_vs_benchmark': performance_ratio,
+        'concrete_volume': concrete_volume_m3,
+        'wood_volume': wood_volume_m3,
+    }
+
+
+def comfort_score_batch(data):
+    """
+    calculate_comfort_score の配列版
+
+    Args:
+        data: building_info とFEM結果（max_displacement）の列を持つ表
+
+    Returns:
+        dict: calculate_comfort_score と同じキー → 各設計の値の配列
+    """
+    cols = data if isinstance(data, _Columns) else _Columns(data)
+
+    # 空間の広がり感
+    H1 = cols.get('H1_mm', 3000) / 1000
+    H2 = cols.get('H2_mm', 3000) / 1000
+    avg_height = (H1 + H2) / 2
+    height_score = _piecewise([
+        (avg_height >= 4.0, 20.0),
+        (avg_height >= 3.5, 12.0 + (avg_height - 3.5) * 16.0),
+        (avg_height >= 3.0, 3.0 + (avg_height - 3.0) * 18.0),
+        (avg_height >= 2.7, -3.0 + (avg_height - 2.7) * 20.0),
+        (avg_height >= 2.4, -8.0 + (avg_height - 2.4) * 16.67),
+    ], -10.0)
+
+    Lx = cols.get('Lx_mm', 8000) / 1000
+    Ly = cols.get('Ly_mm', 8000) / 1000
+    avg_span = (Lx + Ly) / 2
+    span_score = _piecewise([
+        (avg_span >= 15, 20.0),
+        (avg_span >= 12, 12.0 + (avg_span - 12) * 2.67),
+        (avg_span >= 10, 3.0 + (avg_span - 10) * 4.5),
+        (avg_span >= 8, -5.0 + (avg_span - 8) * 4.0),
+    ], -10.0)
+    spaciousness_score = (height_score + span_score) / 2
+
+    # 採光・眺望
+    window_ratio = cols.get('window_ratio_2f', 0.4)
+    daylight_score = _piecewise([
+        (window_ratio >= 0.8, 10.0),
+        (window_ratio >= 0.6, 7.0 + (window_ratio - 0.6) * 15.0),
+        (window_ratio >= 0.4, 3.0 + (window_ratio - 0.4) * 20.0),
+        (window_ratio >= 0.2, 0.0 + (window_ratio - 0.2) * 15.0),
+    ], 0.0)
+    view_score = _piecewise([
+        (H1 >= 3.5, 10.0),
+        (H1 >= 3.0, 5.0 + (H1 - 3.0) * 10.0),
+        (H1 >= 2.5, 0.0 + (H1 - 2.5) * 10.0),
+    ], 0.0)
+    lighting_score = (daylight_score * 0.7 + view_score * 0.3)
+
+    # ピロティによる開放感
+    floor_opening_ratio = cols.get('floor_opening_ratio', 0.7)
+    piloti_score = -5.0 + _piecewise([
+        (floor_opening_ratio > 0.8, 3.0),
+        (floor_opening_ratio > 0.6, 1.5),
+    ], 0.0)
+    bc = cols.get('bc_mm', 400)
+    piloti_score = piloti_score + _piecewise([
+        (bc <= 300, 8.0),
+        (bc <= 400, 5.0),
+        (bc <= 500, 2.0),
+        (bc <= 700, -2.0),
+        (bc <= 900, -5.0),
+    ], -8.0)
+
+    # プライバシー・静粛性
+    tw_ext = cols.get('tw_ext_mm', 150)
+    privacy_score = -5.0 + _piecewise([
+        (tw_ext >= 400, 12.0),
+        (tw_ext >= 300, 9.0),
+        (tw_ext >= 200, 6.0),
+        (tw_ext >= 150, 3.0),
+        (tw_ext >= 100, 0.0),
+    ], -2.0)
+
+    # 構造的安心感
+    max_disp = cols.get('max_displacement', 0.0)
+    span_length = cols.get('span_length', 8.0) * 1000
+    allowable_disp = span_length / 300
+    disp_ratio = _safe_divide(max_disp, allowable_disp)
+    structural_comfort = _piecewise([
+        (disp_ratio <= 0.3, 10.0),
+        (disp_ratio <= 0.6, 10.0 - (disp_ratio - 0.3) * 10.0),
+        (disp_ratio <= 1.0, 7.0 - (disp_ratio - 0.6) * 10.0),
+    ], np.maximum(0, 3.0 - (disp_ratio - 1.0) * 3.0))
+
+    # デザイン性（ペナルティ）
+    wall_tilt = np.abs(cols.get('wall_tilt_angle', 0))
+    design_penalty = (wall_tilt / 30.0) ** 2 * 3.0
+    design_penalty = design_penalty + np.abs(cols.get('roof_morph', 0.5) - 0.5) * 1.0
+
+    # バルコニー
+    balcony_depth = cols.get('balcony_depth', 0)
+    balcony_bonus = np.where(cols.flag('has_balcony'), _piecewise([
+        (balcony_depth >= 3.0, 2.0),
+        (balcony_depth >= 2.0, 1.5),
+        (balcony_depth >= 1.5, 1.0),
+        (balcony_depth >= 1.0, 0.5),
+    ], 0.2), 0)
+
+    base_score = (
+        spaciousness_score * 0.35 +
+        lighting_score * 0.25 +
+        piloti_score * 0.20 +
+        privacy_score * 0.10 +
+        structural_comfort * 0.10
+    )
+    raw_score = base_score * 0.8 - design_penalty + balcony_bonus
+    # np.exp は math.exp と最終桁が異なる場合があるため、スカラー版と一致させるよう math.exp を使う
+    exp_values = np.fromiter(map(math.exp, -(raw_score / 5.0)), dtype=float, count=cols.size)
+    sigmoid_value = 1 / (1 + exp_values)
+    comfort_score = np.clip(2.0 + sigmoid_value * 7.0, 2.0, 9.0)
+
+    return {
+        'comfort_score': comfort_score,
+        'spaciousness_score': spaciousness_score,
+        'lighting_score': lighting_score,
+        'piloti_openness_score': piloti_score,
+        'privacy_score': privacy_score,
+        'structural_comfort_score': structural_comfort,
+        'design_penalty': design_penalty,
+        'balcony_bonus': balcony_bonus,
+        'height_score': height_score,
+        'span_score': span_score,
+        'daylight_score': daylight_score,
+        'view_score': view_score,
+    }
+
+
+def constructability_score_batch(data, fem_available=None):
+    """
+    calculate_constructability_score の配列版
+
+    Args:
+        data: building_info とFEM結果（max_stress, avg_stress）の列を持つ表
+        fem_available: FEM結果を渡した扱いにする行（environmental_impact_batch と同じ）
+
+    Returns:
+        dict: calculate_constructability_score と同じキー → 各設計の値の配列
+    """
+    cols = data if isinstance(data, _Columns) else _Columns(data)
+    has_cantilever = cols.flag('has_cantilever')
+    has_stairs = cols.flag('has_stairs')
+
+    score = np.full(cols.size, 10.0)
+    score = np.where(has_cantilever, score - 2.0, score)
+    score = np.where(has_stairs, score - 1.5, score)
+    score = score + 1.0
+    score = score - cols.get('opening_complexity', 0) * 0.5
+
+    wall_tilt_angle = np.abs(cols.get('wall_tilt_angle', 0))
+    score = np.where(wall_tilt_angle > 0, score - wall_tilt_angle / 10.0, score)
+
+    roof_morph = cols.get('roof_morph', 0.5)
+    roof_penalty = _piecewise([
+        (roof_morph < 0.2, 0.0),
+        (roof_morph < 0.7, 0.5),
+    ], 1.5)
+    score = score - roof_penalty
+
+    balcony_depth = cols.get('balcony_depth', 0)
+    balcony_penalty = _piecewise([
+        (balcony_depth >= 2.0, 1.5),
+        (balcony_depth >= 1.0, 1.0),
+    ], 0.5)
+    score = np.where(cols.flag('has_balcony'), score - balcony_penalty, score)
+    score = np.clip(score, 0, 10)
+
+    # FEM結果による応力集中の減点
+    max_stress = cols.get('max_stress', 0)
+    avg_stress = cols.get('avg_stress', 1)
+    stress_concentration = _safe_divide(max_stress, avg_stress)
+    stress_concentration_penalty = np.where(_fem_rows(cols, fem_available) & (avg_stress > 0)
+                                            & (stress_concentration > 3.0), 0.5, 0)
+    score = np.clip(score - stress_concentration_penalty, 0, 10)
+
+    return {
+        'constructability_score': score,
+        'cantilever_penalty': np.where(has_cantilever, -2.0, 0),
+        'stairs_penalty': np.where(has_stairs, -1.5, 0),
+        'roof_complexity_penalty': -roof_penalty,
+        'stress_concentration_penalty': -stress_concentration_penalty,
+    }
+
+
+def safety_factor_batch(data):
+    """
+    calculate_safety_factor の配列版
+
+    Args:
+        data: FEM結果（max_stress [MPa], max_displacement [mm]）と材料（material_*）の列を持つ表。
+              H1・H2 [m] の列がない場合はスカラー版と同じく 3.0m（building_info には含まれない）
+
+    Returns:
+        np.ndarray: 安全率（応力が0以下の行は inf）
+    """
+    cols = data if isinstance(data, _Columns) else _Columns(data)
+    is_wood = MATERIAL_TABLE['is_wood']
+    concrete_allowable, wood_allowable = 35.0, 6.0
+    column_code = _material_codes(cols.get('material_columns', 0))
+    column_wood = is_wood[column_code] > 0
+    walls_wood = is_wood[_material_codes(cols.get('material_walls', 0))] > 0
+    floors_wood = ((is_wood[_material_codes(cols.get('material_floor1', 0))] > 0)
+                   | (is_wood[_material_codes(cols.get('material_floor2', 0))] > 0))
+    avg_allowable = (np.where(column_wood, wood_allowable, concrete_allowable) * 0.4
+                     + np.where(walls_wood, wood_allowable, concrete_allowable) * 0.3
+                     + np.where(floors_wood, wood_allowable, concrete_allowable) * 0.3)
+
+    max_stress = cols.get('max_stress', 0.0)
+    max_displacement = cols.get('max_displacement', 0.0)
+    stress_safety = _safe_divide(avg_allowable, max_stress)
+
+    # 層間変形角1/200。木造系は0.3倍に加えて疲労係数（CLT 0.7 / 一般木材 0.6）
+    allowable_displacement = (cols.get('H1', 3.0) + cols.get('H2', 3.0)) * 1000 / 200
+    displacement_safety = _safe_divide(allowable_displacement, max_displacement)
+    wood_factor = np.where(column_code == 2, 0.3 * 0.7, 0.3 * 0.6)
+    displacement_safety = np.where(column_wood, displacement_safety * wood_factor, displacement_safety)
+
+    safety = np.where(max_displacement > 0, np.minimum(stress_safety, displacement_safety), stress_safety)
+    return np.where(max_stress > 0, safety, np.inf)
+
+
+def building_columns_from_params(data):
+    """
+    設計パラメータの表（Lx, Ly, H1, H2 [m], tf, tr, bc, hc, tw_ext [mm] など）を
+    evaluate_building が作る building_info と同じ列に変換する
+
+    volume・mass は入力の列があればそのまま使い、ない場合は quantity_takeoff の数量積算
+    （OCC の形状を生成せずに設計パラメータから求めた体積）で補う。
+
+    Args:
+        data: 設計パラメータの列を持つ表（pso_output の CSV を読んだ DataFrame など）
+
+    Returns:
+        dict: building_info のキー → 配列
+    """
+    cols = _Columns(data)
+    Lx = cols.get('Lx')
+    Ly = cols.get('Ly')
+    balcony_depth = cols.get('balcony_depth', 0.0)
+    span = np.maximum(Lx, Ly)
+    if 'volume' in cols:
+        volume, mass = cols.get('volume', 0.0), cols.get('mass', 0.0)
+    else:
+        from quantity_takeoff import takeoff_batch
+        quantities = takeoff_batch(cols)
+        volume, mass = quantities['volume'], quantities['mass']
+    columns = {
+        'volume': volume,
+        'mass': mass,
+        'span_length': span,
+        'asymmetry_factor': _safe_divide(np.abs(Lx - Ly), span),
+        'wall_tilt_angle': cols.get('wall_tilt_angle', 0.0),
+        'window_ratio_2f': cols.get('window_ratio_2f', 0.4),
+        'roof_morph': cols.get('roof_morph', 0.5),
+        'roof_shift': cols.get('roof_shift', 0.0),
+        'Lx_mm': np.trunc(Lx * 1000),
+        'Ly_mm': np.trunc(Ly * 1000),
+        'H1_mm': np.trunc(cols.get('H1') * 1000),
+        'H2_mm': np.trunc(cols.get('H2') * 1000),
+        'tf_mm': np.trunc(cols.get('tf')),
+        'tr_mm': np.trunc(cols.get('tr')),
+        'bc_mm': np.trunc(cols.get('bc')),
+        'hc_mm': np.trunc(cols.get('hc')),
+        'tw_ext_mm': np.trunc(cols.get('tw_ext')),
+        'balcony_depth': balcony_depth,
+        'has_balcony': (balcony_depth > 0).astype(float),
+    }
+    for name in ('material_columns', 'material_floor1', 'material_floor2',
+                 'material_roof', 'material_walls', 'material_balcony'):
+        columns[name] = cols.get(name, 0)
+    for name, value in FIXED_BUILDING_INFO.items():
+        columns[name] = np.full(cols.size, value)
+    for name in FEM_COLUMNS:
+        if name in cols:
+            columns[name] = cols.get(name, np.nan)
+    return columns
+
+
+def score_batch(data, fem_available=None, as_frame=False):
+    """
+    4つの評価指標をまとめて計算
+
+    Args:
+        data: building_info とFEM結果の列を持つ表（構造化配列・DataFrame・辞書）
+        fem_available: FEM結果を渡した扱いにする行（Noneの場合はFEM結果の列の有無で判定）
+        as_frame: True の場合は '<指標>_<項目>' を列名とする DataFrame で返す
+
+    Returns:
+        dict: {'economic': {...}, 'environmental': {...}, 'comfort': {...}, 'constructability': {...}}
+              （evaluate_building の結果と同じ構成で、各値は配列）
+    """
+    cols = _Columns(data)
+    scores = {
+        'economic': economic_cost_batch(cols),
+        'environmental': environmental_impact_batch(cols, fem_available),
+        'comfort': comfort_score_batch(cols),
+        'constructability': constructability_score_batch(cols, fem_available),
+    }
+    if not as_frame:
+        return scores
+    import pandas as pd
+    return pd.DataFrame({f"{group}_{key}": values
+                         for group, metrics in scores.items() for key, values in metrics.items()})
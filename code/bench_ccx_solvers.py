@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_ccx_solvers.py
+====================
+CalculiX 連立方程式ソルバーのベンチマーク用スクリプト
+参照設計の .inp デッキを直接パス（FEM_DIRECT_INP=1）で1回だけ作成し、
+ccx に組み込まれている各ソルバー（SPOOLES / PARDISO / PaStiX / 反復法）で解き直して
+実行時間・最大メモリ（子プロセスの ru_maxrss）・基準ソルバーとの結果の差をCSVに出力。
+最後にモデル規模ごとの推奨ソルバー（FEM_CCX_SOLVER に設定する値）を表示
+"""
+
+import sys
+import os
+import csv
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+# 現在のディレクトリのみをPythonパスに追加（親ディレクトリは追加しない）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+import numpy as np
+
+from generate_building_fem_analyze import evaluate_building_from_params
+from ccx_inp_writer import (CCX_SOLVERS, find_ccx_binary, probe_ccx_solvers, read_abaqus_mesh,
+                            static_keyword)
+from cpu_budget import get_cpu_budget
+from fem_workdir import get_workdir_manager
+from frd_reader import read_frd, summarize_frd
+
+OUTPUT_CSV = "ccx_solver_benchmark.csv"
+
+# 基準ソルバー（直接法）との許容差: 最大変位で正規化した変位場の最大差
+FIELD_TOLERANCE = 1e-3
+
+_BASE_PARAMS = {
+    'Lx': 8.5, 'Ly': 9.0, 'H1': 3.0, 'H2': 3.0,
+    'tf': 400, 'tr': 450, 'bc': 450, 'hc': 450, 'tw_ext': 350,
+    'wall_tilt_angle': 0, 'window_ratio_2f': 0.4,
+    'roof_morph': 0.5, 'roof_shift': 0.0, 'balcony_depth': 0.0,
+    'material_columns': 0, 'material_floor1': 0, 'material_floor2': 0,
+    'material_roof': 0, 'material_walls': 0, 'material_balcony': 0,
+}
+
+# 規模の異なる参照設計（節点数がおおよそ小・中・大）
+REFERENCE_DESIGNS = [
+    ('small', {'Lx': 6.0, 'Ly': 6.5}),
+    ('base', {}),
+    ('large', {'Lx': 14.0, 'Ly': 13.0, 'H1': 3.6, 'H2': 3.4, 'balcony_depth': 2.5,
+               'wall_tilt_angle': -20, 'roof_morph': 0.8}),
+]
+
+
+def _generate_deck(params, bench_root):
+    """直接パスで1回評価し、作業ディレクトリに残った .inp デッキのパスを返す"""
+    os.environ['FEM_DIRECT_INP'] = '1'
+    os.environ['FEM_KEEP_WORKDIR'] = '1'
+    os.environ['FEM_WORKDIR_ROOT'] = bench_root
+    results = evaluate_building_from_params(params)
+    run_dir = get_workdir_manager().last_run_dir
+    if results.get('status') != 'Success' or not run_dir:
+        return None
+    decks = [f for f in os.listdir(run_dir) if f.endswith('.inp') and not f.endswith('_mesh.inp')]
+    return os.path.join(run_dir, decks[0]) if decks else None
+
+
+def _run_with_solver(deck_path, solver, work_dir, ccx_binary, num_threads):
+    """
+    デッキの *STATIC 行を指定ソルバーに書き換えて ccx を実行
+
+    Returns:
+        tuple: (.frd のパス or None, 実行時間 [秒], 最大メモリ [MB])
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    job_name = os.path.splitext(os.path.basename(deck_path))[0]
+    src_dir = os.path.dirname(deck_path)
+    for name in os.listdir(src_dir):
+        if name.startswith(job_name) and name.endswith('.inp'):
+            shutil.copy(os.path.join(src_dir, name), work_dir)
+
+    inp_path = os.path.join(work_dir, f"{job_name}.inp")
+    with open(inp_path, 'r') as f:
+        text = f.read()
+    text = re.sub(r'^\*STATIC.*$', static_keyword(solver) if solver != 'default' else '*STATIC',
+                  text, flags=re.MULTILINE | re.IGNORECASE)
+    with open(inp_path, 'w') as f:
+        f.write(text)
+
+    env = os.environ.copy()
+    env['OMP_NUM_THREADS'] = str(num_threads)
+    env['CCX_NPROC_EQUATION_SOLVER'] = str(num_threads)
+    start = time.perf_counter()
+    proc = subprocess.Popen([ccx_binary, '-i', job_name], cwd=work_dir, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = proc.stdout.read().decode('utf-8', 'replace')
+    # wait4 でこの子プロセスだけのリソース使用量を取得（ru_maxrss は Linux では KB）
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = status
+    elapsed = time.perf_counter() - start
+
+    frd_path = os.path.join(work_dir, f"{job_name}.frd")
+    if '*ERROR' in output or not os.path.exists(frd_path):
+        return None, elapsed, usage.ru_maxrss / 1024
+    return frd_path, elapsed, usage.ru_maxrss / 1024
+
+
+def _displacement_field(frd_path):
+    steps = read_frd(frd_path, fields=('DISP',))
+    nodes, values = steps[-1]['DISP']
+    order = np.argsort(nodes)
+    return values[order, :3]
+
+
+def _relative_diff(a, b):
+    if a is None or b is None:
+        return None
+    return abs(a - b) / max(abs(b), 1e-12)
+
+
+ccx_binary = find_ccx_binary()
+if not ccx_binary:
+    print("❌ ccx 実行ファイルが見つかりません")
+    sys.exit(1)
+
+num_threads = get_cpu_budget().ccx_threads
+bench_root = tempfile.mkdtemp(prefix='ccx_solver_bench_')
+
+print("=== CalculiX ソルバー ベンチマーク ===")
+available = probe_ccx_solvers(os.path.join(bench_root, 'probe'), ccx_binary)
+solvers = ['default'] + [s for s in CCX_SOLVERS if available.get(s)]
+print(f"ccx: {ccx_binary} / スレッド数 {num_threads}")
+print("利用可能なソルバー: " + ", ".join(solvers))
+
+rows = []
+try:
+    for name, overrides in REFERENCE_DESIGNS:
+        params = dict(_BASE_PARAMS, **overrides)
+        deck_path = _generate_deck(params, bench_root)
+        if deck_path is None:
+            print(f"\n[{name}] デッキの作成に失敗しました")
+            continue
+        job_name = os.path.splitext(os.path.basename(deck_path))[0]
+        mesh_path = os.path.join(os.path.dirname(deck_path), f"{job_name}_mesh.inp")
+        num_nodes = len(read_abaqus_mesh(mesh_path)['node_ids']) if os.path.exists(mesh_path) else None
+        print(f"\n[{name}] 節点数 {num_nodes:,}" if num_nodes else f"\n[{name}]")
+
+        # 基準は直接法（SPOOLES、なければ ccx の既定）
+        reference = 'spooles' if 'spooles' in solvers else 'default'
+        ordered = [reference] + [s for s in solvers if s != reference]
+        ref_field, ref_summary = None, None
+        for solver in ordered:
+            frd_path, elapsed, max_rss_mb = _run_with_solver(
+                deck_path, solver, os.path.join(bench_root, name, solver), ccx_binary, num_threads)
+            row = {'design': name, 'nodes': num_nodes, 'solver': solver,
+                   'time_s': round(elapsed, 3), 'max_rss_mb': round(max_rss_mb, 1),
+                   'success': frd_path is not None}
+            if frd_path is not None:
+                summary = summarize_frd(frd_path)
+                field = _displacement_field(frd_path)
+                if ref_field is None:
+                    ref_field, ref_summary = field, summary
+                scale = max(float(np.abs(ref_field).max()), 1e-12)
+                row['max_stress'] = summary.get('max_stress')
+                row['max_displacement'] = summary.get('max_displacement')
+                row['stress_rel_diff'] = _relative_diff(summary.get('max_stress'), ref_summary.get('max_stress'))
+                row['displacement_rel_diff'] = _relative_diff(summary.get('max_displacement'),
+                                                              ref_summary.get('max_displacement'))
+                row['field_rel_diff'] = (float(np.abs(field - ref_field).max()) / scale
+                                         if field.shape == ref_field.shape else None)
+            rows.append(row)
+            status = "✅" if row['success'] else "❌"
+            print(f"  {status} {solver:<18s}: {elapsed:7.2f} 秒 / {max_rss_mb:8.1f} MB"
+                  + (f" / 変位場の差 {row['field_rel_diff']:.2e}" if row.get('field_rel_diff') is not None else ""))
+finally:
+    for key in ('FEM_DIRECT_INP', 'FEM_KEEP_WORKDIR', 'FEM_WORKDIR_ROOT'):
+        os.environ.pop(key, None)
+    shutil.rmtree(bench_root, ignore_errors=True)
+
+if rows:
+    fieldnames = ['design', 'nodes', 'solver', 'time_s', 'max_rss_mb', 'success', 'max_stress',
+                  'max_displacement', 'stress_rel_diff', 'displacement_rel_diff', 'field_rel_diff']
+    with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\n結果を {OUTPUT_CSV} に保存しました")
+
+    print("\n=== 推奨ソルバー（変位場の差 ≤ {:.0e} の中で最速） ===".format(FIELD_TOLERANCE))
+    for name, _ in REFERENCE_DESIGNS:
+        accurate = [r for r in rows if r['design'] == name and r['success']
+                    and r.get('field_rel_diff') is not None and r['field_rel_diff'] <= FIELD_TOLERANCE]
+        if accurate:
+            best = min(accurate, key=lambda r: r['time_s'])
+            print(f"  {name} ({best['nodes']} 節点): FEM_CCX_SOLVER={best['solver']} "
+                  f"({best['time_s']:.2f} 秒, {best['max_rss_mb']:.0f} MB)")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_frd_reader.py
+===================
+frd_reader のベンチマーク用スクリプト
+10万節点以上の合成 .frd（ASCII long / binary）を生成し、
+従来の readlines + split 方式とベクトル化リーダーの速度と結果を比較
+"""
+
+import sys
+import os
+import math
+import tempfile
+import time
+
+# 現在のディレクトリのみをPythonパスに追加（親ディレクトリは追加しない）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+import numpy as np
+
+from frd_reader import read_frd, summarize_frd, von_mises
+
+# ベンチマーク設定
+NODE_COUNTS = [100000, 300000]
+REPEAT = 3
+
+
+def _write_block_header(f, name, numnod, comps, fmt, step=1):
+    """100C / -4 / -5 行を書き出す"""
+    f.write(f"  100CL  101{1.0:12.5E}{numnod:12d}{'':20s} 0{step:5d}{'':10s}{fmt:2d}\n".encode())
+    f.write(f" -4  {name:<8s}{len(comps):5d}    1\n".encode())
+    for i, comp in enumerate(comps, 1):
+        f.write(f" -5  {comp:<8s}    1    2{i:5d}    0\n".encode())
+
+
+def write_synthetic_frd(path, num_nodes, binary=False, seed=12345):
+    """
+    DISP（3成分）と STRESS（6成分）ブロックを持つ合成 .frd を作成
+
+    Returns:
+        tuple: (変位配列 (n, 3), 応力配列 (n, 6))
+    """
+    rng = np.random.default_rng(seed)
+    disp = rng.normal(0.0, 1.0, size=(num_nodes, 3))
+    stress = rng.normal(0.0, 5.0, size=(num_nodes, 6))
+    nodes = np.arange(1, num_nodes + 1)
+    fmt = 2 if binary else 1
+
+    with open(path, 'wb') as f:
+        f.write(b"    1C\n")
+        f.write(b"    1PSTEP                         1           1           1\n")
+        for name, comps, values in (('DISP', ['D1', 'D2', 'D3'], disp),
+                                    ('STRESS', ['SXX', 'SYY', 'SZZ', 'SXY', 'SYZ', 'SZX'], stress)):
+            _write_block_header(f, name, num_nodes, comps, fmt)
+            if binary:
+                rec = np.zeros(num_nodes, dtype=[('node', '<i4'), ('values', '<f4', (len(comps),))])
+                rec['node'] = nodes
+                rec['values'] = values
+                f.write(rec.tobytes())
+                f.write(b"\n -3\n")
+            else:
+                row_fmt = " -1%10d" + "%12.5E" * len(comps) + "\n"
+                f.write("".join(row_fmt % ((n,) + tuple(v)) for n, v in zip(nodes, values)).encode())
+                f.write(b" -3\n")
+        f.write(b" 9999\n")
+    return disp, stress
+
+
+def legacy_max_stress(frd_path):
+    """従来の extract_fem_results のフォールバック（readlines + split + math.sqrt）"""
+    with open(frd_path, 'r') as f:
+        lines = f.readlines()
+    stress_values = []
+    in_stress_block = False
+    for line in lines:
+        if 'STRESS' in line and line.strip().startswith('-4'):
+            in_stress_block = True
+            continue
+        elif line.strip().startswith('-3') and in_stress_block:
+            break
+        elif in_stress_block and line.strip().startswith('-1'):
+            parts = line.strip().split()
+            if len(parts) >= 8:
+                try:
+                    s11, s22, s33, s12, s13, s23 = (float(p) for p in parts[2:8])
+                    stress_values.append(math.sqrt(0.5 * (
+                        (s11 - s22)**2 + (s22 - s33)**2 + (s33 - s11)**2 +
+                        6 * (s12**2 + s13**2 + s23**2)
+                    )))
+                except ValueError:
+                    pass
+    return max(stress_values) if stress_values else None, len(stress_values)
+
+
+def legacy_fixed_width_max_stress(frd_path):
+    """従来方式を桁位置で切り出すよう修正したもの（1行ずつ float 変換）"""
+    with open(frd_path, 'r') as f:
+        lines = f.readlines()
+    stress_values = []
+    in_stress_block = False
+    for line in lines:
+        if 'STRESS' in line and line.startswith(' -4'):
+            in_stress_block = True
+            continue
+        elif line.startswith(' -3') and in_stress_block:
+            break
+        elif in_stress_block and line.startswith(' -1'):
+            s11, s22, s33, s12, s13, s23 = (float(line[13 + 12 * i:25 + 12 * i]) for i in range(6))
+            stress_values.append(math.sqrt(0.5 * (
+                (s11 - s22)**2 + (s22 - s33)**2 + (s33 - s11)**2 +
+                6 * (s12**2 + s13**2 + s23**2)
+            )))
+    return max(stress_values) if stress_values else None, len(stress_values)
+
+
+def vectorized_max_stress(frd_path, use_mmap=True):
+    """ベクトル化リーダーで STRESS ブロックのみ読み込み最大 Von Mises 応力を返す"""
+    steps = read_frd(frd_path, fields=('STRESS',), use_mmap=use_mmap)
+    return float(von_mises(steps[-1]['STRESS'][1]).max())
+
+
+def _best_time(func):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        value = func()
+        times.append(time.perf_counter() - start)
+    return min(times), value
+
+
+print("=== FRDリーダー ベンチマーク ===")
+with tempfile.TemporaryDirectory() as tmp_dir:
+    for num_nodes in NODE_COUNTS:
+        ascii_path = os.path.join(tmp_dir, f"bench_{num_nodes}.frd")
+        binary_path = os.path.join(tmp_dir, f"bench_{num_nodes}_bin.frd")
+        disp, stress = write_synthetic_frd(ascii_path, num_nodes)
+        write_synthetic_frd(binary_path, num_nodes, binary=True)
+        expected_max = float(von_mises(stress).max())
+
+        legacy_time, (legacy_max, legacy_count) = _best_time(lambda: legacy_max_stress(ascii_path))
+        fixed_time, (fixed_max, _) = _best_time(lambda: legacy_fixed_width_max_stress(ascii_path))
+        ascii_time, vec_max = _best_time(lambda: vectorized_max_stress(ascii_path))
+        nommap_time, _ = _best_time(lambda: vectorized_max_stress(ascii_path, use_mmap=False))
+        binary_time, binary_max = _best_time(lambda: vectorized_max_stress(binary_path))
+        summary_time, summary = _best_time(lambda: summarize_frd(binary_path))
+
+        steps = read_frd(ascii_path)
+        parsed_stress = steps[0]['STRESS'][1]
+        max_abs_err = float(np.abs(parsed_stress - stress).max())
+
+        print(f"\n[{num_nodes:,} 節点] ファイルサイズ {os.path.getsize(ascii_path) / 1e6:.1f} MB")
+        print(f"  従来方式 (split)         : {legacy_time:.3f} 秒  最大応力 {legacy_max:.5f}  "
+              f"(負値の連結で読取 {legacy_count:,}/{num_nodes:,} 節点のみ)")
+        print(f"  従来方式 (桁位置・1行ずつ): {fixed_time:.3f} 秒  最大応力 {fixed_max:.5f}")
+        print(f"  ベクトル化 ASCII (mmap)  : {ascii_time:.3f} 秒  最大応力 {vec_max:.5f}  "
+              f"({fixed_time / ascii_time:.1f} 倍)")
+        print(f"  ベクトル化 ASCII (read)  : {nommap_time:.3f} 秒")
+        print(f"  ベクトル化 binary        : {binary_time:.3f} 秒  最大応力 {binary_max:.5f}  "
+              f"({fixed_time / binary_time:.1f} 倍)")
+        print(f"  summarize_frd (binary)   : {summary_time:.3f} 秒  臨界変位 {summary['critical_displacement']:.5f}")
+        print(f"  真値との差 (E12.5丸め)   : 応力成分 {max_abs_err:.2e}, "
+              f"最大応力 {abs(vec_max - expected_max):.2e}")
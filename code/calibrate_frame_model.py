@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+calibrate_frame_model.py
+========================
+骨組・シェル縮約モデル（FEM_FIDELITY=frame）をソリッドモデルに合わせて補正するスクリプト
+参照設計ごとに両モデルで解析し、最大応力・最大変位の比の幾何平均を補正係数として
+frame_calibration.json に保存する。順位相関（スクリーニングとしての有効性）も表示
+"""
+
+import sys
+import os
+import csv
+import json
+import math
+import time
+
+# 現在のディレクトリのみをPythonパスに追加（親ディレクトリは追加しない）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+import numpy as np
+
+from generate_building_fem_analyze import evaluate_building_from_params
+from frame_model import DEFAULT_CALIBRATION_FILE
+
+OUTPUT_CSV = "frame_calibration.csv"
+OUTPUT_JSON = os.environ.get('FEM_FRAME_CALIBRATION', '') or DEFAULT_CALIBRATION_FILE
+
+_BASE_PARAMS = {
+    'Lx': 8.5, 'Ly': 9.0, 'H1': 3.0, 'H2': 3.0,
+    'tf': 400, 'tr': 450, 'bc': 450, 'hc': 450, 'tw_ext': 350,
+    'wall_tilt_angle': 0, 'window_ratio_2f': 0.4,
+    'roof_morph': 0.5, 'roof_shift': 0.0, 'balcony_depth': 0.0,
+    'material_columns': 0, 'material_floor1': 0, 'material_floor2': 0,
+    'material_roof': 0, 'material_walls': 0, 'material_balcony': 0,
+}
+
+# 寸法・形状・材料を振った参照設計
+REFERENCE_DESIGNS = [
+    ('base', {}),
+    ('slender_columns', {'bc': 300, 'hc': 300}),
+    ('thick_slabs', {'tf': 600, 'tr': 600}),
+    ('large_span', {'Lx': 12.0, 'Ly': 11.0}),
+    ('tall', {'H1': 3.8, 'H2': 3.6}),
+    ('tilted_in', {'wall_tilt_angle': -20, 'window_ratio_2f': 0.6}),
+    ('tilted_out', {'wall_tilt_angle': 28, 'roof_morph': 0.8}),
+    ('balcony_flat_roof', {'balcony_depth': 2.0, 'roof_morph': 0.2}),
+    ('wood_frame', {'material_columns': 1, 'material_floor1': 1, 'material_floor2': 1,
+                    'material_roof': 1, 'material_walls': 1, 'bc': 700, 'hc': 700}),
+    ('mixed', {'material_columns': 2, 'material_walls': 1, 'roof_shift': 0.4}),
+]
+
+
+def _evaluate(params, fidelity):
+    """
+    指定の忠実度で評価し、(最大応力, 最大変位, 実行時間, 失敗理由) を返す（縮約モデルは補正前の値）
+
+    縮約モデルの解析に失敗してソリッドモデルで解析した設計は、補正係数と順位相関を
+    完全一致の点として歪めるため値を返さない（失敗理由に 'solid_fallback' を返す）。
+    """
+    os.environ['FEM_FIDELITY'] = fidelity
+    start = time.time()
+    results = evaluate_building_from_params(params)
+    elapsed = time.time() - start
+    if results.get('status') != 'Success':
+        return None, None, elapsed, 'failed'
+    raw = results.get('raw_fem_results', {})
+    if fidelity == 'frame':
+        used_frame = results.get('building_info', {}).get('fem_fidelity') == 'frame'
+        if not used_frame or 'frame_raw_max_stress' not in raw or 'frame_raw_max_displacement' not in raw:
+            return None, None, elapsed, 'solid_fallback'
+        return raw['frame_raw_max_stress'], raw['frame_raw_max_displacement'], elapsed, None
+    return raw.get('max_stress'), raw.get('max_displacement'), elapsed, None
+
+
+def _rank_correlation(a, b):
+    """Spearman の順位相関係数"""
+    ra = np.argsort(np.argsort(a))
+    rb = np.argsort(np.argsort(b))
+    if len(a) < 3:
+        return float('nan')
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+print("=== 縮約モデル 補正係数の算出開始 ===")
+
+rows = []
+for name, overrides in REFERENCE_DESIGNS:
+    params = dict(_BASE_PARAMS, **overrides)
+    print(f"\n[{name}]")
+
+    solid_stress, solid_disp, solid_time, solid_error = _evaluate(params, 'solid')
+    frame_stress, frame_disp, frame_time, frame_error = _evaluate(params, 'frame')
+
+    print(f"  ソリッド: 応力 {solid_stress} MPa / 変位 {solid_disp} mm / {solid_time:.1f} 秒")
+    print(f"  縮約    : 応力 {frame_stress} MPa / 変位 {frame_disp} mm / {frame_time:.1f} 秒")
+    if frame_error == 'solid_fallback':
+        print("  ⚠️ 縮約モデルの解析に失敗しソリッドモデルで解析されたため、補正の対象から除外します")
+
+    rows.append({
+        'design': name,
+        'solid_max_stress': solid_stress,
+        'frame_max_stress': frame_stress,
+        'solid_max_displacement': solid_disp,
+        'frame_max_displacement': frame_disp,
+        'solid_time_s': round(solid_time, 2),
+        'frame_time_s': round(frame_time, 2),
+        'excluded': solid_error or frame_error or '',
+    })
+
+os.environ.pop('FEM_FIDELITY', None)
+
+with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+    writer.writeheader()
+    writer.writerows(rows)
+
+valid = [r for r in rows if all(r[k] for k in ('solid_max_stress', 'frame_max_stress',
+                                               'solid_max_displacement', 'frame_max_displacement'))]
+fallbacks = [r['design'] for r in rows if r['excluded'] == 'solid_fallback']
+if fallbacks:
+    print(f"\n⚠️ 縮約モデルからソリッドモデルに切り替わった設計 {len(fallbacks)} 件を除外: {', '.join(fallbacks)}")
+if not valid:
+    print("\n❌ 両モデルで解析できた設計がないため補正係数を計算できません")
+    sys.exit(1)
+
+solid_s = np.array([r['solid_max_stress'] for r in valid])
+frame_s = np.array([r['frame_max_stress'] for r in valid])
+solid_d = np.array([r['solid_max_displacement'] for r in valid])
+frame_d = np.array([r['frame_max_displacement'] for r in valid])
+
+calibration = {
+    'stress_factor': float(math.exp(np.mean(np.log(solid_s / frame_s)))),
+    'displacement_factor': float(math.exp(np.mean(np.log(solid_d / frame_d)))),
+    'stress_rank_correlation': _rank_correlation(solid_s, frame_s),
+    'displacement_rank_correlation': _rank_correlation(solid_d, frame_d),
+    'samples': len(valid),
+    'excluded_solid_fallback': len(fallbacks),
+    'mean_speedup': float(np.mean([r['solid_time_s'] / max(r['frame_time_s'], 1e-3) for r in valid])),
+}
+stress_err = np.abs(frame_s * calibration['stress_factor'] / solid_s - 1)
+disp_err = np.abs(frame_d * calibration['displacement_factor'] / solid_d - 1)
+calibration['stress_max_rel_error'] = float(stress_err.max())
+calibration['displacement_max_rel_error'] = float(disp_err.max())
+
+with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
+    json.dump(calibration, f, indent=2, ensure_ascii=False)
+
+print(f"\n補正係数: 応力 ×{calibration['stress_factor']:.3f} / 変位 ×{calibration['displacement_factor']:.3f}")
+print(f"補正後の最大相対誤差: 応力 {calibration['stress_max_rel_error'] * 100:.1f}% / "
+      f"変位 {calibration['displacement_max_rel_error'] * 100:.1f}%")
+print(f"順位相関: 応力 {calibration['stress_rank_correlation']:.3f} / "
+      f"変位 {calibration['displacement_rank_correlation']:.3f}")
+print(f"平均速度比: {calibration['mean_speedup']:.1f} 倍")
+print(f"\n結果を {OUTPUT_CSV} / {OUTPUT_JSON} に保存しました")
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ccx_inp_writer.py
+=================
+CalculiX入力デッキ（.inp）の直接書き出しと ccx の実行
+
+CcxTools（update_objects / setup_working_dir / setup_ccx / check_prerequisites /
+write_inp_file）はドキュメント全体と拘束オブジェクトをPythonで走査するため、
+1評価ごとのオーバーヘッドが大きい。本モジュールはメッシュと
+setup_basic_fem_analysis で選択された面（基礎固定・自重・地震・屋根・バルコニー荷重）
+だけから .inp を直接書き出し、ccx をサブプロセスとして起動する。
+
+単位系は FreeCAD FEM と同じ mm / N / t / MPa。
+"""
+
+import os
+import shutil
+import subprocess
+
+import numpy as np
+
+from fem_pipeline import solver_wait
+
+
+# 1行あたりの番号数（CalculiXの上限は16）
+_IDS_PER_LINE = 8
+
+# FEM_CCX_SOLVER の値 → *STATIC の SOLVER パラメータ
+# （default / 未設定の場合は ccx がビルド時に組み込まれたソルバーから自動選択）
+CCX_SOLVERS = {
+    'spooles': 'SPOOLES',
+    'pardiso': 'PARDISO',
+    'pastix': 'PASTIX',
+    'iterativescaling': 'ITERATIVE SCALING',
+    'iterativecholesky': 'ITERATIVE CHOLESKY',
+}
+
+
+def get_ccx_solver():
+    """
+    環境変数 FEM_CCX_SOLVER から連立方程式ソルバー名を取得
+
+    Returns:
+        str or None: CCX_SOLVERS のキー（default / 未設定 / 不明な値の場合は None）
+    """
+    name = os.environ.get('FEM_CCX_SOLVER', '').strip().lower().replace(' ', '').replace('_', '')
+    return name if name in CCX_SOLVERS else None
+
+
+def static_keyword(solver=None):
+    """
+    *STATIC 行を作成
+
+    Args:
+        solver: CCX_SOLVERS のキー（Noneの場合 FEM_CCX_SOLVER）
+
+    Returns:
+        str: 例 "*STATIC, SOLVER=PARDISO"
+    """
+    solver = solver or get_ccx_solver()
+    if solver in CCX_SOLVERS:
+        return f"*STATIC, SOLVER={CCX_SOLVERS[solver]}"
+    return "*STATIC"
+
+
+def _quantity_value(value, unit):
+    """
+    FreeCADのQuantity・文字列・数値を指定単位の float に変換
+
+    Args:
+        value: Quantity / "25000 MPa" 形式の文字列 / 数値
+        unit: 変換先の単位文字列（例: 'MPa'）
+
+    Returns:
+        float: 指定単位での値
+    """
+    if hasattr(value, 'getValueAs'):
+        return float(value.getValueAs(unit))
+    if isinstance(value, str):
+        try:
+            import FreeCAD as App
+            return float(App.Units.Quantity(value).getValueAs(unit))
+        except Exception:
+            return float(value.split()[0])
+    return float(value)
+
+
+def _iter_reference_shapes(references):
+    """
+    拘束オブジェクトの References から (オブジェクト, サブ要素形状) を列挙
+
+    References は [(obj, 'Face1'), ...] と [(obj, ('Face1', 'Face2')), ...]
+    のどちらの形式でも返ってくるため両方に対応する。
+    """
+    for ref in references:
+        ref_obj, subs = ref[0], ref[1]
+        if isinstance(subs, str):
+            subs = (subs,)
+        for sub in subs:
+            yield sub, ref_obj.Shape.getElement(sub)
+
+
+def collect_material(analysis_obj):
+    """
+    解析コンテナの最初の材料オブジェクトから弾性定数と密度を取り出す
+
+    Returns:
+        dict or None: name, E_mpa, poisson, density_t_mm3
+    """
+    for obj in analysis_obj.Group:
+        if hasattr(obj, 'Material') and isinstance(obj.Material, dict):
+            mat = obj.Material
+            return {
+                'name': obj.Name,
+                'E_mpa': _quantity_value(mat.get('YoungsModulus', '25000 MPa'), 'MPa'),
+                'poisson': float(mat.get('PoissonRatio', 0.2)),
+                # kg/m³ → t/mm³
+                'density_t_mm3': _quantity_value(mat.get('Density', '2400 kg/m^3'), 'kg/m^3') * 1e-12,
+            }
+    return None
+
+
+def collect_ccx_model(analysis_obj, mesh_obj, load_cases=None):
+    """
+    解析コンテナから .inp 書き出しに必要な最小限の情報を収集
+
+    材料・固定節点・圧力面（要素番号と面番号の組）を取り出す。
+    面から節点／要素面への対応付けは FemMesh の C++ 実装
+    （getNodesByFace / getccxVolumesByFace）で行う。
+
+    Args:
+        analysis_obj: setup_basic_fem_analysis が返す解析コンテナ
+        mesh_obj: メッシュ生成済みの Gmsh メッシュオブジェクト
+        load_cases: define_multi_load_cases の荷重ケース定義（Noneの場合は
+                    解析コンテナの圧力荷重をすべて1ケースにまとめる）
+
+    Returns:
+        dict: femmesh, material, fixed_nodes, pressure_loads, load_cases を含む辞書
+    """
+    femmesh = mesh_obj.FemMesh
+    model = {
+        'femmesh': femmesh,
+        'material': collect_material(analysis_obj),
+        'fixed_nodes': np.zeros(0, dtype=np.int64),
+        'pressure_loads': [],
+    }
+
+    fixed_nodes = set()
+    for obj in analysis_obj.Group:
+        type_id = getattr(obj, 'TypeId', '')
+
+        if type_id == 'Fem::ConstraintFixed':
+            for sub, shape in _iter_reference_shapes(obj.References):
+                if sub.startswith('Face'):
+                    fixed_nodes.update(femmesh.getNodesByFace(shape))
+                elif sub.startswith('Edge'):
+                    fixed_nodes.update(femmesh.getNodesByEdge(shape))
+                elif sub.startswith('Vertex'):
+                    fixed_nodes.update(femmesh.getNodesByVertex(shape))
+
+        elif type_id == 'Fem::ConstraintPressure':
+            pressure_mpa = _quantity_value(obj.Pressure, 'MPa')
+            if getattr(obj, 'Reversed', False):
+                pressure_mpa = -pressure_mpa
+            faces = []
+            for sub, shape in _iter_reference_shapes(obj.References):
+                faces.extend(femmesh.getccxVolumesByFace(shape))
+            if faces:
+                model['pressure_loads'].append({
+                    'name': obj.Name,
+                    'pressure_mpa': pressure_mpa,
+                    'faces': np.asarray(faces, dtype=np.int64).reshape(-1, 2),
+                })
+
+    model['fixed_nodes'] = np.array(sorted(fixed_nodes), dtype=np.int64)
+    if load_cases:
+        model['component_faces'] = resolve_component_faces(analysis_obj.Document, femmesh,
+                                                           load_cases['components'])
+        model['load_cases'] = build_case_loads(load_cases, model['component_faces'])
+    else:
+        model['load_cases'] = [{'name': 'static', 'pressure_loads': model['pressure_loads']}]
+    return model
+
+
+def resolve_component_faces(doc, femmesh, components):
+    """
+    荷重成分の参照面を *DLOAD 用の要素面リストに変換
+
+    同じ面を複数の成分で使うため、面ごとの getccxVolumesByFace の結果はキャッシュする。
+
+    Args:
+        doc: FreeCADドキュメント
+        femmesh: メッシュ（FemMesh）
+        components: {成分名: {'references': [[オブジェクト名, 'FaceN'], ...], 'pressure_pa'}}
+
+    Returns:
+        dict: 成分名 → (要素番号, 面番号) の配列 (n, 2)
+    """
+    face_cache = {}
+    component_faces = {}
+    for comp_name, comp in components.items():
+        faces = []
+        for obj_name, sub in comp['references']:
+            key = (obj_name, sub)
+            if key not in face_cache:
+                face_cache[key] = femmesh.getccxVolumesByFace(doc.getObject(obj_name).Shape.getElement(sub))
+            faces.extend(face_cache[key])
+        component_faces[comp_name] = np.asarray(faces, dtype=np.int64).reshape(-1, 2)
+    return component_faces
+
+
+def build_case_loads(load_cases, component_faces):
+    """
+    荷重ケース定義と成分ごとの要素面から、ケースごとの圧力荷重リストを作成
+
+    Args:
+        load_cases: {'components': {...}, 'cases': [{'name', 'components'}, ...]}
+        component_faces: resolve_component_faces が返す辞書
+
+    Returns:
+        list: [{'name': ケース名, 'pressure_loads': [...]}, ...]
+    """
+    resolved_components = {
+        comp_name: {
+            'name': comp_name,
+            'pressure_mpa': comp['pressure_pa'] * 1e-6,
+            'faces': component_faces[comp_name],
+        }
+        for comp_name, comp in load_cases['components'].items() if comp_name in component_faces
+    }
+    return [
+        {'name': case['name'],
+         'pressure_loads': [resolved_components[c] for c in case['components'] if c in resolved_components]}
+        for case in load_cases['cases']
+    ]
+
+
+def read_abaqus_mesh(mesh_path):
+    """
+    FemMesh.writeABAQUS が書き出したメッシュファイルを配列として読み込む
+
+    Args:
+        mesh_path: *Node / *Element を含む .inp ファイル
+
+    Returns:
+        dict: node_ids (n,), coords (n, 3), element_ids (m,), connectivity (m, k), element_type
+    """
+    node_lines, element_tokens = [], []
+    element_type = None
+    section = None
+    with open(mesh_path, 'r') as f:
+        for line in f:
+            if line.startswith('**'):
+                continue
+            if line.startswith('*'):
+                keyword = line.upper()
+                if keyword.startswith('*NODE'):
+                    section = 'node'
+                elif keyword.startswith('*ELEMENT'):
+                    section = 'element'
+                    for option in keyword.split(','):
+                        if option.strip().startswith('TYPE='):
+                            element_type = option.split('=')[1].strip()
+                else:
+                    section = None
+                continue
+            if section == 'node':
+                node_lines.append(line)
+            elif section == 'element':
+                # 1要素が複数行に折り返されている場合もあるため番号列として連結
+                element_tokens.extend(t for t in line.strip().rstrip(',').split(',') if t.strip())
+
+    nodes = np.loadtxt(node_lines, delimiter=',', ndmin=2)
+    nodes_per_element = {'C3D4': 4, 'C3D10': 10}.get(element_type, 10)
+    elements = np.asarray(element_tokens, dtype=np.int64).reshape(-1, nodes_per_element + 1)
+    return {
+        'node_ids': nodes[:, 0].astype(np.int64),
+        'coords': nodes[:, 1:4],
+        'element_ids': elements[:, 0],
+        'connectivity': elements[:, 1:],
+        'element_type': element_type or 'C3D10',
+    }
+
+
+def write_mesh_arrays(mesh_path, mesh_arrays):
+    """
+    配列のメッシュを writeABAQUS と同じ形式（Nall / Evolumes）で書き出す
+
+    Args:
+        mesh_path: 書き出すファイルのパス
+        mesh_arrays: read_abaqus_mesh と同じ形式の辞書
+    """
+    with open(mesh_path, 'w') as f:
+        f.write("** Nodes\n*Node, NSET=Nall\n")
+        np.savetxt(f, np.column_stack((mesh_arrays['node_ids'], mesh_arrays['coords'])),
+                   fmt='%d, %.13e, %.13e, %.13e')
+        f.write(f"** Volume elements\n*Element, TYPE={mesh_arrays['element_type']}, ELSET=Evolumes\n")
+        np.savetxt(f, np.column_stack((mesh_arrays['element_ids'], mesh_arrays['connectivity'])),
+                   fmt='%d', delimiter=', ')
+
+
+def _write_id_lines(f, ids):
+    """番号列を1行 _IDS_PER_LINE 個ずつカンマ区切りで書き出す"""
+    ids = np.asarray(ids, dtype=np.int64)
+    for start in range(0, len(ids), _IDS_PER_LINE):
+        f.write(",".join(str(i) for i in ids[start:start + _IDS_PER_LINE]) + ",\n")
+
+
+def _write_dloads(f, pressure_loads):
+    """圧力荷重を *DLOAD 行（要素番号, P面番号, 圧力[MPa]）として書き出す"""
+    for load in pressure_loads:
+        faces = load['faces']
+        if len(faces) == 0:
+            continue
+        f.write(f"** {load['name']}: {load['pressure_mpa']:.6g} MPa\n")
+        value = f"{load['pressure_mpa']:.13G}"
+        f.write("\n".join(f"{e},P{n},{value}" for e, n in faces) + "\n")
+
+
+def write_inp_deck(inp_path, model):
+    """
+    収集したモデル情報から CalculiX の .inp デッキを書き出す
+
+    メッシュ本体は FemMesh.writeABAQUS（model に mesh_arrays がある場合は配列から）で
+    別ファイル（<job>_mesh.inp）に出力し、*INCLUDE で読み込む。
+    節点・要素の並びは CcxTools の出力と同一になる。
+
+    荷重ケースごとに *STEP を書き出し、2番目以降は *DLOAD, OP=NEW で前のケースの
+    荷重を置き換える。結果（.frd）はステップ順に出力される。
+
+    Args:
+        inp_path: 書き出す .inp ファイルのパス
+        model: collect_ccx_model が返す辞書
+
+    Returns:
+        str: 書き出した .inp ファイルのパス
+    """
+    working_dir = os.path.dirname(os.path.abspath(inp_path))
+    job_name = os.path.splitext(os.path.basename(inp_path))[0]
+    mesh_file = os.path.join(working_dir, f"{job_name}_mesh.inp")
+
+    if model.get('mesh_arrays') is not None:
+        # モーフィングしたメッシュなど、配列で持っているメッシュはそのまま書き出す
+        write_mesh_arrays(mesh_file, model['mesh_arrays'])
+    else:
+        # elemParam=1: ボリューム要素のみ, groupParam=False: グループは出力しない
+        model['femmesh'].writeABAQUS(mesh_file, 1, False)
+
+    material = model['material'] or {
+        'name': 'Concrete', 'E_mpa': 25000.0, 'poisson': 0.2, 'density_t_mm3': 2.4e-9
+    }
+
+    with open(inp_path, 'w') as f:
+        f.write("** CalculiX input deck written by ccx_inp_writer.py\n")
+        f.write(f"*INCLUDE, INPUT={os.path.basename(mesh_file)}\n")
+        f.write("*ELSET, ELSET=Eall\nEvolumes\n")
+
+        f.write("*NSET, NSET=FixedSupport\n")
+        _write_id_lines(f, model['fixed_nodes'])
+
+        f.write(f"*MATERIAL, NAME={material['name']}\n")
+        f.write(f"*ELASTIC\n{material['E_mpa']:.13G},{material['poisson']:.13G}\n")
+        f.write(f"*DENSITY\n{material['density_t_mm3']:.13G}\n")
+        f.write(f"*SOLID SECTION, ELSET=Eall, MATERIAL={material['name']}\n")
+
+        load_cases = model.get('load_cases') or [{'name': 'static', 'pressure_loads': model['pressure_loads']}]
+        for i, case in enumerate(load_cases):
+            f.write(f"** Load case {i + 1}: {case['name']}\n")
+            f.write(f"*STEP\n{static_keyword(model.get('solver'))}\n")
+            if i == 0:
+                f.write("*BOUNDARY\nFixedSupport,1,3,0.0\n")
+                f.write("*DLOAD\n")
+            else:
+                f.write("*DLOAD, OP=NEW\n")
+            _write_dloads(f, case['pressure_loads'])
+            f.write("*NODE FILE\nU\n*EL FILE\nS\n")
+            f.write("*END STEP\n")
+
+    return inp_path
+
+
+def find_ccx_binary():
+    """
+    ccx 実行ファイルのパスを探す
+
+    優先順位: 環境変数 FEM_CCX_BINARY → FreeCADのFEM設定 → PATH 上の ccx
+
+    Returns:
+        str or None: 見つかった実行ファイルのパス
+    """
+    env_binary = os.environ.get('FEM_CCX_BINARY', '')
+    if env_binary:
+        return env_binary
+
+    try:
+        import FreeCAD as App
+        prefs = App.ParamGet("User parameter:BaseApp/Preferences/Mod/Fem/Ccx")
+        if not prefs.GetBool("UseStandardCcxLocation", True):
+            pref_binary = prefs.GetString("ccxBinaryPath", "")
+            if pref_binary:
+                return pref_binary
+        home_bin = os.path.join(App.getHomePath(), "bin")
+        for name in ("ccx", "ccx.exe"):
+            candidate = os.path.join(home_bin, name)
+            if os.path.isfile(candidate):
+                return candidate
+    except Exception:
+        pass
+
+    return shutil.which('ccx')
+
+
+def run_ccx(working_dir, job_name, ccx_binary=None, num_threads=None, timeout=None):
+    """
+    ccx をサブプロセスとして実行（ブロッキング）
+
+    Args:
+        working_dir: .inp が置かれた作業ディレクトリ
+        job_name: ジョブ名（.inp の拡張子なしファイル名）
+        ccx_binary: ccx 実行ファイル（Noneの場合 find_ccx_binary で探索）
+        num_threads: OMP_NUM_THREADS に設定するスレッド数
+        timeout: タイムアウト秒数
+
+    Returns:
+        subprocess.CompletedProcess: 実行結果
+
+    Raises:
+        FileNotFoundError: ccx が見つからない場合
+        RuntimeError: ccx がエラーを出力した、または .frd が生成されなかった場合
+    """
+    ccx_binary = ccx_binary or find_ccx_binary()
+    if not ccx_binary:
+        raise FileNotFoundError("ccx 実行ファイルが見つかりません")
+
+    env = os.environ.copy()
+    if num_threads:
+        env['OMP_NUM_THREADS'] = str(num_threads)
+        env['CCX_NPROC_EQUATION_SOLVER'] = str(num_threads)
+
+    # パイプライン評価中は ccx の実行待ちの間に他の設計のモデル生成を進める（fem_pipeline.py）
+    with solver_wait():
+        proc = subprocess.run(
+            [ccx_binary, '-i', job_name],
+            cwd=working_dir, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, timeout=timeout
+        )
+
+    frd_path = os.path.join(working_dir, f"{job_name}.frd")
+    if '*ERROR' in proc.stdout or not os.path.exists(frd_path):
+        error_lines = [line for line in proc.stdout.splitlines() if '*ERROR' in line]
+        raise RuntimeError(f"ccx の実行に失敗しました: {' / '.join(error_lines[:3]) or proc.stderr.strip()}")
+
+    return proc
+
+
+class DirectCcxRun:
+    """
+    直接パスで実行した ccx の結果ハンドル
+
+    extract_fem_results が CcxTools の代わりに受け取れるよう、
+    result_object と working_dir を同じ名前で持つ。
+    """
+
+    def __init__(self, analysis, working_dir, job_name):
+        self.analysis = analysis
+        self.working_dir = working_dir
+        self.job_name = job_name
+        self.result_object = None
+        self.ccx_stdout = ''
+        # 複数荷重ケースの場合のケース名（.frd のステップ順）
+        self.load_case_names = []
+        # True の場合 extract_fem_results は結果オブジェクトを使わず .frd を直接読む
+        self.scalar_results = False
+        # write_inp_deck に渡したモデル（メッシュモーフィングの元データ登録に使う）
+        self.model = None
+
+    @property
+    def inp_file_name(self):
+        return os.path.join(self.working_dir, f"{self.job_name}.inp")
+
+    @property
+    def frd_file_name(self):
+        return os.path.join(self.working_dir, f"{self.job_name}.frd")
+
+    def load_results(self):
+        """FRDを読み込み、CcxTools.load_results と同じ結果オブジェクトを作成"""
+        import feminout.importCcxFrdResults as importCcxFrdResults
+        importCcxFrdResults.importFrd(self.frd_file_name, self.analysis, "CCX_")
+        for obj in self.analysis.Group:
+            if obj.isDerivedFrom('Fem::FemResultObject'):
+                self.result_object = obj
+        return self.result_object
+
+
+def probe_ccx_solvers(working_dir, ccx_binary=None):
+    """
+    ccx に組み込まれている連立方程式ソルバーを1要素の試験モデルで調べる
+
+    組み込まれていないソルバーを指定すると ccx はエラー終了するため、
+    ソルバーごとに実行して成否を記録する。
+
+    Args:
+        working_dir: 試験モデルを書き出すディレクトリ
+        ccx_binary: ccx 実行ファイル（Noneの場合 find_ccx_binary で探索）
+
+    Returns:
+        dict: ソルバー名 → 利用可能かどうか
+    """
+    os.makedirs(working_dir, exist_ok=True)
+    available = {}
+    for solver in CCX_SOLVERS:
+        job_name = f"probe_{solver}"
+        with open(os.path.join(working_dir, f"{job_name}.inp"), 'w') as f:
+            f.write("*NODE, NSET=Nall\n")
+            corners = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+            for i, (x, y, z) in enumerate(corners, 1):
+                f.write(f"{i},{x},{y},{z}\n")
+            f.write("*ELEMENT, TYPE=C3D8, ELSET=Eall\n1,1,2,3,4,5,6,7,8\n")
+            f.write("*MATERIAL, NAME=M\n*ELASTIC\n1000.,0.3\n*SOLID SECTION, ELSET=Eall, MATERIAL=M\n")
+            f.write(f"*STEP\n{static_keyword(solver)}\n*BOUNDARY\n1,1,3\n2,2,3\n4,1,1\n4,3,3\n3,3,3\n")
+            f.write("*CLOAD\n5,3,1.\n6,3,1.\n7,3,1.\n8,3,1.\n*NODE FILE\nU\n*END STEP\n")
+        try:
+            run_ccx(working_dir, job_name, ccx_binary=ccx_binary, timeout=60)
+            available[solver] = True
+        except (RuntimeError, subprocess.SubprocessError, OSError):
+            available[solver] = False
+    return available
+
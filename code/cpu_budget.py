@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cpu_budget.py
+=============
+Gmsh・CalculiX・並列評価ワーカーのCPU割り当てを一元管理する
+
+ホストのコア数と同時に動く評価ワーカー数から、各ワーカーに重ならないコア集合を
+割り当て、Gmsh（General.NumThreads）と ccx（NumberOfThreads / OMP_NUM_THREADS）の
+スレッド数をそのコア数に揃える。BLAS系のスレッドは常に1に固定する。
+
+環境変数:
+    FEM_NUM_WORKERS     同時に実行する評価ワーカー数（デフォルト: 1）
+    FEM_WORKER_ID       このプロセスのワーカー番号 0..N-1（デフォルト: 0）
+    FEM_RESERVED_CORES  OSやモニタ用に空けておくコア数（デフォルト: 0）
+    FEM_MAX_THREADS     1ワーカーあたりのスレッド上限（デフォルト: OSごとの上限）
+    FEM_PIN_CPU         1 の場合、割り当てたコアにCPUアフィニティを固定（Linuxのみ）
+"""
+
+import os
+import platform
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+
+# OSごとの1ワーカーあたりスレッド上限（従来の run_calculix_analysis の上限値）
+_PLATFORM_MAX_THREADS = {
+    'Darwin': 8,
+    'Windows': 16,
+    'Linux': 20,
+}
+
+_current_budget = None
+
+
+@dataclass(frozen=True)
+class CpuBudget:
+    """1ワーカー分のCPU割り当て"""
+    worker_id: int
+    num_workers: int
+    cores: Tuple[int, ...]
+    gmsh_threads: int
+    ccx_threads: int
+
+    def thread_env(self) -> Dict[str, str]:
+        """子プロセス（gmsh / ccx）に渡すスレッド関連の環境変数"""
+        return {
+            'OMP_NUM_THREADS': str(self.ccx_threads),
+            'CCX_NPROC_EQUATION_SOLVER': str(self.ccx_threads),
+            'CCX_NPROC_RESULTS': str(self.ccx_threads),
+            'OPENBLAS_NUM_THREADS': '1',
+            'MKL_NUM_THREADS': '1',
+        }
+
+
+def _available_cores():
+    """このプロセスが使用可能なコア番号の一覧"""
+    if hasattr(os, 'sched_getaffinity'):
+        try:
+            return sorted(os.sched_getaffinity(0))
+        except OSError:
+            pass
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_cpu_budget(num_workers: int = None, worker_id: int = None,
+                    cores=None, max_threads: int = None) -> CpuBudget:
+    """
+    ワーカー番号に対応するCPU割り当てを計算
+
+    使用可能なコアを連続したブロックに等分し、worker_id 番目のブロックを割り当てる。
+    ワーカー数がコア数を上回る場合は1コアずつ巡回して共有する。
+
+    Args:
+        num_workers: 同時ワーカー数（Noneの場合 FEM_NUM_WORKERS）
+        worker_id: ワーカー番号（Noneの場合 FEM_WORKER_ID）
+        cores: 使用可能なコア番号のリスト（Noneの場合ホストから取得）
+        max_threads: 1ワーカーあたりのスレッド上限（Noneの場合 FEM_MAX_THREADS / OS既定値）
+
+    Returns:
+        CpuBudget: 割り当て結果
+    """
+    if num_workers is None:
+        num_workers = int(os.environ.get('FEM_NUM_WORKERS', '1') or 1)
+    if worker_id is None:
+        worker_id = int(os.environ.get('FEM_WORKER_ID', '0') or 0)
+    if max_threads is None:
+        max_threads = int(os.environ.get('FEM_MAX_THREADS', '0') or 0) or \
+            _PLATFORM_MAX_THREADS.get(platform.system(), 20)
+    num_workers = max(1, num_workers)
+    worker_id = worker_id % num_workers
+
+    if cores is None:
+        cores = _available_cores()
+        reserved = int(os.environ.get('FEM_RESERVED_CORES', '0') or 0)
+        if 0 < reserved < len(cores):
+            cores = cores[:len(cores) - reserved]
+    cores = list(cores) or [0]
+
+    if num_workers >= len(cores):
+        assigned = (cores[worker_id % len(cores)],)
+    else:
+        per_worker = len(cores) // num_workers
+        start = worker_id * per_worker
+        assigned = tuple(cores[start:start + per_worker])
+
+    threads = max(1, min(len(assigned), max_threads))
+    return CpuBudget(
+        worker_id=worker_id,
+        num_workers=num_workers,
+        cores=assigned,
+        gmsh_threads=threads,
+        ccx_threads=threads,
+    )
+
+
+def get_cpu_budget() -> CpuBudget:
+    """現在のプロセスのCPU割り当て（初回呼び出し時に環境変数から計算してキャッシュ）"""
+    global _current_budget
+    if _current_budget is None:
+        _current_budget = plan_cpu_budget()
+    return _current_budget
+
+
+def apply_cpu_budget(budget: CpuBudget = None) -> CpuBudget:
+    """
+    CPU割り当てを現在のプロセスに適用
+
+    スレッド数の環境変数を設定し、FEM_PIN_CPU=1 の場合はCPUアフィニティを固定する。
+    アフィニティは子プロセス（gmsh / ccx）にも継承される。
+
+    Args:
+        budget: 適用する割り当て（Noneの場合 get_cpu_budget()）
+
+    Returns:
+        CpuBudget: 適用した割り当て
+    """
+    budget = budget or get_cpu_budget()
+    os.environ.update(budget.thread_env())
+    if os.environ.get('FEM_PIN_CPU', '') == '1' and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, set(budget.cores))
+        except OSError:
+            pass
+    return budget
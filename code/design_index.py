@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+design_index.py
+===============
+評価済み設計の近傍探索インデックス（ほぼ同じ設計の評価結果を再利用する）
+
+PSO の終盤では粒子が収束し、数mm・千分の数しか違わない設計を何度も評価する。
+設計パラメータの完全一致をキーにしたキャッシュではこれを拾えないため、
+設計変数ごとの許容差で正規化したベクトルの KD木 を作り、すべての変数の差が許容差以内
+（正規化後のチェビシェフ距離 ≤ 1）の評価済み設計があればFEM解析の代わりにその結果を返す。
+
+- 許容差が 0（または指定なし）の変数は完全一致のみ（材料コードなど）
+- 'nearest' は最も近い設計の結果をそのまま、'interpolate' は許容差以内の設計（最大 MAX_NEIGHBORS 件）の
+  評価指標を距離の逆数で重み付け平均する
+- 再利用した結果には reuse_distance（正規化後の距離、0〜1）と reused_from（元の評価）を付ける
+- 新しい設計はバッファに追加し、バッファが大きくなったら KD木 を作り直す
+
+NumPy のみを使用（scipy 不要）。
+"""
+
+import copy
+import math
+
+import numpy as np
+
+
+LEAF_SIZE = 16
+MAX_NEIGHBORS = 4
+# 許容差 0 の変数の正規化に使う値（差が 1e-9 を超えると許容差の外）
+EXACT_TOLERANCE = 1e-9
+
+# 評価指標の格納場所（evaluate_building の結果辞書の グループ → キー）
+METRIC_PATHS = {
+    'cost': ('economic', 'cost_per_sqm'),
+    'safety': ('safety', 'overall_safety_factor'),
+    'co2': ('environmental', 'co2_per_sqm'),
+    'comfort': ('comfort', 'comfort_score'),
+    'constructability': ('constructability', 'constructability_score'),
+}
+
+
+class _KDTree:
+    """正規化済みの点の静的な KD木（チェビシェフ距離の範囲探索のみ）"""
+
+    def __init__(self, points, leaf_size=LEAF_SIZE):
+        self.points = points
+        self.leaf_size = leaf_size
+        # ノード: (分割次元, 分割値, 左, 右) または 葉の添字配列
+        self.root = self._build(np.arange(len(points))) if len(points) else None
+
+    def _build(self, indices):
+        if len(indices) <= self.leaf_size:
+            return indices
+        sub = self.points[indices]
+        spread = sub.max(axis=0) - sub.min(axis=0)
+        dim = int(np.argmax(spread))
+        if spread[dim] <= 0:
+            return indices
+        order = np.argsort(sub[:, dim], kind='stable')
+        mid = len(indices) // 2
+        split = float(sub[order[mid], dim])
+        # 左は分割値以下、右は分割値以上の点
+        return (dim, split, self._build(indices[order[:mid]]), self._build(indices[order[mid:]]))
+
+    def query_box(self, point, radius):
+        """各座標の差が radius 以下の点の添字"""
+        if self.root is None:
+            return np.empty(0, dtype=int)
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, np.ndarray):
+                found.append(node)
+                continue
+            dim, split, left, right = node
+            if point[dim] - radius <= split:
+                stack.append(left)
+            if point[dim] + radius >= split:
+                stack.append(right)
+        return np.concatenate(found) if found else np.empty(0, dtype=int)
+
+
+class DesignIndex:
+    """評価済み設計 → 評価結果 の近傍探索インデックス"""
+
+    def __init__(self, param_names, tolerances, mode='nearest'):
+        """
+        Args:
+            param_names: 設計変数名のリスト（ベクトルの並び順）
+            tolerances: 設計変数名 → 許容差（指定のない変数は完全一致）
+            mode: 'nearest'（最近傍の結果）または 'interpolate'（近傍の評価指標を距離で重み付け平均）
+        """
+        if mode not in ('nearest', 'interpolate'):
+            raise ValueError(f"不明な再利用モードです: {mode}")
+        self.param_names = list(param_names)
+        self.mode = mode
+        scale = [float(tolerances.get(name, 0.0) or 0.0) for name in self.param_names]
+        self._scale = np.array([s if s > 0 else EXACT_TOLERANCE for s in scale])
+        self._points = np.empty((0, len(self.param_names)))
+        self._results = []
+        self._sources = []
+        self._tree = _KDTree(self._points)
+        self._tree_size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def _normalize(self, params):
+        return np.array([float(params[name]) for name in self.param_names]) / self._scale
+
+    def add(self, params, result, source=None):
+        """
+        評価済み設計を追加
+
+        Args:
+            params: 設計パラメータ辞書
+            result: 評価結果辞書（再利用時に複製して返す）
+            source: 元の評価の識別情報（reused_from に記録）
+        """
+        self._points = np.vstack([self._points, self._normalize(params)])
+        self._results.append(result)
+        self._sources.append(source)
+        # KD木に入っていない点が多くなったら作り直す
+        if len(self) - self._tree_size > max(32, math.sqrt(len(self))):
+            self._tree = _KDTree(self._points)
+            self._tree_size = len(self)
+
+    def neighbors(self, params, k=MAX_NEIGHBORS):
+        """
+        許容差以内の評価済み設計
+
+        Returns:
+            list: (正規化後の距離, 添字) を距離の小さい順に最大 k 件
+        """
+        if not len(self):
+            return []
+        point = self._normalize(params)
+        candidates = self._tree.query_box(point, 1.0)
+        # KD木を作り直した後に追加した点は全件比較
+        candidates = np.concatenate([candidates, np.arange(self._tree_size, len(self))])
+        if not len(candidates):
+            return []
+        distances = np.max(np.abs(self._points[candidates] - point), axis=1)
+        within = distances <= 1.0
+        order = np.argsort(distances[within], kind='stable')[:k]
+        return [(float(distances[within][i]), int(candidates[within][i])) for i in order]
+
+    def lookup(self, params):
+        """
+        許容差以内の評価済み設計があれば再利用した評価結果を返す
+
+        Returns:
+            dict or None: 評価結果の複製（reuse_distance, reused_from, reuse_mode を追加）。ない場合は None
+        """
+        found = self.neighbors(params, MAX_NEIGHBORS if self.mode == 'interpolate' else 1)
+        if not found:
+            self.misses += 1
+            return None
+        self.hits += 1
+        distance, nearest = found[0]
+        result = copy.deepcopy(self._results[nearest])
+        result.pop('evaluation_time', None)
+        interpolated = self.mode == 'interpolate' and len(found) > 1 and distance > 0
+        if interpolated:
+            weights = np.array([1.0 / d for d, _ in found])
+            for group, key in METRIC_PATHS.values():
+                values = [self._results[i].get(group, {}).get(key) for _, i in found]
+                if all(isinstance(v, (int, float)) and math.isfinite(v) for v in values):
+                    result.setdefault(group, {})[key] = float(np.dot(weights, values) / weights.sum())
+        result['reuse_distance'] = distance
+        result['reused_from'] = self._sources[nearest]
+        result['reuse_mode'] = 'interpolate' if interpolated else 'nearest'
+        result['message'] = f"許容差以内の評価済み設計（距離 {distance:.3f}）の結果を再利用しました。"
+        return result
+
+
+def result_from_record(record):
+    """
+    評価アーカイブの成功した評価から再利用用の評価結果を作る
+
+    Returns:
+        dict or None: 評価指標・building_info・FEMの生の結果を持つ評価結果（指標がない場合は None）
+    """
+    metrics = record.get('metrics')
+    if record.get('status') != 'Success' or not metrics or 'reuse_distance' in record:
+        return None
+    result = {'status': 'Success', 'building_info': dict(record.get('building_info', {})),
+              'raw_fem_results': dict(record.get('fem', {}))}
+    for name, (group, key) in METRIC_PATHS.items():
+        value = metrics.get(name)
+        result[group] = {key: float(value) if isinstance(value, (int, float)) else float('nan')}
+    if record.get('skipped_metrics'):
+        result['skipped_metrics'] = list(record['skipped_metrics'])
+    return result
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+evaluation_archive.py
+=====================
+評価ごとの設計パラメータ・building_info・FEMの生の結果を保存するアーカイブ
+
+PSO の CSV には適応度と評価指標（コスト・安全率・CO2・快適性・施工性）しか残らないため、
+calculate_fitness や評価指標の定義を変えると FEM 解析からやり直す必要があった。
+このアーカイブは1評価を1行の JSON として追記し、rescore_archive.py が FreeCAD なしで
+評価指標と適応度を計算し直せるようにする。
+
+1行の形式:
+    {"run_id": ..., "iteration": ..., "particle": ..., "status": "Success",
+     "params": {設計パラメータ}, "building_info": {...}, "fem": {FEMの生の結果（数値のみ）},
+     "metrics": {"cost": ..., "safety": ..., "co2": ..., "comfort": ..., "constructability": ...},
+     "evaluation_time": 評価に要した秒数}
+失敗した評価は "message" と "failed_stage"（失敗した段階: model / shape / setup / mesh / ccx /
+extract / timeout / error / worker）を持つ。
+評価済みの近傍設計の結果を再利用した評価は "reuse_distance"（許容差で正規化した距離）と
+"reused_from"（元の評価の run_id / iteration / particle）を持つ。
+"""
+
+import json
+import math
+import os
+import time
+
+
+ARCHIVE_FILENAME = "evaluation_archive.jsonl"
+
+
+def _scalar_items(values):
+    """JSON にそのまま書ける数値・文字列・真偽値だけを残す（numpy の値は Python の値へ変換）"""
+    items = {}
+    for key, value in (values or {}).items():
+        if hasattr(value, 'item') and not hasattr(value, '__len__'):
+            value = value.item()
+        if value is None or isinstance(value, (bool, int, str)):
+            items[key] = value
+        elif isinstance(value, float):
+            # inf / nan は JSON の標準外のため文字列で保存
+            items[key] = value if math.isfinite(value) else str(value)
+    return items
+
+
+def _restore_floats(values):
+    return {key: float(value) if value in ('inf', '-inf', 'nan') else value for key, value in values.items()}
+
+
+def archive_record(params, result, **context):
+    """
+    評価結果からアーカイブの1行分の辞書を作る
+
+    Args:
+        params: 設計パラメータ辞書
+        result: evaluate_building_from_params の結果辞書（失敗時は status / message のみでもよい）
+        **context: 追加で保存する項目（run_id, iteration, particle など）
+
+    Returns:
+        dict: アーカイブの1行
+    """
+    result = result or {}
+    record = dict(context)
+    record['status'] = result.get('status', 'Failed')
+    if record['status'] != 'Success':
+        record['message'] = str(result.get('message', ''))
+    if result.get('failed_stage'):
+        record['failed_stage'] = result['failed_stage']
+    if 'evaluation_time' in result:
+        record['evaluation_time'] = round(float(result['evaluation_time']), 3)
+    if 'reuse_distance' in result:
+        record['reuse_distance'] = float(result['reuse_distance'])
+        record['reused_from'] = result.get('reused_from')
+    record['params'] = _scalar_items(params)
+    record['building_info'] = _scalar_items(result.get('building_info'))
+    record['fem'] = _scalar_items(result.get('raw_fem_results'))
+    if result.get('skipped_metrics'):
+        record['skipped_metrics'] = list(result['skipped_metrics'])
+    if 'fitness_lower_bound' in result:
+        record['fitness_lower_bound'] = result['fitness_lower_bound']
+    if record['status'] == 'Success':
+        record['metrics'] = _scalar_items({
+            'cost': result.get('economic', {}).get('cost_per_sqm'),
+            'safety': result.get('safety', {}).get('overall_safety_factor'),
+            'co2': result.get('environmental', {}).get('co2_per_sqm'),
+            'comfort': result.get('comfort', {}).get('comfort_score'),
+            'constructability': result.get('constructability', {}).get('constructability_score'),
+        })
+    return record
+
+
+class EvaluationArchive:
+    """評価結果を JSON Lines ファイルに追記するアーカイブ"""
+
+    def __init__(self, path, run_id=None):
+        """
+        Args:
+            path: アーカイブファイルのパス（既存のファイルには追記する）
+            run_id: 実行の識別子（Noneの場合は開始時刻）。複数回の実行を同じファイルに保存しても区別できる
+        """
+        self.path = path
+        self.run_id = run_id or time.strftime('%Y%m%d_%H%M%S')
+        self.count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def append(self, params, result, **context):
+        """
+        1評価分を追記
+
+        Args:
+            params: 設計パラメータ辞書
+            result: 評価結果辞書
+            **context: 追加で保存する項目（iteration, particle など）
+        """
+        record = archive_record(params, result, run_id=self.run_id, timestamp=time.time(), **context)
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.count += 1
+        except OSError as e:
+            print(f"⚠️ 評価アーカイブへの書き込みに失敗しました: {e}")
+
+
+def load_archive(path, run_id=None):
+    """
+    アーカイブを読み込む
+
+    Args:
+        path: アーカイブファイルのパス
+        run_id: 指定した実行の行だけを返す（Noneの場合はすべて、'latest' の場合は最後の実行）
+
+    Returns:
+        list: アーカイブの行（辞書）のリスト（ファイルの順序）
+    """
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # 書き込み途中で中断した行
+            for key in ('building_info', 'fem', 'metrics'):
+                if key in record:
+                    record[key] = _restore_floats(record[key])
+            records.append(record)
+    if run_id == 'latest' and records:
+        run_id = records[-1].get('run_id')
+    if run_id is not None:
+        records = [r for r in records if r.get('run_id') == run_id]
+    return records
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+evaluation_time_model.py
+========================
+1評価あたりの所要時間を設計パラメータから予測するモデル
+
+評価時間は建物規模・壁傾斜・バルコニー・屋根形状（メッシュ規模）で大きく変わるため、
+記録した評価時間から log(秒) を 20個の設計パラメータ（範囲で正規化）と
+派生特徴量（床面積・バルコニー有無・|傾斜角|）のリッジ回帰でオンライン学習する。
+記録が少ないうちは建物体積に比例する事前予測を使う。
+
+ParallelEvaluator はこの予測で評価を長い順に並べ（LPT: Longest Processing Time first）、
+反復ごとの所要時間の見込み（ETA）を計算する。
+"""
+
+import csv
+import heapq
+import math
+import os
+
+import numpy as np
+
+
+# 回帰に切り替えるまでに必要な記録数
+MIN_SAMPLES = 8
+RIDGE_LAMBDA = 1e-2
+
+
+def lpt_makespan(durations, num_workers):
+    """
+    長い順に空いたワーカーへ割り当てたときの全体の所要時間
+
+    Args:
+        durations: 各評価の所要時間（秒）
+        num_workers: ワーカー数
+
+    Returns:
+        float: 最後の評価が終わるまでの時間（秒）
+    """
+    loads = [0.0] * max(1, num_workers)
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(loads, loads[0] + duration)
+    return max(loads)
+
+
+class EvaluationTimeModel:
+    """設計パラメータ → 評価時間 のオンライン回帰モデル"""
+
+    def __init__(self, param_ranges, history_path=None):
+        """
+        Args:
+            param_ranges: パラメータ名 → (下限, 上限)（pso_config.variable_ranges）
+            history_path: 評価時間の記録を追記するCSV（Noneの場合は保存しない）。
+                          既存のファイルがあれば読み込んで学習に使う
+        """
+        self.param_names = list(param_ranges)
+        self._lower = np.array([param_ranges[k][0] for k in self.param_names], dtype=float)
+        self._span = np.array([max(param_ranges[k][1] - param_ranges[k][0], 1e-9) for k in self.param_names],
+                              dtype=float)
+        self.history_path = history_path
+        self._features = []
+        self._log_seconds = []
+        self._log_priors = []
+        self._coef = None
+        self._prior_scale = None
+        if history_path and os.path.exists(history_path):
+            self._load_history()
+
+    def _feature_vector(self, params):
+        x = np.array([float(params.get(k, self._lower[i])) for i, k in enumerate(self.param_names)])
+        normalized = (x - self._lower) / self._span
+        area = float(params.get('Lx', 0.0)) * float(params.get('Ly', 0.0))
+        derived = [
+            area / 100.0,
+            1.0 if float(params.get('balcony_depth', 0.0)) > 0 else 0.0,
+            abs(float(params.get('wall_tilt_angle', 0.0))) / 30.0,
+        ]
+        return np.concatenate(([1.0], normalized, derived))
+
+    @staticmethod
+    def _prior(params):
+        """建物体積に比例する事前予測（相対値）"""
+        volume = (float(params.get('Lx', 10.0)) * float(params.get('Ly', 10.0))
+                  * (float(params.get('H1', 3.0)) + float(params.get('H2', 3.0))))
+        balcony = 1.3 if float(params.get('balcony_depth', 0.0)) > 0 else 1.0
+        tilt = 1.0 + abs(float(params.get('wall_tilt_angle', 0.0))) / 60.0
+        return volume * balcony * tilt
+
+    @property
+    def num_samples(self):
+        return len(self._log_seconds)
+
+    def record(self, params, seconds, status=''):
+        """
+        評価時間を記録してモデルを更新
+
+        Args:
+            params: 設計パラメータ辞書
+            seconds: 評価に要した時間（秒）
+            status: 評価結果のステータス（記録用）
+        """
+        seconds = max(float(seconds), 1e-3)
+        self._features.append(self._feature_vector(params))
+        self._log_seconds.append(math.log(seconds))
+        self._log_priors.append(math.log(self._prior(params)))
+        self._prior_scale = None
+        self._coef = None
+        if self.history_path:
+            write_header = not os.path.exists(self.history_path)
+            with open(self.history_path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow(self.param_names + ['seconds', 'status'])
+                writer.writerow([params.get(k, '') for k in self.param_names] + [round(seconds, 3), status])
+
+    def _load_history(self):
+        with open(self.history_path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    params = {k: float(row[k]) for k in self.param_names if row.get(k) not in (None, '')}
+                    seconds = max(float(row['seconds']), 1e-3)
+                except (KeyError, ValueError):
+                    continue
+                self._features.append(self._feature_vector(params))
+                self._log_seconds.append(math.log(seconds))
+                self._log_priors.append(math.log(self._prior(params)))
+
+    def _fit(self):
+        X = np.array(self._features)
+        y = np.array(self._log_seconds)
+        penalty = RIDGE_LAMBDA * len(y) * np.eye(X.shape[1])
+        penalty[0, 0] = 0.0  # 切片は正則化しない
+        self._coef = np.linalg.solve(X.T @ X + penalty, X.T @ y)
+
+    def predict(self, params):
+        """
+        評価時間を予測
+
+        Args:
+            params: 設計パラメータ辞書
+
+        Returns:
+            float: 予測した評価時間（秒）。記録がない場合は相対値
+        """
+        if self.num_samples >= MIN_SAMPLES:
+            if self._coef is None:
+                self._fit()
+            return float(math.exp(self._feature_vector(params) @ self._coef))
+        if self._prior_scale is None:
+            # 記録がある場合は、記録した設計の事前予測と実測時間の比（幾何平均）で秒に換算
+            self._prior_scale = (math.exp(np.mean(self._log_seconds) - np.mean(self._log_priors))
+                                 if self._log_seconds else 1e-3)
+        return self._prior(params) * self._prior_scale
+
+    def schedule(self, params_list):
+        """
+        評価の順序を長い順に並べる
+
+        Returns:
+            tuple: (評価順のインデックスリスト, 各設計の予測時間リスト)
+        """
+        predicted = [self.predict(p) for p in params_list]
+        order = sorted(range(len(params_list)), key=lambda i: predicted[i], reverse=True)
+        return order, predicted
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+feasibility_model.py
+====================
+設計パラメータから評価の失敗確率を予測するオンライン分類器
+
+モデル生成の失敗・不正形状・メッシュ生成の失敗・タイムアウトなどで失敗する評価は、
+失敗するまでの時間がそのまま無駄になる。評価アーカイブの成功・失敗（失敗した段階 failed_stage と
+評価時間 evaluation_time を含む）から失敗確率を学習し、失敗しそうな位置を評価の前に避ける。
+
+- 特徴量は 20個の設計パラメータ（範囲で正規化）と派生特徴量
+  （床面積・バルコニー有無・|傾斜角|・|傾斜角|² ・バルコニー×傾斜角・高さ/短辺）
+- L2 正則化付きロジスティック回帰をニュートン法（IRLS）で学習。評価を追加すると次の予測で学習し直す
+- 枝刈りした評価（FEM解析なし）は成否が分からないため学習に使わない
+- 成功・失敗それぞれの平均評価時間から、評価しなかった位置の評価時間の期待値（節約時間）を見積もる
+
+NumPy のみを使用（scipy 不要）。
+"""
+
+import math
+
+import numpy as np
+
+
+FAILURE_STAGES = ('model', 'shape', 'setup', 'mesh', 'ccx', 'extract', 'timeout', 'error', 'worker')
+
+# 予測を使い始めるのに必要な評価数（成功・失敗それぞれ MIN_CLASS_SAMPLES 件以上）
+MIN_SAMPLES = 20
+MIN_CLASS_SAMPLES = 3
+L2_LAMBDA = 1e-2
+NEWTON_ITERATIONS = 30
+
+
+def failure_stage(result):
+    """
+    評価結果（またはアーカイブの行）の失敗した段階
+
+    Returns:
+        str or None: 成功は None、失敗は failed_stage（記録がない場合は 'unknown'）
+    """
+    if result.get('status') == 'Success':
+        return None
+    stage = result.get('failed_stage')
+    if not stage and 'timeout' in str(result.get('message', '')):
+        stage = 'timeout'
+    return stage or 'unknown'
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35.0, 35.0)))
+
+
+class FeasibilityClassifier:
+    """設計パラメータ → 失敗確率 のオンライン分類器"""
+
+    def __init__(self, param_ranges):
+        """
+        Args:
+            param_ranges: パラメータ名 → (下限, 上限)（pso_config.variable_ranges）
+        """
+        self.param_names = list(param_ranges)
+        self._lower = np.array([param_ranges[k][0] for k in self.param_names], dtype=float)
+        self._span = np.array([max(param_ranges[k][1] - param_ranges[k][0], 1e-9) for k in self.param_names],
+                              dtype=float)
+        self._features = []
+        self._failed = []
+        self._coef = None
+        self.stage_counts = {}
+        self.stage_seconds = {}
+        self._seconds = {True: [], False: []}
+
+    def _feature_vector(self, params):
+        x = np.array([float(params.get(k, self._lower[i])) for i, k in enumerate(self.param_names)])
+        normalized = (x - self._lower) / self._span
+        area = float(params.get('Lx', 0.0)) * float(params.get('Ly', 0.0))
+        tilt = abs(float(params.get('wall_tilt_angle', 0.0))) / 30.0
+        balcony = 1.0 if float(params.get('balcony_depth', 0.0)) > 0 else 0.0
+        short_side = max(min(float(params.get('Lx', 1.0)), float(params.get('Ly', 1.0))), 1e-3)
+        height = float(params.get('H1', 0.0)) + float(params.get('H2', 0.0))
+        derived = [area / 100.0, balcony, tilt, tilt ** 2, balcony * tilt, height / short_side]
+        return np.concatenate(([1.0], normalized, derived))
+
+    @property
+    def num_samples(self):
+        return len(self._failed)
+
+    @property
+    def num_failures(self):
+        return int(sum(self._failed))
+
+    @property
+    def ready(self):
+        """予測を使える状態か（記録数と成功・失敗の件数が十分）"""
+        n_failed = self.num_failures
+        return (self.num_samples >= MIN_SAMPLES and n_failed >= MIN_CLASS_SAMPLES
+                and self.num_samples - n_failed >= MIN_CLASS_SAMPLES)
+
+    def record(self, params, result, seconds=None):
+        """
+        評価結果を記録
+
+        Args:
+            params: 設計パラメータ辞書
+            result: 評価結果辞書またはアーカイブの行（status / failed_stage / message）
+            seconds: 評価に要した時間（秒）。Noneの場合は result の evaluation_time
+
+        Returns:
+            bool: 学習に使った場合 True（枝刈りした評価は使わない）
+        """
+        if result.get('status') == 'Pruned':
+            return False
+        try:
+            features = self._feature_vector(params)
+        except (TypeError, ValueError):
+            return False
+        stage = failure_stage(result)
+        failed = stage is not None
+        self._features.append(features)
+        self._failed.append(failed)
+        self._coef = None
+        if seconds is None:
+            seconds = result.get('evaluation_time')
+        if failed:
+            self.stage_counts[stage] = self.stage_counts.get(stage, 0) + 1
+        if seconds is not None and math.isfinite(float(seconds)):
+            self._seconds[failed].append(float(seconds))
+            if failed:
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + float(seconds)
+        return True
+
+    def record_archive(self, records):
+        """評価アーカイブの行をまとめて記録（学習に使った件数を返す）"""
+        return sum(self.record(r.get('params', {}), r) for r in records if r.get('params'))
+
+    def _fit(self):
+        X = np.array(self._features)
+        y = np.array(self._failed, dtype=float)
+        penalty = L2_LAMBDA * len(y) * np.eye(X.shape[1])
+        penalty[0, 0] = 0.0  # 切片は正則化しない
+        coef = np.zeros(X.shape[1])
+        base_rate = min(max(y.mean(), 1e-3), 1 - 1e-3)
+        coef[0] = math.log(base_rate / (1.0 - base_rate))
+        for _ in range(NEWTON_ITERATIONS):
+            p = _sigmoid(X @ coef)
+            gradient = X.T @ (p - y) + penalty @ coef
+            hessian = (X * (p * (1.0 - p))[:, None]).T @ X + penalty + 1e-9 * np.eye(X.shape[1])
+            step = np.linalg.solve(hessian, gradient)
+            coef -= step
+            if np.max(np.abs(step)) < 1e-6:
+                break
+        self._coef = coef
+
+    def predict_failure(self, params):
+        """
+        失敗確率を予測
+
+        Args:
+            params: 設計パラメータ辞書
+
+        Returns:
+            float: 失敗確率。予測を使えない場合（ready が False）はこれまでの失敗率（記録がない場合は 0）
+        """
+        if not self.ready:
+            return self.num_failures / self.num_samples if self.num_samples else 0.0
+        if self._coef is None:
+            self._fit()
+        return float(_sigmoid(self._feature_vector(params) @ self._coef))
+
+    def mean_seconds(self, failed):
+        """成功（failed=False）・失敗した評価の平均評価時間（記録がない場合は None）"""
+        seconds = self._seconds[bool(failed)]
+        return sum(seconds) / len(seconds) if seconds else None
+
+    def expected_seconds(self, failure_probability):
+        """失敗確率から評価時間の期待値を見積もる（評価時間の記録がない場合は 0）"""
+        t_failed = self.mean_seconds(True)
+        t_success = self.mean_seconds(False)
+        t_failed = t_failed if t_failed is not None else (t_success or 0.0)
+        t_success = t_success if t_success is not None else t_failed
+        return failure_probability * t_failed + (1.0 - failure_probability) * t_success
+
+
+class ScreeningStats:
+    """失敗確率による事前判定の統計（評価を避けた件数と節約時間の推定）"""
+
+    def __init__(self):
+        self.checked = 0
+        self.resampled = 0
+        self.skipped = 0
+        self.expected_failures_avoided = 0.0
+        self.seconds_saved = 0.0
+
+    def add_resample(self, classifier, p_before, p_after):
+        """高リスクの位置を別の位置に移した（失敗時間の期待値の差を節約時間とする）"""
+        self.resampled += 1
+        avoided = max(p_before - p_after, 0.0)
+        self.expected_failures_avoided += avoided
+        self.seconds_saved += avoided * (classifier.mean_seconds(True) or 0.0)
+
+    def add_skip(self, classifier, probability):
+        """高リスクの位置を評価しなかった（評価時間の期待値をそのまま節約時間とする）"""
+        self.skipped += 1
+        self.expected_failures_avoided += probability
+        self.seconds_saved += classifier.expected_seconds(probability)
+
+    def print_summary(self, classifier):
+        print(f"🚧 事前判定: {self.checked} 件を判定、再サンプリング {self.resampled} 件、評価を省略 {self.skipped} 件")
+        print(f"  回避した失敗の期待件数 {self.expected_failures_avoided:.1f} 件 / "
+              f"節約した計算時間の推定 {self.seconds_saved:.0f} 秒")
+        failed_seconds = sum(classifier.stage_seconds.values())
+        print(f"  学習データ {classifier.num_samples} 件（失敗 {classifier.num_failures} 件、"
+              f"失敗した評価の合計時間 {failed_seconds:.0f} 秒）")
+        for stage in FAILURE_STAGES + ('unknown',):
+            if classifier.stage_counts.get(stage):
+                print(f"  {stage:<8s}: {classifier.stage_counts[stage]} 件 / "
+                      f"{classifier.stage_seconds.get(stage, 0.0):.0f} 秒")
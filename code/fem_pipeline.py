@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fem_pipeline.py
+===============
+1ワーカー内のパイプライン評価（モデル生成・メッシュ生成と ccx 実行の重ね合わせ）
+
+通常の評価は モデル生成 → Gmsh → ccx → 結果抽出 を順に実行し、ccx の実行中は
+Python 側が待つだけになる。パイプラインモードでは設計ごとに評価スレッドを立て、
+FreeCAD / OCC / Gmsh を使う区間はロックを保持したまま1スレッドずつ実行する。
+ccx（外部プロセス）の実行待ちの間だけ run_ccx がロックを手放すため、
+その間に次の設計のモデル生成とメッシュ生成が進む。
+
+    設計1: [モデル生成・メッシュ][ccx ..........][結果抽出]
+    設計2:                       [モデル生成・メッシュ][ccx ..........][結果抽出]
+
+ccx の起動は ccx_inp_writer.run_ccx を通る直接パス（FEM_DIRECT_INP 相当）に限られるため、
+パイプライン中の評価は CcxTools ではなく直接パスで解析する。
+同時に処理中の設計数は FEM_PIPELINE_DEPTH（デフォルト: 2）で制限する。
+
+評価関数は標準出力を差し替えて（io.StringIO）ログを抑制するため、ロックの受け渡しと一緒に
+sys.stdout も切り替える（ロックを持つスレッドだけが自分の差し替えた標準出力を見る）。
+並列評価のワーカーは FEM_PIPELINE=1 の場合に評価依頼を先読みしてこの評価器に流す（parallel_evaluator.py）。
+
+使用例:
+    from fem_pipeline import PipelinedEvaluator
+    results = PipelinedEvaluator().map([params1, params2, params3])
+
+    pipeline = PipelinedEvaluator()
+    pipeline.submit(params, on_done)   # 評価が終わると on_done(result, seconds) を評価スレッドで呼ぶ
+    pipeline.join()
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+_freecad_lock = threading.Lock()
+_thread_state = threading.local()
+# ロックを持つスレッドがないときの標準出力（ロックを手放すときに戻す）
+_idle_stdout = sys.stdout
+
+
+def pipeline_active():
+    """現在のスレッドがパイプライン評価中かどうか"""
+    return getattr(_thread_state, 'holds_lock', False)
+
+
+def _acquire():
+    """ロックを取得し、このスレッドが差し替えていた標準出力に切り替える"""
+    _freecad_lock.acquire()
+    _thread_state.holds_lock = True
+    _thread_state.acquired_at = time.perf_counter()
+    sys.stdout = getattr(_thread_state, 'stdout', None) or _idle_stdout
+
+
+def _release():
+    """このスレッドの標準出力を退避してロックを手放す"""
+    _thread_state.stdout = sys.stdout
+    sys.stdout = _idle_stdout
+    _thread_state.held_seconds = (getattr(_thread_state, 'held_seconds', 0.0)
+                                  + time.perf_counter() - _thread_state.acquired_at)
+    _thread_state.holds_lock = False
+    _freecad_lock.release()
+
+
+@contextmanager
+def solver_wait():
+    """
+    外部ソルバーの実行待ちの間だけ FreeCAD のロックを手放す
+
+    パイプライン評価中でないスレッドでは何もしない。
+    """
+    if not pipeline_active():
+        yield
+        return
+    _release()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _thread_state.solver_seconds = getattr(_thread_state, 'solver_seconds', 0.0) + time.perf_counter() - start
+        _acquire()
+
+
+class PipelinedEvaluator:
+    """ccx の実行中に次の設計のモデル生成・メッシュ生成を進める評価器"""
+
+    def __init__(self, evaluate_fn=None, depth=None):
+        """
+        Args:
+            evaluate_fn: 設計パラメータ辞書 → 評価結果辞書 の関数
+                         （Noneの場合は evaluate_building_from_params）
+            depth: 同時に処理中にする設計数（Noneの場合は FEM_PIPELINE_DEPTH）
+        """
+        global _idle_stdout
+        if evaluate_fn is None:
+            from generate_building_fem_analyze import evaluate_building_from_params
+            evaluate_fn = evaluate_building_from_params
+        self.evaluate_fn = evaluate_fn
+        self.depth = max(1, int(depth or os.environ.get('FEM_PIPELINE_DEPTH', '2')))
+        _idle_stdout = sys.stdout
+        self._slots = threading.BoundedSemaphore(self.depth)
+        self._stats_lock = threading.Lock()
+        self._threads = []
+        self._running = {}
+        self._next_token = 0
+        self._in_flight = 0
+        self._busy_start = None
+        self.elapsed = 0.0
+        # 累計: 処理中の設計があった時間、各設計を1つずつ実行した場合の時間（ロック保持＋ccx待ち）、ccx待ち
+        self.jobs = 0
+        self.busy_seconds = 0.0
+        self.serial_seconds = 0.0
+        self.solver_seconds = 0.0
+
+    def _run_one(self, token, params, on_done):
+        _thread_state.stdout = None
+        _thread_state.held_seconds = 0.0
+        _thread_state.solver_seconds = 0.0
+        _acquire()
+        start = time.perf_counter()
+        with self._stats_lock:
+            self._running[token] = start
+        try:
+            result = self.evaluate_fn(params)
+        except Exception as e:
+            result = {'status': 'Failed', 'message': f"パイプライン評価中のエラー: {e}"}
+        finally:
+            _release()
+        seconds = time.perf_counter() - start
+        with self._stats_lock:
+            del self._running[token]
+            self.jobs += 1
+            self.serial_seconds += _thread_state.held_seconds + _thread_state.solver_seconds
+            self.solver_seconds += _thread_state.solver_seconds
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self.busy_seconds += time.perf_counter() - self._busy_start
+        try:
+            on_done(result, seconds)
+        finally:
+            self._slots.release()
+
+    def submit(self, params, on_done, key=None):
+        """
+        設計の評価を開始（処理中の設計が depth 件ある場合は空くまで待つ）
+
+        Args:
+            params: evaluate_fn に渡す設計パラメータ
+            on_done: 評価が終わったときに評価スレッドで呼ぶ関数 on_done(評価結果, 評価時間[秒])
+            key: running() でこの評価を表すキー（Noneの場合は通し番号）
+
+        Returns:
+            この評価のキー
+        """
+        self._slots.acquire()
+        with self._stats_lock:
+            token = self._next_token if key is None else key
+            self._next_token += 1
+            if self._in_flight == 0:
+                self._busy_start = time.perf_counter()
+            self._in_flight += 1
+        thread = threading.Thread(target=self._run_one, args=(token, params, on_done),
+                                  name=f"fem-pipeline-{token}", daemon=True)
+        thread.start()
+        self._threads = [t for t in self._threads if t.is_alive()] + [thread]
+        return token
+
+    def join(self):
+        """開始したすべての評価の終了を待つ"""
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def running(self):
+        """実行を開始した（ロックを取得した）評価の キー → 経過時間[秒]"""
+        now = time.perf_counter()
+        with self._stats_lock:
+            return {token: now - start for token, start in self._running.items()}
+
+    def map(self, params_list):
+        """
+        設計パラメータのリストを評価
+
+        Args:
+            params_list: 設計パラメータ辞書のリスト
+
+        Returns:
+            list: 評価結果辞書のリスト（params_list と同じ順序）
+        """
+        params_list = list(params_list)
+        results = [None] * len(params_list)
+        start = time.perf_counter()
+        for index, params in enumerate(params_list):
+            # 前の設計から順に起動するため、スロットの確保は submit で行う
+            self.submit(params, lambda result, seconds, index=index: results.__setitem__(index, result))
+        self.join()
+        self.elapsed = time.perf_counter() - start
+        return results
+
+    def summary(self):
+        """
+        累計の所要時間と重ね合わせの効果
+
+        serial_seconds は各設計を1つずつ実行した場合の時間（ロック保持＋ccx待ち）、busy_seconds は
+        処理中の設計があった実時間で、その差 overlap_seconds が ccx の実行待ちに重ねられた時間。
+        """
+        with self._stats_lock:
+            busy = self.busy_seconds
+            if self._in_flight:
+                busy += time.perf_counter() - self._busy_start
+            return {
+                'jobs': self.jobs,
+                'depth': self.depth,
+                'elapsed_seconds': round(self.elapsed, 2),
+                'busy_seconds': round(busy, 2),
+                'serial_seconds': round(self.serial_seconds, 2),
+                'solver_seconds': round(self.solver_seconds, 2),
+                'overlap_seconds': round(max(self.serial_seconds - busy, 0.0), 2),
+            }
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fem_superposition.py
+====================
+材料違いの設計案を単位荷重解の重ね合わせで評価する
+
+setup_basic_fem_analysis の解析は線形静的・単一材料（柱材料）で、荷重はすべて圧力。
+材料フラグが解析結果に与える影響は次の3つだけである。
+
+    - ヤング率 E（柱材料）        : 変位は 1/E に比例、応力は E に依存しない
+    - ポアソン比 ν（木材 0.3 / コンクリート 0.2）: 解そのものが変わる
+    - 地震荷重の大きさ             : 平均密度 × 応答係数 に比例
+
+そこで形状とν区分ごとに「重力系荷重」と「単位地震荷重」の解（節点変位ベクトルと
+応力テンソル）を一度だけ求めて保存し、任意の材料組み合わせの結果を
+
+    u = (E_ref / E) × (u_gravity + s × u_seismic_unit)
+    σ = σ_gravity + s × σ_seismic_unit       （s = 平均密度 × 応答係数）
+
+で合成する。Von Mises 応力はテンソルを合成してから計算する。
+
+環境変数:
+    FEM_SUPERPOSITION        1 の場合 evaluate_building で重ね合わせを使用
+    FEM_SUPERPOSITION_CACHE  保持する形状数（デフォルト: 8、古いものから破棄）
+"""
+
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from frd_reader import (read_frd, von_mises, summarize_displacements, summarize_stresses)
+
+
+# 地震荷重の荷重成分名の接頭辞（define_multi_load_cases / setup_basic_fem_analysis と共通）
+SEISMIC_COMPONENT_PREFIX = 'SeismicLoad'
+
+# 形状キーに使う building_info の項目（材料による断面補正後の寸法を使う）
+GEOMETRY_KEYS = (
+    'Lx_mm', 'Ly_mm', 'H1_mm', 'H2_mm',
+    'tf_mm_floor1', 'tf_mm_floor2', 'tr_mm', 'bc_mm', 'hc_mm', 'tw_ext_mm',
+    'wall_tilt_angle', 'window_ratio_2f', 'roof_morph', 'roof_shift', 'balcony_depth',
+)
+
+
+def geometry_key(building_info, poisson):
+    """
+    形状とポアソン比区分から重ね合わせキャッシュのキーを作成
+
+    Args:
+        building_info: create_realistic_building_model が返す建物情報（mm 寸法を含む）
+        poisson: ポアソン比（0.2 / 0.3）
+
+    Returns:
+        tuple: キャッシュキー
+    """
+    values = []
+    for key in GEOMETRY_KEYS:
+        value = building_info.get(key)
+        values.append(round(float(value), 6) if value is not None else None)
+    return tuple(values) + (round(float(poisson), 3),)
+
+
+def _is_seismic(component_name):
+    return component_name.startswith(SEISMIC_COMPONENT_PREFIX)
+
+
+def build_unit_load_cases(load_cases, seismic_scale):
+    """
+    荷重ケース定義を単位荷重ステップに分解
+
+    各ケースの非地震成分の組（重力系）を1ステップ、地震成分を1成分1ステップとし、
+    地震成分の圧力は seismic_scale で割って単位化（s = 1 相当）する。
+
+    Args:
+        load_cases: {'components': {...}, 'cases': [{'name', 'components'}, ...]}
+        seismic_scale: 現在の設計の 平均密度 × 応答係数
+
+    Returns:
+        tuple: (ccx に渡す単位荷重ケース定義, 合成計画)
+               合成計画は [(ケース名, 重力系ステップ番号 or None, [地震ステップ番号...]), ...]
+    """
+    components = {}
+    for name, comp in load_cases['components'].items():
+        comp = dict(comp)
+        if _is_seismic(name) and seismic_scale:
+            comp['pressure_pa'] = comp['pressure_pa'] / seismic_scale
+        components[name] = comp
+
+    unit_steps = []
+    step_index = {}
+
+    def _step_for(name, comp_names):
+        key = tuple(sorted(comp_names))
+        if key not in step_index:
+            step_index[key] = len(unit_steps)
+            unit_steps.append({'name': name, 'components': list(comp_names)})
+        return step_index[key]
+
+    plan = []
+    for case in load_cases['cases']:
+        gravity = [c for c in case['components'] if not _is_seismic(c) and c in components]
+        seismic = [c for c in case['components'] if _is_seismic(c) and c in components]
+        gravity_step = _step_for(f"unit_gravity_{len(step_index)}", gravity) if gravity else None
+        seismic_steps = [_step_for(f"unit_{c}", [c]) for c in seismic]
+        plan.append((case['name'], gravity_step, seismic_steps))
+
+    return {'components': components, 'cases': unit_steps}, plan
+
+
+class UnitResponse:
+    """1形状・1ν区分の単位荷重解と合成処理"""
+
+    def __init__(self, E_ref, poisson, displacements, stresses, plan):
+        """
+        Args:
+            E_ref: 単位解を求めたときのヤング率 [MPa]
+            poisson: ポアソン比
+            displacements: ステップごとの節点変位 (n, 3) のリスト
+            stresses: ステップごとの節点応力テンソル (n, 6) のリスト
+            plan: build_unit_load_cases が返す合成計画
+        """
+        self.E_ref = float(E_ref)
+        self.poisson = float(poisson)
+        self.displacements = displacements
+        self.stresses = stresses
+        self.plan = plan
+
+    @classmethod
+    def from_frd(cls, frd_path, plan, E_ref, poisson):
+        """単位荷重ステップの .frd から単位解を読み込む"""
+        steps = read_frd(frd_path)
+        displacements = [step['DISP'][1][:, :3] for step in steps]
+        stresses = [step['STRESS'][1][:, :6] for step in steps]
+        return cls(E_ref, poisson, displacements, stresses, plan)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.displacements) + sum(a.nbytes for a in self.stresses)
+
+    def _combine_case(self, gravity_step, seismic_steps, E, seismic_scale):
+        disp = np.zeros_like(self.displacements[0])
+        stress = np.zeros_like(self.stresses[0])
+        if gravity_step is not None:
+            disp += self.displacements[gravity_step]
+            stress += self.stresses[gravity_step]
+        for step in seismic_steps:
+            disp += seismic_scale * self.displacements[step]
+            stress += seismic_scale * self.stresses[step]
+        disp *= self.E_ref / E
+        lengths = np.sqrt(np.einsum('ij,ij->i', disp, disp))
+        summary = summarize_displacements(lengths)
+        summary.update(summarize_stresses(von_mises(stress)))
+        return summary
+
+    def combine(self, E, seismic_scale):
+        """
+        材料組み合わせに対する結果を合成
+
+        Args:
+            E: 柱材料のヤング率 [MPa]
+            seismic_scale: 平均密度 × 応答係数
+
+        Returns:
+            dict: extract_fem_results と同じキーの結果
+                  （複数ケースの場合は load_cases と包絡値を含む）
+        """
+        cases = {}
+        for case_name, gravity_step, seismic_steps in self.plan:
+            cases[case_name] = self._combine_case(gravity_step, seismic_steps, E, seismic_scale)
+
+        if len(cases) == 1:
+            results = next(iter(cases.values()))
+            max_idx = results.pop('max_index', None)
+            if max_idx is not None:
+                results['critical_location'] = f"要素{max_idx}"
+            return results
+
+        for summary in cases.values():
+            summary.pop('max_index', None)
+        stress_case = max(cases, key=lambda n: cases[n].get('max_stress', 0.0))
+        disp_case = max(cases, key=lambda n: cases[n].get('max_displacement', 0.0))
+        results = {key: cases[stress_case][key] for key in
+                   ('max_stress', 'max_local_stress', 'avg_stress', 'stress_uniformity', 'stress_utilization')}
+        results.update({key: cases[disp_case][key] for key in
+                        ('max_displacement', 'avg_displacement', 'displacement_cv')})
+        results['critical_displacement'] = max(c['critical_displacement'] for c in cases.values())
+        results['governing_load_case'] = stress_case
+        results['governing_displacement_case'] = disp_case
+        results['load_cases'] = cases
+        return results
+
+
+class SuperpositionCache:
+    """形状キー → UnitResponse の LRU キャッシュ"""
+
+    def __init__(self, max_entries=None):
+        if max_entries is None:
+            max_entries = int(os.environ.get('FEM_SUPERPOSITION_CACHE', '8') or 8)
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        response = self._entries.get(key)
+        if response is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def put(self, key, response):
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = None
+
+
+def get_superposition_cache():
+    """プロセス共通の重ね合わせキャッシュを取得"""
+    global _cache
+    if _cache is None:
+        _cache = SuperpositionCache()
+    return _cache
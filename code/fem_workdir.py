@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fem_workdir.py
+==============
+FEM解析（Gmsh / CalculiX）の作業ディレクトリ管理
+
+評価ごとにワーカー専用の作業ディレクトリを払い出し、結果抽出後に削除する。
+失敗した評価のディレクトリはデバッグ用に直近 N 件だけ残す。
+既定の置き場所は RAM ディスク（/dev/shm）で、使えない場合は一時ディレクトリ。
+
+環境変数:
+    FEM_WORKDIR_ROOT  作業ディレクトリのルート（デフォルト: /dev/shm → tempfile.gettempdir()）
+    FEM_KEEP_FAILED   残す失敗ディレクトリ数（デフォルト: 3）
+    FEM_KEEP_WORKDIR  1 の場合は成功した評価のディレクトリも削除しない（ベンチマーク用）
+    FEM_WORKER_ID     ワーカー番号（ディレクトリ名に使用）
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+
+_manager = None
+
+
+def _default_root():
+    """作業ディレクトリのルートを決定"""
+    root = os.environ.get('FEM_WORKDIR_ROOT', '')
+    if root:
+        return root
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def directory_size(path):
+    """ディレクトリ内の全ファイルの合計バイト数"""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+class FemWorkdirManager:
+    """
+    ワーカー単位の作業ディレクトリ管理
+
+    <root>/ai_arch_fem/worker<ID>_<PID>/run<連番> を評価ごとに作成する。
+    プロセスIDを含めるため、同じワーカー番号の再起動や並列実行でも衝突しない。
+    """
+
+    def __init__(self, root=None, worker_id=None, keep_failed=None):
+        if worker_id is None:
+            worker_id = int(os.environ.get('FEM_WORKER_ID', '0') or 0)
+        if keep_failed is None:
+            keep_failed = int(os.environ.get('FEM_KEEP_FAILED', '3') or 0)
+        self.root = root or _default_root()
+        self.worker_dir = os.path.join(self.root, 'ai_arch_fem', f"worker{worker_id}_{os.getpid()}")
+        self.keep_failed = keep_failed
+        self.keep_success = os.environ.get('FEM_KEEP_WORKDIR', '') == '1'
+        self.last_run_dir = None
+        self.failed_dirs = []
+        self.run_count = 0
+        self.last_bytes_written = 0
+        self.total_bytes_written = 0
+
+    def new_run(self, label=None):
+        """
+        新しい評価用の作業ディレクトリを作成
+
+        Args:
+            label: ディレクトリ名に付ける識別子（例: サンプルID）
+
+        Returns:
+            str: 作成したディレクトリの絶対パス
+        """
+        self.run_count += 1
+        name = f"run{self.run_count:05d}"
+        if label:
+            name += "_" + "".join(c if c.isalnum() else "_" for c in str(label))
+        path = os.path.join(self.worker_dir, name)
+        os.makedirs(path, exist_ok=True)
+        self.last_run_dir = path
+        return path
+
+    def finish(self, path, success):
+        """
+        評価終了時の後処理
+
+        書き込まれたバイト数を記録し、成功時はディレクトリを削除、
+        失敗時は保持して古いものから keep_failed 件を超えた分を削除する。
+
+        Args:
+            path: new_run が返したディレクトリ
+            success: 評価が成功したかどうか
+
+        Returns:
+            int: この評価で書き込まれたバイト数
+        """
+        if not path or not os.path.isdir(path):
+            self.last_bytes_written = 0
+            return 0
+
+        bytes_written = directory_size(path)
+        self.last_bytes_written = bytes_written
+        self.total_bytes_written += bytes_written
+
+        if success:
+            if not self.keep_success:
+                shutil.rmtree(path, ignore_errors=True)
+        else:
+            # 失敗時の記録（どのファイルまで生成されたかを残す）
+            with open(os.path.join(path, 'FAILED.txt'), 'w') as f:
+                f.write(f"failed at {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            self.failed_dirs.append(path)
+            while len(self.failed_dirs) > self.keep_failed:
+                shutil.rmtree(self.failed_dirs.pop(0), ignore_errors=True)
+
+        return bytes_written
+
+    def cleanup_all(self):
+        """このワーカーの作業ディレクトリを（失敗分も含めて）すべて削除"""
+        shutil.rmtree(self.worker_dir, ignore_errors=True)
+        self.failed_dirs = []
+
+
+def get_workdir_manager():
+    """プロセス共通の作業ディレクトリマネージャを取得"""
+    global _manager
+    if _manager is None:
+        _manager = FemWorkdirManager()
+    return _manager
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+frame_model.py
+==============
+骨組・シェルの縮約モデルによる高速FEM解析（スクリーニング用の忠実度レベル）
+
+四面体ソリッドメッシュの代わりに、同じ設計パラメータから
+
+    - 柱            : B31 梁要素（矩形断面 bc×1.2 × hc×1.2、ソリッドモデルの柱と同寸法）
+    - 2階床・バルコニー: S4 シェル要素（厚さ tf_mm_floor2 / 150mm）
+    - 屋根          : S4 シェル要素（かまぼこ曲面、厚さ tr）
+    - 2階外壁       : S4 シェル要素（厚さ tw_ext、東面の大窓と南面の窓は要素を抜く）
+
+を構造格子で作り、CalculiX で解く。荷重は setup_basic_fem_analysis と同じ
+（上向き面の自重圧 150kPa、屋根積雪、バルコニー活荷重、南面の地震荷重）。
+1階床は基礎上にあるため省略し、柱脚を完全固定とする。
+Gmsh を使わないため、1評価あたりの解析時間はソリッドモデルより大幅に短い。
+
+結果は extract_fem_results と同じキー（max_stress / max_displacement など）で返す。
+ソリッドモデルとの系統的な差は calibrate_frame_model.py で求めた補正係数で補正できる。
+
+環境変数:
+    FEM_FIDELITY             frame の場合 evaluate_building で縮約モデルを使用（既定: solid）
+    FEM_FRAME_ELEMENT_SIZE   要素寸法 [mm]（デフォルト: 500）
+    FEM_FRAME_CALIBRATION    補正係数のJSONファイル（デフォルト: このモジュールと同じディレクトリの frame_calibration.json）
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+from ccx_inp_writer import run_ccx, static_keyword
+from frd_reader import summarize_frd
+
+
+# setup_basic_fem_analysis と同じ荷重 [Pa]
+SELF_WEIGHT_PA = 150000.0
+ROOF_LOAD_PA = 10000.0
+BALCONY_LIVE_LOAD_PA = 1800.0
+BASE_SEISMIC_COEFFICIENT = 0.5
+
+BALCONY_SLAB_MM = 150.0
+CORNER_OFFSET_MM = 100.0
+# 作業ディレクトリによらず同じ補正係数を参照する（並列評価のワーカーはこのディレクトリで起動する）
+DEFAULT_CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frame_calibration.json")
+
+
+def _grid(start, end, breaks, size):
+    """
+    start〜end を breaks で区切り、各区間を要素寸法 size 以下に等分した座標列
+
+    Returns:
+        np.ndarray: 昇順の座標列（start, end, 範囲内の breaks を含む）
+    """
+    points = sorted({float(start), float(end)} | {float(b) for b in breaks if start < b < end})
+    merged = [points[0]]
+    for p in points[1:]:
+        if p - merged[-1] >= 1.0:
+            merged.append(p)
+    merged[-1] = float(end)
+    coords = [merged[0]]
+    for a, b in zip(merged[:-1], merged[1:]):
+        n = max(1, int(math.ceil((b - a) / size)))
+        coords.extend(a + (b - a) * np.arange(1, n + 1) / n)
+    return np.asarray(coords)
+
+
+def _nearest(grid, value):
+    """座標列の中で value に最も近い点の番号"""
+    return int(np.argmin(np.abs(grid - value)))
+
+
+def roof_profile(x, roof_width, roof_morph, roof_shift):
+    """
+    create_parametric_barrel_roof と同じかまぼこ屋根の立ち上がり高さ
+
+    Args:
+        x: 屋根西端からの距離 [mm]
+        roof_width: 屋根幅 [mm]
+        roof_morph: 屋根形状パラメータ (0.0-1.0)
+        roof_shift: 屋根非対称性パラメータ (-1.0 to 1.0)
+
+    Returns:
+        float: 軒高さからの高さ [mm]
+    """
+    if roof_width <= 0 or x <= 0 or x >= roof_width:
+        return 0.0
+    if roof_morph < 0.33:
+        curve_height = roof_width * roof_morph * 0.9
+        profile_power = 2.0
+    elif roof_morph < 0.67:
+        curve_height = roof_width * 0.3
+        profile_power = 2.0 - (roof_morph - 0.33) * 3
+    else:
+        curve_height = roof_width * (0.3 + (roof_morph - 0.67) * 1.2)
+        profile_power = -1.0 - (roof_morph - 0.67) * 6
+
+    if abs(roof_shift) > 0.01:
+        peak_x = roof_width * (0.5 + roof_shift * 0.4)
+        if x < peak_x:
+            base_curve = pow(min(max(x / peak_x, 0), 1), 1 - roof_shift * 0.5)
+        else:
+            t = min(max((x - peak_x) / (roof_width - peak_x), 0), 1)
+            base_curve = pow(max(1 - t, 0), 1 + roof_shift * 0.5)
+    else:
+        t = 2 * abs(x / roof_width - 0.5)
+        if profile_power > 0:
+            base_curve = 1 - pow(t, profile_power)
+        else:
+            base_curve = pow(max(1 - t, 0), abs(profile_power))
+    return base_curve * curve_height
+
+
+def column_positions(building_info):
+    """
+    柱の左下隅座標の一覧（create_realistic_building_model と同じ配置規則）
+
+    Returns:
+        list: [(x, y), ...] [mm]
+    """
+    Lx = float(building_info['Lx_mm'])
+    Ly = float(building_info['Ly_mm'])
+    H2 = float(building_info['H2_mm'])
+    col_w = float(building_info['bc_mm']) * 1.2
+    col_d = float(building_info['hc_mm']) * 1.2
+    tw = float(building_info['tw_ext_mm'])
+    tilt = float(building_info.get('wall_tilt_angle', 0.0))
+    c = CORNER_OFFSET_MM
+
+    column_shift = 0.0
+    if tilt < 0:
+        column_shift = abs(H2 * math.tan(math.radians(tilt))) + tw + (100 if tilt < -30 else 0)
+    east_margin = 50.0 if tilt > 0 else 0.0
+    east_x = Lx - c - col_w - column_shift - east_margin
+    center_x = Lx * 0.5 - col_w * 0.5 - (column_shift * 0.5 if tilt < 0 else 0.0)
+
+    positions = [
+        (c, c), (c, Ly - c - col_d),
+        (east_x, c), (east_x, Ly - c - col_d),
+        (center_x, Ly * 0.5 - col_d * 0.5),
+    ]
+    if abs(tilt) > 25:
+        positions += [(c, Ly * 0.5 - col_d * 0.5),
+                      (Lx - c - col_w - column_shift, Ly * 0.5 - col_d * 0.5)]
+    return [(x, y) for x, y in positions if x > 0 and x + col_w < Lx and y > 0 and y + col_d < Ly]
+
+
+class FrameModel:
+    """骨組・シェル縮約モデルの節点・要素・荷重"""
+
+    def __init__(self, building_info, element_size=None):
+        """
+        Args:
+            building_info: create_realistic_building_model が返す建物情報（mm 寸法を含む）
+            element_size: 要素寸法 [mm]（Noneの場合 FEM_FRAME_ELEMENT_SIZE）
+        """
+        if element_size is None:
+            element_size = float(os.environ.get('FEM_FRAME_ELEMENT_SIZE', '500') or 500)
+        self.info = building_info
+        self.size = float(element_size)
+        self.nodes = {}
+        self.coords = []
+        self.shells = {'Eslab': [], 'Ebalcony': [], 'Eroof': [], 'Ewall': []}
+        self.beams = []
+        self.base_nodes = []
+        self.south_wall = []
+        self._build()
+
+    # ------------------------------------------------------------------
+    # 形状
+    # ------------------------------------------------------------------
+    def _build(self):
+        info = self.info
+        Lx, Ly = float(info['Lx_mm']), float(info['Ly_mm'])
+        H1, H2 = float(info['H1_mm']), float(info['H2_mm'])
+        tf2 = float(info.get('tf_mm_floor2', info.get('tf_mm', 150)))
+        ratio = float(info.get('window_ratio_2f', 0.4))
+        balcony = float(info.get('balcony_depth', 0.0)) * 1000
+        tilt = float(info.get('wall_tilt_angle', 0.0))
+        col_w, col_d = float(info['bc_mm']) * 1.2, float(info['hc_mm']) * 1.2
+
+        self.total = H1 + H2
+        self.z_floor = H1 + tf2 * 0.5
+        self.roof_width = Lx
+        self.roof_morph = float(info.get('roof_morph', 0.5))
+        self.roof_shift = float(info.get('roof_shift', 0.0))
+        self.shear_offset = H2 * math.tan(math.radians(tilt)) if abs(tilt) > 0.1 else 0.0
+
+        # 開口（東面の大窓・南面の4窓・階段開口）は格子線に合わせて要素を抜く
+        self.east_window = (Ly * (1 - ratio) / 2, Ly * (1 + ratio) / 2,
+                            self.z_floor + H2 * 0.15, self.z_floor + H2 * 0.85) if ratio > 0 else None
+        win_w = Lx * (0.05 + 0.10 * ratio)
+        self.south_windows = [(Lx * 0.1 + i * Lx * 0.2, Lx * 0.1 + i * Lx * 0.2 + win_w) for i in range(4)]
+        self.south_window_z = (self.z_floor + H2 * 0.2, self.z_floor + H2 * (0.5 + 0.3 * ratio))
+        stair_y_end = Ly * 0.15 + int(H1 // 200) * 300
+        self.stair_opening = (Lx * 0.15, Lx * 0.15 + 1000, stair_y_end - 2000, stair_y_end)
+
+        self.columns = [(x + col_w / 2, y + col_d / 2) for x, y in column_positions(info)]
+        x_breaks = [c[0] for c in self.columns] + list(self.stair_opening[:2])
+        x_breaks += [x for w in self.south_windows for x in w]
+        y_breaks = [c[1] for c in self.columns] + [Ly * 0.1, Ly * 0.9] + list(self.stair_opening[2:])
+        if self.east_window:
+            y_breaks += list(self.east_window[:2])
+
+        main_x = _grid(0.0, Lx, x_breaks, self.size)
+        if balcony > 0:
+            balcony_x = _grid(-balcony, 0.0, [], self.size)[:-1]
+            self.x = np.concatenate((balcony_x, main_x))
+        else:
+            self.x = main_x
+        self.i0 = _nearest(self.x, 0.0)
+        self.iLx = len(self.x) - 1
+        self.y = _grid(0.0, Ly, y_breaks, self.size)
+
+        wall_z = _grid(self.z_floor, self.total,
+                       list(self.south_window_z) + (list(self.east_window[2:]) if self.east_window else []),
+                       self.size)
+        self.t_levels = (wall_z - self.z_floor) / (self.total - self.z_floor)
+        self.K = len(self.t_levels) - 1
+        self.m = max(1, int(math.ceil(self.z_floor / self.size)))
+
+        # 東側柱の中心から東面まで、壁の傾斜に合わせて x をずらす（柱自体は鉛直のまま）
+        east_columns = [cx for cx, _ in self.columns if cx > Lx * 0.5] or [Lx * 0.5]
+        self.shear_start = max(east_columns)
+        self.shear_end = Lx
+
+        self._build_slabs(balcony)
+        self._build_roof()
+        self._build_walls()
+        self._build_columns()
+
+    def _roof_z(self, x):
+        return self.total + roof_profile(x, self.roof_width, self.roof_morph, self.roof_shift)
+
+    def _node(self, ix, iy, k):
+        """格子番号 (ix, iy, 高さレベル k) の節点番号（初回は座標を計算して登録）"""
+        key = (ix, iy, k)
+        node_id = self.nodes.get(key)
+        if node_id is not None:
+            return node_id
+        x, y = float(self.x[ix]), float(self.y[iy])
+        if k < 0:
+            z = self.z_floor * (k + self.m) / self.m
+        else:
+            z = self.z_floor + self.t_levels[k] * (self._roof_z(x) - self.z_floor)
+        if self.shear_offset and k > 0:
+            weight = min(max((x - self.shear_start) / max(self.shear_end - self.shear_start, 1.0), 0.0), 1.0)
+            x += self.shear_offset * self.t_levels[k] * weight
+        self.coords.append((x, y, z))
+        node_id = len(self.coords)
+        self.nodes[key] = node_id
+        return node_id
+
+    def _quad(self, elset, keys):
+        self.shells[elset].append(tuple(self._node(*key) for key in keys))
+        return len(self.shells[elset]) - 1
+
+    def _build_slabs(self, balcony):
+        x0, x1, y0, y1 = self.stair_opening
+        Ly = float(self.info['Ly_mm'])
+        for ix in range(len(self.x) - 1):
+            xc = (self.x[ix] + self.x[ix + 1]) / 2
+            for iy in range(len(self.y) - 1):
+                yc = (self.y[iy] + self.y[iy + 1]) / 2
+                keys = ((ix, iy, 0), (ix + 1, iy, 0), (ix + 1, iy + 1, 0), (ix, iy + 1, 0))
+                if xc < 0:
+                    if Ly * 0.1 < yc < Ly * 0.9:
+                        self._quad('Ebalcony', keys)
+                elif not (x0 < xc < x1 and y0 < yc < y1):
+                    self._quad('Eslab', keys)
+
+    def _build_roof(self):
+        for ix in range(self.i0, self.iLx):
+            for iy in range(len(self.y) - 1):
+                self._quad('Eroof', ((ix, iy, self.K), (ix + 1, iy, self.K),
+                                     (ix + 1, iy + 1, self.K), (ix, iy + 1, self.K)))
+
+    def _wall_z(self, k):
+        return self.z_floor + (self.t_levels[k] + self.t_levels[k + 1]) / 2 * (self.total - self.z_floor)
+
+    def _build_walls(self):
+        iy_n = len(self.y) - 1
+        z0, z1 = self.south_window_z
+        for k in range(self.K):
+            zc = self._wall_z(k)
+            for ix in range(self.i0, self.iLx):
+                xc = (self.x[ix] + self.x[ix + 1]) / 2
+                if not (z0 < zc < z1 and any(a < xc < b for a, b in self.south_windows)):
+                    # 南面: 法線 -y（地震荷重の圧力方向 +y）
+                    self.south_wall.append(self._quad('Ewall', ((ix, 0, k), (ix + 1, 0, k),
+                                                                (ix + 1, 0, k + 1), (ix, 0, k + 1))))
+                self._quad('Ewall', ((ix, iy_n, k), (ix, iy_n, k + 1),
+                                     (ix + 1, iy_n, k + 1), (ix + 1, iy_n, k)))
+            for iy in range(iy_n):
+                yc = (self.y[iy] + self.y[iy + 1]) / 2
+                self._quad('Ewall', ((self.i0, iy, k), (self.i0, iy, k + 1),
+                                     (self.i0, iy + 1, k + 1), (self.i0, iy + 1, k)))
+                w = self.east_window
+                if not (w and w[0] < yc < w[1] and w[2] < zc < w[3]):
+                    self._quad('Ewall', ((self.iLx, iy, k), (self.iLx, iy + 1, k),
+                                         (self.iLx, iy + 1, k + 1), (self.iLx, iy, k + 1)))
+
+    def _build_columns(self):
+        for cx, cy in self.columns:
+            ix, iy = _nearest(self.x, cx), _nearest(self.y, cy)
+            levels = list(range(-self.m, self.K + 1))
+            self.base_nodes.append(self._node(ix, iy, -self.m))
+            for k_a, k_b in zip(levels[:-1], levels[1:]):
+                self.beams.append((self._node(ix, iy, k_a), self._node(ix, iy, k_b)))
+
+    # ------------------------------------------------------------------
+    # 荷重・デッキ
+    # ------------------------------------------------------------------
+    def south_wall_area(self):
+        """南面壁（窓を除く）の面積 [mm²]"""
+        coords = np.asarray(self.coords)
+        area = 0.0
+        for index in self.south_wall:
+            p = coords[np.asarray(self.shells['Ewall'][index]) - 1]
+            area += 0.5 * np.linalg.norm(np.cross(p[2] - p[0], p[3] - p[1]))
+        return area
+
+    def pressure_loads(self, seismic_scale):
+        """
+        setup_basic_fem_analysis と同じ荷重を要素ごとの圧力 [MPa] として返す
+
+        Args:
+            seismic_scale: 平均密度 [kg/m³] × 応答係数（calculate_seismic_scale）
+
+        Returns:
+            list: [(要素セット名, 要素インデックスの配列, 圧力 MPa, 荷重名), ...]
+        """
+        morph = self.roof_morph
+        load_factor = 1.0 if morph < 0.33 else (0.9 if morph < 0.67 else 0.8)
+        loads = [
+            ('Eslab', None, SELF_WEIGHT_PA * 1e-6, 'SelfWeightPressure'),
+            ('Ebalcony', None, (SELF_WEIGHT_PA + BALCONY_LIVE_LOAD_PA) * 1e-6, 'BalconyLiveLoad'),
+            ('Eroof', None, (SELF_WEIGHT_PA + ROOF_LOAD_PA * load_factor) * 1e-6, 'RoofPressure'),
+        ]
+        area = self.south_wall_area()
+        volume_m3 = float(self.info.get('volume') or 0.0)
+        if area > 0 and volume_m3 > 0:
+            seismic_force = volume_m3 * seismic_scale * 9.81 * BASE_SEISMIC_COEFFICIENT  # N
+            loads.append(('Ewall', self.south_wall, seismic_force / area, 'SeismicLoad'))
+        return loads
+
+    def write_inp(self, inp_path, E_mpa, poisson, seismic_scale):
+        """
+        CalculiX の .inp を書き出す
+
+        Args:
+            inp_path: 出力ファイルのパス
+            E_mpa: ヤング率 [MPa]
+            poisson: ポアソン比
+            seismic_scale: 平均密度 × 応答係数
+        """
+        info = self.info
+        thickness = {
+            'Eslab': float(info.get('tf_mm_floor2', info.get('tf_mm', 150))),
+            'Ebalcony': BALCONY_SLAB_MM,
+            'Eroof': float(info.get('tr_mm', 150)),
+            'Ewall': float(info.get('tw_ext_mm', 150)),
+        }
+        first_id = {}
+        next_id = 1
+        with open(inp_path, 'w') as f:
+            f.write("** Frame/shell reduced model written by frame_model.py\n")
+            f.write("*NODE, NSET=Nall\n")
+            for i, (x, y, z) in enumerate(self.coords, 1):
+                f.write(f"{i},{x:.6f},{y:.6f},{z:.6f}\n")
+
+            for elset, quads in self.shells.items():
+                if not quads:
+                    continue
+                first_id[elset] = next_id
+                f.write(f"*ELEMENT, TYPE=S4, ELSET={elset}\n")
+                for i, quad in enumerate(quads):
+                    f.write(f"{next_id + i}," + ",".join(str(n) for n in quad) + "\n")
+                next_id += len(quads)
+            f.write("*ELEMENT, TYPE=B31, ELSET=Ecolumn\n")
+            for i, (a, b) in enumerate(self.beams):
+                f.write(f"{next_id + i},{a},{b}\n")
+
+            f.write("*NSET, NSET=FixedSupport\n")
+            f.write("\n".join(str(n) for n in self.base_nodes) + "\n")
+            f.write("*MATERIAL, NAME=FrameMaterial\n")
+            f.write(f"*ELASTIC\n{E_mpa:.13G},{poisson:.13G}\n")
+            for elset in first_id:
+                f.write(f"*SHELL SECTION, ELSET={elset}, MATERIAL=FrameMaterial\n{thickness[elset]:.6f}\n")
+            col_w, col_d = float(info['bc_mm']) * 1.2, float(info['hc_mm']) * 1.2
+            f.write("*BEAM SECTION, ELSET=Ecolumn, MATERIAL=FrameMaterial, SECTION=RECT\n")
+            f.write(f"{col_w:.6f},{col_d:.6f}\n1.,0.,0.\n")
+
+            f.write(f"*STEP\n{static_keyword()}\n*BOUNDARY\nFixedSupport,1,6,0.0\n*DLOAD\n")
+            for elset, indices, pressure, name in self.pressure_loads(seismic_scale):
+                if elset not in first_id:
+                    continue
+                if indices is None:
+                    indices = range(len(self.shells[elset]))
+                f.write(f"** {name}: {pressure:.6g} MPa\n")
+                f.write("".join(f"{first_id[elset] + i},P,{pressure:.13G}\n" for i in indices))
+            f.write("*NODE FILE\nU\n*EL FILE\nS\n*END STEP\n")
+        return inp_path
+
+
+def load_calibration(path=None):
+    """
+    ソリッドモデルに対する補正係数を読み込む
+
+    Returns:
+        dict: stress_factor, displacement_factor（ファイルがない場合は 1.0）
+    """
+    path = path or os.environ.get('FEM_FRAME_CALIBRATION', '') or DEFAULT_CALIBRATION_FILE
+    calibration = {'stress_factor': 1.0, 'displacement_factor': 1.0}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                calibration.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return calibration
+
+
+def apply_calibration(results, calibration):
+    """縮約モデルの結果に補正係数を掛ける（元の値は frame_raw_* に残す）"""
+    stress_keys = ('max_stress', 'max_local_stress', 'avg_stress')
+    disp_keys = ('max_displacement', 'avg_displacement', 'critical_displacement')
+    for keys, factor in ((stress_keys, calibration['stress_factor']),
+                         (disp_keys, calibration['displacement_factor'])):
+        for key in keys:
+            if results.get(key) is not None:
+                results[f'frame_raw_{key}'] = results[key]
+                results[key] = results[key] * factor
+    if results.get('avg_stress') is not None:
+        results['stress_utilization'] = results['avg_stress'] / 35.0
+    return results
+
+
+def solve_frame_model(building_info, E_mpa, poisson, seismic_scale, working_dir,
+                      num_threads=None, calibrate=True):
+    """
+    縮約モデルを作成して CalculiX で解き、extract_fem_results と同じキーの結果を返す
+
+    Args:
+        building_info: 建物情報（mm 寸法を含む）
+        E_mpa: 柱材料のヤング率 [MPa]
+        poisson: ポアソン比
+        seismic_scale: 平均密度 × 応答係数
+        working_dir: .inp / .frd を書き出すディレクトリ
+        num_threads: ccx のスレッド数
+        calibrate: True の場合ソリッドモデルに対する補正係数を適用
+
+    Returns:
+        dict: 変位・応力の統計値（frame_nodes / frame_elements を含む）
+
+    Raises:
+        RuntimeError: ccx の実行に失敗した場合
+    """
+    model = FrameModel(building_info)
+    os.makedirs(working_dir, exist_ok=True)
+    job_name = 'FrameModel'
+    model.write_inp(os.path.join(working_dir, f"{job_name}.inp"), E_mpa, poisson, seismic_scale)
+    run_ccx(working_dir, job_name, num_threads=num_threads)
+
+    results = summarize_frd(os.path.join(working_dir, f"{job_name}.frd"))
+    max_idx = results.pop('max_index', None)
+    if max_idx is not None:
+        results['critical_location'] = f"要素{max_idx}"
+    if calibrate:
+        apply_calibration(results, load_calibration())
+    results['frame_nodes'] = len(model.coords)
+    results['frame_elements'] = sum(len(q) for q in model.shells.values()) + len(model.beams)
+    return results
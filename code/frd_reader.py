@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+frd_reader.py
+=============
+CalculiX結果ファイル（.frd）のベクトル化リーダー
+
+DISP / STRESS などの節点結果ブロックを、固定桁フォーマットのまま
+NumPy の構造化 dtype で一括変換する（1行ずつの split / float 変換を行わない）。
+E12.5 の負値は前の欄と空白なしで連結されるため、桁位置で切り出す必要がある。
+
+対応フォーマット（100C 行の FORMAT 欄）:
+    0: ASCII short（節点番号 I5）
+    1: ASCII long （節点番号 I10、ccx の既定）
+    2: binary     （節点番号 int32 + 値 float32）
+
+ステップごとのブロックを順に読み出し、mmap で大きなファイルを
+メモリに全展開せずに処理できる。
+"""
+
+import mmap
+import os
+
+import numpy as np
+
+
+# 許容応力 [MPa]（extract_fem_results の stress_utilization と同じ基準）
+ALLOWABLE_STRESS_MPA = 35.0
+
+_NODE_ID_WIDTH = {0: 5, 1: 10}
+
+
+def _parse_100c(line):
+    """
+    100C 行（結果ブロックのヘッダ）を解析
+
+    Format:(1X,' 100','C',6A1,E12.5,I12,20A1,I2,I5,10A1,I2)
+
+    Returns:
+        dict: value（時間・荷重係数）, numnod, step, format
+    """
+    text = line.decode('ascii', 'replace').rstrip('\r\n')
+    try:
+        return {
+            'value': float(text[12:24]),
+            'numnod': int(text[24:36]),
+            'step': int(text[58:63]),
+            'format': int(text[73:75] or 1),
+        }
+    except ValueError:
+        # 桁ずれしたファイルは空白区切りで解析
+        parts = text.split()
+        return {
+            'value': float(parts[2]),
+            'numnod': int(parts[3]),
+            'step': int(parts[5]) if len(parts) > 5 else 1,
+            'format': int(parts[-1]) if len(parts) > 6 else 1,
+        }
+
+
+def _next_line(buf, pos):
+    """pos から始まる1行（改行を含む）と次の行の開始位置を返す"""
+    end = buf.find(b'\n', pos)
+    if end < 0:
+        end = len(buf) - 1
+    return buf[pos:end + 1], end + 1
+
+
+def _parse_ascii_block(buf, start, end, fmt):
+    """
+    ASCII の -1 レコード群を構造化 dtype で一括変換
+
+    Returns:
+        tuple: (節点番号 int64 配列, 値 float64 配列 (n, ncomp))
+    """
+    if end <= start:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0))
+    first_end = buf.find(b'\n', start) + 1
+    record_len = first_end - start
+    eol_len = 2 if buf[first_end - 2:first_end - 1] == b'\r' else 1
+    id_width = _NODE_ID_WIDTH.get(fmt, 10)
+    ncomp = (record_len - eol_len - 3 - id_width) // 12
+
+    dtype = np.dtype([
+        ('key', 'S3'),
+        ('node', f'S{id_width}'),
+        ('values', 'S12', (ncomp,)),
+        ('eol', f'S{eol_len}'),
+    ])
+    count = (end - start) // record_len
+    records = np.frombuffer(buf, dtype=dtype, count=count, offset=start)
+    return records['node'].astype(np.int64), records['values'].astype(np.float64)
+
+
+def _parse_binary_block(buf, start, numnod, ncomp):
+    """binary の節点レコード（int32 + float32 × ncomp）を一括変換"""
+    dtype = np.dtype([('node', '<i4'), ('values', '<f4', (ncomp,))])
+    records = np.frombuffer(buf, dtype=dtype, count=numnod, offset=start)
+    return (records['node'].astype(np.int64),
+            records['values'].astype(np.float64).reshape(numnod, ncomp))
+
+
+def iter_frd_blocks(buf, fields=('DISP', 'STRESS')):
+    """
+    バッファ内の節点結果ブロックを順に取り出す（ジェネレータ）
+
+    Args:
+        buf: .frd の内容（bytes または mmap）
+        fields: 読み出すブロック名（DISP, STRESS, TOSTRAIN など）
+
+    Yields:
+        dict: name, step, value, nodes, values
+    """
+    wanted = {f.encode('ascii') for f in fields}
+    pos = 0
+    size = len(buf)
+    header = None
+    while pos < size:
+        line, next_pos = _next_line(buf, pos)
+        key = line[:6]
+
+        if key == b'  100C':
+            header = _parse_100c(line)
+
+        elif line.startswith(b' -4 '):
+            name = line[5:13].strip()
+            # -5 行（成分定義）を読み飛ばし、データ成分数を数える
+            ncomp = 0
+            pos = next_pos
+            while True:
+                comp_line, comp_next = _next_line(buf, pos)
+                if not comp_line.startswith(b' -5'):
+                    break
+                if comp_line[5:13].strip() != b'ALL':
+                    ncomp += 1
+                pos = comp_next
+            data_start = pos
+            fmt = header['format'] if header else 1
+
+            if fmt == 2:
+                numnod = header['numnod']
+                data_end = data_start + numnod * (4 + 4 * ncomp)
+                if name in wanted:
+                    nodes, values = _parse_binary_block(buf, data_start, numnod, ncomp)
+                    yield {'name': name.decode('ascii'), 'step': header['step'],
+                           'value': header['value'], 'nodes': nodes, 'values': values}
+                end_marker = buf.find(b' -3', data_end)
+            else:
+                end_marker = buf.find(b'\n -3', data_start - 1) + 1
+                if end_marker <= 0:
+                    end_marker = size
+                if name in wanted:
+                    nodes, values = _parse_ascii_block(buf, data_start, end_marker, fmt)
+                    yield {'name': name.decode('ascii'),
+                           'step': header['step'] if header else 1,
+                           'value': header['value'] if header else 0.0,
+                           'nodes': nodes, 'values': values}
+            if end_marker < 0:
+                break
+            _, pos = _next_line(buf, end_marker)
+            continue
+
+        pos = next_pos
+
+
+def read_frd(frd_path, fields=('DISP', 'STRESS'), use_mmap=True):
+    """
+    .frd ファイルから節点結果をステップごとに読み込む
+
+    Args:
+        frd_path: .frd ファイルのパス
+        fields: 読み出すブロック名
+        use_mmap: True の場合ファイルをメモリマップして読む
+
+    Returns:
+        list: ステップ順の辞書 [{'step': 1, 'value': 1.0, 'DISP': (nodes, values), ...}, ...]
+    """
+    steps = {}
+
+    def _collect(buf):
+        for block in iter_frd_blocks(buf, fields):
+            step = steps.setdefault(block['step'], {'step': block['step'], 'value': block['value']})
+            step[block['name']] = (block['nodes'], block['values'])
+
+    with open(frd_path, 'rb') as f:
+        if use_mmap and os.path.getsize(frd_path) > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                _collect(mm)
+        else:
+            _collect(f.read())
+
+    return [steps[k] for k in sorted(steps)]
+
+
+def displacement_lengths(disp_values):
+    """変位ベクトル (n, 3) から変位量 (n,) を計算"""
+    disp_values = np.asarray(disp_values, dtype=np.float64)
+    return np.sqrt(np.einsum('ij,ij->i', disp_values[:, :3], disp_values[:, :3]))
+
+
+def von_mises(stress_values):
+    """
+    応力テンソル (n, 6) [sxx, syy, szz, sxy, syz, szx] から Von Mises 応力を計算
+    """
+    s = np.asarray(stress_values, dtype=np.float64)
+    sxx, syy, szz = s[:, 0], s[:, 1], s[:, 2]
+    shear = s[:, 3] ** 2 + s[:, 4] ** 2 + s[:, 5] ** 2
+    return np.sqrt(0.5 * ((sxx - syy) ** 2 + (syy - szz) ** 2 + (szz - sxx) ** 2 + 6.0 * shear))
+
+
+def summarize_displacements(lengths):
+    """
+    変位量の統計値を計算
+
+    critical_displacement は上位10%（sorted[int(n*0.9):]）の平均で、
+    全体ソートの代わりに np.partition を使う。
+
+    Returns:
+        dict: max_displacement, avg_displacement, displacement_cv, critical_displacement
+    """
+    d = np.asarray(lengths, dtype=np.float64)
+    n = len(d)
+    if n == 0:
+        return {}
+    mean = float(d.mean())
+    cut = int(n * 0.9)
+    top = np.partition(d, cut)[cut:] if cut < n else d
+    return {
+        'max_displacement': float(d.max()),
+        'avg_displacement': mean,
+        'displacement_cv': float(d.std() / mean) if mean > 0 else 0,
+        'critical_displacement': float(top.mean()),
+    }
+
+
+def summarize_stresses(vm, allowable=ALLOWABLE_STRESS_MPA):
+    """
+    Von Mises 応力の統計値を計算
+
+    Returns:
+        dict: max_stress, max_local_stress, max_index, avg_stress,
+              stress_uniformity, stress_utilization
+    """
+    s = np.asarray(vm, dtype=np.float64)
+    if len(s) == 0:
+        return {}
+    max_idx = int(s.argmax())
+    mean = float(s.mean())
+    return {
+        'max_stress': float(s[max_idx]),
+        'max_local_stress': float(s[max_idx]),
+        'max_index': max_idx,
+        'avg_stress': mean,
+        'stress_uniformity': float(1 - s.std() / mean) if mean > 0 else 0,
+        'stress_utilization': float(mean / allowable),
+    }
+
+
+def summarize_step(data):
+    """read_frd が返す1ステップ分の結果から変位・応力の統計値を計算"""
+    summary = {}
+    if 'DISP' in data:
+        summary.update(summarize_displacements(displacement_lengths(data['DISP'][1])))
+    if 'STRESS' in data:
+        summary.update(summarize_stresses(von_mises(data['STRESS'][1])))
+    return summary
+
+
+def summarize_frd(frd_path, step=-1, use_mmap=True):
+    """
+    .frd から extract_fem_results と同じキーの統計値を直接計算
+
+    Args:
+        frd_path: .frd ファイルのパス
+        step: 対象ステップ（リストのインデックス、既定は最終ステップ）
+        use_mmap: メモリマップを使うかどうか
+
+    Returns:
+        dict: 変位・応力の統計値（該当ブロックがない項目は含まない）
+    """
+    steps = read_frd(frd_path, use_mmap=use_mmap)
+    if not steps:
+        return {}
+    return summarize_step(steps[step])
+
+
+def summarize_load_cases(frd_path, case_names=None, use_mmap=True):
+    """
+    複数ステップ（荷重ケース）の .frd からケースごとの統計値と包絡値を計算
+
+    包絡値の応力統計は最大応力のケース、変位統計は最大変位のケースの値を使う。
+
+    Args:
+        frd_path: .frd ファイルのパス
+        case_names: ステップ順のケース名（不足分は step<n> とする）
+        use_mmap: メモリマップを使うかどうか
+
+    Returns:
+        tuple: (ケース名→統計値の辞書, 包絡値の辞書)
+               包絡値には governing_load_case / governing_displacement_case を含む
+    """
+    case_names = list(case_names or [])
+    cases = {}
+    for i, data in enumerate(read_frd(frd_path, use_mmap=use_mmap)):
+        name = case_names[i] if i < len(case_names) else f"step{data['step']}"
+        summary = summarize_step(data)
+        summary.pop('max_index', None)
+        cases[name] = summary
+
+    envelope = {}
+    stress_cases = [n for n, c in cases.items() if 'max_stress' in c]
+    if stress_cases:
+        governing = max(stress_cases, key=lambda n: cases[n]['max_stress'])
+        for key in ('max_stress', 'max_local_stress', 'avg_stress', 'stress_uniformity', 'stress_utilization'):
+            envelope[key] = cases[governing][key]
+        envelope['governing_load_case'] = governing
+    disp_cases = [n for n, c in cases.items() if 'max_displacement' in c]
+    if disp_cases:
+        governing = max(disp_cases, key=lambda n: cases[n]['max_displacement'])
+        for key in ('max_displacement', 'avg_displacement', 'displacement_cv'):
+            envelope[key] = cases[governing][key]
+        envelope['critical_displacement'] = max(cases[n]['critical_displacement'] for n in disp_cases)
+        envelope['governing_displacement_case'] = governing
+    return cases, envelope
@@ -54,7 +54,7 @@ print(latest_gbest)
 # --- evaluate_building_from_params に渡す辞書を作成 ---
 test_params = latest_gbest.to_dict()
 
-# 材料パラメータをintにキャスト（0/1）
+# 材料パラメータをintにキャスト（0/1/2）
 material_keys = [
     'material_columns', 'material_floor1', 'material_floor2',
     'material_roof', 'material_walls', 'material_balcony'
@@ -69,7 +69,7 @@ print("\n=== 建物評価テスト実行開始 ===")
 print("\n入力パラメータ:")
 for key, value in test_params.items():
     if key.startswith('material_'):
-        material = '木材' if value == 1 else 'コンクリート'
+        material = {1: '木材', 2: '高級木材（CLT）'}.get(value, 'コンクリート')
         print(f"  {key}: {value} ({material})")
     else:
         print(f"  {key}: {value}")
@@ -141,6 +141,75 @@ MATERIAL_PROPERTIES = {
     }
 }
 
+# 材料コード（0/1/2）→ 材料名（MATERIAL_TABLE の各配列の並び順）
+MATERIAL_CODES = ('concrete', 'wood', 'premium_wood')
+N_MATERIAL_TYPES = len(MATERIAL_CODES)
+
+# 部材ごとの労務費係数（材料コード順: コンクリート / 一般木材 / CLT）
+PART_LABOR_FACTORS = {
+    'columns': (1.0, 1.2, 1.4),    # CLTの施工はより高度
+    'floors': (1.0, 1.3, 1.5),     # CLT床は特殊工法
+    'roof': (1.0, 1.25, 1.45),     # CLT屋根は高度な施工
+    'walls': (1.0, 1.15, 1.35),    # CLT壁パネル施工
+    'balcony': (1.0, 1.35, 1.55),  # CLTバルコニーは高価
+    'foundation': (1.0, 1.0, 1.0), # 基礎は常にコンクリート
+}
+
+# 部材 → 材料コードを決める building_info のキー（複数ある場合は大きい方。基礎は常にコンクリート）
+PART_MATERIAL_KEYS = {
+    'columns': ('material_columns',),
+    'floors': ('material_floor1', 'material_floor2'),
+    'roof': ('material_roof',),
+    'walls': ('material_walls',),
+    'balcony': ('material_balcony',),
+    'foundation': (),
+}
+
+
+def _compile_material_table(properties):
+    """
+    MATERIAL_PROPERTIES の数値項目を材料コードで引ける配列に変換
+    
+    section_factor は 'section_factor_<部位>' として展開し、定義のない材料は 1.0（補正なし）とする。
+    'is_wood' は木材系（一般木材・CLT）のとき 1.0。
+    """
+    rows = [properties[name] for name in MATERIAL_CODES]
+    table = {}
+    for key, value in rows[0].items():
+        if isinstance(value, (int, float)) and all(isinstance(row.get(key), (int, float)) for row in rows):
+            table[key] = np.array([float(row[key]) for row in rows])
+    section_keys = sorted({k for row in rows for k in row.get('section_factor', {})})
+    for key in section_keys:
+        table[f'section_factor_{key}'] = np.array([float(row.get('section_factor', {}).get(key, 1.0)) for row in rows])
+    table['is_wood'] = np.array([1.0 if 'wood' in name else 0.0 for name in MATERIAL_CODES])
+    for values in table.values():
+        values.flags.writeable = False
+    return table
+
+
+# 材料特性の配列表（MATERIAL_TABLE['cost_per_m3'][材料コード] のように引く）
+MATERIAL_TABLE = _compile_material_table(MATERIAL_PROPERTIES)
+
+
+def material_code(material_value) -> int:
+    """
+    材料値を MATERIAL_TABLE の材料コードに変換（0/1/2 以外はコンクリート）
+    """
+    if material_value == 1:
+        return 1
+    if material_value == 2:
+        return 2
+    return 0
+
+
+def part_material_code(building_info: Dict[str, Any], part: str) -> int:
+    """部材の材料コード（床は1階と2階の大きい方、基礎は常にコンクリート）"""
+    keys = PART_MATERIAL_KEYS.get(part, ())
+    if not keys:
+        return 0
+    return material_code(max(building_info.get(key, 0) for key in keys))
+
+
 # 材料タイプマッピング関数
 def get_material_name(material_value):
     """
@@ -155,14 +224,7 @@ def get_material_name(material_value):
     Returns:
         str: 材料プロパティのキー名（'concrete', 'wood', 'premium_wood'）
     """
-    if material_value == 0:
-        return 'concrete'
-    elif material_value == 1:
-        return 'wood'
-    elif material_value == 2:
-        return 'premium_wood'
-    else:
-        return 'concrete'  # デフォルト
+    return MATERIAL_CODES[material_code(material_value)]
 
 # 固定リサイクル率パラメータ
 FIXED_RECYCLE_RATIOS = {
@@ -1501,22 +1563,21 @@ def setup_deterministic_fem():
     FEM解析を決定論的にするためのセットアップ
     
     乱数シードやスレッド数を固定して、同じ入力に対して
-    常に同じ結果が得られるようにする。
+    常に同じ結果が得られるようにする。スレッド数は cpu_budget の
+    ワーカーごとの割り当てに揃える（BLAS系は常に1）。
     
     Returns:
         bool: 常にTrue
     """
+    from cpu_budget import apply_cpu_budget
+    
     random.seed(12345)
     try:
         np.random.seed(12345)
     except:
         pass
     os.environ['GMSH_RANDOM_SEED'] = '12345'
-    os.environ['CCX_NPROC_EQUATION_SOLVER'] = '1'
-    os.environ['CCX_NPROC_RESULTS'] = '1'
-    os.environ['OMP_NUM_THREADS'] = '1'
-    os.environ['OPENBLAS_NUM_THREADS'] = '1'
-    os.environ['MKL_NUM_THREADS'] = '1'
+    apply_cpu_budget()
     return True
 
 def create_external_stairs(Lx_mm, Ly_mm, H1_mm, H2_mm, tf_mm):
@@ -1693,6 +1754,52 @@ def create_external_stairs(Lx_mm, Ly_mm, H1_mm, H2_mm, tf_mm):
     return all_stair_parts, stair_connection_info
 
 
+def get_column_elastic_constants(material_columns: int) -> (float, float):
+    """
+    解析に使う弾性定数（柱材料のヤング率とポアソン比）を取得
+    
+    Args:
+        material_columns: 柱材料タイプ (0/1/2)
+    
+    Returns:
+        tuple: (ヤング率 [MPa], ポアソン比) - 木材系は0.3、コンクリートは0.2
+    """
+    code = material_code(material_columns)
+    poisson_ratio = 0.3 if MATERIAL_TABLE['is_wood'][code] else 0.2
+    return float(MATERIAL_TABLE['E_modulus'][code]), poisson_ratio
+
+
+def calculate_seismic_avg_density(material_columns: int, material_floor1: int,
+                                  material_floor2: int, material_walls: int) -> float:
+    """
+    地震荷重の算定に使う平均密度を計算
+    
+    柱・床（1階と2階の重い方）・壁の密度の平均。
+    
+    Returns:
+        float: 平均密度 [kg/m³]
+    """
+    density = MATERIAL_TABLE['density']
+    floor_density = max(density[material_code(material_floor1)], density[material_code(material_floor2)])
+    total_density = (density[material_code(material_columns)]
+                     + floor_density
+                     + density[material_code(material_walls)])
+    return float(total_density / 3)
+
+
+def calculate_seismic_scale(material_columns: int, material_floor1: int,
+                            material_floor2: int, material_walls: int) -> float:
+    """
+    地震荷重の材料依存係数（平均密度 × 柱材料の応答係数）
+    
+    地震圧力は 体積 × この係数 × 9.81 × 0.5 / 受圧面積 となるため、
+    形状が同じ設計どうしでは地震荷重はこの係数に比例する。
+    """
+    response_factor = float(MATERIAL_TABLE['response_factor'][material_code(material_columns)])
+    return calculate_seismic_avg_density(material_columns, material_floor1,
+                                         material_floor2, material_walls) * response_factor
+
+
 def setup_basic_fem_analysis(doc: Any, building: Any, building_info: Dict[str, Any] = None,
                            material_columns: int = 0, material_floor1: int = 0, material_floor2: int = 0,
                            material_roof: int = 0, material_walls: int = 0, material_balcony: int = 0) -> (Any, Any):
@@ -1744,11 +1851,12 @@ def setup_basic_fem_analysis(doc: Any, building: Any, building_info: Dict[str, A
             is_wood_structure = material_columns >= 1  # 木材系（一般木材またはCLT）
             
             # 材料定義
+            _, poisson_ratio = get_column_elastic_constants(material_columns)
             mat = ObjectsFem.makeMaterialSolid(doc, mat_name.capitalize())
             mat.Material = {
                 'Name': mat_props['name_ja'],
                 'YoungsModulus': f"{mat_props['E_modulus']} MPa",
-                'PoissonRatio': "0.3" if 'wood' in mat_name else "0.2",
+                'PoissonRatio': str(poisson_ratio),
                 'Density': f"{mat_props['density']} kg/m^3"
             }
             if VERBOSE_OUTPUT:
@@ -1859,6 +1967,7 @@ def setup_basic_fem_analysis(doc: Any, building: Any, building_info: Dict[str, A
 
         # 地震荷重の追加（水平力0.5G）
         print("\n========== 地震荷重セクション開始 ==========")
+        seismic_force = None
         try:
             if VERBOSE_OUTPUT:
                 print("🏢 地震荷重（水平力）を設定中...")
@@ -1866,28 +1975,9 @@ def setup_basic_fem_analysis(doc: Any, building: Any, building_info: Dict[str, A
             # 建物の体積と質量を計算
             volume_m3 = building.Shape.Volume / 1e9  # mm³ → m³
             
-            # 材料別の平均密度を計算
-            total_density = 0
-            material_count = 0
-            
-            # 各部材の材料を確認して平均密度を計算
-            mat_columns = get_material_name(material_columns)
-            total_density += MATERIAL_PROPERTIES[mat_columns]['density']
-            material_count += 1
-            
-            # 床材料（より重い方を使用）
-            mat_floor1 = get_material_name(material_floor1)
-            mat_floor2 = get_material_name(material_floor2)
-            floor_density = max(MATERIAL_PROPERTIES[mat_floor1]['density'], 
-                               MATERIAL_PROPERTIES[mat_floor2]['density'])
-            total_density += floor_density
-            material_count += 1
-            
-            mat_walls = get_material_name(material_walls)
-            total_density += MATERIAL_PROPERTIES[mat_walls]['density']
-            material_count += 1
-            
-            avg_density = total_density / material_count if material_count > 0 else 2000  # kg/m³
+            # 材料別の平均密度を計算（柱・床・壁）
+            avg_density = calculate_seismic_avg_density(material_columns, material_floor1,
+                                                        material_floor2, material_walls)  # kg/m³
             
             # 総質量と地震力を計算
             total_mass = volume_m3 * avg_density  # kg
@@ -2087,6 +2177,14 @@ def setup_basic_fem_analysis(doc: Any, building: Any, building_info: Dict[str, A
         import time
         detailed_log = os.environ.get('FEM_DETAILED_LOG', '') == '1'
         sample_id = os.environ.get('FEM_SAMPLE_ID', '')
+        
+        # 複数荷重ケース（地震±X/±Y・屋根積雪・バルコニー活荷重）を1回のccx実行で解く
+        if building_info is not None and os.environ.get('FEM_MULTI_LOAD_CASES', '') == '1':
+            building_info['fem_load_cases'] = define_multi_load_cases(analysis, building, seismic_force)
+            if VERBOSE_OUTPUT:
+                case_names = [case['name'] for case in building_info['fem_load_cases']['cases']]
+                print(f"✅ 荷重ケースを設定: {', '.join(case_names)}")
+        
         if detailed_log:
             print(f"{sample_id} ⏱️ doc.recompute() [FEM解析設定後] 実行開始: {time.strftime('%H:%M:%S')}")
         
@@ -2105,6 +2203,90 @@ def setup_basic_fem_analysis(doc: Any, building: Any, building_info: Dict[str, A
         return None, None
 
 
+def collect_pressure_components(analysis: Any) -> Dict[str, Any]:
+    """
+    解析コンテナの圧力荷重を荷重成分（参照面と圧力[Pa]）として取り出す
+    
+    Args:
+        analysis: FEM解析コンテナ
+    
+    Returns:
+        dict: 荷重成分名 → {'references': [[オブジェクト名, 'FaceN'], ...], 'pressure_pa': 圧力}
+    """
+    components = {}
+    for obj in analysis.Group:
+        if getattr(obj, 'TypeId', '') != 'Fem::ConstraintPressure':
+            continue
+        pressure = obj.Pressure
+        pressure_pa = float(pressure.getValueAs('Pa')) if hasattr(pressure, 'getValueAs') else float(pressure) * 1e6
+        refs = []
+        for ref_obj, subs in obj.References:
+            for sub in ((subs,) if isinstance(subs, str) else subs):
+                refs.append([ref_obj.Name, sub])
+        components[obj.Name] = {'references': refs, 'pressure_pa': pressure_pa}
+    return components
+
+
+def define_multi_load_cases(analysis: Any, building: Any, seismic_force: float = None) -> Dict[str, Any]:
+    """
+    複数荷重ケースの定義を作成
+    
+    setup_basic_fem_analysis で作成した圧力荷重（自重・地震+Y・屋根・バルコニー）を
+    荷重成分として登録し、地震力を4方向（±X/±Y）の側面に振り分けた成分を追加する。
+    各ケースは荷重成分名の組み合わせで表し、ccx_inp_writer が *STEP ごとに書き出す。
+    
+    1番目のケース（seismic_+Y）は従来の単一ケースと同じ荷重構成。
+    
+    Args:
+        analysis: FEM解析コンテナ
+        building: 解析対象の建物オブジェクト
+        seismic_force: 地震力 [N]（Noneの場合は地震ケースを作らない）
+    
+    Returns:
+        dict: components（成分名→参照面と圧力[Pa]）と cases（ケース名と成分名リスト）
+              JSONに変換可能な形式
+    """
+    components = collect_pressure_components(analysis)
+    
+    # 地震力を各方向の受圧面（法線が荷重方向と逆向きの側面）に圧力として配分
+    seismic_directions = {
+        'seismic_+Y': (1, -1),   # 南面を押す（従来の SeismicLoad と同じ）
+        'seismic_-Y': (1, 1),    # 北面
+        'seismic_+X': (0, -1),   # 西面
+        'seismic_-X': (0, 1),    # 東面
+    }
+    if seismic_force:
+        faces = building.Shape.Faces
+        for case_name, (axis, sign) in seismic_directions.items():
+            if case_name == 'seismic_+Y' and 'SeismicLoad' in components:
+                continue
+            refs, area = [], 0.0
+            for i, f in enumerate(faces):
+                normal = f.normalAt(0, 0)
+                component = normal.x if axis == 0 else normal.y
+                if abs(component) > 0.8 and component * sign > 0 and f.CenterOfGravity.z > 100:
+                    refs.append([building.Name, f"Face{i+1}"])
+                    area += f.Area
+            if refs and area > 0:
+                name = 'SeismicLoad' if case_name == 'seismic_+Y' else f"SeismicLoad_{case_name[-2:]}"
+                components[name] = {'references': refs, 'pressure_pa': seismic_force / (area / 1e6)}
+    
+    gravity = [name for name in ('SelfWeightPressure', 'RoofPressure', 'BalconyLiveLoad') if name in components]
+    cases = []
+    for case_name in seismic_directions:
+        name = 'SeismicLoad' if case_name == 'seismic_+Y' else f"SeismicLoad_{case_name[-2:]}"
+        if name in components:
+            cases.append({'name': case_name, 'components': gravity + [name]})
+    if 'RoofPressure' in components:
+        cases.append({'name': 'roof_snow', 'components': [n for n in ('SelfWeightPressure', 'RoofPressure') if n in components]})
+    if 'BalconyLiveLoad' in components:
+        cases.append({'name': 'balcony_live', 'components': [n for n in ('SelfWeightPressure', 'BalconyLiveLoad') if n in components]})
+    if not cases:
+        cases.append({'name': 'static', 'components': list(components)})
+    
+    return {'components': components, 'cases': cases}
+
+
 def check_fixed_nodes(doc: Any, mesh_obj: Any) -> None:
     """
     固定条件が適用されているノードを確認（デバッグ用）
@@ -2142,17 +2324,24 @@ def check_fixed_nodes(doc: Any, mesh_obj: Any) -> None:
         if VERBOSE_OUTPUT:
             print(f"⚠️ 固定ノードのチェック中にエラー: {e}")
 
-def run_mesh_generation(doc: Any, mesh_obj: Any) -> bool:
+def run_mesh_generation(doc: Any, mesh_obj: Any, working_dir: str = None,
+                        mesh_settings: Dict[str, Any] = None, building_info: Dict[str, Any] = None) -> bool:
     """
     メッシュ生成を実行
     
     Gmshを使用してFEM解析用のメッシュを生成する。
     gmshtoolsが利用可能な場合はそれを使用し、
     そうでない場合はFreeCAD内蔵のメッシュ生成を使用する。
+    最初の試行に失敗した場合は回復ラダー（形状修復 → 別アルゴリズム → 要素寸法の緩和 →
+    微小面の除去、mesh_recovery.py）を時間予算内で順に試す。
     
     Args:
         doc: FreeCADドキュメント
         mesh_obj: メッシュオブジェクト
+        working_dir: Gmshの入出力ファイルを書き出すディレクトリ（Noneの場合はGmshToolsの既定）
+        mesh_settings: Gmsh の3Dアルゴリズム・最適化設定（gmsh_tuning.get_mesh_settings の戻り値）。
+                       Noneの場合は従来の設定
+        building_info: 建物情報辞書（回復した段階と、形状修復時の面番号の対応表を記録）
     
     Returns:
         bool: メッシュ生成に成功した場合True
@@ -2184,100 +2373,14 @@ def run_mesh_generation(doc: Any, mesh_obj: Any) -> bool:
                 print("❌ メッシュ生成をスキップ: 建物モデルの形状が不正です。")
             return False
 
-        # gmshtools の利用可能性を判定し、利用を試みる
-        # sys.modules をチェックすることで、ImportError が発生した場合でもNameErrorを回避
-        if gmshtools is not None and 'femmesh.gmshtools' in sys.modules and hasattr(sys.modules['femmesh.gmshtools'], 'GmshTools'):
-            if VERBOSE_OUTPUT:
-                print("⚙️ GmshTools (femmesh.gmshtools) を使用してメッシュ生成を試行中...")
-            try:
-                # global gmshtools がなくても、sys.modules からアクセス可能
-                gmsh_tools = sys.modules['femmesh.gmshtools'].GmshTools(mesh_obj)
-                # 強制的に3Dメッシュと決定論的オプションを適用
-                gmsh_tools.Options = "".join([
-                    "General.RandomSeed = 12345;",
-                    "Mesh.ElementDimension = 3;",
-                    "Mesh.VolumeEdges = 1;",
-                    "Mesh.Algorithm3D = 1;", # 1: MeshAdapt, 2: Delaunay, 3: Frontal, 4: LcMesh, 5: HXT, 6: MMG, 7: Netgen
-                    "Mesh.CharacteristicLengthFactor = 1.0;",
-                    "Mesh.RandomFactor = 0.0;",
-                    "Mesh.Smoothing = 10;",
-                    "Mesh.Optimize = 1;",
-                    "Mesh.OptimizeNetgen = 1;",
-                    "General.NumThreads = 2;" # 0だと全コア
-                ])
-                if detailed_log:
-                    print(f"{sample_id} ⏱️ GmshTools.create_mesh() 実行開始: {time.strftime('%H:%M:%S')}")
-                gmsh_tools.create_mesh()
-                if detailed_log:
-                    print(f"{sample_id} ✅ GmshTools.create_mesh() 完了: {time.strftime('%H:%M:%S')}")
-                if VERBOSE_OUTPUT:
-                    print("✅ GmshToolsでメッシュ生成コマンドを実行しました。")
-            except Exception as e:
-                if VERBOSE_OUTPUT:
-                    print(f"⚠️ GmshToolsを使ったメッシュ生成でエラー: {e}. FreeCAD内部のメッシュ生成へフォールバックします。")
-                if detailed_log:
-                    print(f"{sample_id} ⏱️ doc.recompute() [フォールバック] 実行開始: {time.strftime('%H:%M:%S')}")
-                doc.recompute() # GmshToolsが失敗した場合のフォールバック (mesh_obj.execute()も含まれる)
-                if detailed_log:
-                    print(f"{sample_id} ✅ doc.recompute() [フォールバック] 完了: {time.strftime('%H:%M:%S')}")
-        else:
-            if VERBOSE_OUTPUT:
-                print("⚙️ femmesh.gmshtools が利用できないため、FreeCAD内部のGmshメッシュ生成を試行中...")
-            
-            # メッシュオブジェクトが正しく設定されているか確認
-            if hasattr(mesh_obj, 'Part') and mesh_obj.Part:
-                if VERBOSE_OUTPUT:
-                    print(f"✅ メッシュのPart設定確認: {mesh_obj.Part.Name}")
-            else:
-                if VERBOSE_OUTPUT:
-                    print("⚠️ メッシュのPartが設定されていません")
-            
-            # CharacteristicLengthが設定されているか確認
-            if hasattr(mesh_obj, 'CharacteristicLengthMax'):
-                if VERBOSE_OUTPUT:
-                    print(f"✅ CharacteristicLengthMax: {mesh_obj.CharacteristicLengthMax}")
-                    print(f"✅ CharacteristicLengthMin: {mesh_obj.CharacteristicLengthMin}")
-            
-            if detailed_log:
-                print(f"{sample_id} ⏱️ doc.recompute() [通常] 実行開始: {time.strftime('%H:%M:%S')}")
-            doc.recompute() # FreeCADにメッシュ生成を任せる (これも mesh_obj.execute() をトリガーする)
-            if detailed_log:
-                print(f"{sample_id} ✅ doc.recompute() [通常] 完了: {time.strftime('%H:%M:%S')}")
-
-        # メッシュ生成後に FemMesh オブジェクトのノード数をチェック
-        if hasattr(mesh_obj, 'FemMesh') and mesh_obj.FemMesh:
-            if mesh_obj.FemMesh.NodeCount == 0:
-                if VERBOSE_OUTPUT:
-                    print("⚠️ メッシュ生成は完了しましたが、ノード数が0です。モデルの形状やメッシュ設定を確認してください。")
-            else:
-                # Fem.FemMesh オブジェクトに ElementCount 属性がない問題を修正
-                try:
-                    element_count = mesh_obj.FemMesh.ElementCount # これは前のエラーでAttributeErrorを出した
-                except AttributeError:
-                    # 互換性のため、getElementCount() メソッドを試すか、取得をスキップ
-                    try:
-                        element_count = mesh_obj.FemMesh.getElementCount()
-                    except AttributeError:
-                        element_count = "N/A" # 取得できない場合は表示しない
-                
-                if VERBOSE_OUTPUT:
-                    print(f"✅ メッシュ生成成功。ノード数: {mesh_obj.FemMesh.NodeCount}, 要素数: {element_count}")
-                # デバッグ情報の追加
-                try:
-                    bbox = mesh_obj.FemMesh.BoundBox
-                    if VERBOSE_OUTPUT:
-                        print(f"メッシュの範囲: X({bbox.XMin:.1f} - {bbox.XMax:.1f}), "
-                          f"Y({bbox.YMin:.1f} - {bbox.YMax:.1f}), "
-                          f"Z({bbox.ZMin:.1f} - {bbox.ZMax:.1f}) mm")
-                except:
-                    pass
-                if detailed_log:
-                    print(f"{sample_id} ✅ メッシュ生成成功: ノード数={mesh_obj.FemMesh.NodeCount}")
-                return True
-        
-        if VERBOSE_OUTPUT:
-            print("❌ メッシュ生成に失敗しました (FemMeshが見つからないかノード数が0)。")
-        return False
+        from gmsh_tuning import get_mesh_settings
+        from mesh_recovery import get_mesh_recovery_stats, recovery_enabled
+        settings = mesh_settings or get_mesh_settings()
+        success = _generate_mesh_attempt(doc, mesh_obj, working_dir, settings)
+        get_mesh_recovery_stats().record_initial(success)
+        if success or not recovery_enabled():
+            return success
+        return _recover_mesh_generation(doc, mesh_obj, building_obj, working_dir, settings, building_info)
     except Exception:
         if VERBOSE_OUTPUT:
             print("❌ メッシュ生成中に予期せぬエラーが発生しました。")
@@ -2289,7 +2392,216 @@ def run_mesh_generation(doc: Any, mesh_obj: Any) -> bool:
         if not VERBOSE_OUTPUT:
             sys.stdout = old_stdout
 
-def run_calculix_analysis(analysis_obj: Any) -> Any:
+
+def _generate_mesh_attempt(doc: Any, mesh_obj: Any, working_dir: str, mesh_settings: Dict[str, Any]) -> bool:
+    """
+    指定の Gmsh 設定でメッシュ生成を1回試行
+    
+    Args:
+        doc: FreeCADドキュメント
+        mesh_obj: メッシュオブジェクト
+        working_dir: Gmshの入出力ファイルを書き出すディレクトリ
+        mesh_settings: Gmsh の3Dアルゴリズム・最適化設定
+    
+    Returns:
+        bool: ノード数が1以上のメッシュが得られた場合True
+    """
+    detailed_log = os.environ.get('FEM_DETAILED_LOG', '') == '1'
+    sample_id = os.environ.get('FEM_SAMPLE_ID', '')
+
+    # gmshtools の利用可能性を判定し、利用を試みる
+    # sys.modules をチェックすることで、ImportError が発生した場合でもNameErrorを回避
+    if gmshtools is not None and 'femmesh.gmshtools' in sys.modules and hasattr(sys.modules['femmesh.gmshtools'], 'GmshTools'):
+        if VERBOSE_OUTPUT:
+            print("⚙️ GmshTools (femmesh.gmshtools) を使用してメッシュ生成を試行中...")
+        try:
+            # global gmshtools がなくても、sys.modules からアクセス可能
+            gmsh_tools = sys.modules['femmesh.gmshtools'].GmshTools(mesh_obj)
+            # 強制的に3Dメッシュと決定論的オプションを適用（アルゴリズム・最適化は形状区分ごとの設定）
+            from cpu_budget import get_cpu_budget
+            from gmsh_tuning import gmsh_options
+            gmsh_threads = get_cpu_budget().gmsh_threads
+            gmsh_tools.Options = gmsh_options(mesh_settings, gmsh_threads)
+            if detailed_log:
+                print(f"{sample_id} ⏱️ GmshTools.create_mesh() 実行開始: {time.strftime('%H:%M:%S')}")
+            if working_dir and hasattr(gmsh_tools, 'get_tmp_file_paths'):
+                # create_mesh() と同じ手順で、一時ファイルだけ評価専用ディレクトリに書き出す
+                gmsh_tools.update_mesh_data()
+                gmsh_tools.get_tmp_file_paths(working_dir, True)
+                gmsh_tools.get_gmsh_command()
+                gmsh_tools.write_gmsh_input_files()
+                gmsh_error = gmsh_tools.run_gmsh_with_geo()
+                if gmsh_error:
+                    raise RuntimeError(gmsh_error)
+                gmsh_tools.read_and_set_new_mesh()
+            else:
+                gmsh_tools.create_mesh()
+            if detailed_log:
+                print(f"{sample_id} ✅ GmshTools.create_mesh() 完了: {time.strftime('%H:%M:%S')}")
+            if VERBOSE_OUTPUT:
+                print("✅ GmshToolsでメッシュ生成コマンドを実行しました。")
+        except Exception as e:
+            if VERBOSE_OUTPUT:
+                print(f"⚠️ GmshToolsを使ったメッシュ生成でエラー: {e}. FreeCAD内部のメッシュ生成へフォールバックします。")
+            if detailed_log:
+                print(f"{sample_id} ⏱️ doc.recompute() [フォールバック] 実行開始: {time.strftime('%H:%M:%S')}")
+            doc.recompute() # GmshToolsが失敗した場合のフォールバック (mesh_obj.execute()も含まれる)
+            if detailed_log:
+                print(f"{sample_id} ✅ doc.recompute() [フォールバック] 完了: {time.strftime('%H:%M:%S')}")
+    else:
+        if VERBOSE_OUTPUT:
+            print("⚙️ femmesh.gmshtools が利用できないため、FreeCAD内部のGmshメッシュ生成を試行中...")
+        
+        # メッシュオブジェクトが正しく設定されているか確認
+        if hasattr(mesh_obj, 'Part') and mesh_obj.Part:
+            if VERBOSE_OUTPUT:
+                print(f"✅ メッシュのPart設定確認: {mesh_obj.Part.Name}")
+        else:
+            if VERBOSE_OUTPUT:
+                print("⚠️ メッシュのPartが設定されていません")
+        
+        # CharacteristicLengthが設定されているか確認
+        if hasattr(mesh_obj, 'CharacteristicLengthMax'):
+            if VERBOSE_OUTPUT:
+                print(f"✅ CharacteristicLengthMax: {mesh_obj.CharacteristicLengthMax}")
+                print(f"✅ CharacteristicLengthMin: {mesh_obj.CharacteristicLengthMin}")
+        
+        if detailed_log:
+            print(f"{sample_id} ⏱️ doc.recompute() [通常] 実行開始: {time.strftime('%H:%M:%S')}")
+        doc.recompute() # FreeCADにメッシュ生成を任せる (これも mesh_obj.execute() をトリガーする)
+        if detailed_log:
+            print(f"{sample_id} ✅ doc.recompute() [通常] 完了: {time.strftime('%H:%M:%S')}")
+
+    # メッシュ生成後に FemMesh オブジェクトのノード数をチェック
+    if hasattr(mesh_obj, 'FemMesh') and mesh_obj.FemMesh:
+        if mesh_obj.FemMesh.NodeCount == 0:
+            if VERBOSE_OUTPUT:
+                print("⚠️ メッシュ生成は完了しましたが、ノード数が0です。モデルの形状やメッシュ設定を確認してください。")
+        else:
+            # Fem.FemMesh オブジェクトに ElementCount 属性がない問題を修正
+            try:
+                element_count = mesh_obj.FemMesh.ElementCount # これは前のエラーでAttributeErrorを出した
+            except AttributeError:
+                # 互換性のため、getElementCount() メソッドを試すか、取得をスキップ
+                try:
+                    element_count = mesh_obj.FemMesh.getElementCount()
+                except AttributeError:
+                    element_count = "N/A" # 取得できない場合は表示しない
+            
+            if VERBOSE_OUTPUT:
+                print(f"✅ メッシュ生成成功。ノード数: {mesh_obj.FemMesh.NodeCount}, 要素数: {element_count}")
+            # デバッグ情報の追加
+            try:
+                bbox = mesh_obj.FemMesh.BoundBox
+                if VERBOSE_OUTPUT:
+                    print(f"メッシュの範囲: X({bbox.XMin:.1f} - {bbox.XMax:.1f}), "
+                      f"Y({bbox.YMin:.1f} - {bbox.YMax:.1f}), "
+                      f"Z({bbox.ZMin:.1f} - {bbox.ZMax:.1f}) mm")
+            except:
+                pass
+            if detailed_log:
+                print(f"{sample_id} ✅ メッシュ生成成功: ノード数={mesh_obj.FemMesh.NodeCount}")
+            return True
+    
+    if VERBOSE_OUTPUT:
+        print("❌ メッシュ生成に失敗しました (FemMeshが見つからないかノード数が0)。")
+    return False
+
+
+def _recover_mesh_generation(doc: Any, mesh_obj: Any, building_obj: Any, working_dir: str,
+                             mesh_settings: Dict[str, Any], building_info: Dict[str, Any] = None) -> bool:
+    """
+    メッシュ生成の回復ラダーを実行
+    
+    mesh_recovery.RECOVERY_STEPS の段階を順に試し、各段階の変更（形状・アルゴリズム・
+    要素寸法）は次の段階に引き継ぐ。形状を置き換えた場合は境界条件・荷重の参照面を
+    付け替え、元の面番号 → 現在の面番号の対応表を building_info['healed_face_map'] に記録する。
+    
+    Args:
+        doc: FreeCADドキュメント
+        mesh_obj: メッシュオブジェクト
+        building_obj: 解析対象の建物オブジェクト
+        working_dir: Gmshの入出力ファイルを書き出すディレクトリ
+        mesh_settings: 最初の試行で使った Gmsh 設定
+        building_info: 建物情報辞書（Noneの場合は記録しない）
+    
+    Returns:
+        bool: いずれかの段階でメッシュ生成に成功した場合True
+    """
+    from mesh_recovery import (RECOVERY_STEPS, RELAXED_MAX_FACTOR, RELAXED_MIN_FACTOR, HEAL_VOLUME_TOLERANCE,
+                               alternative_settings, get_mesh_recovery_stats, heal_fuzzy_value,
+                               recovery_budget, small_face_area)
+    from shape_healing import count_small_faces, heal_shape, remap_face_references, remove_small_faces
+    
+    stats = get_mesh_recovery_stats()
+    budget = recovery_budget()
+    fuzzy_value = heal_fuzzy_value()
+    settings = dict(mesh_settings)
+    face_map = None
+    ladder_start = time.perf_counter()
+
+    def _replace_shape(new_shape):
+        """有効で体積が変わらない形状なら置き換えて参照面を付け替える"""
+        nonlocal face_map
+        old_shape = building_obj.Shape
+        if not new_shape.isValid() or abs(new_shape.Volume - old_shape.Volume) > HEAL_VOLUME_TOLERANCE * old_shape.Volume:
+            return False
+        building_obj.Shape = new_shape
+        step_map = remap_face_references(doc, building_obj, old_shape, fuzzy_value)
+        if face_map is None:
+            face_map = step_map
+        else:
+            face_map = {k: step_map[v] for k, v in face_map.items() if v in step_map}
+        return True
+
+    for step in RECOVERY_STEPS:
+        if time.perf_counter() - ladder_start > budget:
+            stats.skipped_by_budget += 1
+            if VERBOSE_OUTPUT:
+                print(f"⏱️ メッシュ回復の時間上限 {budget:.0f} 秒を超えたため残りの段階を省略します。")
+            break
+        step_start = time.perf_counter()
+        applied, success = False, False
+        try:
+            if step == 'heal_fuzzy_fuse':
+                applied = _replace_shape(heal_shape(building_obj.Shape, fuzzy_value))
+            elif step == 'alternative_algorithm':
+                settings = alternative_settings(settings)
+                applied = True
+            elif step == 'relaxed_size':
+                mesh_obj.CharacteristicLengthMax = float(mesh_obj.CharacteristicLengthMax) * RELAXED_MAX_FACTOR
+                mesh_obj.CharacteristicLengthMin = float(mesh_obj.CharacteristicLengthMin) * RELAXED_MIN_FACTOR
+                applied = True
+            elif step == 'remove_small_faces':
+                if count_small_faces(building_obj.Shape, small_face_area()) > 0:
+                    applied = _replace_shape(remove_small_faces(building_obj.Shape, fuzzy_value, small_face_area()))
+            if applied:
+                if VERBOSE_OUTPUT:
+                    print(f"🔧 メッシュ回復: {step} で再試行中...")
+                success = _generate_mesh_attempt(doc, mesh_obj, working_dir, settings)
+        except Exception as e:
+            applied = True
+            if VERBOSE_OUTPUT:
+                print(f"⚠️ メッシュ回復 {step} でエラー: {e}")
+        if applied:
+            stats.record(step, success, time.perf_counter() - step_start)
+        if success:
+            if VERBOSE_OUTPUT:
+                print(f"✅ メッシュ回復に成功: {step}（{time.perf_counter() - ladder_start:.1f} 秒）")
+            if building_info is not None:
+                building_info['mesh_recovery_step'] = step
+                if face_map is not None:
+                    building_info['healed_face_map'] = face_map
+            return True
+
+    stats.unrecovered += 1
+    if VERBOSE_OUTPUT:
+        print("❌ メッシュ回復ラダーのすべての段階で失敗しました。")
+    return False
+
+
+def run_calculix_analysis(analysis_obj: Any, load_cases: Dict[str, Any] = None,
+                          working_dir: str = None) -> Any:
     """
     CalculiX解析を実行
     
@@ -2298,6 +2610,9 @@ def run_calculix_analysis(analysis_obj: Any) -> Any:
     
     Args:
         analysis_obj: FEM解析コンテナオブジェクト
+        load_cases: define_multi_load_cases の荷重ケース定義（指定時は直接パスで
+                    ケースごとに *STEP を書き出して1回のccx実行で解く）
+        working_dir: .inp / .frd を書き出すディレクトリ（Noneの場合はCcxToolsの既定）
     
     Returns:
         CcxTools: 解析ツールオブジェクト、失敗時はNone
@@ -2335,30 +2650,29 @@ def run_calculix_analysis(analysis_obj: Any) -> Any:
             if hasattr(solver, 'GeometricalNonlinearity'):
                 solver.GeometricalNonlinearity = False
             
+            # 連立方程式ソルバーの選択（FEM_CCX_SOLVER、未設定時は ccx の既定）
+            # FreeCADのバージョンによって選べない値があるため個別に例外を処理する
+            from ccx_inp_writer import get_ccx_solver
+            ccx_solver = get_ccx_solver()
+            if ccx_solver and hasattr(solver, 'MatrixSolverType'):
+                try:
+                    solver.MatrixSolverType = ccx_solver
+                    if VERBOSE_OUTPUT:
+                        print(f"🔧 CalculiX連立方程式ソルバー: {ccx_solver}")
+                except Exception as e:
+                    if VERBOSE_OUTPUT:
+                        print(f"⚠️ ソルバー {ccx_solver} はこのFreeCADでは選択できません: {e}")
+            
             # 並列計算設定（マルチスレッド）
+            # ワーカーごとのCPU割り当て（cpu_budget）に合わせ、並列評価時の過剰割り当てを防ぐ
             if hasattr(solver, 'NumberOfThreads'):
-                import platform
-                import os
-                
-                # CPUコア数を取得して適切なスレッド数を設定
-                cpu_count = os.cpu_count() or 4
-                
-                if platform.system() == 'Darwin':  # macOS
-                    # Apple Siliconは効率的なので控えめに設定
-                    # M1/M2は8コア、M1 Pro/Maxは10コア以上
-                    if cpu_count <= 8:
-                        solver.NumberOfThreads = 4  # M1/M2の場合
-                    else:
-                        solver.NumberOfThreads = min(8, cpu_count // 2)  # Pro/Maxの場合
-                elif platform.system() == 'Windows':
-                    # Windowsは物理コア数の半分程度を使用
-                    solver.NumberOfThreads = max(4, min(16, cpu_count // 2))
-                else:  # Linux
-                    # Linuxは物理コア数の6-7割を使用
-                    solver.NumberOfThreads = max(4, min(20, int(cpu_count * 0.7)))
+                from cpu_budget import get_cpu_budget
+                budget = get_cpu_budget()
+                solver.NumberOfThreads = budget.ccx_threads
                 
                 if VERBOSE_OUTPUT:
-                    print(f"🔧 CalculiX並列計算: {platform.system()} / {cpu_count}コア → {solver.NumberOfThreads}スレッド使用")
+                    print(f"🔧 CalculiX並列計算: ワーカー {budget.worker_id + 1}/{budget.num_workers} / "
+                          f"コア {len(budget.cores)} → {solver.NumberOfThreads}スレッド使用")
             
             # その他の設定も同様に
         except Exception as e:
@@ -2366,6 +2680,12 @@ def run_calculix_analysis(analysis_obj: Any) -> Any:
                 print(f"ソルバー設定の一部をスキップ: {e}")
             # エラーが発生しても処理を継続
         
+        # 直接パス: CcxToolsを経由せず .inp を書き出して ccx を起動
+        # パイプライン評価中も ccx の実行待ちで他の設計を進められるよう直接パスを使う
+        from fem_pipeline import pipeline_active
+        if os.environ.get('FEM_DIRECT_INP', '') == '1' or load_cases or pipeline_active():
+            return run_calculix_direct(analysis_obj, solver, load_cases, working_dir)
+        
         # CcxToolsで解析実行
         # FEMログを抑制するため標準出力をリダイレクト
         if not VERBOSE_OUTPUT:
@@ -2376,7 +2696,10 @@ def run_calculix_analysis(analysis_obj: Any) -> Any:
         try:
             fea = CcxTools(solver)
             fea.update_objects()
-            fea.setup_working_dir()
+            if working_dir:
+                fea.setup_working_dir(working_dir, True)
+            else:
+                fea.setup_working_dir()
             fea.setup_ccx()
             
             if fea.check_prerequisites():
@@ -2403,12 +2726,13 @@ def run_calculix_analysis(analysis_obj: Any) -> Any:
             if VERBOSE_OUTPUT:
                 print("✅ CalculiX解析が完了しました。")
             
-            # 結果をロード
-            if VERBOSE_OUTPUT:
-                print("📊 結果をロード中...")
-            fea.load_results()
-            if VERBOSE_OUTPUT:
-                print("✅ 結果のロードが完了しました。")
+            # 結果をロード（スカラー結果モードでは結果オブジェクトを作らない）
+            if os.environ.get('FEM_SCALAR_RESULTS', '') != '1':
+                if VERBOSE_OUTPUT:
+                    print("📊 結果をロード中...")
+                fea.load_results()
+                if VERBOSE_OUTPUT:
+                    print("✅ 結果のロードが完了しました。")
         finally:
             # 標準出力を復元
             if not VERBOSE_OUTPUT:
@@ -2428,6 +2752,227 @@ def run_calculix_analysis(analysis_obj: Any) -> Any:
         return None
 
 
+def run_calculix_direct(analysis_obj: Any, solver: Any = None, load_cases: Dict[str, Any] = None,
+                        working_dir: str = None) -> Any:
+    """
+    CcxToolsを経由せずにCalculiX解析を実行（高速パス）
+    
+    setup_basic_fem_analysis で作成したメッシュと拘束面から .inp を直接書き出し、
+    ccx をサブプロセスで実行して結果を読み込む。環境変数 FEM_DIRECT_INP=1 のとき
+    run_calculix_analysis から呼ばれる。
+    
+    Args:
+        analysis_obj: FEM解析コンテナオブジェクト
+        solver: ソルバーオブジェクト（スレッド数の参照用）
+        load_cases: 複数荷重ケースの定義（Noneの場合は解析コンテナの荷重で1ケース）
+        working_dir: 作業ディレクトリ（Noneの場合は一時ディレクトリ下の共有ディレクトリ）
+    
+    Returns:
+        DirectCcxRun: 解析結果ハンドル（result_object, working_dir を持つ）、失敗時はNone
+    """
+    import tempfile
+    from ccx_inp_writer import collect_ccx_model, write_inp_deck, run_ccx, DirectCcxRun
+    
+    detailed_log = os.environ.get('FEM_DETAILED_LOG', '') == '1'
+    sample_id = os.environ.get('FEM_SAMPLE_ID', '')
+    
+    try:
+        mesh_obj = None
+        for obj in analysis_obj.Group:
+            if hasattr(obj, 'FemMesh'):
+                mesh_obj = obj
+                break
+        if mesh_obj is None or mesh_obj.FemMesh.NodeCount == 0:
+            if VERBOSE_OUTPUT:
+                print("❌ メッシュが見つからないため直接パスを実行できません。")
+            return None
+        
+        if not working_dir:
+            working_dir = os.path.join(tempfile.gettempdir(), 'ai_arch_ccx_direct')
+        os.makedirs(working_dir, exist_ok=True)
+        job_name = mesh_obj.Name
+        
+        if detailed_log:
+            print(f"{sample_id} ⏱️ write_inp_deck() 実行開始: {time.strftime('%H:%M:%S')}")
+        model = collect_ccx_model(analysis_obj, mesh_obj, load_cases)
+        if len(model['fixed_nodes']) == 0:
+            if VERBOSE_OUTPUT:
+                print("❌ 固定節点がありません。")
+            return None
+        fea = DirectCcxRun(analysis_obj, working_dir, job_name)
+        fea.model = model
+        if load_cases:
+            fea.scalar_results = True
+            if len(model['load_cases']) > 1:
+                fea.load_case_names = [case['name'] for case in model['load_cases']]
+        write_inp_deck(fea.inp_file_name, model)
+        if detailed_log:
+            print(f"{sample_id} ✅ write_inp_deck() 完了: {time.strftime('%H:%M:%S')}")
+        
+        num_threads = getattr(solver, 'NumberOfThreads', None) if solver is not None else None
+        if detailed_log:
+            print(f"{sample_id} ⏱️ ccx 実行開始: {time.strftime('%H:%M:%S')}")
+        proc = run_ccx(working_dir, job_name, num_threads=num_threads)
+        fea.ccx_stdout = proc.stdout
+        if detailed_log:
+            print(f"{sample_id} ✅ ccx 完了: {time.strftime('%H:%M:%S')}")
+        
+        # スカラー結果モード・荷重ケース指定時は .frd を extract_fem_results が直接読む
+        if os.environ.get('FEM_SCALAR_RESULTS', '') == '1' or fea.scalar_results:
+            return fea
+        
+        # 結果オブジェクトを作成（extract_fem_results は CcxTools と同じ経路で読み込める）
+        if not VERBOSE_OUTPUT:
+            import io
+            old_stdout = sys.stdout
+            sys.stdout = io.StringIO()
+        try:
+            fea.load_results()
+        finally:
+            if not VERBOSE_OUTPUT:
+                sys.stdout = old_stdout
+        
+        return fea
+    
+    except Exception:
+        if VERBOSE_OUTPUT:
+            traceback.print_exc()
+        return None
+
+
+def run_calculix_morphed(analysis_obj: Any, building_info: Dict[str, Any], load_cases: Dict[str, Any],
+                         working_dir: str = None) -> Any:
+    """
+    以前のメッシュをモーフィングしてCalculiX解析を実行（メッシュ生成を省略）
+    
+    トポロジー署名が一致するメッシュがキャッシュにあれば、節点を新しい形状へ写像し、
+    要素品質と体積の検査に合格した場合だけ .inp を書き出して ccx を実行する。
+    環境変数 FEM_MESH_MORPHING=1 のとき run_fem_stages から呼ばれる。
+    
+    Args:
+        analysis_obj: FEM解析コンテナオブジェクト（材料の参照用）
+        building_info: 建物情報辞書
+        load_cases: 荷重ケース定義（成分の圧力は現在の設計の値）
+        working_dir: 作業ディレクトリ
+    
+    Returns:
+        DirectCcxRun: 解析結果ハンドル、モーフィングできない・失敗した場合はNone
+    """
+    import tempfile
+    from ccx_inp_writer import collect_material, build_case_loads, write_inp_deck, run_ccx, DirectCcxRun
+    from cpu_budget import get_cpu_budget
+    from mesh_morphing import get_mesh_morph_cache, topology_signature
+    
+    detailed_log = os.environ.get('FEM_DETAILED_LOG', '') == '1'
+    sample_id = os.environ.get('FEM_SAMPLE_ID', '')
+    
+    cache = get_mesh_morph_cache()
+    source = cache.get(topology_signature(building_info))
+    if source is None:
+        return None
+    
+    try:
+        missing = [name for name in load_cases['components'] if name not in source.component_faces]
+        if missing:
+            reason = f"荷重成分 {', '.join(missing)} の面が元メッシュにありません"
+            mesh_arrays = None
+        else:
+            mesh_arrays, reason = source.morph(building_info)
+        if mesh_arrays is None:
+            cache.rejections += 1
+            if VERBOSE_OUTPUT:
+                print(f"🔁 メッシュモーフィング不可（再メッシュ）: {reason}")
+            return None
+        
+        if not working_dir:
+            working_dir = os.path.join(tempfile.gettempdir(), 'ai_arch_ccx_direct')
+        os.makedirs(working_dir, exist_ok=True)
+        
+        model = {
+            'mesh_arrays': mesh_arrays,
+            'material': collect_material(analysis_obj),
+            'fixed_nodes': source.fixed_nodes,
+            'load_cases': build_case_loads(load_cases, source.component_faces),
+        }
+        fea = DirectCcxRun(analysis_obj, working_dir, 'MorphedMesh')
+        fea.model = model
+        fea.scalar_results = True
+        if len(model['load_cases']) > 1:
+            fea.load_case_names = [case['name'] for case in model['load_cases']]
+        write_inp_deck(fea.inp_file_name, model)
+        
+        if detailed_log:
+            print(f"{sample_id} ⏱️ ccx 実行開始（モーフィングメッシュ）: {time.strftime('%H:%M:%S')}")
+        proc = run_ccx(working_dir, fea.job_name, num_threads=get_cpu_budget().ccx_threads)
+        fea.ccx_stdout = proc.stdout
+        if detailed_log:
+            print(f"{sample_id} ✅ ccx 完了: {time.strftime('%H:%M:%S')}")
+        
+        building_info['fem_mesh_morphing'] = 'morphed'
+        if VERBOSE_OUTPUT:
+            print(f"♻️ メッシュをモーフィングして再利用しました（節点 {len(mesh_arrays['node_ids']):,}）")
+        return fea
+    
+    except Exception:
+        if VERBOSE_OUTPUT:
+            traceback.print_exc()
+        return None
+
+
+def register_morph_source(fea_obj: Any, building_info: Dict[str, Any]) -> None:
+    """
+    再メッシュした解析のメッシュと荷重面をモーフィング用キャッシュに登録
+    
+    Args:
+        fea_obj: run_calculix_direct が返した DirectCcxRun（荷重ケース指定で実行したもの）
+        building_info: 建物情報辞書
+    """
+    from ccx_inp_writer import read_abaqus_mesh
+    from mesh_morphing import MorphSource, get_mesh_morph_cache, topology_signature
+    
+    model = getattr(fea_obj, 'model', None)
+    if not model or 'component_faces' not in model:
+        return
+    try:
+        mesh_path = os.path.join(fea_obj.working_dir, f"{fea_obj.job_name}_mesh.inp")
+        source = MorphSource(building_info, read_abaqus_mesh(mesh_path),
+                             model['fixed_nodes'], model['component_faces'])
+        get_mesh_morph_cache().put(topology_signature(building_info), source)
+        building_info['fem_mesh_morphing'] = 'remeshed'
+    except Exception as e:
+        if VERBOSE_OUTPUT:
+            print(f"⚠️ モーフィング用メッシュの登録に失敗: {e}")
+
+
+
+def get_frd_path(fea_obj: Any) -> str:
+    """
+    解析で出力された .frd ファイルのパスを取得
+    
+    直接パス（frd_file_name）→ CcxTools の入力ファイル名から推定 →
+    作業ディレクトリ内で最も新しい .frd の順に探す。
+    
+    Args:
+        fea_obj: CcxToolsオブジェクトまたは DirectCcxRun
+    
+    Returns:
+        str: .frd ファイルのパス、見つからない場合はNone
+    """
+    candidates = [getattr(fea_obj, 'frd_file_name', None)]
+    inp_file_name = getattr(fea_obj, 'inp_file_name', None)
+    if inp_file_name:
+        candidates.append(os.path.splitext(inp_file_name)[0] + '.frd')
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    
+    working_dir = getattr(fea_obj, 'working_dir', None)
+    if working_dir and os.path.isdir(working_dir):
+        frd_files = [os.path.join(working_dir, f) for f in os.listdir(working_dir) if f.endswith('.frd')]
+        if frd_files:
+            return max(frd_files, key=os.path.getmtime)
+    return None
+
 
 def extract_fem_results(fea_obj: Any) -> Dict[str, Any]:
     """
@@ -2444,6 +2989,8 @@ def extract_fem_results(fea_obj: Any) -> Dict[str, Any]:
     """
     import os
     import time
+    from frd_reader import (summarize_displacements, summarize_stresses, summarize_frd,
+                            summarize_load_cases, von_mises)
     detailed_log = os.environ.get('FEM_DETAILED_LOG', '') == '1'
     sample_id = os.environ.get('FEM_SAMPLE_ID', '')
     
@@ -2464,6 +3011,37 @@ def extract_fem_results(fea_obj: Any) -> Dict[str, Any]:
         'stress_utilization': None
     }
     
+    # スカラー結果モード・複数荷重ケース: 結果オブジェクトを介さず .frd から統計値だけを計算
+    load_case_names = getattr(fea_obj, 'load_case_names', None)
+    if (os.environ.get('FEM_SCALAR_RESULTS', '') == '1' or load_case_names
+            or getattr(fea_obj, 'scalar_results', False)):
+        try:
+            frd_path = get_frd_path(fea_obj)
+            if frd_path is None:
+                if VERBOSE_OUTPUT:
+                    print("❌ .frd ファイルが見つかりません")
+                return results
+            if load_case_names:
+                # ケースごとの結果と包絡値（最大応力・最大変位は全ケースの最大）
+                case_results, frd_summary = summarize_load_cases(frd_path, load_case_names)
+                results['load_cases'] = case_results
+                if VERBOSE_OUTPUT:
+                    for name, case in case_results.items():
+                        print(f"   {name}: 最大応力 {case.get('max_stress', 0):.3f} MPa, "
+                              f"最大変位 {case.get('max_displacement', 0):.3f} mm")
+            else:
+                frd_summary = summarize_frd(frd_path)
+            max_idx = frd_summary.pop('max_index', None)
+            results.update(frd_summary)
+            if max_idx is not None:
+                results['critical_location'] = f"要素{max_idx}"
+            if detailed_log:
+                print(f"{sample_id} ✅ FEM結果抽出完了(.frd直接): 最大変位={results['max_displacement']}, 最大応力={results['max_stress']}")
+        except Exception as e:
+            if VERBOSE_OUTPUT:
+                print(f"❌ FRDファイル読み取りエラー: {e}")
+        return results
+    
     try:
         result = None
         
@@ -2483,7 +3061,8 @@ def extract_fem_results(fea_obj: Any) -> Dict[str, Any]:
             if detailed_log:
                 print(f"{sample_id} 🔍 ドキュメントから結果オブジェクトを探索中...")
             
-            doc = App.ActiveDocument
+            analysis = getattr(fea_obj, 'analysis', None)
+            doc = analysis.Document if analysis is not None else App.ActiveDocument
             for obj in doc.Objects:
                 # CCX_Resultsオブジェクトを探す
                 if obj.Name == 'CCX_Results' or 'Result' in obj.Name:
@@ -2557,37 +3136,12 @@ def extract_fem_results(fea_obj: Any) -> Dict[str, Any]:
         
         # 変位データの処理（拡張版）
         if displacements is not None and len(displacements) > 0:
-            # numpy配列かリストかを判定
-            if hasattr(displacements, 'max'):
-                max_disp = float(displacements.max())
-                active_disps = displacements[displacements > 0.001]
-                
-                # 新規：統計情報の計算
-                results['avg_displacement'] = float(np.mean(displacements))
-                results['displacement_cv'] = float(np.std(displacements) / np.mean(displacements)) if np.mean(displacements) > 0 else 0
-                
-                # 上位10%の平均
-                sorted_disps = np.sort(displacements)
-                top_10_percent = sorted_disps[int(len(sorted_disps) * 0.9):]
-                results['critical_displacement'] = float(np.mean(top_10_percent))
-            else:
-                max_disp = max(displacements)
-                active_disps = [d for d in displacements if d > 0.001]
-                
-                # リストの場合の統計計算
-                import statistics
-                results['avg_displacement'] = statistics.mean(displacements)
-                if results['avg_displacement'] > 0:
-                    results['displacement_cv'] = statistics.stdev(displacements) / results['avg_displacement']
-                else:
-                    results['displacement_cv'] = 0
-                
-                # 上位10%の平均
-                sorted_disps = sorted(displacements, reverse=True)
-                top_10_count = max(1, int(len(sorted_disps) * 0.1))
-                results['critical_displacement'] = statistics.mean(sorted_disps[:top_10_count])
+            # リスト・タプルでも同じ統計になるようNumPy配列に揃えてベクトル化計算
+            displacements = np.asarray(displacements, dtype=np.float64)
+            results.update(summarize_displacements(displacements))
+            max_disp = results['max_displacement']
+            active_disps = displacements[displacements > 0.001]
             
-            results['max_displacement'] = max_disp
             if VERBOSE_OUTPUT:
                 print(f"✅ 最大変位: {max_disp:.3f} mm")
             if VERBOSE_OUTPUT:
@@ -2602,7 +3156,7 @@ def extract_fem_results(fea_obj: Any) -> Dict[str, Any]:
                 print(f"   臨界変位（上位10%平均）: {results['critical_displacement']:.3f} mm")
             
             if len(active_disps) > 0:
-                avg_disp = sum(active_disps) / len(active_disps)
+                avg_disp = float(active_disps.mean())
                 if VERBOSE_OUTPUT:
                     print(f"   平均変位（アクティブ）: {avg_disp:.3f} mm")
         else:
@@ -2640,17 +3194,8 @@ def extract_fem_results(fea_obj: Any) -> Dict[str, Any]:
         elif hasattr(result, 'StressValues'):
             stress_values = result.StressValues
             if stress_values:
-                # Von Mises応力を計算
-                von_mises = []
-                for stress in stress_values:
-                    if len(stress) >= 6:
-                        s11, s22, s33, s12, s13, s23 = stress[:6]
-                        vm = math.sqrt(0.5 * (
-                            (s11 - s22)**2 + (s22 - s33)**2 + (s33 - s11)**2 +
-                            6 * (s12**2 + s13**2 + s23**2)
-                        ))
-                        von_mises.append(vm)
-                stresses = von_mises
+                # Von Mises応力を一括計算
+                stresses = von_mises(np.asarray(stress_values, dtype=np.float64)[:, :6])
                 if VERBOSE_OUTPUT:
                     print("✅ StressValues属性から応力データ取得")
         
@@ -2662,33 +3207,11 @@ def extract_fem_results(fea_obj: Any) -> Dict[str, Any]:
         
         # 応力データの処理（拡張版）
         if stresses is not None and len(stresses) > 0:
-            # numpy配列かリストかを判定
-            if hasattr(stresses, 'max'):
-                max_stress = float(stresses.max())
-                max_idx = int(stresses.argmax())
-                
-                # 新規：統計情報の計算
-                results['avg_stress'] = float(np.mean(stresses))
-                if results['avg_stress'] > 0:
-                    results['stress_uniformity'] = float(1 - np.std(stresses) / results['avg_stress'])
-                else:
-                    results['stress_uniformity'] = 0
-                results['stress_utilization'] = float(results['avg_stress'] / 35.0)  # 許容応力35MPa
-            else:
-                max_stress = max(stresses)
-                max_idx = stresses.index(max_stress) if isinstance(stresses, list) else 0
-                
-                # リストの場合の統計計算
-                import statistics
-                results['avg_stress'] = statistics.mean(stresses)
-                if results['avg_stress'] > 0:
-                    results['stress_uniformity'] = 1 - statistics.stdev(stresses) / results['avg_stress']
-                else:
-                    results['stress_uniformity'] = 0
-                results['stress_utilization'] = results['avg_stress'] / 35.0
-            
-            results['max_stress'] = max_stress
-            results['max_local_stress'] = max_stress
+            # 統計値は許容応力35MPa基準（stress_utilization）でベクトル化計算
+            stress_summary = summarize_stresses(np.asarray(stresses, dtype=np.float64))
+            max_idx = stress_summary.pop('max_index')
+            max_stress = stress_summary['max_stress']
+            results.update(stress_summary)
             results['critical_location'] = f"要素{max_idx}"
             
             if VERBOSE_OUTPUT:
@@ -2723,58 +3246,19 @@ def extract_fem_results(fea_obj: Any) -> Dict[str, Any]:
             if VERBOSE_OUTPUT:
                 print("\n📄 FRDファイルから応力データを直接読み取り中...")
             try:
-                working_dir = fea_obj.working_dir
-                frd_files = [f for f in os.listdir(working_dir) if f.endswith('.frd')]
-                if frd_files:
-                    frd_path = os.path.join(working_dir, frd_files[0])
-                    
-                    # 簡易的なFRD読み取り
-                    with open(frd_path, 'r') as f:
-                        lines = f.readlines()
-                    
-                    stress_values = []
-                    in_stress_block = False
-                    for line in lines:
-                        if 'STRESS' in line and line.strip().startswith('-4'):
-                            in_stress_block = True
-                            continue
-                        elif line.strip().startswith('-3') and in_stress_block:
-                            break
-                        elif in_stress_block and line.strip().startswith('-1'):
-                            parts = line.strip().split()
-                            if len(parts) >= 8:
-                                try:
-                                    # Von Mises応力の計算
-                                    s11 = float(parts[2])
-                                    s22 = float(parts[3])
-                                    s33 = float(parts[4])
-                                    s12 = float(parts[5])
-                                    s13 = float(parts[6])
-                                    s23 = float(parts[7])
-                                    
-                                    vm = math.sqrt(0.5 * (
-                                        (s11 - s22)**2 + (s22 - s33)**2 + (s33 - s11)**2 +
-                                        6 * (s12**2 + s13**2 + s23**2)
-                                    ))
-                                    stress_values.append(vm)
-                                except:
-                                    pass
-                    
-                    if stress_values:
-                        max_stress = max(stress_values)
-                        results['max_stress'] = max_stress
-                        results['max_local_stress'] = max_stress
+                frd_path = get_frd_path(fea_obj)
+                if frd_path:
+                    # 固定桁フォーマットをNumPyで一括変換（最終ステップの結果を使用）
+                    frd_summary = summarize_frd(frd_path)
+                    if 'max_stress' in frd_summary:
+                        frd_summary.pop('max_index', None)
+                        if results['max_displacement'] is not None:
+                            for key in ('max_displacement', 'avg_displacement',
+                                        'displacement_cv', 'critical_displacement'):
+                                frd_summary.pop(key, None)
+                        results.update(frd_summary)
                         if VERBOSE_OUTPUT:
-                            print(f"✅ FRDファイルから最大応力取得: {max_stress:.3f} MPa")
-                        
-                        # FRDから読み取った場合も統計計算
-                        import statistics
-                        results['avg_stress'] = statistics.mean(stress_values)
-                        if results['avg_stress'] > 0:
-                            results['stress_uniformity'] = 1 - statistics.stdev(stress_values) / results['avg_stress']
-                        else:
-                            results['stress_uniformity'] = 0
-                        results['stress_utilization'] = results['avg_stress'] / 35.0
+                            print(f"✅ FRDファイルから最大応力取得: {results['max_stress']:.3f} MPa")
                         
             except Exception as e:
                 if VERBOSE_OUTPUT:
@@ -2926,66 +3410,19 @@ def calculate_economic_cost(building_info: Dict[str, Any]) -> Dict[str, Any]:
     total_material_cost = 0
     total_labor_cost = 0
     
-    # 材料コストの計算
+    # 材料コストの計算（材料特性・労務費係数は材料コードで配列表から引く）
     for part, ratio in parts_volume_ratio.items():
         part_volume = volume_m3 * ratio
-        
-        if part == 'columns':
-            mat_type = building_info.get('material_columns', 0)
-            material = get_material_name(mat_type)
-            if mat_type == 2:  # CLT
-                labor_factor = 1.4  # CLTの施工はより高度
-            elif mat_type == 1:  # 一般木材
-                labor_factor = 1.2
-            else:  # コンクリート
-                labor_factor = 1.0
-        elif part == 'floors':
-            mat_type = max(building_info.get('material_floor1', 0), building_info.get('material_floor2', 0))
-            material = get_material_name(mat_type)
-            if mat_type == 2:  # CLT
-                labor_factor = 1.5  # CLT床は特殊工法
-            elif mat_type == 1:  # 一般木材
-                labor_factor = 1.3
-            else:  # コンクリート
-                labor_factor = 1.0
-        elif part == 'roof':
-            mat_type = building_info.get('material_roof', 0)
-            material = get_material_name(mat_type)
-            if mat_type == 2:  # CLT
-                labor_factor = 1.45  # CLT屋根は高度な施工
-            elif mat_type == 1:  # 一般木材
-                labor_factor = 1.25
-            else:  # コンクリート
-                labor_factor = 1.0
-        elif part == 'walls':
-            mat_type = building_info.get('material_walls', 0)
-            material = get_material_name(mat_type)
-            if mat_type == 2:  # CLT
-                labor_factor = 1.35  # CLT壁パネル施工
-            elif mat_type == 1:  # 一般木材
-                labor_factor = 1.15
-            else:  # コンクリート
-                labor_factor = 1.0
-        elif part == 'balcony':
-            mat_type = building_info.get('material_balcony', 0)
-            material = get_material_name(mat_type)
-            if mat_type == 2:  # CLT
-                labor_factor = 1.55  # CLTバルコニーは高価
-            elif mat_type == 1:  # 一般木材
-                labor_factor = 1.35
-            else:  # コンクリート
-                labor_factor = 1.0
-        else:
-            # コンクリート
-            material = 'concrete'
-            labor_factor = 1.0
+        code = part_material_code(building_info, part)
+        labor_factor = PART_LABOR_FACTORS[part][code]
         
         # 固定リサイクル率を使用
         recycle_ratio = FIXED_RECYCLE_RATIOS.get(f'recycle_ratio_{part}', 0.0)
         
         # 材料費（リサイクル率を考慮）
-        new_material_cost = part_volume * MATERIAL_PROPERTIES[material]['cost_per_m3']
-        recycle_material_cost = part_volume * MATERIAL_PROPERTIES[material]['cost_per_m3'] * MATERIAL_PROPERTIES[material]['recycle_cost_factor']
+        cost_per_m3 = MATERIAL_TABLE['cost_per_m3'][code]
+        new_material_cost = part_volume * cost_per_m3
+        recycle_material_cost = part_volume * cost_per_m3 * MATERIAL_TABLE['recycle_cost_factor'][code]
         material_cost = new_material_cost * (1 - recycle_ratio) + recycle_material_cost * recycle_ratio
         
         # 労務費（材料費の50%をベースに）
@@ -3242,56 +3679,22 @@ def calculate_environmental_impact(building_info: Dict[str, Any], fem_results: D
     concrete_volume_m3 = 0
     wood_volume_m3 = 0
     
-    # 各部材のCO2計算
+    # 各部材のCO2計算（材料特性は材料コードで配列表から引く）
     for part, ratio in parts_volume_ratio.items():
         part_volume = volume_m3 * ratio
-        
-        # 材料判定
-        if part == 'columns':
-            mat_type = building_info.get('material_columns', 0)
-            material = get_material_name(mat_type)
-            if mat_type >= 1:
-                wood_volume_m3 += part_volume
-            else:
-                concrete_volume_m3 += part_volume
-        elif part == 'floors':
-            mat_type = max(building_info.get('material_floor1', 0), building_info.get('material_floor2', 0))
-            material = get_material_name(mat_type)
-            if mat_type >= 1:
-                wood_volume_m3 += part_volume
-            else:
-                concrete_volume_m3 += part_volume
-        elif part == 'roof':
-            mat_type = building_info.get('material_roof', 0)
-            material = get_material_name(mat_type)
-            if mat_type >= 1:
-                wood_volume_m3 += part_volume
-            else:
-                concrete_volume_m3 += part_volume
-        elif part == 'walls':
-            mat_type = building_info.get('material_walls', 0)
-            material = get_material_name(mat_type)
-            if mat_type >= 1:
-                wood_volume_m3 += part_volume
-            else:
-                concrete_volume_m3 += part_volume
-        elif part == 'balcony':
-            mat_type = building_info.get('material_balcony', 0)
-            material = get_material_name(mat_type)
-            if mat_type >= 1:
-                wood_volume_m3 += part_volume
-            else:
-                concrete_volume_m3 += part_volume
+        code = part_material_code(building_info, part)
+        if MATERIAL_TABLE['is_wood'][code]:
+            wood_volume_m3 += part_volume
         else:
-            material = 'concrete'
             concrete_volume_m3 += part_volume
         
         # 固定リサイクル率を使用
         recycle_ratio = FIXED_RECYCLE_RATIOS.get(f'recycle_ratio_{part}', 0.0)
         
         # CO2排出量（リサイクル率を考慮）
-        new_material_co2 = part_volume * MATERIAL_PROPERTIES[material]['co2_per_m3']
-        recycle_material_co2 = part_volume * MATERIAL_PROPERTIES[material]['co2_per_m3'] * MATERIAL_PROPERTIES[material]['recycle_co2_factor']
+        co2_per_m3 = MATERIAL_TABLE['co2_per_m3'][code]
+        new_material_co2 = part_volume * co2_per_m3
+        recycle_material_co2 = part_volume * co2_per_m3 * MATERIAL_TABLE['recycle_co2_factor'][code]
         co2_emission = new_material_co2 * (1 - recycle_ratio) + recycle_material_co2 * recycle_ratio
         total_co2_from_materials += co2_emission
     
@@ -3731,6 +4134,140 @@ def calculate_constructability_score(building_info: Dict[str, Any], fem_results:
         'stress_concentration_penalty': -stress_concentration_penalty
     }
 
+def run_frame_analysis(building_info: Dict[str, Any], material_columns: int, material_floor1: int,
+                       material_floor2: int, material_walls: int, working_dir: str = None) -> Dict[str, Any]:
+    """
+    骨組・シェル縮約モデルでFEM解析を実行（環境変数 FEM_FIDELITY=frame）
+    
+    Gmsh とソリッドメッシュを使わず、柱を梁要素、床・屋根・壁をシェル要素としたモデルを
+    CalculiX で解く。材料による弾性定数と地震荷重はソリッドモデルと同じ式で求める。
+    
+    Args:
+        building_info: 建物情報辞書（mm 寸法と体積を含む）
+        material_*: 各部材の材料タイプ
+        working_dir: .inp / .frd を書き出すディレクトリ
+    
+    Returns:
+        dict: extract_fem_results と同じキーの結果、失敗時はNone
+    """
+    import tempfile
+    from cpu_budget import get_cpu_budget
+    from frame_model import solve_frame_model
+    
+    if not working_dir:
+        working_dir = os.path.join(tempfile.gettempdir(), 'ai_arch_frame')
+    try:
+        column_E, column_poisson = get_column_elastic_constants(material_columns)
+        seismic_scale = calculate_seismic_scale(material_columns, material_floor1,
+                                                material_floor2, material_walls)
+        fem_results = solve_frame_model(building_info, column_E, column_poisson, seismic_scale,
+                                        working_dir, num_threads=get_cpu_budget().ccx_threads)
+        if VERBOSE_OUTPUT:
+            print(f"🦴 縮約モデル解析完了: 節点 {fem_results['frame_nodes']:,} / "
+                  f"要素 {fem_results['frame_elements']:,}")
+        return fem_results
+    except Exception as e:
+        if VERBOSE_OUTPUT:
+            print(f"❌ 縮約モデル解析エラー: {e}")
+            traceback.print_exc()
+        return None
+
+
+def run_fem_stages(doc: Any, building_obj: Any, building_info: Dict[str, Any],
+                   material_columns: int, material_floor1: int, material_floor2: int,
+                   material_roof: int, material_walls: int, material_balcony: int,
+                   working_dir: str = None, superposition: Dict[str, Any] = None) -> (Dict[str, Any], str, str):
+    """
+    FEM解析の各段階（解析設定→メッシュ生成→CalculiX→結果抽出）を実行
+    
+    環境変数 FEM_MESH_MORPHING=1 の場合、トポロジーが同じ設計のメッシュを
+    モーフィングして使い回し、品質検査に不合格のときだけメッシュを再生成する。
+    
+    Args:
+        doc: FreeCADドキュメント
+        building_obj: 解析対象の建物オブジェクト
+        building_info: 建物情報辞書
+        material_*: 各部材の材料タイプ
+        working_dir: Gmsh / CalculiX の作業ディレクトリ
+        superposition: 重ね合わせモードの設定（key, E, poisson, seismic_scale）。
+                       指定時は単位荷重解を求めてキャッシュに登録し、合成した結果を返す
+    
+    Returns:
+        tuple: (FEM結果 or None, 失敗した段階 'setup'/'mesh'/'ccx'/'extract' or None, メッセージ)
+    """
+    # FEM解析設定
+    analysis_obj, mesh_obj = setup_basic_fem_analysis(doc, building_obj, building_info,
+                                                     material_columns, material_floor1, material_floor2,
+                                                     material_roof, material_walls, material_balcony)
+    if not (analysis_obj and mesh_obj):
+        return None, 'setup', "FEM解析設定に失敗しました。"
+    if VERBOSE_OUTPUT:
+        print("✅ FEM解析設定完了。メッシュ生成へ。")
+
+    # 重ね合わせモード・メッシュモーフィングでは荷重を成分ごとの荷重ケース定義として扱う
+    morphing = os.environ.get('FEM_MESH_MORPHING', '') == '1'
+    load_cases = building_info.get('fem_load_cases')
+    if (superposition is not None or morphing) and not load_cases:
+        components = collect_pressure_components(analysis_obj)
+        load_cases = {'components': components, 'cases': [{'name': 'static', 'components': list(components)}]}
+
+    # 重ね合わせモードでは荷重ケースを単位荷重ステップに分解して解く
+    unit_plan = None
+    if superposition is not None:
+        from fem_superposition import build_unit_load_cases
+        load_cases, unit_plan = build_unit_load_cases(load_cases, superposition['seismic_scale'])
+
+    # トポロジーが同じ設計のメッシュがあればモーフィングして再利用（メッシュ生成を省略）
+    fea_obj = None
+    if morphing:
+        fea_obj = run_calculix_morphed(analysis_obj, building_info, load_cases, working_dir)
+
+    if fea_obj is None:
+        # メッシュ生成（形状区分ごとにチューニング済みの Gmsh 設定を使用）
+        from gmsh_tuning import geometry_class, get_mesh_settings
+        building_info['mesh_geometry_class'] = geometry_class(building_info)
+        mesh_success = run_mesh_generation(doc, mesh_obj, working_dir, get_mesh_settings(building_info),
+                                           building_info)
+        if not mesh_success:
+            return None, 'mesh', "メッシュ生成に失敗しました。"
+        # 回復ラダーで形状を修復した場合は荷重ケース定義の参照面も付け替える
+        if load_cases and building_info.get('healed_face_map') is not None:
+            from shape_healing import remap_load_case_references
+            remap_load_case_references(load_cases, building_info['healed_face_map'], building_obj.Name)
+        if VERBOSE_OUTPUT:
+            print("✅ メッシュ生成完了。CalculiX解析へ。")
+        
+        # デバッグ：固定ノードの確認
+        check_fixed_nodes(doc, mesh_obj)
+
+        # CalculiX解析実行
+        fea_obj = run_calculix_analysis(analysis_obj, load_cases, working_dir)
+        if not fea_obj:
+            return None, 'ccx', "CalculiX解析の実行または結果の読み込みに失敗しました。"
+        if morphing:
+            register_morph_source(fea_obj, building_info)
+    if VERBOSE_OUTPUT:
+        print("✅ CalculiX解析完了。結果抽出へ。")
+
+    # FEM結果抽出
+    if unit_plan is not None:
+        from fem_superposition import UnitResponse, get_superposition_cache
+        try:
+            unit_response = UnitResponse.from_frd(get_frd_path(fea_obj), unit_plan,
+                                                  superposition['E'], superposition['poisson'])
+            get_superposition_cache().put(superposition['key'], unit_response)
+            fem_results = unit_response.combine(superposition['E'], superposition['seismic_scale'])
+        except Exception as e:
+            if VERBOSE_OUTPUT:
+                print(f"❌ 単位荷重解の読み込みエラー: {e}")
+            fem_results = {}
+    else:
+        fem_results = extract_fem_results(fea_obj)
+    if fem_results.get('max_displacement') is None and fem_results.get('max_stress') is None:
+        return None, 'extract', "FEM結果の抽出に失敗しました。"
+    return fem_results, None, ''
+
+
 def evaluate_building(
     # 基本パラメータ
     Lx: float, Ly: float, H1: float, H2: float,
@@ -3758,7 +4295,14 @@ def evaluate_building(
     
     # FCStdファイル保存用パラメータ
     fcstd_path: str = None,
-    verbose: bool = False
+    verbose: bool = False,
+    
+    # 下限枝刈り用パラメータ
+    prune_above: float = None,
+    lower_bound_fn: Any = None,
+    
+    # 目的関数が使う評価指標（metric_dependencies.METRIC_NAMES。Noneの場合はすべて）
+    metrics: Any = None
 ) -> Dict[str, Any]:
     """
     建物のFEM解析と評価を実行するメイン関数
@@ -3785,9 +4329,17 @@ def evaluate_building(
         material_*: 各部材の材料タイプ
         fcstd_path: 保存先ファイルパス
         verbose: 詳細ログ出力フラグ
+        prune_above: 適応度の下限がこの値を超える場合はFEM解析を省略（Noneの場合は枝刈りしない）
+        lower_bound_fn: (コスト, CO2) → 適応度の下限 の関数（FEMに依存しない評価値のみから計算）。
+                        FEM_SAFETY_ESTIMATOR を指定した場合はキーワード引数 safety_upper（安全率の推定の上限）も渡す
+        metrics: 計算する評価指標。FEMを必要とする指標（安全率・快適性・施工性）を含まない場合は
+                 メッシュ生成とFEM解析を行わず、含まない指標は NaN とする
     
     Returns:
-        dict: 各種評価結果、FEM解析結果、建物情報、ステータスを含む辞書
+        dict: 各種評価結果、FEM解析結果、建物情報、ステータスを含む辞書。
+              枝刈りした場合は status が 'Pruned' で、fitness_lower_bound に下限を格納。
+              失敗した場合は failed_stage に失敗した段階
+              （'model' / 'shape' / 'setup' / 'mesh' / 'ccx' / 'extract' / 'error'）を格納
     """
     overall_results = {
         'safety': {},
@@ -3805,7 +4357,9 @@ def evaluate_building(
         print(f"\n--- 建物モデル生成とFEM解析開始 (Lx={Lx}m, Ly={Ly}m, H1={H1}m, H2={H2}m) ---")
     
     # 既存ドキュメントのクリーンアップ
-    if App.ActiveDocument:
+    # （パイプライン評価中は ccx 実行待ちの別の設計のドキュメントを閉じないようにする）
+    from fem_pipeline import pipeline_active
+    if App.ActiveDocument and not pipeline_active():
         if VERBOSE_OUTPUT:
             print("🧹 既存ドキュメントをクリーンアップ中...")
         App.closeDocument(App.ActiveDocument.Name)
@@ -3815,6 +4369,11 @@ def evaluate_building(
     # 決定論的設定の適用
     setup_deterministic_fem()
 
+    # 評価専用の作業ディレクトリ（Gmsh / CalculiX の入出力先）
+    from fem_workdir import get_workdir_manager
+    workdir_manager = get_workdir_manager()
+    fem_working_dir = workdir_manager.new_run(os.environ.get('FEM_SAMPLE_ID', ''))
+
     doc, building_obj, building_info = None, None, {}
     try:
         # モデル生成
@@ -3828,6 +4387,7 @@ def evaluate_building(
         )
         if not (doc and building_obj):
             overall_results['message'] = "建物モデルの生成に失敗しました。"
+            overall_results['failed_stage'] = 'model'
             overall_results['safety_factor'] = 0.0  # 実行不能解として0を設定
             overall_results['cost'] = float('inf')  # 無限大コスト
             overall_results['co2_emission'] = float('inf')  # 無限大CO2
@@ -3850,13 +4410,24 @@ def evaluate_building(
         building_info['balcony_depth'] = balcony_depth
         building_info['has_balcony'] = balcony_depth > 0
 
-        # モデルの形状検証 (最終結合後)
+        # モデルの形状検証 (最終結合後)。不正な場合は中止する前に形状修復を試みる
+        if not building_obj.Shape.isValid() and os.environ.get('FEM_SHAPE_HEALING', '1') != '0':
+            from mesh_recovery import heal_fuzzy_value
+            from shape_healing import heal_building_object
+            if VERBOSE_OUTPUT:
+                print("🔧 建物モデルの形状が不正なため形状修復を試行中...")
+            healing_stage = heal_building_object(building_obj, heal_fuzzy_value())
+            if healing_stage is not None:
+                building_info['shape_healing'] = healing_stage
+                if VERBOSE_OUTPUT:
+                    print(f"✅ 形状修復に成功しました（{healing_stage}）")
         if not building_obj.Shape.isValid():
             if VERBOSE_OUTPUT:
                 print("❌ 警告: 最終生成された建物モデルの形状が不正です。FEM解析に問題が発生する可能性が非常に高いです。")
             building_info['is_valid_shape'] = False
             # FEM解析が失敗する可能性が高いため、ここで早期終了する
             overall_results['message'] = "最終生成された建物モデルの形状が不正です。FEM解析を中止します。"
+            overall_results['failed_stage'] = 'shape'
             overall_results['safety_factor'] = 0.0  # 実行不能解
             overall_results['cost'] = float('inf')
             overall_results['co2_emission'] = float('inf')
@@ -3872,53 +4443,114 @@ def evaluate_building(
         if VERBOSE_OUTPUT:
             print("✅ 建物モデル生成完了。FEM解析設定へ。")
 
-        # FEM解析設定
-        analysis_obj, mesh_obj = setup_basic_fem_analysis(doc, building_obj, building_info,
-                                                         material_columns, material_floor1, material_floor2,
-                                                         material_roof, material_walls, material_balcony)
-        if not (analysis_obj and mesh_obj):
-            overall_results['message'] = "FEM解析設定に失敗しました。"
-            overall_results['safety_factor'] = 0.0  # 実行不能解
-            overall_results['cost'] = float('inf')
-            overall_results['co2_emission'] = float('inf')
-            overall_results['comfort_score'] = 0.0
-            overall_results['constructability_score'] = 0.0
-            if VERBOSE_OUTPUT:
-                print(overall_results['message'])
-            return overall_results
-        if VERBOSE_OUTPUT:
-            print("✅ FEM解析設定完了。メッシュ生成へ。")
-
-        # メッシュ生成
-        mesh_success = run_mesh_generation(doc, mesh_obj)
-        if not mesh_success:
-            overall_results['message'] = "メッシュ生成に失敗しました。"
-            if VERBOSE_OUTPUT:
-                print(overall_results['message'])
-            return overall_results
-        if VERBOSE_OUTPUT:
-            print("✅ メッシュ生成完了。CalculiX解析へ。")
-        
-        # デバッグ：固定ノードの確認
-        check_fixed_nodes(doc, mesh_obj)
-
-        # CalculiX解析実行
-        fea_obj = run_calculix_analysis(analysis_obj)
-        if not fea_obj:
-            overall_results['message'] = "CalculiX解析の実行または結果の読み込みに失敗しました。"
+        # 安全率の略算推定（FEM_SAFETY_ESTIMATOR で校正済みの推定器を指定した場合）
+        safety_upper = None
+        if os.environ.get('FEM_SAFETY_ESTIMATOR', ''):
+            from safety_estimator import get_safety_estimator
+            safety_estimator = get_safety_estimator()
+            if safety_estimator is not None:
+                estimate = safety_estimator.predict_one({
+                    'Lx': Lx, 'Ly': Ly, 'H1': H1, 'H2': H2, 'tf': tf, 'tr': tr, 'bc': bc, 'hc': hc,
+                    'tw_ext': tw_ext, 'wall_tilt_angle': wall_tilt_angle, 'window_ratio_2f': window_ratio_2f,
+                    'roof_morph': roof_morph, 'roof_shift': roof_shift, 'balcony_depth': balcony_depth,
+                    'material_columns': material_columns, 'material_floor1': material_floor1,
+                    'material_floor2': material_floor2, 'material_roof': material_roof,
+                    'material_walls': material_walls, 'material_balcony': material_balcony,
+                })
+                building_info['safety_estimate'] = estimate['safety']
+                building_info['safety_estimate_upper'] = estimate['safety_upper']
+                safety_upper = estimate['safety_upper']
+                if VERBOSE_OUTPUT:
+                    print(f"🛡️ 安全率の略算推定: {estimate['safety']:.2f}"
+                          f"（{estimate['safety_lower']:.2f} 〜 {estimate['safety_upper']:.2f}）")
+
+        # 下限枝刈り: コストとCO2は体積と寸法だけで決まるため、FEM解析の前に適応度の下限を求め、
+        # 下限が閾値（粒子の pbest）を超える設計はメッシュ生成と解析を省略する
+        # （安全率の推定器がある場合は安全率の上限も下限の計算に使う）
+        if prune_above is not None and lower_bound_fn is not None:
+            economic = calculate_economic_cost(building_info)
+            environmental = calculate_environmental_impact(building_info)
+            if safety_upper is not None:
+                fitness_lower_bound = lower_bound_fn(economic['cost_per_sqm'], environmental['co2_per_sqm'],
+                                                     safety_upper=safety_upper)
+            else:
+                fitness_lower_bound = lower_bound_fn(economic['cost_per_sqm'], environmental['co2_per_sqm'])
+            if fitness_lower_bound is not None and fitness_lower_bound > prune_above:
+                overall_results['economic'] = economic
+                overall_results['environmental'] = environmental
+                overall_results['building_info'] = building_info
+                overall_results['fitness_lower_bound'] = float(fitness_lower_bound)
+                overall_results['status'] = 'Pruned'
+                overall_results['message'] = (f"適応度の下限 {fitness_lower_bound:.4g} が閾値 {prune_above:.4g} を"
+                                              f"超えるためFEM解析を省略しました。")
+                if VERBOSE_OUTPUT:
+                    print(f"✂️ {overall_results['message']}")
+                return overall_results
+
+        # 目的関数がFEMに依存する指標を使わない場合は、形状だけで決まる指標（コスト・CO2）を返して終了
+        from metric_dependencies import METRIC_STAGES, needs_fem
+        if metrics is not None and not needs_fem(metrics):
+            overall_results['economic'] = calculate_economic_cost(building_info)
+            overall_results['environmental'] = calculate_environmental_impact(building_info)
+            overall_results['safety'] = {'overall_safety_factor': float('nan')}
+            overall_results['comfort'] = {'comfort_score': float('nan')}
+            overall_results['constructability'] = {'constructability_score': float('nan')}
+            overall_results['skipped_metrics'] = [m for m, stage in METRIC_STAGES.items() if stage == 'fem']
+            building_info['analysis_stages'] = 'geometry'
+            overall_results['building_info'] = building_info
+            overall_results['status'] = 'Success'
+            overall_results['message'] = "目的関数がFEMに依存する指標を使わないため、形状の評価のみで終了しました。"
             if VERBOSE_OUTPUT:
                 print(overall_results['message'])
             return overall_results
-        if VERBOSE_OUTPUT:
-            print("✅ CalculiX解析完了。結果抽出へ。")
 
-        # FEM結果抽出
-        fem_results = extract_fem_results(fea_obj)
-        if fem_results['max_displacement'] is None and fem_results['max_stress'] is None:
-            overall_results['message'] = "FEM結果の抽出に失敗しました。"
-            if VERBOSE_OUTPUT:
-                print(overall_results['message'])
-            return overall_results
+        fem_results = None
+        superposition = None
+
+        # 縮約モデル（骨組・シェル）によるスクリーニング評価。失敗時はソリッドモデルで解析
+        if os.environ.get('FEM_FIDELITY', 'solid') == 'frame':
+            fem_results = run_frame_analysis(building_info, material_columns, material_floor1,
+                                             material_floor2, material_walls, fem_working_dir)
+            building_info['fem_fidelity'] = 'frame' if fem_results is not None else 'solid'
+
+        # 重ね合わせモード: 同じ形状・ν区分の単位荷重解があればFEM解析を省略して合成
+        if fem_results is None and os.environ.get('FEM_SUPERPOSITION', '') == '1':
+            from fem_superposition import get_superposition_cache, geometry_key
+            column_E, column_poisson = get_column_elastic_constants(material_columns)
+            superposition = {
+                'key': geometry_key(building_info, column_poisson),
+                'E': column_E,
+                'poisson': column_poisson,
+                'seismic_scale': calculate_seismic_scale(material_columns, material_floor1,
+                                                         material_floor2, material_walls),
+            }
+            unit_response = get_superposition_cache().get(superposition['key'])
+            if unit_response is not None:
+                fem_results = unit_response.combine(superposition['E'], superposition['seismic_scale'])
+                building_info['fem_superposition'] = 'reused'
+                if VERBOSE_OUTPUT:
+                    print("♻️ 単位荷重解の重ね合わせで結果を合成しました（FEM解析省略）")
+        
+        if fem_results is None:
+            fem_results, failed_stage, message = run_fem_stages(
+                doc, building_obj, building_info,
+                material_columns, material_floor1, material_floor2,
+                material_roof, material_walls, material_balcony,
+                fem_working_dir, superposition)
+            if fem_results is None:
+                overall_results['message'] = message
+                overall_results['failed_stage'] = failed_stage
+                if failed_stage == 'setup':
+                    overall_results['safety_factor'] = 0.0  # 実行不能解
+                    overall_results['cost'] = float('inf')
+                    overall_results['co2_emission'] = float('inf')
+                    overall_results['comfort_score'] = 0.0
+                    overall_results['constructability_score'] = 0.0
+                if VERBOSE_OUTPUT:
+                    print(overall_results['message'])
+                return overall_results
+            if superposition is not None:
+                building_info['fem_superposition'] = 'solved'
         overall_results['raw_fem_results'] = fem_results
         if VERBOSE_OUTPUT:
             print("✅ FEM結果抽出完了。評価計算へ。")
@@ -3942,6 +4574,9 @@ def evaluate_building(
             'max_stress_mpa': max_stress_mpa,
             'max_displacement_mm': fem_results.get('max_displacement', 0.0)
         }
+        if 'load_cases' in fem_results:
+            overall_results['safety']['governing_load_case'] = fem_results.get('governing_load_case')
+            overall_results['safety']['load_cases'] = fem_results['load_cases']
 
         # 経済性（構造パラメータのみに基づくコスト計算）
         overall_results['economic'] = calculate_economic_cost(building_info)
@@ -3966,12 +4601,23 @@ def evaluate_building(
 
     except Exception as e:
         overall_results['message'] = f"処理中に予期せぬエラーが発生しました: {e}"
+        overall_results['failed_stage'] = 'error'
         if VERBOSE_OUTPUT:
             print(overall_results['message'])
             if VERBOSE_OUTPUT:
 
                 traceback.print_exc()
     finally:
+        # 作業ディレクトリの後処理（成功・枝刈り時は削除、失敗時は直近分のみ保持）
+        try:
+            overall_results['workdir_bytes_written'] = workdir_manager.finish(
+                fem_working_dir, overall_results['status'] in ('Success', 'Pruned'))
+            if VERBOSE_OUTPUT:
+                print(f"🗂️ 作業ディレクトリ書き込み量: {overall_results['workdir_bytes_written'] / 1e6:.1f} MB")
+        except Exception as e:
+            if VERBOSE_OUTPUT:
+                print(f"作業ディレクトリ後処理エラー: {e}")
+        
         if save_fcstd and doc:
             try:
                 if VERBOSE_OUTPUT:
@@ -4104,7 +4750,9 @@ def clean_document_for_fcstd_save(doc, building_info=None):
     return True
 
 
-def evaluate_building_from_params(params: Dict[str, Any], save_fcstd: bool = False, fcstd_path: str = None) -> Dict[str, Any]:
+def evaluate_building_from_params(params: Dict[str, Any], save_fcstd: bool = False, fcstd_path: str = None,
+                                  prune_above: float = None, lower_bound_fn: Any = None,
+                                  metrics: Any = None) -> Dict[str, Any]:
     """
     パラメータ辞書から建物評価を実行するラッパー関数
     
@@ -4137,6 +4785,9 @@ def evaluate_building_from_params(params: Dict[str, Any], save_fcstd: bool = Fal
             - material_balcony: バルコニー材料 (0/1/2)
         save_fcstd: FCStdファイルを保存するか
         fcstd_path: 保存先パス（Noneの場合自動生成）
+        prune_above: 適応度の下限がこの値を超える場合はFEM解析を省略（evaluate_building を参照）
+        lower_bound_fn: (コスト, CO2) → 適応度の下限 の関数
+        metrics: 計算する評価指標（Noneの場合はすべて。evaluate_building を参照）
     
     Returns:
         dict: 評価結果の辞書
@@ -4183,7 +4834,10 @@ def evaluate_building_from_params(params: Dict[str, Any], save_fcstd: bool = Fal
             material_roof=params.get('material_roof', 0),
             material_walls=params.get('material_walls', 0),
             material_balcony=params.get('material_balcony', 0),
-            fcstd_path=fcstd_path
+            fcstd_path=fcstd_path,
+            prune_above=prune_above,
+            lower_bound_fn=lower_bound_fn,
+            metrics=metrics
         )
         # Flatten nested results so simple_random_batch can access them
         result['cost_per_sqm'] = result.get('economic', {}).get('cost_per_sqm', 0.0)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+gmsh_tuning.py
+==============
+形状区分ごとの Gmsh メッシュ設定（3Dアルゴリズム・最適化）の参照テーブル
+
+建物を屋根（平ら/かまぼこ）・外壁（鉛直/傾斜）・バルコニー（有/無）の8区分に分け、
+tune_gmsh_settings.py で区分ごとに成功率・要素品質・所要時間を比較して選んだ設定を
+JSON のテーブルに保存しておく。run_mesh_generation はこのテーブルを自動で参照し、
+テーブルがない区分では従来の設定（Delaunay + Netgen最適化 + 平滑化10回）を使う。
+
+環境変数:
+    FEM_GMSH_TUNING    参照テーブルのJSONファイル（デフォルト: このモジュールと同じディレクトリの gmsh_tuning.json、off で無効）
+"""
+
+import json
+import os
+
+
+# 作業ディレクトリによらず同じテーブルを参照する（並列評価のワーカーはこのディレクトリで起動する）
+DEFAULT_TUNING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gmsh_tuning.json")
+
+# Gmsh の Mesh.Algorithm3D の番号
+GMSH_ALGORITHMS_3D = {
+    1: 'Delaunay',
+    4: 'Frontal',
+    7: 'MMG3D',
+    10: 'HXT',      # 並列版 Delaunay（General.NumThreads のスレッド数で実行）
+}
+
+# 従来 run_mesh_generation に固定されていた設定
+DEFAULT_MESH_SETTINGS = {
+    'algorithm3d': 1,
+    'optimize': 1,
+    'optimize_netgen': 1,
+    'smoothing': 10,
+}
+
+# 最適化設定の候補（名前: Optimize / OptimizeNetgen / Smoothing）
+OPTIMIZATION_PRESETS = {
+    'full': {'optimize': 1, 'optimize_netgen': 1, 'smoothing': 10},
+    'standard': {'optimize': 1, 'optimize_netgen': 0, 'smoothing': 5},
+    'light': {'optimize': 1, 'optimize_netgen': 0, 'smoothing': 0},
+}
+
+_SETTING_KEYS = tuple(DEFAULT_MESH_SETTINGS)
+
+_tuning_table = None
+
+
+def geometry_class(building_info):
+    """
+    メッシュ設定を切り替える形状区分を返す
+
+    Args:
+        building_info: 建物情報辞書（roof_morph / wall_tilt_angle / balcony_depth）
+
+    Returns:
+        str: 'flat-vertical-nobalcony' のような区分名
+    """
+    roof = 'flat' if float(building_info.get('roof_morph', 0.5)) < 0.33 else 'barrel'
+    wall = 'tilted' if abs(float(building_info.get('wall_tilt_angle', 0.0))) > 0.1 else 'vertical'
+    balcony = 'balcony' if float(building_info.get('balcony_depth', 0.0)) > 0 else 'nobalcony'
+    return f"{roof}-{wall}-{balcony}"
+
+
+def candidate_settings():
+    """チューニングで比較する設定（3Dアルゴリズム × 最適化設定）の一覧"""
+    candidates = []
+    for algorithm in GMSH_ALGORITHMS_3D:
+        for preset_name, preset in OPTIMIZATION_PRESETS.items():
+            settings = dict(preset, algorithm3d=algorithm)
+            settings['label'] = f"{GMSH_ALGORITHMS_3D[algorithm]}/{preset_name}"
+            candidates.append(settings)
+    return candidates
+
+
+def gmsh_options(settings, num_threads):
+    """
+    メッシュ設定を GmshTools に渡すオプション文字列に変換
+
+    Args:
+        settings: algorithm3d / optimize / optimize_netgen / smoothing を含む辞書
+        num_threads: Gmsh のスレッド数（0だと全コア）
+
+    Returns:
+        str: Gmsh オプション文字列
+    """
+    return "".join([
+        "General.RandomSeed = 12345;",
+        "Mesh.ElementDimension = 3;",
+        "Mesh.VolumeEdges = 1;",
+        f"Mesh.Algorithm3D = {int(settings['algorithm3d'])};",
+        "Mesh.CharacteristicLengthFactor = 1.0;",
+        "Mesh.RandomFactor = 0.0;",
+        f"Mesh.Smoothing = {int(settings['smoothing'])};",
+        f"Mesh.Optimize = {int(settings['optimize'])};",
+        f"Mesh.OptimizeNetgen = {int(settings['optimize_netgen'])};",
+        f"General.NumThreads = {num_threads};",
+    ])
+
+
+def load_tuning_table(path=None, reload=False):
+    """
+    区分ごとのメッシュ設定テーブルを読み込む（プロセス内で1回だけ）
+
+    Returns:
+        dict: 区分名 → 設定（ファイルがない・無効化されている場合は空）
+    """
+    global _tuning_table
+    if _tuning_table is not None and not reload and path is None:
+        return _tuning_table
+
+    env_path = os.environ.get('FEM_GMSH_TUNING', '')
+    table = {}
+    if env_path.lower() != 'off':
+        path = path or env_path or DEFAULT_TUNING_FILE
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    table = json.load(f).get('classes', {})
+            except (OSError, ValueError, AttributeError):
+                table = {}
+    _tuning_table = table
+    return table
+
+
+def get_mesh_settings(building_info=None):
+    """
+    建物の形状区分に対応するメッシュ設定を返す
+
+    Args:
+        building_info: 建物情報辞書（None の場合は従来の設定）
+
+    Returns:
+        dict: algorithm3d / optimize / optimize_netgen / smoothing
+    """
+    settings = dict(DEFAULT_MESH_SETTINGS)
+    if building_info is None:
+        return settings
+    tuned = load_tuning_table().get(geometry_class(building_info), {})
+    for key in _SETTING_KEYS:
+        if key in tuned:
+            settings[key] = int(tuned[key])
+    return settings
+
+
+def save_tuning_table(path, classes):
+    """
+    チューニング結果をテーブルとして保存
+
+    Args:
+        path: 保存先のJSONファイル
+        classes: 区分名 → 採用した設定と評価値（success_rate / mean_time_s / mean_quality など）
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'algorithms': {str(k): v for k, v in GMSH_ALGORITHMS_3D.items()},
+                   'classes': classes}, f, indent=2, ensure_ascii=False)
+    load_tuning_table(reload=True)
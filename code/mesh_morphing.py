@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mesh_morphing.py
+================
+寸法だけが少し異なる設計案でメッシュを再利用する（メッシュモーフィング）
+
+PSO の連続した評価点は Lx / Ly / H1 / H2 や部材厚がわずかに違うだけで、
+モデルのトポロジー（柱本数・傾斜区分・バルコニー有無・屋根形状区分）は変わらない
+ことが多い。本モジュールは一度生成したメッシュ（節点座標・要素・固定節点・荷重面）を
+トポロジー署名ごとに保存し、新しい設計では
+
+    1. 各軸の区分線形写像（基礎・床・柱・壁・屋根などの境界座標を対応付け）
+    2. 東面傾斜壁のせん断補正（壁上端のオフセット量の差）
+
+で節点を新しい形状へ移動する。要素の反転・形状品質の劣化・体積の不一致が
+あれば None を返し、呼び出し側は通常どおりメッシュを再生成する。
+
+要素番号・節点番号・面番号は変わらないため、固定節点と *DLOAD 面はそのまま使える。
+
+環境変数:
+    FEM_MESH_MORPHING           1 の場合 run_fem_stages でモーフィングを試みる
+    FEM_MESH_MORPH_CACHE        保持するトポロジー数（デフォルト: 4）
+    FEM_MORPH_MIN_QUALITY_RATIO 元メッシュ最小品質に対する許容比（デフォルト: 0.5）
+    FEM_MORPH_VOLUME_TOL        体積比の許容誤差（デフォルト: 0.01）
+"""
+
+import math
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+
+# 柱の隅部オフセット・バルコニー床厚・手すり高・階段開口（create_realistic_building_model と同じ値）
+CORNER_OFFSET_MM = 100.0
+BALCONY_FLOOR_MM = 150.0
+BALCONY_RAILING_MM = 100.0
+BALCONY_RAILING_HEIGHT_MM = 1100.0
+STAIR_OPENING_WIDTH_MM = 1000.0
+STAIR_OPENING_DEPTH_MM = 2000.0
+
+# 写像で表現できない形状パラメータの許容差（超える場合はモーフィングしない）
+SHAPE_TOLERANCES = {
+    'wall_tilt_angle': 0.5,
+    'window_ratio_2f': 0.02,
+    'roof_morph': 0.02,
+    'roof_shift': 0.02,
+}
+
+# 窓・柱追加の分岐となる傾斜角度 [度]
+_TILT_THRESHOLDS = (10.0, 20.0, 25.0, 30.0, 40.0)
+
+
+def topology_signature(building_info):
+    """
+    メッシュを使い回せるかどうかを判定するトポロジー署名
+
+    柱本数・傾斜区分（内傾斜/鉛直/外傾斜と窓分岐の角度帯）・バルコニー有無・
+    屋根形状区分・大窓分岐、および結合後形状の面数を含む。
+
+    Args:
+        building_info: create_realistic_building_model が返す建物情報
+
+    Returns:
+        tuple: トポロジー署名
+    """
+    tilt = float(building_info.get('wall_tilt_angle', 0.0))
+    if tilt < -0.1:
+        tilt_branch = 'in'
+    elif tilt > 0.1:
+        tilt_branch = 'out'
+    else:
+        tilt_branch = 'vertical'
+    tilt_band = sum(1 for t in _TILT_THRESHOLDS if abs(tilt) >= t)
+    column_count = 7 if abs(tilt) > 25 else 5
+
+    morph = float(building_info.get('roof_morph', 0.5))
+    roof_branch = 0 if morph < 0.33 else (1 if morph < 0.67 else 2)
+    roof_asymmetric = abs(float(building_info.get('roof_shift', 0.0))) > 0.01
+
+    return (
+        column_count,
+        tilt_branch,
+        tilt_band,
+        float(building_info.get('balcony_depth', 0.0)) > 0,
+        roof_branch,
+        roof_asymmetric,
+        float(building_info.get('window_ratio_2f', 0.4)) > 0.7,
+        int(building_info.get('faces', 0)),
+    )
+
+
+def _roof_curve_height(roof_width, roof_morph):
+    """create_parametric_barrel_roof と同じ屋根の立ち上がり高さ"""
+    if roof_morph < 0.33:
+        return roof_width * roof_morph * 0.9
+    if roof_morph < 0.67:
+        return roof_width * 0.3
+    return roof_width * (0.3 + (roof_morph - 0.67) * 1.2)
+
+
+def building_geometry(building_info):
+    """
+    building_info から部材境界の座標を計算（create_realistic_building_model と同じ式）
+
+    Returns:
+        dict: 写像の基準点と傾斜壁のせん断量
+    """
+    Lx = float(building_info['Lx_mm'])
+    Ly = float(building_info['Ly_mm'])
+    H1 = float(building_info['H1_mm'])
+    H2 = float(building_info['H2_mm'])
+    tf1 = float(building_info.get('tf_mm_floor1', building_info.get('tf_mm', 150)))
+    tf2 = float(building_info.get('tf_mm_floor2', building_info.get('tf_mm', 150)))
+    tr = float(building_info.get('tr_mm', 150))
+    tw = float(building_info.get('tw_ext_mm', 150))
+    col_w = float(building_info.get('bc_mm', 400)) * 1.2
+    col_d = float(building_info.get('hc_mm', 400)) * 1.2
+    balcony = float(building_info.get('balcony_depth', 0.0)) * 1000
+    tilt = float(building_info.get('wall_tilt_angle', 0.0))
+    total = H1 + H2
+
+    offset_top = H2 * math.tan(math.radians(tilt))
+    column_shift = 0.0
+    east_margin = 0.0
+    if tilt < 0:
+        column_shift = abs(offset_top) + tw + (100 if tilt < -30 else 0)
+    elif tilt > 0:
+        east_margin = 50.0
+    east_x = Lx - CORNER_OFFSET_MM - col_w - column_shift - east_margin
+    center_x = Lx * 0.5 - col_w * 0.5 - column_shift * 0.5
+    roof_width = Lx + offset_top if tilt < -0.1 else Lx
+    roof_top = total + _roof_curve_height(roof_width, float(building_info.get('roof_morph', 0.5)))
+    stair_y_end = Ly * 0.15 + int(H1 // 200) * 300
+
+    x = {
+        'west_wall': -tw, 'origin': 0.0,
+        'west_col': CORNER_OFFSET_MM, 'west_col_end': CORNER_OFFSET_MM + col_w,
+        'stair': Lx * 0.15, 'stair_end': Lx * 0.15 + STAIR_OPENING_WIDTH_MM,
+        'center_col': center_x, 'center_col_end': center_x + col_w,
+        'east_col': east_x, 'east_col_end': east_x + col_w,
+        'east': Lx, 'east_wall': Lx + tw,
+    }
+    y = {
+        'south_wall': -tw, 'origin': 0.0,
+        'south_col': CORNER_OFFSET_MM, 'south_col_end': CORNER_OFFSET_MM + col_d,
+        'center_col': Ly * 0.5 - col_d * 0.5, 'center_col_end': Ly * 0.5 + col_d * 0.5,
+        'stair_open': stair_y_end - STAIR_OPENING_DEPTH_MM, 'stair_open_end': stair_y_end,
+        'north_col': Ly - CORNER_OFFSET_MM - col_d, 'north_col_end': Ly - CORNER_OFFSET_MM,
+        'north': Ly, 'north_wall': Ly + tw,
+    }
+    z = {
+        'foundation': -400.0, 'ground': 0.0, 'floor1_top': tf1,
+        'floor2': H1, 'floor2_top': H1 + tf2, 'wall_base': H1 + tf1,
+        'eaves': total, 'eaves_top': total + tr, 'roof_top': roof_top,
+    }
+    if balcony > 0:
+        x['balcony'] = -balcony
+        x['balcony_railing'] = -balcony + BALCONY_RAILING_MM
+        y['balcony'] = Ly * 0.1
+        y['balcony_railing'] = Ly * 0.1 + BALCONY_RAILING_MM
+        y['balcony_end_railing'] = Ly * 0.9 - BALCONY_RAILING_MM
+        y['balcony_end'] = Ly * 0.9
+        z['balcony_top'] = H1 + BALCONY_FLOOR_MM
+        z['railing_top'] = H1 + BALCONY_FLOOR_MM + BALCONY_RAILING_HEIGHT_MM
+
+    return {
+        'x': x, 'y': y, 'z': z,
+        # 東面傾斜壁: 壁下端 wall_base から上端 eaves までで offset_top だけ x がずれる
+        'shear_offset': offset_top if abs(tilt) > 0.1 else 0.0,
+        'shear_start_x': center_x + col_w,
+        'shear_end_x': Lx,
+    }
+
+
+def _axis_map(old_points, new_points, min_gap=1.0):
+    """
+    旧座標 → 新座標の区分線形写像の節点列を作成
+
+    旧座標でほぼ重なる基準点は1つにまとめる。新座標で順序が入れ替わる場合は
+    写像が折り返すため None を返す。
+
+    Returns:
+        tuple or None: (旧座標の基準点, 新座標の基準点)
+    """
+    labels = sorted(set(old_points) & set(new_points), key=lambda k: old_points[k])
+    xp, fp = [], []
+    for label in labels:
+        if xp and old_points[label] - xp[-1] < min_gap:
+            continue
+        xp.append(old_points[label])
+        fp.append(new_points[label])
+    xp = np.asarray(xp, dtype=np.float64)
+    fp = np.asarray(fp, dtype=np.float64)
+    if len(xp) < 2 or np.any(np.diff(fp) < min_gap):
+        return None
+    return xp, fp
+
+
+def _apply_axis_map(values, axis_map):
+    """区分線形写像を適用（範囲外は端点の移動量で平行移動）"""
+    xp, fp = axis_map
+    mapped = np.interp(values, xp, fp)
+    below = values < xp[0]
+    above = values > xp[-1]
+    mapped[below] = values[below] + (fp[0] - xp[0])
+    mapped[above] = values[above] + (fp[-1] - xp[-1])
+    return mapped
+
+
+def _shear_amount(z, geometry):
+    """高さ z での東面傾斜壁の x 方向のずれ量（壁下端 0 → 上端 offset_top）"""
+    z_base, z_top = geometry['z']['wall_base'], geometry['z']['eaves']
+    return geometry['shear_offset'] * np.clip((z - z_base) / max(z_top - z_base, 1.0), 0.0, 1.0)
+
+
+def _apply_shear(u, z, geometry):
+    """
+    傾斜のない座標 u に傾斜壁のずれを加える
+
+    ずれは中央柱の東端（shear_start_x）で 0、東面（shear_end_x）以東で全量となるよう線形に変化させる。
+    """
+    x0, x1 = geometry['shear_start_x'], geometry['shear_end_x']
+    weight = np.clip((u - x0) / max(x1 - x0, 1.0), 0.0, 1.0)
+    return u + _shear_amount(z, geometry) * weight
+
+
+def _remove_shear(x, z, geometry):
+    """_apply_shear の逆変換（各高さで区分線形なので厳密に戻せる）"""
+    x0, x1 = geometry['shear_start_x'], geometry['shear_end_x']
+    k = _shear_amount(z, geometry)
+    span = max(x1 - x0, 1.0)
+    return np.where(x <= x0, x,
+                    np.where(x >= x0 + span + k, x - k, x0 + (x - x0) * span / np.maximum(span + k, 1.0)))
+
+
+def morph_coordinates(coords, old_info, new_info):
+    """
+    旧設計のメッシュ節点を新設計の形状へ写像
+
+    Args:
+        coords: 節点座標 (n, 3) [mm]
+        old_info: メッシュを生成した設計の building_info
+        new_info: 新しい設計の building_info
+
+    Returns:
+        np.ndarray or None: 新しい節点座標、写像が作れない場合は None
+    """
+    old_geom = building_geometry(old_info)
+    new_geom = building_geometry(new_info)
+    maps = {}
+    for axis in ('x', 'y', 'z'):
+        maps[axis] = _axis_map(old_geom[axis], new_geom[axis])
+        if maps[axis] is None:
+            return None
+
+    x, y, z = coords[:, 0], coords[:, 1], coords[:, 2]
+    # 旧形状のせん断を外してから各軸を写像し、新形状のせん断を加える
+    new_x = _apply_axis_map(_remove_shear(x, z, old_geom), maps['x'])
+    new_z = _apply_axis_map(z, maps['z'])
+    new_x = _apply_shear(new_x, new_z, new_geom)
+    new_y = _apply_axis_map(y, maps['y'])
+    return np.column_stack((new_x, new_y, new_z))
+
+
+def tet_quality(coords, connectivity, node_index):
+    """
+    四面体要素の符号付き体積と形状品質を計算（頂点4節点のみ使用）
+
+    品質は 6√2·|V| / l_rms³（正四面体で 1、つぶれた要素で 0 に近づく）。
+
+    Args:
+        coords: 節点座標 (n, 3)
+        connectivity: 要素の節点番号 (m, k)、先頭4列が頂点
+        node_index: 節点番号 → coords の行番号の配列
+
+    Returns:
+        tuple: (符号付き体積 (m,), 品質 (m,))
+    """
+    p = coords[node_index[connectivity[:, :4]]]
+    a, b, c, d = p[:, 0], p[:, 1], p[:, 2], p[:, 3]
+    volume = np.einsum('ij,ij->i', b - a, np.cross(c - a, d - a)) / 6.0
+    edges = (b - a, c - a, d - a, c - b, d - b, d - c)
+    l_rms = np.sqrt(sum(np.einsum('ij,ij->i', e, e) for e in edges) / 6.0)
+    quality = 6.0 * math.sqrt(2.0) * np.abs(volume) / np.maximum(l_rms, 1e-12) ** 3
+    return volume, quality
+
+
+class MorphSource:
+    """モーフィングの元になる1設計分のメッシュと荷重面"""
+
+    def __init__(self, building_info, mesh_arrays, fixed_nodes, component_faces):
+        """
+        Args:
+            building_info: メッシュを生成した設計の建物情報（寸法と体積のみ保持）
+            mesh_arrays: read_abaqus_mesh が返すメッシュ配列
+            fixed_nodes: 固定節点番号の配列
+            component_faces: 荷重成分名 → (要素番号, 面番号) 配列
+        """
+        keep = ('Lx_mm', 'Ly_mm', 'H1_mm', 'H2_mm', 'tf_mm', 'tf_mm_floor1', 'tf_mm_floor2',
+                'tr_mm', 'bc_mm', 'hc_mm', 'tw_ext_mm', 'balcony_depth', 'volume', 'faces') + \
+            tuple(SHAPE_TOLERANCES)
+        self.building_info = {k: building_info[k] for k in keep if k in building_info}
+        self.mesh_arrays = mesh_arrays
+        self.fixed_nodes = np.asarray(fixed_nodes, dtype=np.int64)
+        self.component_faces = component_faces
+
+        node_ids = mesh_arrays['node_ids']
+        self.node_index = np.zeros(int(node_ids.max()) + 1, dtype=np.int64)
+        self.node_index[node_ids] = np.arange(len(node_ids))
+        volume, quality = tet_quality(mesh_arrays['coords'], mesh_arrays['connectivity'], self.node_index)
+        self.volume_sign = np.sign(volume)
+        self.min_quality = float(quality.min())
+        self.mesh_volume = float(np.abs(volume).sum())
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.mesh_arrays.values() if isinstance(a, np.ndarray))
+
+    def morph(self, building_info, min_quality_ratio=None, volume_tol=None):
+        """
+        保存したメッシュを新しい設計へ写像し、品質を検査
+
+        Args:
+            building_info: 新しい設計の建物情報
+            min_quality_ratio: 元メッシュ最小品質に対する許容比
+            volume_tol: 体積比（メッシュ / CAD形状）の許容誤差
+
+        Returns:
+            tuple: (メッシュ配列 or None, 不採用の理由 or '')
+        """
+        if min_quality_ratio is None:
+            min_quality_ratio = float(os.environ.get('FEM_MORPH_MIN_QUALITY_RATIO', '0.5') or 0.5)
+        if volume_tol is None:
+            volume_tol = float(os.environ.get('FEM_MORPH_VOLUME_TOL', '0.01') or 0.01)
+
+        for key, tol in SHAPE_TOLERANCES.items():
+            diff = abs(float(building_info.get(key, 0.0)) - float(self.building_info.get(key, 0.0)))
+            if diff > tol:
+                return None, f"{key} の差 {diff:.3f} が許容値 {tol} を超えています"
+
+        coords = morph_coordinates(self.mesh_arrays['coords'], self.building_info, building_info)
+        if coords is None:
+            return None, "部材境界の順序が変わるため写像できません"
+
+        volume, quality = tet_quality(coords, self.mesh_arrays['connectivity'], self.node_index)
+        inverted = int(np.count_nonzero(np.sign(volume) != self.volume_sign))
+        if inverted:
+            return None, f"反転要素 {inverted} 個"
+        min_quality = float(quality.min())
+        if min_quality < min_quality_ratio * self.min_quality:
+            return None, f"最小要素品質 {min_quality:.3f} < {min_quality_ratio} × {self.min_quality:.3f}"
+
+        # 離散化誤差を打ち消すため、メッシュ体積とCAD体積の「比の変化」で比較
+        cad_old = float(self.building_info.get('volume') or 0.0)
+        cad_new = float(building_info.get('volume') or 0.0)
+        if cad_old > 0 and cad_new > 0:
+            volume_error = abs((np.abs(volume).sum() / self.mesh_volume) / (cad_new / cad_old) - 1.0)
+            if volume_error > volume_tol:
+                return None, f"体積誤差 {volume_error * 100:.2f}% が許容値を超えています"
+
+        mesh_arrays = dict(self.mesh_arrays)
+        mesh_arrays['coords'] = coords
+        return mesh_arrays, ''
+
+
+class MeshMorphCache:
+    """トポロジー署名 → MorphSource の LRU キャッシュ"""
+
+    def __init__(self, max_entries=None):
+        if max_entries is None:
+            max_entries = int(os.environ.get('FEM_MESH_MORPH_CACHE', '4') or 4)
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.rejections = 0
+
+    def get(self, signature):
+        source = self._entries.get(signature)
+        if source is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(signature)
+        self.hits += 1
+        return source
+
+    def put(self, signature, source):
+        self._entries[signature] = source
+        self._entries.move_to_end(signature)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = None
+
+
+def get_mesh_morph_cache():
+    """プロセス共通のメッシュモーフィング用キャッシュを取得"""
+    global _cache
+    if _cache is None:
+        _cache = MeshMorphCache()
+    return _cache
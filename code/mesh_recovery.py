@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mesh_recovery.py
+================
+メッシュ生成に失敗したときの回復ラダーの設定と統計
+
+run_mesh_generation は最初の試行に失敗すると、以下の段階を順に試す（各段階の変更は
+次の段階にも引き継ぐ）。成功した時点で打ち切り、合計時間が予算を超えたら残りは省略する。
+
+    1. heal_fuzzy_fuse       : fuzzy fuse とヒーリングで形状を修復（体積が変わる場合は不採用）
+    2. alternative_algorithm : 別の3Dアルゴリズム（Delaunay ↔ HXT）
+    3. relaxed_size          : 要素寸法の上下限を緩める（最大 ×1.5、最小 ×0.5）
+    4. remove_small_faces    : 微小面を除去した形状で再試行
+
+段階ごとの試行回数・成功回数・所要時間は MeshRecoveryStats に集計する。
+
+環境変数:
+    FEM_MESH_RECOVERY          0 で回復ラダーを無効化（デフォルト: 1）
+    FEM_MESH_RECOVERY_BUDGET   回復ラダー全体の時間上限 [秒]（デフォルト: 120）
+    FEM_HEAL_FUZZY_VALUE       fuzzy fuse とヒーリングの許容差 [mm]（デフォルト: 1.0）。
+                               evaluate_building の形状検証前の修復（FEM_SHAPE_HEALING）でも使用
+    FEM_SMALL_FACE_AREA        微小面とみなす面積 [mm²]（デフォルト: 100）
+"""
+
+import os
+
+
+RECOVERY_STEPS = ('heal_fuzzy_fuse', 'alternative_algorithm', 'relaxed_size', 'remove_small_faces')
+
+RELAXED_MAX_FACTOR = 1.5
+RELAXED_MIN_FACTOR = 0.5
+
+# 修復で許容する体積の変化率（これを超えると設計が変わったとみなして不採用）
+HEAL_VOLUME_TOLERANCE = 0.001
+
+_DELAUNAY = 1
+_HXT = 10
+
+
+def recovery_enabled():
+    return os.environ.get('FEM_MESH_RECOVERY', '1') != '0'
+
+
+def recovery_budget():
+    return float(os.environ.get('FEM_MESH_RECOVERY_BUDGET', '120'))
+
+
+def heal_fuzzy_value():
+    return float(os.environ.get('FEM_HEAL_FUZZY_VALUE', '1.0'))
+
+
+def small_face_area():
+    return float(os.environ.get('FEM_SMALL_FACE_AREA', '100'))
+
+
+def alternative_settings(settings):
+    """
+    失敗した設定と別の3Dアルゴリズムの設定を返す
+
+    Delaunay で失敗した場合は HXT、それ以外で失敗した場合は Delaunay に切り替え、
+    最適化は最も強い設定（Netgen 最適化 + 平滑化10回）にする。
+    """
+    algorithm = _HXT if int(settings['algorithm3d']) == _DELAUNAY else _DELAUNAY
+    return {'algorithm3d': algorithm, 'optimize': 1, 'optimize_netgen': 1, 'smoothing': 10}
+
+
+class MeshRecoveryStats:
+    """回復ラダーの段階ごとの試行回数・成功回数・所要時間（プロセス内で集計）"""
+
+    def __init__(self):
+        self.initial_attempts = 0
+        self.initial_failures = 0
+        self.attempts = {step: 0 for step in RECOVERY_STEPS}
+        self.successes = {step: 0 for step in RECOVERY_STEPS}
+        self.seconds = {step: 0.0 for step in RECOVERY_STEPS}
+        self.skipped_by_budget = 0
+        self.unrecovered = 0
+
+    def record_initial(self, success):
+        self.initial_attempts += 1
+        if not success:
+            self.initial_failures += 1
+
+    def record(self, step, success, elapsed):
+        self.attempts[step] += 1
+        self.seconds[step] += elapsed
+        if success:
+            self.successes[step] += 1
+
+    @property
+    def recovered(self):
+        return sum(self.successes.values())
+
+    def summary(self):
+        """集計結果を辞書で返す"""
+        return {
+            'initial_attempts': self.initial_attempts,
+            'initial_failures': self.initial_failures,
+            'recovered': self.recovered,
+            'unrecovered': self.unrecovered,
+            'skipped_by_budget': self.skipped_by_budget,
+            'steps': {
+                step: {
+                    'attempts': self.attempts[step],
+                    'successes': self.successes[step],
+                    'total_seconds': round(self.seconds[step], 2),
+                    'mean_seconds': round(self.seconds[step] / self.attempts[step], 2) if self.attempts[step] else 0.0,
+                }
+                for step in RECOVERY_STEPS
+            },
+        }
+
+    def merge(self, summary):
+        """別プロセス（並列評価のワーカー）の summary() を加算"""
+        self.initial_attempts += summary.get('initial_attempts', 0)
+        self.initial_failures += summary.get('initial_failures', 0)
+        self.unrecovered += summary.get('unrecovered', 0)
+        self.skipped_by_budget += summary.get('skipped_by_budget', 0)
+        for step, values in summary.get('steps', {}).items():
+            if step in self.attempts:
+                self.attempts[step] += values.get('attempts', 0)
+                self.successes[step] += values.get('successes', 0)
+                self.seconds[step] += values.get('total_seconds', 0.0)
+
+    def print_summary(self):
+        print(f"メッシュ回復: 初回失敗 {self.initial_failures}/{self.initial_attempts} 件, "
+              f"回復 {self.recovered} 件, 未回復 {self.unrecovered} 件")
+        for step in RECOVERY_STEPS:
+            if self.attempts[step]:
+                print(f"  {step:<22s}: 成功 {self.successes[step]}/{self.attempts[step]} / "
+                      f"平均 {self.seconds[step] / self.attempts[step]:.1f} 秒")
+
+
+_stats = None
+
+
+def get_mesh_recovery_stats():
+    """プロセス内で共有する MeshRecoveryStats を返す"""
+    global _stats
+    if _stats is None:
+        _stats = MeshRecoveryStats()
+    return _stats
+
+
+def take_mesh_recovery_stats():
+    """プロセス内の集計結果（summary()）を返して集計をやり直す（並列評価のワーカーが評価ごとに親へ送る）"""
+    global _stats
+    summary = get_mesh_recovery_stats().summary()
+    _stats = MeshRecoveryStats()
+    return summary
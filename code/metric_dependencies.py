@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+metric_dependencies.py
+======================
+目的関数が使う評価指標と、それに必要な解析段階の対応
+
+目的関数 calculate_fitness(cost, safety, co2, comfort, constructability) が実際に使う指標を
+宣言（@uses_metrics）または関数本体から推定し、evaluate_building で必要な段階だけを実行する。
+
+    指標              必要な段階
+    cost              geometry（建物モデルの体積・寸法）
+    co2               geometry
+    safety            fem（最大応力・最大変位）
+    comfort           fem（最大変位による構造的安心感）
+    constructability  fem（応力集中による減点）
+
+コストのみ・CO2のみの目的関数ではメッシュ生成と CalculiX の実行を行わない。
+
+使用例:
+    from metric_dependencies import uses_metrics
+
+    @uses_metrics('cost', 'co2')
+    def calculate_fitness(cost, safety, co2, comfort, constructability):
+        return cost + 100.0 * co2
+"""
+
+import ast
+import inspect
+import textwrap
+
+
+METRIC_NAMES = ('cost', 'safety', 'co2', 'comfort', 'constructability')
+
+METRIC_STAGES = {
+    'cost': 'geometry',
+    'co2': 'geometry',
+    'safety': 'fem',
+    'comfort': 'fem',
+    'constructability': 'fem',
+}
+
+
+def uses_metrics(*metrics):
+    """
+    目的関数が使う評価指標を宣言するデコレータ
+
+    Args:
+        *metrics: METRIC_NAMES のうち目的関数が使う指標
+    """
+    unknown = [m for m in metrics if m not in METRIC_NAMES]
+    if unknown:
+        raise ValueError(f"不明な評価指標です: {unknown}（指定可能: {METRIC_NAMES}）")
+
+    def decorator(fn):
+        fn.metrics = tuple(m for m in METRIC_NAMES if m in metrics)
+        return fn
+    return decorator
+
+
+def infer_metrics(fitness_fn):
+    """
+    目的関数の本体で参照している引数から使う評価指標を推定
+
+    引数は (cost, safety, co2, comfort, constructability) の順に対応付ける。
+    ソースを取得できない関数や、引数をまとめて扱う関数（*args, locals() など）はすべての指標を使うとみなす。
+
+    Returns:
+        tuple: 使う評価指標（METRIC_NAMES の順）
+    """
+    try:
+        source = textwrap.dedent(inspect.getsource(fitness_fn))
+        tree = ast.parse(source)
+        params = list(inspect.signature(fitness_fn).parameters.values())
+    except (OSError, TypeError, SyntaxError, ValueError):
+        return METRIC_NAMES
+
+    func = next((node for node in ast.walk(tree)
+                 if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda))), None)
+    if func is None or any(p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD) for p in params):
+        return METRIC_NAMES
+
+    param_to_metric = {p.name: metric for p, metric in zip(params, METRIC_NAMES)}
+    body = func.body if isinstance(func.body, list) else [func.body]
+    used = set()
+    for statement in body:
+        for node in ast.walk(statement):
+            if isinstance(node, ast.Name) and node.id in param_to_metric:
+                used.add(param_to_metric[node.id])
+            elif isinstance(node, ast.Call) and getattr(node.func, 'id', None) in ('locals', 'vars', 'eval', 'exec'):
+                return METRIC_NAMES
+    return tuple(m for m in METRIC_NAMES if m in used)
+
+
+def required_metrics(fitness_fn):
+    """目的関数が使う評価指標（@uses_metrics の宣言を優先し、なければ推定）"""
+    declared = getattr(fitness_fn, 'metrics', None)
+    if declared is not None:
+        return tuple(declared)
+    return infer_metrics(fitness_fn)
+
+
+def required_stages(metrics):
+    """
+    評価指標の計算に必要な解析段階
+
+    Args:
+        metrics: 評価指標のリスト（Noneの場合はすべて）
+
+    Returns:
+        set: {'geometry'} または {'geometry', 'fem'}
+    """
+    if metrics is None:
+        metrics = METRIC_NAMES
+    return {'geometry'} | {METRIC_STAGES[m] for m in metrics}
+
+
+def needs_fem(metrics):
+    """評価指標の計算に FEM 解析（メッシュ生成・CalculiX）が必要かどうか"""
+    return 'fem' in required_stages(metrics)
@@ -413,8 +413,8 @@ class PSOMonitor:
                     ]
                     for param, description in material_params:
                         value = int(latest_gbest[param])
-                        material = "木材" if value == 1 else "コンクリート"
-                        material_class = "material-wood" if value == 1 else "material-concrete"
+                        material = {1: "木材", 2: "高級木材（CLT）"}.get(value, "コンクリート")
+                        material_class = "material-wood" if value >= 1 else "material-concrete"
                         html += f'<tr><td class="variable-name">{description}</td><td class="{material_class}">{material}</td></tr>'
                     html += '</table></div></div>'
                     
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+parallel_evaluator.py
+=====================
+複数のワーカープロセスで建物評価を並列実行する評価器
+
+各ワーカーはこのファイルを FEM_PARALLEL_WORKER=1 で起動した常駐プロセスで、
+FEM_WORKER_ID / FEM_NUM_WORKERS により cpu_budget から重ならないコアを割り当てる。
+評価の依頼と結果は標準入出力の JSON 行でやり取りする（評価中のログは標準エラーへ流す）。
+ワーカー内で集計したメッシュ回復・形状修復の統計は評価ごとに結果と一緒に送り、親プロセスの統計に加算する。
+
+評価は EvaluationTimeModel の予測時間が長い順（LPT）に空いたワーカーへ渡すため、
+反復の最後に長い評価が1つだけ残る状況を避けられる。実測時間はモデルに記録して
+オンラインで学習し、反復ごとの所要時間の見込み（ETA）も表示する。
+
+FEM_PIPELINE=1 の場合、各ワーカーには最大 FEM_PIPELINE_DEPTH 件の評価を先に渡し、ワーカーは
+fem_pipeline.PipelinedEvaluator で ccx の実行待ちの間に次の設計のモデル生成・メッシュ生成を進める。
+結果は終わった順に評価の番号付きで返る。評価スレッドには SIGALRM が届かないため、タイムアウトは
+ワーカーの監視スレッドが判定し、処理中の評価をすべて失敗として返してからワーカーを終了する（親が起動し直す）。
+
+環境変数:
+    FEM_WORKER_PYTHON   ワーカーの起動に使う Python（デフォルト: sys.executable）
+    FEM_PIPELINE        1 の場合ワーカー内でパイプライン評価を行う
+    FEM_PIPELINE_DEPTH  パイプライン評価で1ワーカーが同時に処理する設計数（デフォルト: 2）
+"""
+
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+from evaluation_time_model import lpt_makespan
+
+# ワーカーに渡すときに絶対パスに直す環境変数（参照テーブル・補正係数・推定器のファイル）
+PATH_ENV_VARS = ('FEM_GMSH_TUNING', 'FEM_FRAME_CALIBRATION', 'FEM_SAFETY_ESTIMATOR')
+
+# 評価時間の学習に使う失敗の段階（メッシュ生成以降まで実行した評価）
+TIMED_FAILED_STAGES = ('mesh', 'ccx', 'extract')
+
+
+def _json_default(value):
+    """numpy の値など JSON にそのまま書けない値の変換"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+def _is_timed_run(result):
+    """
+    評価時間の学習に使う評価か（FEM解析まで実行した評価のみ）
+
+    枝刈り・形状の評価のみ・近傍設計の再利用はFEM解析を含まず、ワーカーの異常・タイムアウト・
+    通信の失敗は評価時間ではない時間で終わるため、評価を長い順に並べる予測と ETA を歪める。
+    """
+    if 'reuse_distance' in result or result.get('skipped_metrics'):
+        return False
+    if result.get('status') == 'Success':
+        return True
+    return result.get('failed_stage') in TIMED_FAILED_STAGES
+
+
+def _failed_result(message, stage='error'):
+    return {'status': 'Failed', 'message': message, 'failed_stage': stage}
+
+
+class ParallelEvaluator:
+    """常駐ワーカープロセスに評価を長い順に割り当てる並列評価器"""
+
+    def __init__(self, num_workers, time_model=None, timeout=None, python=None, metrics=None):
+        """
+        Args:
+            num_workers: ワーカープロセス数
+            time_model: EvaluationTimeModel（Noneの場合は投入順のまま実行）
+            timeout: 1評価あたりのタイムアウト秒数（ワーカー側で SIGALRM により中断）
+            python: ワーカーの起動に使う Python（Noneの場合は FEM_WORKER_PYTHON / sys.executable）
+            metrics: 計算する評価指標（evaluate_building の metrics。Noneの場合はすべて）
+        """
+        self.num_workers = max(1, int(num_workers))
+        self.time_model = time_model
+        self.timeout = timeout
+        self.metrics = list(metrics) if metrics is not None else None
+        self.python = python or os.environ.get('FEM_WORKER_PYTHON', '') or sys.executable
+        self.pipeline_depth = pipeline_depth()
+        self._workers = [None] * self.num_workers
+        self._record_lock = threading.Lock()
+        # パイプライン評価の統計（ワーカーごとの最新の累計と、終了したワーカーの合計）
+        self._pipeline_stats = [None] * self.num_workers
+        self._pipeline_finished = {}
+        self.last_eta = None
+        self.last_makespan = None
+
+    def _start_worker(self, worker_id):
+        env = os.environ.copy()
+        env['FEM_PARALLEL_WORKER'] = '1'
+        env['FEM_NUM_WORKERS'] = str(self.num_workers)
+        env['FEM_WORKER_ID'] = str(worker_id)
+        # ワーカーは current_dir で起動するため、相対パスで指定したテーブルは起動時の作業ディレクトリ基準に直す
+        for key in PATH_ENV_VARS:
+            if env.get(key) and env[key].lower() != 'off':
+                env[key] = os.path.abspath(env[key])
+        self._workers[worker_id] = subprocess.Popen(
+            [self.python, os.path.abspath(__file__)],
+            cwd=current_dir, env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            universal_newlines=True, encoding='utf-8', bufsize=1,
+        )
+        return self._workers[worker_id]
+
+    def _worker(self, worker_id):
+        worker = self._workers[worker_id]
+        if worker is None or worker.poll() is not None:
+            if worker is not None:
+                self._finish_pipeline_stats(worker_id)
+            worker = self._start_worker(worker_id)
+        return worker
+
+    def _finish_pipeline_stats(self, worker_id):
+        """終了したワーカーのパイプライン評価の累計を合計に移す"""
+        with self._record_lock:
+            for key, value in (self._pipeline_stats[worker_id] or {}).items():
+                if key != 'depth':
+                    self._pipeline_finished[key] = self._pipeline_finished.get(key, 0.0) + value
+            self._pipeline_stats[worker_id] = None
+
+    def _record_result(self, index, params, result, elapsed, results):
+        results[index] = result
+        result['evaluation_time'] = elapsed
+        if self.time_model is not None and _is_timed_run(result):
+            with self._record_lock:
+                self.time_model.record(params, elapsed, result.get('status', ''))
+
+    def _run_jobs(self, worker_id, jobs, params_list, results, prune_thresholds):
+        # ワーカーに渡して結果を待っている評価（評価の番号 → 渡した時刻）。
+        # パイプライン評価では pipeline_depth 件まで先に渡す
+        in_flight = {}
+        exiting = False
+        while True:
+            if exiting and not in_flight:
+                self._workers[worker_id].wait()
+                exiting = False
+            # タイムアウトで終了するワーカーには新しい評価を渡さない（残りの結果を読み切る）
+            while not exiting and len(in_flight) < self.pipeline_depth:
+                try:
+                    index = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                in_flight[index] = time.perf_counter()
+                try:
+                    worker = self._worker(worker_id)
+                    job = {'id': index, 'params': params_list[index], 'timeout': self.timeout,
+                           'prune_above': prune_thresholds[index], 'metrics': self.metrics}
+                    worker.stdin.write(json.dumps(job, default=_json_default) + '\n')
+                    worker.stdin.flush()
+                except (OSError, ValueError) as e:
+                    self._record_result(index, params_list[index],
+                                        _failed_result(f"評価ワーカー {worker_id} との通信エラー: {e}", 'worker'),
+                                        time.perf_counter() - in_flight.pop(index), results)
+            if not in_flight:
+                return
+            worker = self._workers[worker_id]
+            try:
+                line = worker.stdout.readline()
+                reply = json.loads(line) if line else None
+            except (OSError, ValueError) as e:
+                worker.kill()
+                line, reply = None, None
+                message = f"評価ワーカー {worker_id} との通信エラー: {e}"
+            if reply is None:
+                # ワーカーが異常終了した場合は結果待ちの評価をすべて失敗とし、次の評価で起動し直す
+                worker.wait()
+                if line is not None:
+                    message = f"評価ワーカー {worker_id} が異常終了しました（終了コード {worker.returncode}）"
+                for index, sent in list(in_flight.items()):
+                    self._record_result(index, params_list[index], _failed_result(message, 'worker'),
+                                        time.perf_counter() - sent, results)
+                in_flight.clear()
+                exiting = False
+                continue
+            index = reply.get('id')
+            if index not in in_flight:
+                continue
+            sent = in_flight.pop(index)
+            with self._record_lock:
+                _merge_worker_stats(reply.get('stats', {}))
+                if reply.get('pipeline'):
+                    self._pipeline_stats[worker_id] = reply['pipeline']
+            # パイプライン評価では他の設計と重なった待ち時間を含めないよう、ワーカーが測った評価時間を使う
+            elapsed = reply.get('seconds') if self.pipeline_depth > 1 else None
+            self._record_result(index, params_list[index], reply['result'],
+                                elapsed if elapsed is not None else time.perf_counter() - sent, results)
+            if reply.get('exiting'):
+                # タイムアウトでワーカーが終了する（結果待ちの評価の結果は続けて届く）
+                exiting = True
+
+    def evaluate(self, params_list, prune_thresholds=None):
+        """
+        設計パラメータのリストを並列評価
+
+        Args:
+            params_list: 設計パラメータ辞書のリスト
+            prune_thresholds: 設計ごとの枝刈りの閾値（None の要素は枝刈りしない）。
+                              ワーカーは pso_config.calculate_fitness_lower_bound で下限を求める
+
+        Returns:
+            list: evaluate_building_from_params と同じ形式の結果辞書のリスト（params_list と同じ順序）
+        """
+        params_list = list(params_list)
+        prune_thresholds = list(prune_thresholds or [None] * len(params_list))
+        if self.time_model is not None:
+            order, predicted = self.time_model.schedule(params_list)
+            self.last_eta = lpt_makespan(predicted, self.num_workers)
+            print(f"⏱️ 並列評価 {len(params_list)} 件 / ワーカー {self.num_workers}: "
+                  f"見込み {self.last_eta:.0f} 秒（長い順に割り当て）")
+        else:
+            order = list(range(len(params_list)))
+
+        jobs = queue.Queue()
+        for index in order:
+            jobs.put(index)
+        results = [None] * len(params_list)
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._run_jobs, args=(worker_id, jobs, params_list, results, prune_thresholds),
+                                    name=f"fem-worker-{worker_id}", daemon=True)
+                   for worker_id in range(self.num_workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.last_makespan = time.perf_counter() - start
+        if self.last_eta is not None:
+            print(f"⏱️ 並列評価完了: {self.last_makespan:.0f} 秒（見込み {self.last_eta:.0f} 秒）")
+        return [r if r is not None else _failed_result("評価されませんでした") for r in results]
+
+    def pipeline_summary(self):
+        """
+        パイプライン評価の累計（全ワーカーの合計。パイプライン評価でない場合は None）
+
+        Returns:
+            dict: fem_pipeline.PipelinedEvaluator.summary の合計（overlap_seconds が ccx の実行待ちに重ねられた時間）
+        """
+        if self.pipeline_depth <= 1:
+            return None
+        with self._record_lock:
+            total = dict(self._pipeline_finished)
+            for stats in self._pipeline_stats:
+                for key, value in (stats or {}).items():
+                    if key != 'depth':
+                        total[key] = total.get(key, 0.0) + value
+        total['depth'] = self.pipeline_depth
+        return total
+
+    def close(self):
+        """ワーカープロセスを終了"""
+        for worker in self._workers:
+            if worker is None or worker.poll() is not None:
+                continue
+            try:
+                worker.stdin.close()
+                worker.wait(timeout=30)
+            except (OSError, subprocess.TimeoutExpired):
+                worker.kill()
+        self._workers = [None] * self.num_workers
+
+
+def pipeline_depth():
+    """ワーカー内で同時に処理する設計数（FEM_PIPELINE=1 の場合は FEM_PIPELINE_DEPTH、それ以外は 1）"""
+    if os.environ.get('FEM_PIPELINE', '') != '1':
+        return 1
+    return max(1, int(os.environ.get('FEM_PIPELINE_DEPTH', '2')))
+
+
+def _merge_worker_stats(stats):
+    """ワーカーから届いたメッシュ回復・形状修復の統計を親プロセスの統計に加算"""
+    try:
+        if stats.get('mesh_recovery'):
+            from mesh_recovery import get_mesh_recovery_stats
+            get_mesh_recovery_stats().merge(stats['mesh_recovery'])
+        if stats.get('shape_healing'):
+            from shape_healing import get_shape_healing_stats
+            get_shape_healing_stats().merge(stats['shape_healing'])
+    except ImportError:
+        pass
+
+
+def _take_worker_stats():
+    """ワーカー内で集計したメッシュ回復・形状修復の統計（送った分は集計し直す）"""
+    stats = {}
+    try:
+        from mesh_recovery import take_mesh_recovery_stats
+        stats['mesh_recovery'] = take_mesh_recovery_stats()
+        from shape_healing import take_shape_healing_stats
+        stats['shape_healing'] = take_shape_healing_stats()
+    except ImportError:
+        pass
+    return stats
+
+
+def _timeout_handler(signum, frame):
+    raise TimeoutError("evaluation timeout")
+
+
+def _evaluate_job(job):
+    """評価依頼を評価して結果辞書を返す（例外は失敗の結果にする）"""
+    from generate_building_fem_analyze import evaluate_building_from_params
+    eval_kwargs = {'metrics': job.get('metrics')}
+    if job.get('prune_above') is not None:
+        from pso_config import calculate_fitness_lower_bound
+        eval_kwargs.update({'prune_above': job['prune_above'], 'lower_bound_fn': calculate_fitness_lower_bound})
+    try:
+        return evaluate_building_from_params(job['params'], save_fcstd=False, **eval_kwargs)
+    except TimeoutError:
+        raise
+    except Exception as e:
+        return _failed_result(f"評価中のエラー: {e}")
+
+
+def _close_documents():
+    try:
+        import FreeCAD as App
+        for doc in list(App.listDocuments().values()):
+            App.closeDocument(doc.Name)
+    except Exception:
+        pass
+
+
+def _reply(protocol, job, result, seconds, **extra):
+    message = {'id': job.get('id'), 'result': result, 'seconds': seconds, 'stats': _take_worker_stats()}
+    message.update(extra)
+    protocol.write(json.dumps(message, default=_json_default) + '\n')
+    protocol.flush()
+
+
+def _serve_sequential(protocol):
+    """評価依頼を1件ずつ処理（SIGALRM でタイムアウト）"""
+    has_alarm = hasattr(signal, 'SIGALRM')
+    if has_alarm:
+        signal.signal(signal.SIGALRM, _timeout_handler)
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        timeout = job.get('timeout')
+        start = time.perf_counter()
+        try:
+            if has_alarm and timeout:
+                signal.alarm(int(timeout))
+            result = _evaluate_job(job)
+        except TimeoutError:
+            result = _failed_result("evaluation timeout", 'timeout')
+        finally:
+            if has_alarm:
+                signal.alarm(0)
+            _close_documents()
+        _reply(protocol, job, result, time.perf_counter() - start)
+
+
+def _serve_pipelined(protocol, depth):
+    """
+    評価依頼を先読みしてパイプライン評価し、終わった順に結果を返す
+
+    評価スレッドは SIGALRM で中断できないため、監視スレッドが実行中の評価の経過時間を確認し、
+    タイムアウトした場合は処理中の評価をすべて失敗として返してからプロセスを終了する。
+    """
+    from fem_pipeline import PipelinedEvaluator
+    pipeline = PipelinedEvaluator(_evaluate_job, depth)
+    write_lock = threading.Lock()
+    pending = {}   # 評価の番号 → 評価依頼（結果を返していないもの）
+    exiting = threading.Event()
+
+    def on_done(job, result, seconds):
+        with write_lock:
+            if exiting.is_set():
+                return
+            pending.pop(job['id'], None)
+            _reply(protocol, job, result, seconds, pipeline=pipeline.summary())
+
+    def watchdog():
+        while not exiting.wait(1.0):
+            with write_lock:
+                overdue = [token for token, seconds in pipeline.running().items()
+                           if token in pending and pending[token].get('timeout')
+                           and seconds > pending[token]['timeout']]
+                if not overdue:
+                    continue
+                exiting.set()
+                for token, job in pending.items():
+                    if token in overdue:
+                        result = _failed_result("evaluation timeout", 'timeout')
+                    else:
+                        result = _failed_result("同じワーカーの評価がタイムアウトしたため中断しました", 'worker')
+                    _reply(protocol, job, result, None, exiting=True)
+            os._exit(1)
+
+    threading.Thread(target=watchdog, name="fem-pipeline-watchdog", daemon=True).start()
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        with write_lock:
+            pending[job['id']] = job
+        pipeline.submit(job, lambda result, seconds, job=job: on_done(job, result, seconds), key=job['id'])
+    pipeline.join()
+    exiting.set()
+    _close_documents()
+
+
+def _worker_main():
+    """ワーカープロセス: 標準入力の評価依頼を処理して結果を返す（FEM_PIPELINE=1 の場合はパイプライン評価）"""
+    sys.path.insert(0, current_dir)
+    # 結果の受け渡しには元の標準出力を使い、評価中のログ（C拡張の出力を含む）は標準エラーへ流す
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    from cpu_budget import apply_cpu_budget
+    apply_cpu_budget()
+    import generate_building_fem_analyze  # noqa: F401  （読み込み時の出力を評価の前に済ませる）
+
+    depth = pipeline_depth()
+    if depth > 1:
+        _serve_pipelined(protocol, depth)
+    else:
+        _serve_sequential(protocol)
+
+
+if __name__ == '__main__' and os.environ.get('FEM_PARALLEL_WORKER', '') == '1':
+    _worker_main()
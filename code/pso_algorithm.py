@@ -94,6 +94,21 @@ from pso_config import (
     C1,
     C2,
     V_MAX,
+    N_WORKERS,
+    PIPELINE_DEPTH,
+    FITNESS_PRUNING,
+    calculate_fitness_lower_bound,
+    SAFETY_ESTIMATOR_FILE,
+    SURROGATE_ASSIST,
+    SURROGATE_TOP_K,
+    SURROGATE_MIN_SAMPLES,
+    FEASIBILITY_SCREENING,
+    FEASIBILITY_THRESHOLD,
+    FEASIBILITY_ACTION,
+    FEASIBILITY_MAX_RESAMPLES,
+    DESIGN_REUSE,
+    DESIGN_REUSE_MODE,
+    DESIGN_REUSE_TOLERANCES,
     variable_ranges,
     calculate_fitness
 )
@@ -257,14 +272,17 @@ def _timeout_handler(signum, frame):
 _HAS_SIGALRM = hasattr(signal, "SIGALRM")
 
 # ---------- 評価関数ラッパー ----------
-def _evaluate_once(design_vars: dict, timeout_s: int = EVALUATION_TIMEOUT):
-    """タイムアウト付き評価"""
+def _evaluate_once(design_vars: dict, timeout_s: int = EVALUATION_TIMEOUT, prune_above: float = None):
+    """タイムアウト付き評価（prune_above を指定した場合は適応度の下限による枝刈りあり）"""
+    eval_kwargs = {'metrics': FITNESS_METRICS}
+    if prune_above is not None:
+        eval_kwargs.update({'prune_above': prune_above, 'lower_bound_fn': calculate_fitness_lower_bound})
     if _HAS_SIGALRM:
         # Unix系OS（Linux, macOS）の場合
         try:
             signal.signal(signal.SIGALRM, _timeout_handler)
             signal.alarm(timeout_s)
-            res = evaluate_building_from_params(design_vars, save_fcstd=False)
+            res = evaluate_building_from_params(design_vars, save_fcstd=False, **eval_kwargs)
             signal.alarm(0)  # タイムアウトキャンセル
             return res
         except TimeoutError:
@@ -278,7 +296,7 @@ def _evaluate_once(design_vars: dict, timeout_s: int = EVALUATION_TIMEOUT):
     else:
         # Windowsの場合（タイムアウトなし）
         try:
-            res = evaluate_building_from_params(design_vars, save_fcstd=False)
+            res = evaluate_building_from_params(design_vars, save_fcstd=False, **eval_kwargs)
             return res
         except Exception as e:
             raise e
@@ -286,6 +304,27 @@ def _evaluate_once(design_vars: dict, timeout_s: int = EVALUATION_TIMEOUT):
             _cleanup_freecad_memory()
 
 # ---------- ベクトル⇔設計変数変換 ----------
+def _compile_material_bins(param_ranges):
+    """
+    材料パラメータの離散化表を作成
+    
+    範囲 (下限, 上限) に含まれる整数の材料コードごとに等幅の区間を割り当てる。
+    (0, 1) は 0.5 を境にコンクリート／木材、(0, 2) は3等分、(1, 1) は木材に固定。
+    
+    Returns:
+        dict: パラメータ名 → (下限, 区間幅, 最小コード, 最大コード)
+    """
+    bins = {}
+    for name, (low, high) in param_ranges.items():
+        if not name.startswith("material_"):
+            continue
+        low_code, high_code = int(round(low)), int(round(high))
+        width = (high - low) / (high_code - low_code + 1) if high > low else 1.0
+        bins[name] = (low, width, low_code, high_code)
+    return bins
+
+MATERIAL_BINS = _compile_material_bins(PARAM_RANGES)
+
 def _vector_to_design(vec):
     """ベクトル形式から設計変数辞書へ変換"""
     dv = {}
@@ -294,9 +333,9 @@ def _vector_to_design(vec):
             # 整数値（mm単位）
             dv[k] = int(round(v))
         elif k.startswith("material_"):
-            # 材料パラメータ：連続値を離散値に変換
-            # 0.5未満 → 0（コンクリート）、0.5以上 → 1（木材）
-            dv[k] = 1 if v >= 0.5 else 0
+            # 材料パラメータ：連続値を材料コードに変換（0: コンクリート, 1: 木材, 2: CLT）
+            low, width, low_code, high_code = MATERIAL_BINS[k]
+            dv[k] = min(high_code, max(low_code, low_code + int((v - low) // width)))
         else:
             dv[k] = float(v)
     
@@ -327,6 +366,9 @@ class Particle:
         # 現在の適応度
         self.fitness = float("inf")
         
+        # 評価の種類（'Success' / 'Pruned' / 'Failed' / 'Surrogate' / 'Screened'）
+        self.evaluation = None
+        
         # 評価値の詳細
         self.safety = 0.0
         self.cost = float("inf")
@@ -335,12 +377,83 @@ class Particle:
         self.constructability = 0.0
 
 # ---------- 粒子評価関数 ----------
-def evaluate_particle(particle: Particle, idx: int = None) -> float:
+def evaluate_particle(particle: Particle, idx: int = None, iteration: int = None) -> float:
     """粒子の評価（コスト最小化 + 安全率制約）"""
+    res = _reuse_result(particle)
+    if res is not None:
+        return apply_evaluation_result(particle, res, idx, iteration)
+    start = time.perf_counter()
     try:
         dv = _vector_to_design(particle.position)
-        res = _evaluate_once(dv)
-        
+        res = _evaluate_once(dv, prune_above=_prune_threshold(particle))
+    except TimeoutError as e:
+        res = {'status': 'Failed', 'message': str(e), 'failed_stage': 'timeout'}
+    except Exception as e:
+        res = {'status': 'Failed', 'message': str(e), 'failed_stage': 'error'}
+    res['evaluation_time'] = time.perf_counter() - start
+    return apply_evaluation_result(particle, res, idx, iteration)
+
+
+def _prune_threshold(particle: Particle):
+    """
+    枝刈りの閾値（適応度の下限がこれを超える設計はFEM解析を省略）
+    
+    pbest >= gbest のため、下限が pbest を超えれば pbest と gbest のどちらも更新されない。
+    """
+    if not pruning_enabled or not np.isfinite(particle.pbest_fitness):
+        return None
+    return float(particle.pbest_fitness)
+
+
+def _check_fitness_lower_bound(particle: Particle):
+    """
+    FEM解析した評価で 適応度の下限 <= 適応度 を確認（成り立たない場合は警告して枝刈りを止める）
+
+    calculate_fitness_lower_bound が calculate_fitness と合っていない場合（正規化した目的関数に
+    差し替えた場合など）、下限がすべての pbest を超えて以降の評価がすべて枝刈りされてしまうため。
+    """
+    global pruning_enabled
+    if not pruning_enabled or not np.isfinite(particle.fitness):
+        return
+    lower_bound = calculate_fitness_lower_bound(particle.cost, particle.co2)
+    if lower_bound is None or lower_bound <= particle.fitness + 1e-9 * max(1.0, abs(particle.fitness)):
+        return
+    pruning_enabled = False
+    print("\n" + "!" * 70)
+    print(f"⚠️ 適応度の下限 {lower_bound:.6g} が適応度 {particle.fitness:.6g} を超えました。")
+    print("   calculate_fitness_lower_bound が calculate_fitness と合っていません。以降の下限枝刈りを止めます。")
+    print(f"   （これまでに枝刈りした {n_pruned} 件の評価は信頼できません。pso_config.py の下限を見直してください）")
+    print("!" * 70 + "\n")
+
+
+def apply_evaluation_result(particle: Particle, res: dict, idx: int = None, iteration: int = None) -> float:
+    """評価結果を粒子に反映して適応度を返す（逐次評価・並列評価で共通）"""
+    global n_pruned
+    # 評価指標の再計算用に building_info とFEMの生の結果を保存
+    design = _vector_to_design(particle.position)
+    evaluation_archive.append(design, res, iteration=iteration, particle=None if idx is None else idx + 1)
+    reused = 'reuse_distance' in res
+    # 失敗確率の学習データに追加（枝刈りした評価・再利用した結果は除く）
+    if feasibility_model is not None and not reused:
+        feasibility_model.record(design, res)
+    # 近傍設計の再利用の対象に追加（成功した評価のみ）
+    if design_index is not None and res.get('status') == 'Success' and not reused:
+        design_index.add(design, res, {'run_id': evaluation_archive.run_id, 'iteration': iteration,
+                                       'particle': None if idx is None else idx + 1})
+    particle.evaluation = res.get('status', 'Failed')
+    if res.get('status') == 'Pruned':
+        # FEM解析を省略した設計は下限を適応度として記録（pbest・gbest は更新されない）
+        n_pruned += 1
+        particle.fitness = res['fitness_lower_bound']
+        particle.cost = res["economic"]["cost_per_sqm"]
+        particle.co2 = res["environmental"]["co2_per_sqm"]
+        particle.safety = float("nan")
+        particle.comfort = float("nan")
+        particle.constructability = float("nan")
+        if idx is not None:
+            print(f"  ✂️ 粒子 {idx+1}: 下限 {particle.fitness:.0f} > pbest のためFEM解析を省略")
+        return particle.fitness
+    try:
         if res['status'] != 'Success':
             raise Exception(f"評価失敗: {res['message']}")
         
@@ -360,20 +473,28 @@ def evaluate_particle(particle: Particle, idx: int = None) -> float:
             particle.constructability
         )
         
+        _check_fitness_lower_bound(particle)
+        
         # 個人的最良解の更新
         if particle.fitness < particle.pbest_fitness:
             particle.pbest_fitness = particle.fitness
             particle.pbest_position = np.copy(particle.position)
         
+        # サロゲートの学習データに追加
+        if surrogate_model is not None and not reused:
+            surrogate_model.add(_design_vector(particle.position), particle.fitness)
+        
         if idx is not None:
+            reuse_note = f"（♻️ 距離 {res['reuse_distance']:.3f} の評価済み設計を再利用）" if reused else ""
             print(f"  粒子 {idx+1}: cost={particle.cost:.0f}, safety={particle.safety:.2f}, "
-                  f"CO2={particle.co2:.0f}, comfort={particle.comfort:.1f}")
+                  f"CO2={particle.co2:.0f}, comfort={particle.comfort:.1f}{reuse_note}")
         
         return particle.fitness
         
     except Exception as e:
         if idx is not None:
             print(f"  ❌ 粒子 {idx+1} の評価失敗: {e}")
+        particle.evaluation = 'Failed'
         particle.fitness = float("inf")
         particle.safety = 0.0
         particle.cost = float("inf")
@@ -382,6 +503,276 @@ def evaluate_particle(particle: Particle, idx: int = None) -> float:
         particle.constructability = 0.0
         return float("inf")
 
+# FEM解析を省略した評価の件数（適応度の下限による枝刈り）
+n_pruned = 0
+# 下限枝刈りを行うか（下限が適応度を超えた評価があれば False にする）
+pruning_enabled = FITNESS_PRUNING
+
+# ---------- 目的関数が使う評価指標 ----------
+# FEMに依存する指標（安全率・快適性・施工性）を使わない目的関数ではメッシュ生成・FEM解析を行わない
+from metric_dependencies import needs_fem, required_metrics
+FITNESS_METRICS = list(required_metrics(calculate_fitness))
+print(f"🎯 目的関数が使う評価指標: {', '.join(FITNESS_METRICS)}"
+      f"（FEM解析: {'あり' if needs_fem(FITNESS_METRICS) else 'なし'}）")
+
+# ---------- 安全率の略算推定（SAFETY_ESTIMATOR_FILE を指定した場合） ----------
+# evaluate_building と並列評価のワーカーは FEM_SAFETY_ESTIMATOR から推定器を読み込む
+if SAFETY_ESTIMATOR_FILE:
+    os.environ['FEM_SAFETY_ESTIMATOR'] = os.path.abspath(SAFETY_ESTIMATOR_FILE)
+    from safety_estimator import get_safety_estimator
+    safety_estimator = get_safety_estimator()
+    if safety_estimator is not None:
+        print(f"🛡️ 安全率推定器: {SAFETY_ESTIMATOR_FILE}（校正 {safety_estimator.statistics.get('num_samples')} 件、"
+              f"相対誤差の中央値 {safety_estimator.statistics.get('median_relative_error', float('nan')) * 100:.1f}%）")
+    else:
+        print(f"⚠️ 安全率推定器 {SAFETY_ESTIMATOR_FILE} を使用できません（safety_estimator.py で校正してください）")
+
+# ---------- 評価アーカイブ ----------
+# 実行をまたいで追記し、rescore_archive.py で別の適応度定義による再評価に使う
+from evaluation_archive import ARCHIVE_FILENAME, EvaluationArchive
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+evaluation_archive = EvaluationArchive(os.path.join(OUTPUT_DIR, ARCHIVE_FILENAME))
+print(f"🗄️ 評価アーカイブ: {evaluation_archive.path}（実行ID {evaluation_archive.run_id}）")
+
+# ---------- サロゲート（SURROGATE_ASSIST = True の場合） ----------
+def _design_vector(position):
+    """サロゲートの入力（材料コード・整数化後の設計変数）"""
+    design = _vector_to_design(position)
+    return np.array([design[name] for name in PARAM_NAMES], dtype=float)
+
+
+surrogate_model = None
+n_surrogate = 0
+if SURROGATE_ASSIST:
+    from evaluation_archive import load_archive
+    from surrogate_model import GaussianProcessSurrogate, expected_improvement
+    surrogate_model = GaussianProcessSurrogate(*get_bounds())
+    # 過去の実行の評価を現在の目的関数で採点し直して学習に使う
+    if os.path.exists(evaluation_archive.path):
+        for record in load_archive(evaluation_archive.path):
+            metrics = record.get('metrics')
+            if record.get('status') != 'Success' or not metrics or record.get('skipped_metrics'):
+                continue
+            try:
+                fitness = calculate_fitness(*(float(metrics[k]) for k in
+                                              ('cost', 'safety', 'co2', 'comfort', 'constructability')))
+                surrogate_model.add([float(record['params'][name]) for name in PARAM_NAMES], fitness)
+            except (KeyError, TypeError, ValueError, ArithmeticError):
+                continue
+    print(f"🔮 サロゲート: 評価アーカイブから {surrogate_model.num_samples} 件を学習"
+          f"（{SURROGATE_MIN_SAMPLES} 件以上で各反復 {SURROGATE_TOP_K}/{N_PARTICLES} 粒子のみFEM解析）")
+
+# ---------- 失敗確率による事前判定（FEASIBILITY_SCREENING = True の場合） ----------
+feasibility_model = None
+screening_stats = None
+if FEASIBILITY_SCREENING:
+    from evaluation_archive import load_archive
+    from feasibility_model import FeasibilityClassifier, ScreeningStats
+    feasibility_model = FeasibilityClassifier(PARAM_RANGES)
+    screening_stats = ScreeningStats()
+    if os.path.exists(evaluation_archive.path):
+        feasibility_model.record_archive(load_archive(evaluation_archive.path))
+    print(f"🚧 事前判定: 評価アーカイブから {feasibility_model.num_samples} 件を学習"
+          f"（失敗 {feasibility_model.num_failures} 件、失敗確率 {FEASIBILITY_THRESHOLD} 超の位置は"
+          f"{'再サンプリング' if FEASIBILITY_ACTION == 'resample' else '評価を省略'}）")
+
+# ---------- 評価済みの近傍設計の再利用（DESIGN_REUSE = True の場合） ----------
+design_index = None
+if DESIGN_REUSE:
+    from evaluation_archive import load_archive
+    from design_index import DesignIndex, result_from_record
+    design_index = DesignIndex(PARAM_NAMES, DESIGN_REUSE_TOLERANCES, DESIGN_REUSE_MODE)
+    # FEM解析を省略した過去の評価は、現在の目的関数がFEMに依存する指標を使う場合は使わない
+    if os.path.exists(evaluation_archive.path):
+        for record in load_archive(evaluation_archive.path):
+            result = result_from_record(record)
+            if result is None or (record.get('skipped_metrics') and needs_fem(FITNESS_METRICS)):
+                continue
+            try:
+                design_index.add(record['params'], result, {key: record.get(key)
+                                                            for key in ('run_id', 'iteration', 'particle')})
+            except (KeyError, TypeError, ValueError):
+                continue
+    print(f"♻️ 近傍設計の再利用: 評価アーカイブから {len(design_index)} 件を登録（{DESIGN_REUSE_MODE}）")
+
+
+def _reuse_result(particle: Particle):
+    """許容差以内の評価済み設計の結果（再利用しない・該当なしの場合は None）"""
+    if design_index is None:
+        return None
+    return design_index.lookup(_vector_to_design(particle.position))
+
+
+# ---------- 並列評価器（N_WORKERS > 1 またはパイプライン評価の場合） ----------
+# パイプライン評価（fem_pipeline.py）はワーカー内で行うため、N_WORKERS = 1 でもワーカーを起動する
+if PIPELINE_DEPTH > 1:
+    os.environ['FEM_PIPELINE'] = '1'
+    os.environ['FEM_PIPELINE_DEPTH'] = str(PIPELINE_DEPTH)
+parallel_evaluator = None
+if N_WORKERS > 1 or PIPELINE_DEPTH > 1:
+    from evaluation_time_model import EvaluationTimeModel
+    from parallel_evaluator import ParallelEvaluator
+    # 評価時間の記録は反復をまたいで学習に使うため、毎回消去される csv/ ではなく出力ディレクトリに置く
+    evaluation_time_model = EvaluationTimeModel(PARAM_RANGES, os.path.join(OUTPUT_DIR, "evaluation_times.csv"))
+    parallel_evaluator = ParallelEvaluator(N_WORKERS, evaluation_time_model, timeout=EVALUATION_TIMEOUT,
+                                           metrics=FITNESS_METRICS)
+    print(f"⚡ 並列評価: ワーカー {N_WORKERS} / 評価時間の記録 {evaluation_time_model.num_samples} 件"
+          + (f" / パイプライン {PIPELINE_DEPTH} 設計" if PIPELINE_DEPTH > 1 else ""))
+
+
+def evaluate_swarm_parallel(particles: list, iteration: int = None, indices: list = None) -> None:
+    """全粒子をまとめて並列評価（予測評価時間の長い順にワーカーへ割り当て。評価済みの近傍設計は再利用）"""
+    indices = range(len(particles)) if indices is None else indices
+    pending = []
+    for idx, particle in zip(indices, particles):
+        res = _reuse_result(particle)
+        if res is not None:
+            apply_evaluation_result(particle, res, idx, iteration)
+        else:
+            pending.append((idx, particle))
+    if not pending:
+        return
+    results = parallel_evaluator.evaluate([_vector_to_design(p.position) for _, p in pending],
+                                          prune_thresholds=[_prune_threshold(p) for _, p in pending])
+    for (idx, particle), res in zip(pending, results):
+        apply_evaluation_result(particle, res, idx, iteration)
+
+
+def _true_fitness(particle: Particle) -> float:
+    """最良粒子の選択に使う適応度（サロゲートの予測値は除外）"""
+    return particle.fitness if particle.evaluation != 'Surrogate' else float("inf")
+
+
+def surrogate_ready() -> bool:
+    """サロゲートで評価を選別できる状態か"""
+    return surrogate_model is not None and surrogate_model.num_samples >= SURROGATE_MIN_SAMPLES
+
+
+def evaluate_swarm_with_surrogate(particles: list, iteration: int, indices: list = None) -> None:
+    """
+    期待改善量（EI）の大きい SURROGATE_TOP_K 粒子だけFEM解析し、残りはサロゲートの予測値を使う
+    
+    予測値は pbest・gbest の更新に使わない。評価の種類・予測値・予測誤差を SURROGATE_CSV_FILE に記録する。
+    indices を指定した場合はその粒子だけを対象とする（事前判定で評価を省略した粒子は除く）。
+    """
+    global n_surrogate
+    indices = list(range(len(particles))) if indices is None else list(indices)
+    if not indices:
+        return
+    mean, std = surrogate_model.predict([_design_vector(particles[i].position) for i in indices])
+    ei = expected_improvement(mean, std, gbest_fitness)
+    selected = sorted(indices[int(j)] for j in np.argsort(-ei, kind='stable')[:SURROGATE_TOP_K])
+    if parallel_evaluator is not None:
+        evaluate_swarm_parallel([particles[i] for i in selected], iteration, indices=selected)
+    else:
+        for idx in selected:
+            evaluate_particle(particles[idx], idx, iteration)
+
+    with open(SURROGATE_CSV_FILE, "a", newline="") as f:
+        writer = csv.writer(f)
+        for row, idx in enumerate(indices):
+            particle = particles[idx]
+            if idx in selected:
+                # 真の評価（予測誤差は成功した評価のみ）
+                success = particle.evaluation == 'Success' and np.isfinite(particle.fitness)
+                error = particle.fitness - mean[row] if success else ""
+                writer.writerow([iteration, idx + 1, "true", particle.evaluation, mean[row], std[row], ei[row],
+                                 particle.fitness, error])
+                continue
+            n_surrogate += 1
+            particle.evaluation = 'Surrogate'
+            particle.fitness = float(mean[row])
+            particle.cost = float("nan")
+            particle.safety = float("nan")
+            particle.co2 = float("nan")
+            particle.comfort = float("nan")
+            particle.constructability = float("nan")
+            print(f"  🔮 粒子 {idx+1}: 予測 fitness={mean[row]:.0f} ± {std[row]:.0f}（EI={ei[row]:.3g}、FEM解析なし）")
+            writer.writerow([iteration, idx + 1, "surrogate", "Surrogate", mean[row], std[row], ei[row], "", ""])
+
+
+def move_particle(particle: Particle) -> None:
+    """速度と位置の更新（PSO基本式 + 速度制限 + 鏡像反射）"""
+    r1 = np.random.rand(len(particle.velocity))
+    r2 = np.random.rand(len(particle.velocity))
+    
+    cognitive = C1 * r1 * (particle.pbest_position - particle.position)
+    social = C2 * r2 * (gbest_position - particle.position)
+    
+    particle.velocity = W * particle.velocity + cognitive + social
+    
+    # 速度制限
+    v_limit = V_MAX * (bounds[1] - bounds[0])
+    particle.velocity = np.clip(particle.velocity, -v_limit, v_limit)
+    
+    # 位置更新
+    particle.position = particle.position + particle.velocity
+    
+    # 境界処理（鏡像反射）
+    particle.position, particle.velocity = apply_reflection_boundary(
+        particle.position, particle.velocity, bounds[0], bounds[1]
+    )
+
+
+def screen_particle(particle: Particle, resample=None) -> bool:
+    """
+    失敗確率が FEASIBILITY_THRESHOLD を超える位置を評価の前に避ける
+    
+    Args:
+        particle: 判定する粒子
+        resample: 粒子の位置を引き直す関数（FEASIBILITY_ACTION = 'resample' の場合に使用）
+    
+    Returns:
+        bool: 評価する場合 True。評価しない場合は粒子を適応度 inf（evaluation='Screened'）とする
+    """
+    if feasibility_model is None or not feasibility_model.ready:
+        return True
+    screening_stats.checked += 1
+    probability = feasibility_model.predict_failure(_vector_to_design(particle.position))
+    if probability <= FEASIBILITY_THRESHOLD:
+        return True
+    if FEASIBILITY_ACTION == 'resample' and resample is not None:
+        resampled = probability
+        for _ in range(FEASIBILITY_MAX_RESAMPLES):
+            resample(particle)
+            resampled = feasibility_model.predict_failure(_vector_to_design(particle.position))
+            if resampled <= FEASIBILITY_THRESHOLD:
+                screening_stats.add_resample(feasibility_model, probability, resampled)
+                print(f"  🚧 失敗確率 {probability:.2f} の位置を再サンプリング（→ {resampled:.2f}）")
+                return True
+        probability = resampled
+    screening_stats.add_skip(feasibility_model, probability)
+    print(f"  🚧 失敗確率 {probability:.2f} の位置のため評価を省略")
+    particle.evaluation = 'Screened'
+    particle.fitness = float("inf")
+    particle.safety = 0.0
+    particle.cost = float("inf")
+    particle.co2 = float("inf")
+    particle.comfort = 0.0
+    particle.constructability = 0.0
+    return False
+
+
+def move_particle_screened(particle: Particle) -> bool:
+    """粒子を移動して事前判定（高リスクの場合は乱数を引き直して移動をやり直す）。評価する場合 True"""
+    position, velocity = np.copy(particle.position), np.copy(particle.velocity)
+    move_particle(particle)
+
+    def resample(p):
+        p.position, p.velocity = np.copy(position), np.copy(velocity)
+        move_particle(p)
+
+    return screen_particle(particle, resample)
+
+
+def _redraw_position(particle: Particle) -> None:
+    """初期位置をランダムに引き直す（初期粒子群の事前判定用）"""
+    particle.position = np.array([
+        low + (up - low) * rng.random()
+        for low, up in zip(particle.bound_low, particle.bound_up)
+    ])
+    particle.pbest_position = np.copy(particle.position)
+
 # ---------- CSVヘッダー作成 ----------
 with open(CSV_FILE, "w", newline="") as f:
     writer = csv.writer(f)
@@ -438,6 +829,16 @@ with open(GBEST_HISTORY_CSV_FILE, "w", newline="") as f:
     ] + PARAM_NAMES
     writer.writerow(header)
 
+# ---------- サロゲートのログCSVヘッダー作成 ----------
+SURROGATE_CSV_FILE = os.path.join(CSV_DIR, "pso_surrogate_log.csv")
+if SURROGATE_ASSIST:
+    with open(SURROGATE_CSV_FILE, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            "iteration", "particle", "evaluation", "status", "predicted_fitness", "predicted_std",
+            "expected_improvement", "fitness", "prediction_error"
+        ])
+
 # ---------- テキストログファイルの初期化 ----------
 # (削除済み - リアルタイムデータとCSVファイルに統合)
 
@@ -498,7 +899,7 @@ with open(SETTINGS_FILE, "w", newline="", encoding='utf-8-sig') as f:
         elif name in ["window_ratio_2f", "roof_morph", "roof_shift"]:
             unit = "-"
         elif name.startswith("material_"):
-            unit = "0:コンクリート／1:木材"
+            unit = "0:コンクリート／1:木材／2:CLT"
             
         description = PARAM_DESCRIPTIONS.get(name, "")
         writer.writerow([name, description, lower_bounds[i], upper_bounds[i], unit])
@@ -606,10 +1007,16 @@ swarm = []
 gbest_position = None
 gbest_fitness = float("inf")
 
-for idx in range(N_PARTICLES):
+initial_particles = [Particle(bounds) for _ in range(N_PARTICLES)]
+dispatch = [screen_particle(particle, _redraw_position) for particle in initial_particles]
+if parallel_evaluator is not None:
+    selected = [i for i, ok in enumerate(dispatch) if ok]
+    evaluate_swarm_parallel([initial_particles[i] for i in selected], 0, indices=selected)
+
+for idx, particle in enumerate(initial_particles):
     print(f"\n🧬 粒子 {idx+1}/{N_PARTICLES}")
-    particle = Particle(bounds)
-    evaluate_particle(particle, idx)
+    if parallel_evaluator is None and dispatch[idx]:
+        evaluate_particle(particle, idx, 0)
     
     # グローバルベストの更新
     if particle.fitness < gbest_fitness:
@@ -693,34 +1100,24 @@ import statistics
 for iter_num in range(1, MAX_ITER):
     print(f"\n🔄 反復 {iter_num}/{MAX_ITER} 開始")
     
+    # 並列評価・サロゲートによる選別では全粒子を移動してからまとめて評価（同期型の更新）
+    # （失敗確率の高い位置は事前判定で再サンプリングまたは評価を省略）
+    use_surrogate = surrogate_ready()
+    if use_surrogate or parallel_evaluator is not None:
+        selected = [idx for idx, particle in enumerate(swarm) if move_particle_screened(particle)]
+        if use_surrogate:
+            evaluate_swarm_with_surrogate(swarm, iter_num, indices=selected)
+        else:
+            evaluate_swarm_parallel([swarm[i] for i in selected], iter_num, indices=selected)
+    
     # 各粒子の更新と評価
     for idx, particle in enumerate(swarm):
-        # 速度更新（PSO基本式）
-        r1 = np.random.rand(len(particle.velocity))
-        r2 = np.random.rand(len(particle.velocity))
-        
-        cognitive = C1 * r1 * (particle.pbest_position - particle.position)
-        social = C2 * r2 * (gbest_position - particle.position)
-        
-        particle.velocity = W * particle.velocity + cognitive + social
-        
-        # 速度制限
-        v_limit = V_MAX * (bounds[1] - bounds[0])
-        particle.velocity = np.clip(particle.velocity, -v_limit, v_limit)
+        if parallel_evaluator is None and not use_surrogate:
+            if move_particle_screened(particle):
+                evaluate_particle(particle, idx, iter_num)
         
-        # 位置更新
-        particle.position = particle.position + particle.velocity
-        
-        # 境界処理（鏡像反射）
-        particle.position, particle.velocity = apply_reflection_boundary(
-            particle.position, particle.velocity, bounds[0], bounds[1]
-        )
-        
-        # 評価
-        evaluate_particle(particle, idx)
-        
-        # グローバルベストの更新
-        if particle.fitness < gbest_fitness:
+        # グローバルベストの更新（サロゲートの予測値では更新しない）
+        if particle.fitness < gbest_fitness and particle.evaluation != 'Surrogate':
             gbest_fitness = particle.fitness
             gbest_position = np.copy(particle.position)
         
@@ -755,12 +1152,12 @@ for iter_num in range(1, MAX_ITER):
         # 1分ごとにリアルタイムデータを更新（モニタリング用）
         current_time = time.time()
         if current_time - update_time_tracker[0] >= 60:  # 60秒経過したら更新
-            current_best = min(swarm, key=lambda p: p.fitness)
+            current_best = min(swarm, key=_true_fitness)
             save_realtime_data(iter_num, gbest_fitness, swarm, current_best)
             update_time_tracker[0] = current_time
     
     # 履歴に記録
-    best_particle = min(swarm, key=lambda p: p.fitness)
+    best_particle = min(swarm, key=_true_fitness)
     history.append({
         'iteration': iter_num+1,
         'fitness': gbest_fitness,
@@ -801,7 +1198,7 @@ for iter_num in range(1, MAX_ITER):
         pbest_std = statistics.pstdev(pbest_vals) if len(pbest_vals) > 1 else 0.0
 
     # 現在の最良粒子（gbest）
-    best_particle = min(swarm, key=lambda p: p.fitness)
+    best_particle = min(swarm, key=_true_fitness)
 
     # 各指標
     safety = best_particle.safety
@@ -836,6 +1233,10 @@ for iter_num in range(1, MAX_ITER):
     
     
 
+if parallel_evaluator is not None:
+    parallel_evaluator.close()
+    pipeline_stats = parallel_evaluator.pipeline_summary()
+
 # ---------- 最終結果 ----------
 print("\n" + "="*60)
 print("🏁 最適化完了！")
@@ -843,7 +1244,7 @@ print("="*60)
 
 
 
-best_particle = min(swarm, key=lambda p: p.fitness)
+best_particle = min(swarm, key=_true_fitness)
 best_design = _vector_to_design(gbest_position)
 
 print(f"\n🏆 最終的な最良解:")
@@ -857,6 +1258,48 @@ print(f"\n設計変数:")
 for k, v in best_design.items():
     print(f"  {k} = {v}")
 
+# 適応度の下限による枝刈りの統計
+if FITNESS_PRUNING:
+    print(f"\n✂️ 下限枝刈り: {n_pruned}/{evaluation_archive.count} 件の評価でFEM解析を省略")
+    if not pruning_enabled:
+        print("  ⚠️ 下限が適応度を超えた評価があったため、途中で枝刈りを止めました（pso_config.py の下限を確認）")
+
+# サロゲートによる評価の選別の統計
+if SURROGATE_ASSIST:
+    print(f"\n🔮 サロゲート: 真の評価 {evaluation_archive.count} 件 / 予測値で代用 {n_surrogate} 件"
+          f"（学習データ {surrogate_model.num_samples} 件、ログ: {SURROGATE_CSV_FILE}）")
+
+# 評価済みの近傍設計の再利用の統計
+if DESIGN_REUSE:
+    print(f"\n♻️ 近傍設計の再利用: {design_index.hits}/{design_index.hits + design_index.misses} 件の評価で"
+          f"FEM解析を省略（登録 {len(design_index)} 件、距離は評価アーカイブの reuse_distance）")
+
+# 失敗確率による事前判定の統計（回避した失敗と節約した計算時間の推定）
+if FEASIBILITY_SCREENING:
+    print()
+    screening_stats.print_summary(feasibility_model)
+
+# パイプライン評価の統計（ccx の実行待ちに重ねられた時間）
+if parallel_evaluator is not None and pipeline_stats and pipeline_stats.get('jobs'):
+    print(f"\n🔀 パイプライン評価: {pipeline_stats['jobs']:.0f} 件、1件ずつなら {pipeline_stats['serial_seconds']:.0f} 秒"
+          f" → 実時間 {pipeline_stats['busy_seconds']:.0f} 秒（ccx 実行待ち {pipeline_stats['solver_seconds']:.0f} 秒のうち"
+          f" {pipeline_stats['overlap_seconds']:.0f} 秒を重ねた）")
+
+# 形状修復・メッシュ回復ラダーの統計（不正形状・初回のメッシュ生成失敗があった場合）
+try:
+    from mesh_recovery import get_mesh_recovery_stats
+    mesh_recovery_stats = get_mesh_recovery_stats()
+    if mesh_recovery_stats.initial_failures:
+        print()
+        mesh_recovery_stats.print_summary()
+    from shape_healing import get_shape_healing_stats
+    shape_healing_stats = get_shape_healing_stats()
+    if shape_healing_stats.attempts:
+        print()
+        shape_healing_stats.print_summary()
+except ImportError:
+    pass
+
 
 
 # ---------- グラフ生成は削除（monitor_pso_mac.pyに移行） ----------
@@ -864,6 +1307,7 @@ for k, v in best_design.items():
 # グラフ生成は削除（monitor_pso_mac.pyで生成）
 print("\n📁 出力ファイル構造:")
 print(f"  {OUTPUT_DIR}/")
+print(f"    ├── {ARCHIVE_FILENAME}  # 評価アーカイブ（rescore_archive.py で再評価）")
 print(f"    └── csv/  # CSVファイル")
 print(f"        ├── pso_particle_positions.csv")
 print(f"        ├── pso_pbest_positions.csv")
@@ -9,6 +9,8 @@ W = 0.7           # 慣性重み
 C1 = 1.5          # 個人的最良解(pbest)への加速係数
 C2 = 1.5          # 群れ全体の最良解(gbest)への加速係数
 V_MAX = 0.2       # 最大速度（探索範囲の割合）
+N_WORKERS = 1     # 並列評価ワーカー数（2以上で各反復の全粒子をまとめて並列評価）
+PIPELINE_DEPTH = 1  # 1ワーカー内で同時に処理する設計数（2以上で ccx の実行中に次の設計のモデル生成・メッシュ生成を進める）
 
 
 # ========================================
@@ -29,19 +31,22 @@ variable_ranges = {
     "roof_morph": (0.0, 1.0),       # 屋根形態
     "roof_shift": (0.0, 1.0),       # 屋根シフト
     "balcony_depth": (1.0, 3.0),    # バルコニー奥行 [m]
-    # 材料パラメータ（0: コンクリート, 1: 木材）
-    "material_columns": (0, 1),
-    "material_floor1": (0, 1),
-    "material_floor2": (0, 1),
-    "material_roof": (0, 1),
-    "material_walls": (0, 1),
-    "material_balcony": (0, 1),
+    # 材料パラメータ（0: コンクリート, 1: 木材, 2: 高級木材（CLT））
+    # 範囲内の整数コードを等幅の区間に割り当てて離散化する（(0, 1) ならコンクリートと木材のみ）
+    "material_columns": (0, 2),
+    "material_floor1": (0, 2),
+    "material_floor2": (0, 2),
+    "material_roof": (0, 2),
+    "material_walls": (0, 2),
+    "material_balcony": (0, 2),
 }
 
 
 # ========================================
 # 目的関数
 # ========================================
+# 使う評価指標は metric_dependencies が本体から推定する（@uses_metrics('cost', 'co2') で明示も可）
+# FEMに依存する指標（safety, comfort, constructability）を使わない場合はFEM解析を省略する
 def calculate_fitness(cost, safety, co2, comfort, constructability):
 
     # 安全率の閾値
@@ -56,3 +61,77 @@ def calculate_fitness(cost, safety, co2, comfort, constructability):
 
      
     return fitness
+
+
+# ========================================
+# 適応度の下限（FEM解析の枝刈り用）
+# ========================================
+# True の場合、粒子の pbest を超えることが確実な設計はメッシュ生成とFEM解析を省略する
+# calculate_fitness_lower_bound は現在の calculate_fitness（コスト＋安全率ペナルティ）専用。
+# 正規化した目的関数（fitness_presets など）に差し替えた場合は下限も合わせて変更すること
+# （FEM解析した評価で 下限 <= 適応度 を確認し、成り立たない場合は警告して枝刈りを止める）
+FITNESS_PRUNING = False
+
+def calculate_fitness_lower_bound(cost, co2, safety_upper=float('inf')):
+    """
+    FEMに依存しない評価値（コスト・CO2）だけから求めた calculate_fitness の下限
+
+    calculate_fitness を変更した場合は、どの安全率・快適性・施工性でも
+    calculate_fitness(cost, ...) >= この値 となるように合わせて変更すること。
+    下限を求められない場合は None を返す（枝刈りしない）。
+    safety_upper は安全率の略算推定の上限（SAFETY_ESTIMATOR_FILE を指定した場合のみ渡される）。
+    この上限は校正データの残差の分位点で、真の安全率が上回ることもあるため、
+    safety_upper を使った下限は確率的な下限（まれに適応度を上回る）になる。
+    """
+    # 安全率ペナルティは0以上のため、コストそのものが下限
+    fitness = cost
+
+    # 安全率が上限以下であれば、安全率ペナルティは上限での値以上（閾値は calculate_fitness と同じ）
+    if safety_upper < 2.0:
+        fitness += (2.0 - safety_upper) * 100000
+
+    return fitness
+
+
+# 略算による安全率推定器（safety_estimator.py で校正したJSON。None の場合は使わない）
+# 指定した場合は安全率の推定の上限（片側97.5%）を下限枝刈りに使い、推定値を評価アーカイブに記録する
+# （推定の上限は確率的なため、真の安全率が上限を超える設計（約40件に1件）を誤って枝刈りしうる）
+SAFETY_ESTIMATOR_FILE = None
+
+
+# ========================================
+# サロゲート（ガウス過程）による評価の選別
+# ========================================
+# True の場合、各反復で期待改善量（EI）の大きい粒子だけをFEM解析し、残りはサロゲートの予測値を使う
+# （予測値で pbest・gbest は更新しない。評価の種類と予測誤差は csv/pso_surrogate_log.csv に記録）
+SURROGATE_ASSIST = False
+SURROGATE_TOP_K = 5          # 各反復でFEM解析する粒子数
+SURROGATE_MIN_SAMPLES = 30   # サロゲートを使い始めるのに必要な評価数（評価アーカイブの過去の実行を含む）
+
+
+# ========================================
+# 失敗確率の予測による評価の事前判定
+# ========================================
+# True の場合、評価アーカイブの成功・失敗（失敗した段階を含む）からロジスティック回帰で失敗確率を学習し、
+# 失敗確率が FEASIBILITY_THRESHOLD を超える位置は評価の前に移動をやり直す（'resample'）か、
+# 評価せずに適応度 inf とする（'penalize'）。節約できた計算時間の推定値は終了時に表示
+FEASIBILITY_SCREENING = False
+FEASIBILITY_THRESHOLD = 0.8       # この失敗確率を超える位置は評価しない
+FEASIBILITY_ACTION = 'resample'   # 'resample': 乱数を引き直して移動をやり直す / 'penalize': 評価せず inf
+FEASIBILITY_MAX_RESAMPLES = 5     # 'resample' で移動をやり直す最大回数（超えた場合は 'penalize' と同じ）
+
+
+# ========================================
+# 評価済みの近傍設計の再利用
+# ========================================
+# True の場合、すべての設計変数の差が許容差以内の評価済み設計（評価アーカイブの過去の実行を含む）があれば
+# FEM解析を行わずにその結果を使う（再利用した距離は評価アーカイブの reuse_distance に記録）
+DESIGN_REUSE = False
+DESIGN_REUSE_MODE = 'nearest'     # 'nearest': 最も近い設計の結果 / 'interpolate': 近傍の評価指標を距離で重み付け平均
+DESIGN_REUSE_TOLERANCES = {       # 設計変数ごとの許容差（指定のない変数・材料は完全一致）
+    "Lx": 0.01, "Ly": 0.01, "H1": 0.01, "H2": 0.01,                # [m]
+    "tf": 2, "tr": 2, "bc": 2, "hc": 2, "tw_ext": 2,               # [mm]
+    "wall_tilt_angle": 0.1,                                        # [度]
+    "window_ratio_2f": 0.005, "roof_morph": 0.005, "roof_shift": 0.005,
+    "balcony_depth": 0.01,                                         # [m]
+}
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+quantity_takeoff.py
+===================
+設計パラメータから部材ごとの体積を閉じた式で求める数量積算（OpenCASCADE 不要）
+
+経済性・環境負荷の評価に使う体積・質量は、create_realistic_building_model で
+OCC の形状をすべて生成・結合したあとの building_shape.Volume から求めていた。
+このモジュールは同じ寸法規則（材料による断面補正、階段開口、柱配置、傾斜壁と窓、
+かまぼこ屋根、バルコニー）を NumPy の配列演算で再現し、20個の設計パラメータの表から
+部材ごとの体積と結合後の体積をまとめて計算する。
+
+    部材          求め方
+    foundation    Lx × Ly × 400mm
+    floor1/2      Lx × Ly × 床厚（2階床は階段開口を除く）
+    columns       柱断面 × 総高さ（柱配置・範囲外の柱の除外は建物モデルと同じ）
+    walls         壁断面（台形・五角形）の面積 × 長さ − 窓・ドアと壁の交差体積
+    roof          屋根断面（50点の折れ線）の面積 × Ly（厚み付けは建物モデルに残らず中実）
+    balcony       床スラブ + 手すり3面（手すりの重なりを除く）
+
+結合後の体積（volume）は部材の合計から柱と床、バルコニーと西面壁の重なりを除いた値。
+形状修復（shape_healing）で形状が変わった場合は再現しない。
+OCC との差は `python quantity_takeoff.py` で既存のテスト設計について確認できる（FreeCAD が必要。
+誤差が VOLUME_TOLERANCE を超えた場合は終了コード 1）。
+
+使用例:
+    from batch_scoring import building_columns_from_params, score_batch
+    from quantity_takeoff import takeoff_batch
+
+    quantities = takeoff_batch(params_table)
+    scores = score_batch(building_columns_from_params(params_table), fem_available=False)
+"""
+
+import sys
+import os
+import argparse
+import csv
+import math
+
+# 現在のディレクトリのみをPythonパスに追加（親ディレクトリは追加しない）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+import numpy as np
+
+from batch_scoring import _Columns, _material_codes
+from generate_building_fem_analyze import MATERIAL_TABLE
+
+COMPONENTS = ('foundation', 'floor1', 'floor2', 'columns', 'walls', 'roof', 'balcony')
+
+FOUNDATION_THICKNESS = 400   # 基礎厚 [mm]
+CONCRETE_DENSITY = 2400      # building_info['mass'] の換算密度 [kg/m³]
+ROOF_PROFILE_POINTS = 50     # かまぼこ屋根の断面の点数
+CHUNK_SIZE = 100000          # 屋根断面を計算するときの1回あたりの行数
+VOLUME_TOLERANCE = 1.0       # OCC との比較で許容する体積の誤差 [%]
+
+# 既存のテスト設計（OCC との比較用）
+TEST_DESIGN_FILE = "test_results.csv"
+
+
+def section_dimensions(data):
+    """
+    材料による断面補正後の部材寸法 [mm]（create_realistic_building_model と同じ切り捨て）
+
+    Returns:
+        dict: tf_mm_floor1, tf_mm_floor2, tr_mm, bc_mm, hc_mm, tw_ext_mm の配列
+    """
+    cols = data if isinstance(data, _Columns) else _Columns(data)
+    mat = {name: cols.get(f'material_{name}', 0) for name in
+           ('columns', 'floor1', 'floor2', 'roof', 'walls')}
+
+    def adjusted(value, material, factor):
+        # 木材系（材料値1以上）のときだけ断面補正係数を掛ける
+        scale = np.where(material >= 1, MATERIAL_TABLE[factor][_material_codes(material)], 1.0)
+        return np.trunc(value * scale)
+
+    tf = cols.get('tf')
+    floor_material = np.maximum(mat['floor1'], mat['floor2'])
+    tf_wood = adjusted(tf, floor_material, 'section_factor_slab')
+    return {
+        'tf_mm_floor1': np.where(mat['floor1'] >= 1, tf_wood, np.trunc(tf)),
+        'tf_mm_floor2': np.where(mat['floor2'] >= 1, tf_wood, np.trunc(tf)),
+        'tr_mm': adjusted(cols.get('tr'), mat['roof'], 'section_factor_slab'),
+        'bc_mm': adjusted(cols.get('bc'), mat['columns'], 'section_factor_column'),
+        'hc_mm': adjusted(cols.get('hc'), mat['columns'], 'section_factor_column'),
+        'tw_ext_mm': adjusted(cols.get('tw_ext'), mat['walls'], 'section_factor_wall'),
+    }
+
+
+# ---------- 直方体 ----------
+
+def _box(x0, x1, y0, y1, z0, z1):
+    return tuple(np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (x0, x1, y0, y1, z0, z1))))
+
+
+def _box_intersection(a, b):
+    return (np.maximum(a[0], b[0]), np.minimum(a[1], b[1]),
+            np.maximum(a[2], b[2]), np.minimum(a[3], b[3]),
+            np.maximum(a[4], b[4]), np.minimum(a[5], b[5]))
+
+
+def _box_volume(box):
+    return (np.clip(box[1] - box[0], 0, None) * np.clip(box[3] - box[2], 0, None)
+            * np.clip(box[5] - box[4], 0, None))
+
+
+def _interval_overlap(a0, a1, b0, b1):
+    return np.clip(np.minimum(a1, b1) - np.maximum(a0, b0), 0, None)
+
+
+# ---------- 壁断面（XZ面またはYZ面の台形・五角形を押し出した柱状体） ----------
+
+class _WallProfile:
+    """
+    壁の断面: 高さ z での幅が [xl(z), xr(z)] の図形
+
+    xl(z) = xl0 + xl_off * s(z), xr(z) = xr0 + xr_off * s(z),
+    s(z) = clip((z - z_lo) / (z_slant - z_lo), 0, 1)、z の範囲は [z_lo, z_hi]
+    （傾斜部分は z_slant まで、その上は幅一定。外傾斜の東面壁の屋根貫通部分など）
+    """
+
+    def __init__(self, z_lo, z_hi, z_slant, xl0, xl_off, xr0, xr_off):
+        self.z_lo, self.z_hi, self.z_slant = z_lo, z_hi, z_slant
+        self.xl0, self.xl_off, self.xr0, self.xr_off = xl0, xl_off, xr0, xr_off
+
+    def _s(self, z):
+        height = self.z_slant - self.z_lo
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.clip(np.where(height > 0, (z - self.z_lo) / np.where(height > 0, height, 1.0), 1.0), 0, 1)
+
+    def area(self):
+        """断面積"""
+        slant = self.z_slant - self.z_lo
+        width0 = self.xr0 - self.xl0
+        width1 = width0 + self.xr_off - self.xl_off
+        return (width0 + width1) / 2 * slant + width1 * (self.z_hi - self.z_slant)
+
+    def overlap_area(self, x0, x1, z0, z1):
+        """長方形 [x0, x1] × [z0, z1] との交差面積（区分的に線形な幅を折れ点ごとに台形積分）"""
+        lo = np.maximum(self.z_lo, z0)
+        hi = np.maximum(np.minimum(self.z_hi, z1), lo)
+        knots = [lo, hi, self.z_slant]
+        height = self.z_slant - self.z_lo
+        # xl(z), xr(z) が x0, x1 と交わる高さ
+        for base, off in ((self.xl0, self.xl_off), (self.xr0, self.xr_off)):
+            for edge in (x0, x1):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    z_cross = self.z_lo + (edge - base) / off * height
+                knots.append(np.where(np.isfinite(z_cross), z_cross, lo))
+        z = np.sort(np.clip(np.array(np.broadcast_arrays(*knots)), lo, hi), axis=0)
+        s = self._s(z)
+        width = np.clip(np.minimum(self.xr0 + self.xr_off * s, x1)
+                        - np.maximum(self.xl0 + self.xl_off * s, x0), 0, None)
+        return np.sum((width[1:] + width[:-1]) / 2 * np.diff(z, axis=0), axis=0)
+
+
+def _walls_volume(g):
+    """2階の外壁4面（窓・バルコニー出入口を除く）の体積 [mm³]"""
+    Lx, Ly, H1, H2, tw = g['Lx'], g['Ly'], g['H1'], g['H2'], g['tw']
+    tilt, ratio = g['tilt'], g['window_ratio']
+    base = H1 + g['tf1']                      # 2階壁の下端（1階床厚を基準にする建物モデルと同じ）
+    top = H1 + H2                             # 屋根下端
+    offset = g['wall_offset_top']
+    tilted = np.abs(tilt) > 0.1
+    outward = tilted & (tilt > 0)
+    abs_tilt = np.abs(tilt)
+    has_window = ratio > 0
+
+    # --- 東面壁 ---
+    east = _WallProfile(
+        z_lo=base,
+        z_hi=np.where(outward, top + g['tr'], np.where(tilted, top, base + H2)),
+        z_slant=np.where(tilted, top, base),
+        xl0=Lx, xl_off=np.where(tilted & ~outward, offset, 0.0),
+        xr0=Lx + tw, xr_off=np.where(tilted, offset, 0.0),
+    )
+    large = ratio > 0.7
+    # 傾斜壁の窓（大きな窓は傾斜角で高さ・幅・下部マージンを変える）
+    height_frac = np.where(large, _by_tilt(abs_tilt, (0.70, 0.72, 0.75, 0.80)),
+                           _by_tilt(abs_tilt, (0.60, 0.65, 0.70, 0.75)))
+    margin = np.where(large, _by_tilt(abs_tilt, (0.20, 0.18, 0.15, 0.12)),
+                      _by_tilt(abs_tilt, (0.25, 0.225, 0.20, 0.15)))
+    width = np.where(large, Ly * np.minimum(_by_tilt(abs_tilt, (0.95, 0.92, 0.90, 0.90)),
+                                            ratio * _by_tilt(abs_tilt, (1.3, 1.25, 1.2, 1.1))),
+                     Ly * ratio)
+    thickness = np.select([abs_tilt > 30, abs_tilt > 20],
+                          [tw * 6 + np.abs(offset) * 2, tw * 5 + np.abs(offset) * 1.5],
+                          default=tw * 4 + np.abs(offset))
+    x_start = np.where(tilt < 0, Lx + 0.5 * offset - thickness * 0.3, Lx - thickness * 0.7)
+    z_start = base + H2 * margin
+    tilted_cut = (_interval_overlap(0, Ly, (Ly - width) / 2, (Ly + width) / 2)
+                  * east.overlap_area(x_start, x_start + thickness, z_start, z_start + H2 * height_frac))
+    # 垂直壁の窓（壁厚の4倍の箱で貫通）
+    z_start = base + H2 * 0.15
+    vertical_cut = (_interval_overlap(0, Ly, Ly * (1 - ratio) / 2, Ly * (1 + ratio) / 2)
+                    * east.overlap_area(Lx - tw * 2, Lx + tw * 2, z_start, z_start + H2 * 0.7))
+    east_volume = east.area() * Ly - np.where(has_window, np.where(tilted, tilted_cut, vertical_cut), 0.0)
+
+    # --- 西面壁（バルコニーがある場合は出入口を除く） ---
+    west_volume = tw * Ly * H2 - np.where(g['balcony_depth'] > 0, g['door_cut'], 0.0)
+
+    # --- 南面壁・北面壁 ---
+    side = _WallProfile(
+        z_lo=base, z_hi=np.where(tilted, top, base + H2), z_slant=np.where(tilted, top, base),
+        xl0=np.zeros_like(Lx), xl_off=0.0, xr0=Lx, xr_off=np.where(tilted, offset, 0.0),
+    )
+    tan_tilt = np.tan(np.radians(tilt))
+    south_cut = np.zeros_like(Lx)
+    width = Lx * (0.05 + 0.10 * ratio)
+    height = np.where(tilted, H2 * (_by_tilt(abs_tilt, (0.30, 0.35, 0.40, 0.40)) + 0.30 * ratio),
+                      H2 * (0.30 + 0.30 * ratio))
+    z_start = np.where(tilted, base + H2 * _by_tilt(abs_tilt, (0.25, 0.225, 0.20, 0.20)), base + H2 * 0.2)
+    shift = np.where(tilted, 0.5 * (z_start + height * 0.5 - base) * tan_tilt, 0.0)
+    for i in range(4):
+        x_start = Lx * 0.1 + i * Lx * 0.2 + shift
+        south_cut = south_cut + side.overlap_area(x_start, x_start + width, z_start, z_start + height)
+
+    north_cut = np.zeros_like(Lx)
+    width = Lx * (0.03 + 0.05 * ratio)
+    height = H2 * (0.15 + 0.15 * ratio)
+    z_start = base + H2 * 0.35
+    shift = np.where(tilted, 0.5 * (H2 * 0.5) * tan_tilt, 0.0)
+    for i in range(6):
+        x_start = Lx * 0.1 + i * Lx * 0.13 + shift
+        north_cut = north_cut + side.overlap_area(x_start, x_start + width, z_start, z_start + height)
+
+    side_volume = 2 * side.area() * tw - tw * (south_cut + north_cut)
+    return east_volume + west_volume + side_volume
+
+
+def _by_tilt(abs_tilt, values):
+    """傾斜角の段階（40度以上 / 30度以上 / 20度以上 / それ以外）で値を選ぶ"""
+    return np.select([abs_tilt >= 40, abs_tilt >= 30, abs_tilt >= 20], list(values[:3]), default=values[3])
+
+
+# ---------- 柱 ----------
+
+def _column_positions(g):
+    """柱の左下の座標 (x, y) のリストと有効フラグ（建物モデルの柱配置と同じ）"""
+    Lx, Ly, bc, hc = g['Lx'], g['Ly'], g['bc'], g['hc']
+    tilt = g['tilt']
+    corner = 100
+    margin = np.where(tilt < -30, 100, 0)
+    column_shift = np.where(tilt < 0, np.abs(g['wall_offset_top']) + g['tw'] + margin, 0.0)
+    # 外傾斜では東側の柱を50mm内側に置き、中央柱はシフトしない
+    east_shift = np.where(tilt > 0, 50.0, column_shift)
+    center_shift = np.where(tilt > 0, 0.0, column_shift * 0.5)
+    west_x = np.full_like(Lx, corner)
+    east_x = Lx - corner - bc * 1.2 - east_shift
+    south_y = np.full_like(Ly, corner)
+    north_y = Ly - corner - hc * 1.2
+    middle_y = Ly * 0.5 - hc * 0.6
+    positions = [
+        (west_x, south_y, True),
+        (west_x, north_y, True),
+        (east_x, south_y, True),
+        (east_x, north_y, True),
+        (Lx * 0.5 - bc * 0.6 - center_shift, middle_y, True),
+        # 25度を超える傾斜では西側・東側の中間に補強柱
+        (west_x, middle_y, np.abs(tilt) > 25),
+        (Lx - corner - bc * 1.2 - column_shift, middle_y, np.abs(tilt) > 25),
+    ]
+    result = []
+    for x, y, enabled in positions:
+        inside = (x > 0) & (x + bc * 1.2 < Lx) & (y > 0) & (y + hc * 1.2 < Ly)
+        result.append((x, y, enabled & inside))
+    return result
+
+
+# ---------- かまぼこ屋根 ----------
+
+def roof_profile(width, roof_morph, roof_shift, points=ROOF_PROFILE_POINTS):
+    """
+    かまぼこ屋根の断面（create_parametric_barrel_roof の点列）
+
+    Args:
+        width: 屋根幅 [mm]（行ごとの配列）
+        roof_morph, roof_shift: 屋根形状パラメータ（行ごとの配列）
+
+    Returns:
+        tuple: (x, z) それぞれ (行数, points) の配列。z は屋根下端からの高さ [mm]
+    """
+    width = np.asarray(width, dtype=float)[:, None]
+    morph = np.asarray(roof_morph, dtype=float)[:, None]
+    shift = np.asarray(roof_shift, dtype=float)[:, None]
+    x = width * (np.arange(points) / (points - 1))[None, :]
+
+    curve_height = np.select([morph < 0.33, morph < 0.67],
+                             [width * morph * 0.9, width * 0.3],
+                             default=width * (0.3 + (morph - 0.67) * 1.2))
+    power = np.select([morph < 0.33, morph < 0.67], [2.0, 2.0 - (morph - 0.33) * 3],
+                      default=-1.0 - (morph - 0.67) * 6)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 非対称（頂部の位置を shift でずらし、左右で指数を変える）
+        peak = width * (0.5 + shift * 0.4)
+        rise = np.clip(np.where(peak > 0, x / np.where(peak > 0, peak, 1.0), 0.0), 0, 1) ** (1 - shift * 0.5)
+        remaining = width - peak
+        t = np.clip(np.where(remaining > 0, (x - peak) / np.where(remaining > 0, remaining, 1.0), 0.0), 0, 1)
+        fall = np.where(remaining > 0, np.maximum(1 - t, 0) ** (1 + shift * 0.5), 0.0)
+        asymmetric = np.where(x < peak, rise, fall)
+        # 対称
+        t = 2 * np.abs(np.where(width > 0, x / np.where(width > 0, width, 1.0), 0.0) - 0.5)
+        symmetric = np.where(power > 0, 1 - t ** np.abs(power), np.maximum(1 - t, 0) ** np.abs(power))
+    base_curve = np.where(np.abs(shift) > 0.01, asymmetric, symmetric)
+    return x, base_curve * curve_height
+
+
+def _roof_volume(width, Ly, roof_morph, roof_shift):
+    """
+    かまぼこ屋根の体積 [mm³]（断面の折れ線の面積 × Ly）
+
+    create_parametric_barrel_roof の厚み付け（makeOffsetShape で内側にオフセットして cut）は
+    建物モデルに残らず、RoofSlab は屋根厚によらず中実の柱状体になる（OCC の体積で確認済み）。
+    """
+    volume = np.empty(len(width))
+    for start in range(0, len(width), CHUNK_SIZE):
+        rows = slice(start, start + CHUNK_SIZE)
+        x, z = roof_profile(width[rows], roof_morph[rows], roof_shift[rows])
+        area = np.sum((z[:, 1:] + z[:, :-1]) / 2 * np.diff(x, axis=1), axis=1)
+        volume[rows] = area * Ly[rows]
+    return volume
+
+
+# ---------- 全体 ----------
+
+def takeoff_batch(data):
+    """
+    設計パラメータの表から部材ごとの体積と結合後の体積・質量を計算
+
+    Args:
+        data: 設計パラメータ（Lx, Ly, H1, H2 [m], tf, tr, bc, hc, tw_ext [mm], wall_tilt_angle,
+              window_ratio_2f, roof_morph, roof_shift, balcony_depth [m], material_*）の列を持つ表
+              （構造化配列・DataFrame・列名 → 配列の辞書。列がない場合は建物モデルのデフォルト値）
+
+    Returns:
+        dict: COMPONENTS の各部材の体積 [m³]（部材単体。柱は床との重なりを含む）、
+              'overlap'（部材間の重なり [m³]）、'volume'（結合後の体積 [m³]）、
+              'mass'（volume × 2400 [kg]）、'floor_area' [m²]
+    """
+    cols = data if isinstance(data, _Columns) else _Columns(data)
+    sections = section_dimensions(cols)
+    H1 = np.trunc(cols.get('H1') * 1000)
+    H2 = np.trunc(cols.get('H2') * 1000)
+    tilt = cols.get('wall_tilt_angle', 0.0)
+    g = {
+        'Lx': np.trunc(cols.get('Lx') * 1000),
+        'Ly': np.trunc(cols.get('Ly') * 1000),
+        'H1': H1,
+        'H2': H2,
+        'tf1': sections['tf_mm_floor1'],
+        'tf2': sections['tf_mm_floor2'],
+        'tr': sections['tr_mm'],
+        'bc': sections['bc_mm'],
+        'hc': sections['hc_mm'],
+        'tw': sections['tw_ext_mm'],
+        'tilt': tilt,
+        'window_ratio': cols.get('window_ratio_2f', 0.4),
+        'wall_offset_top': H2 * np.tan(np.radians(tilt)),
+        'balcony_depth': np.trunc(cols.get('balcony_depth', 0.0) * 1000),
+    }
+    Lx, Ly = g['Lx'], g['Ly']
+    total_height = H1 + H2
+
+    # 2階床の階段開口（階段の終端から手前に奥行2m）
+    landing_y_end = Ly * 0.15 + np.floor(H1 / 200) * 300
+    opening = _box(Lx * 0.15, Lx * 0.15 + 1000, landing_y_end - 2000, landing_y_end, -np.inf, np.inf)
+    opening_area = (_interval_overlap(opening[0], opening[1], 0, Lx)
+                    * _interval_overlap(opening[2], opening[3], 0, Ly))
+
+    volumes = {
+        'foundation': Lx * Ly * FOUNDATION_THICKNESS,
+        'floor1': Lx * Ly * g['tf1'],
+        'floor2': (Lx * Ly - opening_area) * g['tf2'],
+    }
+
+    # 柱（柱同士は重ならない。1階床・2階床との重なりは結合時に除く）
+    columns = np.zeros(cols.size)
+    column_overlap = np.zeros(cols.size)
+    column_area = g['bc'] * 1.2 * g['hc'] * 1.2
+    for x, y, valid in _column_positions(g):
+        footprint_box = _box(x, x + g['bc'] * 1.2, y, y + g['hc'] * 1.2, 0, 1)
+        in_opening = _box_volume(_box_intersection(footprint_box, opening))  # 開口と重なる柱の断面積
+        columns = columns + np.where(valid, column_area * total_height, 0.0)
+        column_overlap = column_overlap + np.where(valid, column_area * g['tf1']
+                                                   + (column_area - in_opening) * g['tf2'], 0.0)
+    volumes['columns'] = columns
+
+    # バルコニー（西側。床スラブ150mm + 高さ1100mm・厚さ100mmの手すり3面）
+    depth = g['balcony_depth']
+    has_balcony = depth > 0
+    length = Ly * 0.8
+    y0 = Ly * 0.1
+    rail_z0, rail_z1 = H1 + 150, H1 + 150 + 1100
+    balcony_boxes = [
+        _box(-depth, 0, y0, y0 + length, H1, H1 + 150),
+        _box(-depth, -depth + 100, y0, y0 + length, rail_z0, rail_z1),
+        _box(-depth, 0, y0 + length - 100, y0 + length, rail_z0, rail_z1),
+        _box(-depth, 0, y0, y0 + 100, rail_z0, rail_z1),
+    ]
+
+    def balcony_overlap(region):
+        # region ∩ バルコニー（手すり同士の重なりは包除原理で1回だけ数える）
+        parts = [_box_intersection(region, b) for b in balcony_boxes]
+        rails = parts[1:]
+        overlap = sum(_box_volume(p) for p in parts)
+        for i in range(len(rails)):
+            for j in range(i + 1, len(rails)):
+                overlap = overlap - _box_volume(_box_intersection(rails[i], rails[j]))
+        return overlap + _box_volume(_box_intersection(_box_intersection(rails[0], rails[1]), rails[2]))
+
+    volumes['balcony'] = np.where(has_balcony, balcony_overlap(_box(-np.inf, np.inf, -np.inf, np.inf,
+                                                                    -np.inf, np.inf)), 0.0)
+
+    # 西面壁とバルコニー出入口（幅900mm・高さ2100mm、床から100mm上）
+    base = H1 + g['tf1']
+    west_wall = _box(-g['tw'], 0, 0, Ly, base, base + H2)
+    door_y = y0 + (length - 900) / 2
+    door = _box(-g['tw'] - 10, 10, door_y, door_y + 900, base + 100, base + 2200)
+    door_region = _box_intersection(west_wall, door)
+    g['door_cut'] = _box_volume(door_region)
+    balcony_wall_overlap = np.where(has_balcony, balcony_overlap(west_wall) - balcony_overlap(door_region), 0.0)
+
+    volumes['walls'] = _walls_volume(g)
+
+    # かまぼこ屋根（内傾斜の場合は屋根幅を壁の上端に合わせる）
+    roof_width = np.where(tilt < -0.1, Lx + g['wall_offset_top'], Lx)
+    volumes['roof'] = _roof_volume(roof_width, Ly, cols.get('roof_morph', 0.5), cols.get('roof_shift', 0.0))
+
+    overlap = column_overlap + balcony_wall_overlap
+    result = {name: volumes[name] / 1e9 for name in COMPONENTS}
+    result['overlap'] = overlap / 1e9
+    result['volume'] = (sum(volumes.values()) - overlap) / 1e9
+    result['mass'] = result['volume'] * CONCRETE_DENSITY
+    result['floor_area'] = (Lx / 1000) * (Ly / 1000)
+    return result
+
+
+# ---------- OCC との比較 ----------
+
+# create_realistic_building_model が作る部材オブジェクト名
+_COMPONENT_OBJECTS = {
+    'foundation': 'Foundation', 'floor1': 'Floor1', 'floor2': 'Floor2', 'columns': 'Columns',
+    'walls': 'Walls', 'roof': 'RoofSlab', 'balcony': 'Balcony',
+}
+
+# 設計パラメータ名（takeoff_batch などの表の列）
+PARAM_NAMES = ('Lx', 'Ly', 'H1', 'H2', 'tf', 'tr', 'bc', 'hc', 'tw_ext', 'wall_tilt_angle',
+               'window_ratio_2f', 'roof_morph', 'roof_shift', 'balcony_depth',
+               'material_columns', 'material_floor1', 'material_floor2',
+               'material_roof', 'material_walls', 'material_balcony')
+
+
+def load_test_designs(path):
+    """テスト結果CSV（2行目が英語の列名）から設計パラメータを読み込む"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        rows = list(csv.reader(f))
+    header = rows[1] if len(rows) > 1 and 'Lx' in rows[1] else rows[0]
+    start = rows.index(header) + 1
+    designs = []
+    for row in rows[start:]:
+        values = dict(zip(header, row))
+        try:
+            designs.append({name: float(values[name]) for name in PARAM_NAMES})
+        except (KeyError, ValueError):
+            continue
+    return designs
+
+
+def compare_with_occ(designs):
+    """
+    OCC の建物モデルと部材ごとの体積を比較（FreeCAD が必要）
+
+    Returns:
+        list: 設計ごとの {部材: (OCC [m³], 積算 [m³])} の辞書
+    """
+    import generate_building_fem_analyze as gbfa
+    if not gbfa.FEM_AVAILABLE:
+        raise RuntimeError("FreeCAD が利用できないため OCC の体積と比較できません")
+
+    table = {name: np.array([d[name] for d in designs]) for name in PARAM_NAMES}
+    takeoff = takeoff_batch(table)
+    comparisons = []
+    for i, design in enumerate(designs):
+        params = dict(design)
+        for name in PARAM_NAMES:
+            if name.startswith('material_'):
+                params[name] = int(params[name])
+        doc, building_obj, building_info = gbfa.create_realistic_building_model(**params)
+        if doc is None:
+            comparisons.append(None)
+            continue
+        row = {}
+        for component, obj_name in _COMPONENT_OBJECTS.items():
+            obj = doc.getObject(obj_name)
+            occ = obj.Shape.Volume / 1e9 if obj is not None else 0.0
+            row[component] = (occ, float(takeoff[component][i]))
+        row['volume'] = (building_info['volume'], float(takeoff['volume'][i]))
+        comparisons.append(row)
+        gbfa.App.closeDocument(doc.Name)
+    return comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数量積算の体積を OCC の建物モデルと比較')
+    parser.add_argument('--designs', type=str, default=os.path.join(current_dir, TEST_DESIGN_FILE),
+                        help='設計パラメータのCSV（test_generate_building.py の出力形式）')
+    args = parser.parse_args()
+
+    designs = load_test_designs(args.designs)
+    if not designs:
+        print(f"❌ 設計パラメータを読み込めませんでした: {args.designs}")
+        sys.exit(1)
+
+    try:
+        comparisons = compare_with_occ(designs)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    names = list(COMPONENTS) + ['volume']
+    worst = {name: 0.0 for name in names}
+    print(f"{'設計':>4} " + " ".join(f"{name:>11}" for name in names))
+    for i, row in enumerate(comparisons):
+        if row is None:
+            print(f"{i:>4} 建物モデルの生成に失敗")
+            continue
+        errors = []
+        for name in names:
+            occ, estimate = row[name]
+            error = (estimate - occ) / occ * 100 if occ > 0 else (0.0 if estimate == 0 else math.inf)
+            worst[name] = max(worst[name], abs(error))
+            errors.append(f"{error:>+10.2f}%")
+        print(f"{i:>4} " + " ".join(errors))
+    print("最大誤差 " + " ".join(f"{worst[name]:>10.2f}%" for name in names))
+    if max(worst.values()) > VOLUME_TOLERANCE:
+        print(f"❌ 許容誤差 {VOLUME_TOLERANCE}% を超えた部材があります")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+rescore_archive.py
+==================
+評価アーカイブ（evaluation_archive.jsonl）を別の適応度定義で再評価するスクリプト
+保存した building_info とFEMの生の結果から、コスト・CO2・快適性・施工性を
+FreeCAD なしで計算し直し（batch_scoring）、pso_config.calculate_fitness または
+fitness_presets の PRESET_NAME_TO_FUNC の関数で適応度を求める。
+安全率は評価時にアーカイブした値（metrics['safety']）をそのまま使う。evaluate_building は
+材料情報を設定する前の空の building_info で calculate_safety_factor を呼ぶため、評価時の安全率は
+材料によらずコンクリートの許容応力で計算されており、保存した building_info から計算し直すと
+木材を使う設計で値が変わってしまうため。
+計算し直した評価指標がアーカイブの値と一致するかは実行時に確認して表示する
+（一致しない場合、--preset current でも元の実行の適応度・gbest を再現できない）。
+
+出力（適応度定義ごと）:
+    rescore_<名前>_ranking.csv : 成功した評価を適応度の良い順に並べた表
+    rescore_<名前>_gbest.csv   : 同じ評価列を再生したときの反復ごとの gbest の推移
+                                 （粒子の移動は元の実行のまま。適応度の定義を変えた場合に
+                                  どの反復でどの設計が gbest になっていたかの目安）
+
+使い方:
+    python rescore_archive.py                              # 現在の calculate_fitness、最後の実行
+    python rescore_archive.py --preset low_carbon_priority --preset 快適性重視
+    python rescore_archive.py --preset all --run all --top 20
+"""
+
+import sys
+import os
+import argparse
+import contextlib
+import csv
+import importlib.util
+import io
+import math
+
+# 現在のディレクトリのみをPythonパスに追加（親ディレクトリは追加しない）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+import numpy as np
+
+# batch_scoring が読み込む generate_building_fem_analyze は読み込み時にメッセージを出力するため抑制
+with contextlib.redirect_stdout(io.StringIO()):
+    from batch_scoring import FEM_COLUMNS, score_batch
+from evaluation_archive import ARCHIVE_FILENAME, load_archive
+from metric_dependencies import required_metrics
+from pso_config import calculate_fitness
+
+PRESET_FILES = ("fitness_presets.py", "fitness_presets 2.py")
+METRIC_NAMES = ('cost', 'safety', 'co2', 'comfort', 'constructability')
+REPRODUCE_TOLERANCE = 1e-6  # 計算し直した評価指標とアーカイブの値の許容相対誤差
+
+
+def load_fitness_presets():
+    """fitness_presets の PRESET_NAME_TO_FUNC を読み込む（ファイル名に空白を含む場合があるためパスから読み込む）。ない場合は空"""
+    for filename in PRESET_FILES:
+        path = os.path.join(current_dir, filename)
+        if not os.path.exists(path):
+            continue
+        spec = importlib.util.spec_from_file_location("fitness_presets", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return dict(module.PRESET_NAME_TO_FUNC)
+    return {}
+
+
+def recompute_metrics(records):
+    """
+    アーカイブの成功した評価について評価指標を計算し直す
+
+    Returns:
+        list: 各行の評価指標辞書（失敗した評価は None）
+    """
+    success = [i for i, r in enumerate(records) if r.get('status') == 'Success' and r.get('building_info')]
+    metrics = [None] * len(records)
+    if not success:
+        return metrics
+
+    table = {}
+    keys = sorted({k for i in success for k, v in records[i]['building_info'].items()
+                   if isinstance(v, (int, float))})
+    for key in keys:
+        table[key] = np.array([_number(records[i]['building_info'].get(key)) for i in success])
+    for key in FEM_COLUMNS:
+        table[key] = np.array([_number(records[i]['fem'].get(key)) for i in success])
+    scores = score_batch(table, fem_available=True)
+
+    for row, i in enumerate(success):
+        # 安全率は評価時の値（evaluate_building の計算条件はモジュールの説明を参照）
+        metrics[i] = {
+            'cost': float(scores['economic']['cost_per_sqm'][row]),
+            'safety': _number(records[i].get('metrics', {}).get('safety')),
+            'co2': float(scores['environmental']['co2_per_sqm'][row]),
+            'comfort': float(scores['comfort']['comfort_score'][row]),
+            'constructability': float(scores['constructability']['constructability_score'][row]),
+        }
+        # 形状の評価のみで終了した評価（FEM解析なし）はFEMに依存する指標を計算できない
+        for name in records[i].get('skipped_metrics', ()):
+            metrics[i][name] = math.nan
+    return metrics
+
+
+def check_reproduction(records, metrics):
+    """
+    計算し直した評価指標とアーカイブの評価指標（評価時の値）の比較
+
+    Returns:
+        dict: 評価指標名 → (比較した件数, 最大相対誤差, 許容誤差を超えた件数)
+    """
+    summary = {}
+    for name in METRIC_NAMES:
+        count, worst, mismatched = 0, 0.0, 0
+        for record, m in zip(records, metrics):
+            archived = _number(record.get('metrics', {}).get(name)) if m is not None else math.nan
+            if m is None or math.isnan(archived) or math.isnan(m[name]):
+                continue
+            count += 1
+            if archived == m[name]:
+                continue
+            error = abs(m[name] - archived) / max(abs(archived), 1e-12) if math.isfinite(archived) else math.inf
+            worst = max(worst, error)
+            mismatched += error > REPRODUCE_TOLERANCE
+        summary[name] = (count, worst, mismatched)
+    return summary
+
+
+def _number(value, default=math.nan):
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    return default
+
+
+def rescore(records, metrics, fitness_fn):
+    """
+    各評価の適応度
+
+    失敗した評価、適応度に必要な指標を計算していない評価（FEM解析なしの評価を安全率を使う適応度で
+    再評価する場合など）、適応度が有限でない評価は inf とする。
+    NaN の安全率は安全率の下限との比較で False になり、ペナルティなしで上位に来てしまうため。
+    """
+    required = set(required_metrics(fitness_fn))
+    fitness = []
+    for record, m in zip(records, metrics):
+        if m is None or required & set(record.get('skipped_metrics', ())):
+            fitness.append(float('inf'))
+            continue
+        try:
+            value = float(fitness_fn(*(m[k] for k in METRIC_NAMES)))
+        except (ArithmeticError, TypeError, ValueError):
+            value = float('inf')
+        fitness.append(value if math.isfinite(value) else float('inf'))
+    return fitness
+
+
+def gbest_trajectory(records, fitness):
+    """アーカイブの順に評価を再生したときの反復ごとの gbest"""
+    trajectory = []
+    best = None
+    iterations = []
+    for i, r in enumerate(records):
+        key = (r.get('run_id'), r.get('iteration'))
+        if not iterations or iterations[-1][0] != key:
+            iterations.append((key, []))
+        iterations[-1][1].append(i)
+    for (run_id, iteration), indices in iterations:
+        for i in indices:
+            if best is None or fitness[i] < fitness[best]:
+                best = i
+        trajectory.append({'run_id': run_id, 'iteration': iteration, 'best_index': best})
+    return trajectory
+
+
+def _write_ranking(path, records, metrics, fitness, top):
+    order = sorted((i for i in range(len(records)) if math.isfinite(fitness[i])), key=lambda i: fitness[i])
+    if top:
+        order = order[:top]
+    param_names = sorted({k for i in order for k in records[i].get('params', {})})
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['rank', 'run_id', 'iteration', 'particle', 'fitness', 'archived_cost']
+                        + list(METRIC_NAMES) + param_names)
+        for rank, i in enumerate(order, 1):
+            r = records[i]
+            writer.writerow([rank, r.get('run_id'), r.get('iteration'), r.get('particle'), fitness[i],
+                             r.get('metrics', {}).get('cost')]
+                            + [metrics[i][k] for k in METRIC_NAMES]
+                            + [r['params'].get(k) for k in param_names])
+    return order
+
+
+def _write_trajectory(path, records, metrics, fitness, trajectory):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['run_id', 'iteration', 'gbest_fitness', 'gbest_iteration', 'gbest_particle']
+                        + list(METRIC_NAMES))
+        for step in trajectory:
+            i = step['best_index']
+            m = metrics[i] or {k: '' for k in METRIC_NAMES}
+            writer.writerow([step['run_id'], step['iteration'], fitness[i], records[i].get('iteration'),
+                             records[i].get('particle')] + [m[k] for k in METRIC_NAMES])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='評価アーカイブを別の適応度定義で再評価')
+    parser.add_argument('--archive', type=str, default=os.path.join('pso_output', ARCHIVE_FILENAME),
+                        help='評価アーカイブのパス')
+    parser.add_argument('--run', type=str, default='latest',
+                        help="対象の実行ID（'latest': 最後の実行, 'all': すべての実行）")
+    parser.add_argument('--preset', action='append', default=[],
+                        help="適応度定義（'current': pso_config.calculate_fitness, "
+                             "fitness_presets のキー, 'all': 全プリセット）。複数指定可")
+    parser.add_argument('--top', type=int, default=50, help='ランキングに出力する件数（0: すべて）')
+    parser.add_argument('--output-dir', type=str, default='.', help='出力先ディレクトリ')
+    args = parser.parse_args()
+
+    records = load_archive(args.archive, None if args.run == 'all' else args.run)
+    if not records:
+        print(f"❌ 評価アーカイブに対象の評価がありません: {args.archive}")
+        sys.exit(1)
+
+    presets = load_fitness_presets()
+    names = args.preset or ['current']
+    if 'all' in names:
+        names = ['current'] + [k for k in presets if k.isascii()]
+    fitness_fns = {}
+    for name in names:
+        if name == 'current':
+            fitness_fns[name] = calculate_fitness
+        elif name in presets:
+            fitness_fns[name] = presets[name]
+        else:
+            print(f"❌ 不明な適応度定義です: {name}（指定可能: current, {', '.join(presets)}）")
+            sys.exit(1)
+
+    metrics = recompute_metrics(records)
+    n_success = sum(m is not None for m in metrics)
+    print(f"🗄️ {args.archive}: {len(records)} 件（成功 {n_success} 件）を再評価")
+    reproduction = check_reproduction(records, metrics)
+    mismatched = {name: v for name, v in reproduction.items() if v[2]}
+    if mismatched:
+        print("⚠️ 計算し直した評価指標がアーカイブの値と一致しません（--preset current でも元の実行を再現できません）:")
+        for name, (count, worst, n) in mismatched.items():
+            print(f"    {name}: {n}/{count} 件が不一致（最大相対誤差 {worst:.3g}）")
+    else:
+        print(f"  計算し直した評価指標はアーカイブの値と一致（相対誤差 {REPRODUCE_TOLERANCE:g} 以内）")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    for name, fitness_fn in fitness_fns.items():
+        fitness = rescore(records, metrics, fitness_fn)
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+        ranking_path = os.path.join(args.output_dir, f"rescore_{safe_name}_ranking.csv")
+        trajectory_path = os.path.join(args.output_dir, f"rescore_{safe_name}_gbest.csv")
+        order = _write_ranking(ranking_path, records, metrics, fitness, args.top)
+        trajectory = gbest_trajectory(records, fitness)
+        _write_trajectory(trajectory_path, records, metrics, fitness, trajectory)
+
+        print(f"\n=== {name} ===")
+        if not order:
+            print("  有限の適応度を持つ評価がありません")
+            continue
+        best = order[0]
+        m = metrics[best]
+        print(f"  gbest: 適応度 {fitness[best]:.4g}（反復 {records[best].get('iteration')}, "
+              f"粒子 {records[best].get('particle')}）")
+        print(f"    cost={m['cost']:.0f}, safety={m['safety']:.2f}, CO2={m['co2']:.0f}, "
+              f"comfort={m['comfort']:.2f}, constructability={m['constructability']:.2f}")
+        first_hit = next(step['iteration'] for step in trajectory if step['best_index'] == best)
+        print(f"  gbest に到達した反復: {first_hit} / 出力: {ranking_path}, {trajectory_path}")
+
+
+if __name__ == "__main__":
+    main()
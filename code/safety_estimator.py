@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+safety_estimator.py
+===================
+柱の略算による安全率の高速推定（FEM解析の結果で係数を校正）
+
+calculate_safety_factor は FEM の最大応力・最大変位を必要とするため、粗い選別にも
+メッシュ生成と解析が必要だった。この推定器は設計パラメータだけから
+
+    - 柱の軸応力   : 鉛直荷重（setup_basic_fem_analysis と同じ自重圧・屋根荷重・バルコニー活荷重）
+                     / 柱断面積の合計
+    - 柱の曲げ応力 : 地震力（体積 × 平均密度 × 応答係数 × 0.5G）を柱本数で等分し、
+                     1階の柱を両端固定として M = Q·H1/2
+    - 柱頭の水平変位: δ = Q·H1³ / 12EI
+
+を求め、これらと許容応力・変形制限から求めた略算の安全率、形状・材料の特徴量で
+log(安全率) をリッジ回帰し、FEM解析の結果に合わせて係数を校正する。
+誤差範囲は一個抜き交差検証の残差の分位点（両側 CONFIDENCE の範囲の上限・下限の倍率）で表す。
+上限 safety_upper は片側 (1 + CONFIDENCE) / 2（97.5%）の上限で、校正データと同じ分布の設計でも
+およそ 40 件に 1 件は真の安全率が上限を超える。下限枝刈りでこの上限を使う場合、
+「pbest を更新できない」ことは確率的にしか保証されない（上限を超えた設計を誤って枝刈りしうる）。
+
+校正データは評価アーカイブか、設計パラメータと安全率（safety_factor または safety）の列を持つCSV。
+どちらも評価時に calculate_fitness に渡した安全率（アーカイブの metrics['safety']）で校正する
+（evaluate_building の安全率は材料によらずコンクリートの許容応力で計算されるため、FEMの生の結果から
+材料別に計算し直すと木材の設計で安全率を低く学習し、枝刈りの上限が偏る）。
+
+使い方:
+    python safety_estimator.py                   # pso_output/evaluation_archive.jsonl で校正
+    python safety_estimator.py --data ../files/production_freecad_random_fem_evaluation.csv
+
+    from safety_estimator import SafetyEstimator
+    estimator = SafetyEstimator.load("safety_estimator.json")
+    estimate = estimator.predict(params_table)   # {'safety', 'safety_lower', 'safety_upper'}
+
+環境変数:
+    FEM_SAFETY_ESTIMATOR  校正済みの推定器（JSON）。指定した場合 evaluate_building は推定値を
+                          building_info に記録し、下限枝刈りで安全率の上限を使う
+"""
+
+import sys
+import os
+import argparse
+import csv
+import json
+import math
+import time
+
+# 現在のディレクトリのみをPythonパスに追加（親ディレクトリは追加しない）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+import numpy as np
+
+from batch_scoring import _Columns, _material_codes, safety_factor_batch
+from frame_model import BALCONY_LIVE_LOAD_PA, BALCONY_SLAB_MM, BASE_SEISMIC_COEFFICIENT, ROOF_LOAD_PA, SELF_WEIGHT_PA
+from generate_building_fem_analyze import MATERIAL_TABLE
+from quantity_takeoff import PARAM_NAMES, takeoff_batch
+
+DEFAULT_ESTIMATOR_FILE = "safety_estimator.json"
+DEFAULT_ARCHIVE = os.path.join("pso_output", "evaluation_archive.jsonl")
+
+# 校正に必要な評価数・リッジ回帰の正則化・誤差範囲の信頼水準
+MIN_SAMPLES = 30
+RIDGE_LAMBDA = 1e-3
+CONFIDENCE = 0.95
+
+FEATURE_NAMES = (
+    'intercept', 'log_allowable_stress', 'log_axial_stress', 'log_bending_stress', 'log_drift',
+    'log_analytic_safety', 'abs_tilt', 'tilt', 'window_ratio_2f', 'roof_morph', 'balcony_depth',
+    'wood_columns', 'wood_walls', 'clt_columns', 'log_tw_ext', 'log_tf', 'log_tr',
+)
+
+
+def analytic_response(data):
+    """
+    柱の略算による断面力と変位
+
+    Args:
+        data: 設計パラメータ（Lx, Ly, H1, H2 [m], tf, tr, bc, hc, tw_ext [mm], ..., material_*）の列を持つ表
+
+    Returns:
+        dict: 'num_columns', 'gravity_load' [N], 'seismic_force' [N], 'axial_stress' [MPa],
+              'bending_stress' [MPa], 'drift' [mm], 'allowable_stress' [MPa]（加重平均の許容応力）,
+              'analytic_safety'（calculate_safety_factor と同じ規則で求めた略算の安全率）
+    """
+    cols = data if isinstance(data, _Columns) else _Columns(data)
+    quantities = takeoff_batch(cols)
+    tilt = cols.get('wall_tilt_angle', 0.0)
+    column_code = _material_codes(cols.get('material_columns', 0))
+    floor_code = np.maximum(_material_codes(cols.get('material_floor1', 0)),
+                            _material_codes(cols.get('material_floor2', 0)))
+    density = MATERIAL_TABLE['density']
+
+    # 鉛直荷重: 2階床と屋根の自重圧 + 屋根荷重 + バルコニー（自重圧 + 活荷重）
+    floor_area = quantities['floor_area']
+    balcony_area = quantities['balcony'] / (BALCONY_SLAB_MM / 1000)
+    gravity_load = ((2 * SELF_WEIGHT_PA + ROOF_LOAD_PA) * floor_area
+                    + (SELF_WEIGHT_PA + BALCONY_LIVE_LOAD_PA) * balcony_area)
+
+    # 地震力: 体積 × 平均密度（柱・床・壁）× 応答係数 × 0.5G
+    floor_density = np.maximum(density[_material_codes(cols.get('material_floor1', 0))],
+                               density[_material_codes(cols.get('material_floor2', 0))])
+    avg_density = (density[column_code] + floor_density
+                   + density[_material_codes(cols.get('material_walls', 0))]) / 3
+    seismic_force = (quantities['volume'] * avg_density * MATERIAL_TABLE['response_factor'][column_code]
+                     * 9.81 * BASE_SEISMIC_COEFFICIENT)
+
+    # 柱（断面は bc×1.2 × hc×1.2、25度を超える傾斜では補強柱2本を追加）
+    num_columns = np.where(np.abs(tilt) > 25, 7, 5)
+    width = cols.get('bc') * 1.2
+    depth = cols.get('hc') * 1.2
+    H1 = cols.get('H1') * 1000
+    shear = seismic_force / num_columns
+    axial_stress = gravity_load / (num_columns * width * depth)
+    bending_stress = shear * H1 / 2 / (width * depth ** 2 / 6)
+    drift = shear * H1 ** 3 / (12 * MATERIAL_TABLE['E_modulus'][column_code] * width * depth ** 3 / 12)
+
+    is_wood = MATERIAL_TABLE['is_wood']
+    analytic = {
+        'max_stress': axial_stress + bending_stress,
+        'max_displacement': drift,
+        'material_columns': column_code,
+        'material_walls': _material_codes(cols.get('material_walls', 0)),
+        'material_floor1': floor_code,
+    }
+    wood_allowable, concrete_allowable = 6.0, 35.0
+    allowable_stress = (np.where(is_wood[column_code] > 0, wood_allowable, concrete_allowable) * 0.4
+                        + np.where(is_wood[analytic['material_walls']] > 0, wood_allowable, concrete_allowable) * 0.3
+                        + np.where(is_wood[floor_code] > 0, wood_allowable, concrete_allowable) * 0.3)
+    return {
+        'num_columns': num_columns,
+        'gravity_load': gravity_load,
+        'seismic_force': seismic_force,
+        'axial_stress': axial_stress,
+        'bending_stress': bending_stress,
+        'drift': drift,
+        'allowable_stress': allowable_stress,
+        'analytic_safety': safety_factor_batch(analytic),
+    }
+
+
+def design_matrix(data):
+    """回帰の特徴量（FEATURE_NAMES の順）と略算の安全率"""
+    cols = data if isinstance(data, _Columns) else _Columns(data)
+    response = analytic_response(cols)
+    tilt = cols.get('wall_tilt_angle', 0.0) / 30
+    column_code = _material_codes(cols.get('material_columns', 0))
+    is_wood = MATERIAL_TABLE['is_wood']
+    X = np.column_stack([
+        np.ones(cols.size),
+        np.log(response['allowable_stress']),
+        np.log(response['axial_stress']),
+        np.log(response['bending_stress']),
+        np.log(response['drift']),
+        np.log(response['analytic_safety']),
+        np.abs(tilt),
+        tilt,
+        cols.get('window_ratio_2f', 0.4),
+        cols.get('roof_morph', 0.5),
+        cols.get('balcony_depth', 0.0) / 3,
+        is_wood[column_code],
+        is_wood[_material_codes(cols.get('material_walls', 0))],
+        (column_code == 2).astype(float),
+        np.log(cols.get('tw_ext') / 400),
+        np.log(cols.get('tf') / 450),
+        np.log(cols.get('tr') / 450),
+    ])
+    return X, response['analytic_safety']
+
+
+def _rank_correlation(a, b):
+    """スピアマンの順位相関"""
+    ranks_a = np.argsort(np.argsort(a))
+    ranks_b = np.argsort(np.argsort(b))
+    return float(np.corrcoef(ranks_a, ranks_b)[0, 1]) if len(a) > 1 else math.nan
+
+
+class SafetyEstimator:
+    """設計パラメータ → 安全率 の略算推定器（係数は FEM 解析の結果で校正）"""
+
+    def __init__(self, coef=None, log_error_bounds=None, statistics=None):
+        """
+        Args:
+            coef: 回帰係数（FEATURE_NAMES の順。Noneの場合は略算の安全率をそのまま使う）
+            log_error_bounds: (下限, 上限) log(FEMの安全率 / 推定値) の分位点
+            statistics: 校正時の誤差の統計（表示・保存用）
+        """
+        self.coef = None if coef is None else np.asarray(coef, dtype=float)
+        self.log_error_bounds = tuple(log_error_bounds) if log_error_bounds is not None else None
+        self.statistics = dict(statistics or {})
+
+    @property
+    def calibrated(self):
+        return self.coef is not None and self.log_error_bounds is not None
+
+    def fit(self, data, safety):
+        """
+        FEM解析で求めた安全率に合わせて係数を校正し、一個抜き交差検証で誤差範囲を求める
+
+        Args:
+            data: 設計パラメータの表
+            safety: 各設計のFEM解析による安全率（非有限・0以下の行は使わない）
+
+        Returns:
+            SafetyEstimator: self
+
+        Raises:
+            ValueError: 使える評価が MIN_SAMPLES 件未満の場合
+        """
+        X, _ = design_matrix(data)
+        safety = np.asarray(safety, dtype=float)
+        valid = np.isfinite(safety) & (safety > 0) & np.all(np.isfinite(X), axis=1)
+        if valid.sum() < MIN_SAMPLES:
+            raise ValueError(f"校正に使える評価が {int(valid.sum())} 件しかありません（{MIN_SAMPLES} 件以上必要）")
+        X, y = X[valid], np.log(safety[valid])
+        penalty = RIDGE_LAMBDA * len(y) * np.eye(X.shape[1])
+        penalty[0, 0] = 0.0  # 切片は正則化しない
+        solve = np.linalg.solve(X.T @ X + penalty, X.T)
+        self.coef = solve @ y
+
+        # 一個抜きの残差 e_i / (1 - h_ii)
+        leverage = np.sum(X * solve.T, axis=1)
+        residuals = (y - X @ self.coef) / (1.0 - leverage)
+        # 両側 CONFIDENCE の範囲（上下それぞれ (1 - CONFIDENCE) / 2 を除く）
+        tail = (1.0 - CONFIDENCE) / 2 * 100
+        self.log_error_bounds = (float(np.percentile(residuals, tail)),
+                                 float(np.percentile(residuals, 100 - tail)))
+        relative = np.abs(np.expm1(residuals))
+        self.statistics = {
+            'num_samples': int(len(y)),
+            'confidence': CONFIDENCE,
+            'loo_rmse_log': float(np.sqrt(np.mean(residuals ** 2))),
+            'median_relative_error': float(np.median(relative)),
+            'p90_relative_error': float(np.percentile(relative, 90)),
+            'rank_correlation': _rank_correlation(y - residuals, y),
+            'analytic_rank_correlation': _rank_correlation(X[:, FEATURE_NAMES.index('log_analytic_safety')], y),
+        }
+        return self
+
+    def predict(self, data):
+        """
+        安全率を推定
+
+        Args:
+            data: 設計パラメータの表
+
+        Returns:
+            dict: 'safety'（推定値）, 'safety_lower', 'safety_upper'（両側 CONFIDENCE の範囲。
+                  校正していない場合は 0 と inf）の配列。校正データの残差から求めた範囲のため、
+                  真の安全率が safety_upper を超える確率は (1 - CONFIDENCE) / 2 程度で 0 ではない
+        """
+        X, analytic_safety = design_matrix(data)
+        if self.coef is None:
+            safety = analytic_safety
+        else:
+            safety = np.exp(X @ self.coef)
+        if not self.calibrated:
+            return {'safety': safety, 'safety_lower': np.zeros_like(safety),
+                    'safety_upper': np.full_like(safety, np.inf)}
+        low, high = self.log_error_bounds
+        return {'safety': safety, 'safety_lower': safety * math.exp(low), 'safety_upper': safety * math.exp(high)}
+
+    def predict_one(self, params):
+        """1設計分の推定（predict の各値を float で返す）"""
+        estimate = self.predict({name: [params[name]] for name in PARAM_NAMES if name in params})
+        return {key: float(values[0]) for key, values in estimate.items()}
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'feature_names': list(FEATURE_NAMES),
+                'coef': None if self.coef is None else [float(c) for c in self.coef],
+                'log_error_bounds': self.log_error_bounds,
+                'statistics': self.statistics,
+            }, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """
+        保存した推定器を読み込む
+
+        Raises:
+            ValueError: 特徴量の定義が現在のモジュールと異なる場合
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if tuple(data.get('feature_names', ())) != FEATURE_NAMES:
+            raise ValueError(f"{path} の特徴量が現在の定義と異なります。校正し直してください")
+        return cls(data.get('coef'), data.get('log_error_bounds'), data.get('statistics'))
+
+
+_estimator_cache = {}
+
+
+def get_safety_estimator():
+    """
+    FEM_SAFETY_ESTIMATOR で指定した校正済みの推定器（プロセス内で共有）
+
+    Returns:
+        SafetyEstimator or None: 指定がない・読み込めない・校正していない場合は None
+    """
+    path = os.environ.get('FEM_SAFETY_ESTIMATOR', '')
+    if not path:
+        return None
+    if path not in _estimator_cache:
+        try:
+            estimator = SafetyEstimator.load(path)
+            _estimator_cache[path] = estimator if estimator.calibrated else None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 安全率推定器を読み込めません: {e}")
+            _estimator_cache[path] = None
+    return _estimator_cache[path]
+
+
+def load_training_data(path, run_id=None):
+    """
+    校正データを読み込む
+
+    Args:
+        path: 評価アーカイブ（.jsonl）または設計パラメータと安全率の列を持つCSV
+        run_id: 評価アーカイブの実行ID（Noneの場合はすべて）
+
+    Returns:
+        tuple: (設計パラメータの列名 → 配列 の辞書, 安全率の配列)
+    """
+    rows = []
+    if path.endswith('.jsonl'):
+        from evaluation_archive import load_archive
+        records = [r for r in load_archive(path, run_id)
+                   if r.get('status') == 'Success' and not r.get('skipped_metrics')
+                   and r.get('building_info', {}).get('fem_fidelity', 'solid') == 'solid'
+                   and isinstance(r.get('metrics', {}).get('safety'), (int, float))]
+        # 評価時の安全率（rescore_archive と同じ定義）
+        safety = np.array([float(r['metrics']['safety']) for r in records])
+        rows = [r['params'] for r in records]
+    else:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            lines = list(csv.reader(f))
+        header_index = next((i for i, row in enumerate(lines) if 'Lx' in row), None)
+        if header_index is None:
+            raise ValueError(f"{path} に設計パラメータの列がありません")
+        header = lines[header_index]
+        safety_column = 'safety_factor' if 'safety_factor' in header else 'safety'
+        values = []
+        for line in lines[header_index + 1:]:
+            row = dict(zip(header, line))
+            if row.get('evaluation_status', 'success').lower() != 'success':
+                continue
+            try:
+                params = {name: float(row[name]) for name in PARAM_NAMES}
+                values.append(float(row[safety_column]))
+            except (KeyError, ValueError):
+                continue
+            rows.append(params)
+        safety = np.array(values)
+    table = {name: np.array([float(r.get(name, np.nan)) for r in rows]) for name in PARAM_NAMES}
+    return table, np.asarray(safety, dtype=float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='略算による安全率推定器をFEM解析の結果で校正')
+    parser.add_argument('--data', type=str, default=DEFAULT_ARCHIVE,
+                        help='校正データ（評価アーカイブ .jsonl または安全率の列を持つCSV）')
+    parser.add_argument('--run', type=str, default=None, help="評価アーカイブの実行ID（'latest' で最後の実行）")
+    parser.add_argument('--output', type=str, default=os.environ.get('FEM_SAFETY_ESTIMATOR', '') or DEFAULT_ESTIMATOR_FILE,
+                        help='推定器の保存先（JSON）')
+    args = parser.parse_args()
+
+    try:
+        table, safety = load_training_data(args.data, args.run)
+        estimator = SafetyEstimator().fit(table, safety)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    estimate = estimator.predict(table)
+    elapsed = time.perf_counter() - start
+
+    stats = estimator.statistics
+    low, high = estimator.log_error_bounds
+    valid = np.isfinite(safety) & (safety > 0)
+    inside = (safety[valid] >= estimate['safety_lower'][valid]) & (safety[valid] <= estimate['safety_upper'][valid])
+    print(f"🛡️ 安全率推定器を {stats['num_samples']} 件のFEM解析結果で校正（{args.data}）")
+    print(f"  一個抜き交差検証: log誤差 RMSE {stats['loo_rmse_log']:.3f}, 相対誤差 中央値 "
+          f"{stats['median_relative_error'] * 100:.1f}% / 90%点 {stats['p90_relative_error'] * 100:.1f}%")
+    print(f"  順位相関: 推定 {stats['rank_correlation']:.3f}（校正前の略算 {stats['analytic_rank_correlation']:.3f}）")
+    print(f"  誤差範囲（両側 {CONFIDENCE:.0%}）: 推定値 × {math.exp(low):.2f} 〜 × {math.exp(high):.2f}"
+          f"（校正データでの包含率 {inside.mean() * 100:.1f}%）")
+    print(f"  推定時間: {elapsed / max(len(safety), 1) * 1e6:.1f} µs/設計")
+    estimator.save(args.output)
+    print(f"💾 {args.output} に保存しました（FEM_SAFETY_ESTIMATOR={args.output} で評価時に使用）")
+
+
+if __name__ == "__main__":
+    main()
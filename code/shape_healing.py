@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+shape_healing.py
+================
+メッシュ生成に失敗しやすい形状の修復（シェイプヒーリング）
+
+    - heal_shape          : ソリッドを許容差付き（fuzzy）で結合し直し、同一面の分割を除去して修復
+    - remove_small_faces  : 面積が閾値未満の微小面・細長い面を除去
+    - remap_face_references: 形状を置き換えた後、境界条件・荷重の参照面（FaceN / VertexN）を
+                             位置と法線で新しい形状の番号に付け替える
+    - heal_invalid_shape  : isValid() が False の形状を段階的に修復（許容差修正 → 微小エッジ除去 →
+                             removeSplitter → fuzzy 再結合）。evaluate_building の形状検証の前に使う
+
+形状を置き換えると面番号が変わるため、呼び出し側は remap_face_references の戻り値
+（旧番号 → 新番号）で荷重ケース定義などの参照も更新する。
+形状検証前の修復の試行回数・救済件数・所要時間は ShapeHealingStats に集計する。
+"""
+
+import time
+
+import Part
+
+
+HEALING_STAGES = ('fix_tolerance', 'remove_small_edges', 'remove_splitter', 'fuzzy_refuse')
+
+# 修復で許容する体積の変化率（これを超えると設計が変わったとみなして不採用）
+HEALING_VOLUME_TOLERANCE = 0.01
+
+
+def heal_shape(shape, fuzzy_value):
+    """
+    ソリッドを fuzzy fuse で結合し直して修復
+
+    Args:
+        shape: 建物形状
+        fuzzy_value: 結合の許容差 [mm]
+
+    Returns:
+        Part.Shape: 修復した形状
+    """
+    solids = shape.Solids
+    if len(solids) > 1:
+        healed = solids[0].fuse(solids[1:], fuzzy_value)
+    else:
+        healed = shape.copy()
+    healed = healed.removeSplitter()
+    healed.fix(fuzzy_value, fuzzy_value * 0.1, fuzzy_value * 10)
+    if len(healed.Solids) == 1:
+        healed = healed.Solids[0]
+    return healed
+
+
+def count_small_faces(shape, min_area):
+    """面積が min_area [mm²] 未満の面の数"""
+    return sum(1 for face in shape.Faces if face.Area < min_area)
+
+
+def remove_small_faces(shape, tolerance, min_area):
+    """
+    微小面・細長い面を除去
+
+    Args:
+        shape: 建物形状
+        tolerance: 形状修正の許容差 [mm]
+        min_area: 微小面とみなす面積 [mm²]
+
+    Returns:
+        Part.Shape: 微小面を除去した形状
+    """
+    if count_small_faces(shape, min_area) == 0:
+        return shape
+    fixed = shape.copy()
+    try:
+        fixer = Part.ShapeFix.FixSmallFace(fixed)
+        fixer.Precision = tolerance
+        fixer.perform()
+        fixed = fixer.shape()
+    except (AttributeError, Part.OCCError):
+        # 古い FreeCAD には ShapeFix のバインディングがないため、許容差付きの修正だけ行う
+        fixed.fix(tolerance, tolerance * 0.1, tolerance * 10)
+    fixed = fixed.removeSplitter()
+    if len(fixed.Solids) == 1:
+        fixed = fixed.Solids[0]
+    return fixed
+
+
+def _match_face(old_face, new_faces, tolerance):
+    """旧形状の面の重心を含み、法線が同じ新形状の面の番号（なければ None）"""
+    center = old_face.CenterOfGravity
+    normal = old_face.normalAt(0, 0)
+    point = Part.Vertex(center)
+    best, best_area_diff = None, None
+    for j, face in enumerate(new_faces):
+        box = face.BoundBox
+        box.enlarge(tolerance)
+        if not box.isInside(center):
+            continue
+        if face.normalAt(0, 0).dot(normal) < 0.99:
+            continue
+        if face.distToShape(point)[0] > tolerance:
+            continue
+        area_diff = abs(face.Area - old_face.Area)
+        if best is None or area_diff < best_area_diff:
+            best, best_area_diff = j, area_diff
+    return best
+
+
+def _match_vertex(old_vertex, new_vertices, tolerance):
+    """旧形状の頂点に最も近い新形状の頂点の番号（許容差を超える場合は None）"""
+    distances = [(old_vertex.Point - v.Point).Length for v in new_vertices]
+    if not distances:
+        return None
+    j = min(range(len(distances)), key=distances.__getitem__)
+    return j if distances[j] <= tolerance else None
+
+
+def remap_face_references(doc, building_obj, old_shape, tolerance=1.0):
+    """
+    building_obj の形状を置き換えた後、ドキュメント内の参照（References）を付け替える
+
+    Args:
+        doc: FreeCADドキュメント
+        building_obj: 形状を置き換えたオブジェクト
+        old_shape: 置き換える前の形状
+        tolerance: 位置の許容差 [mm]
+
+    Returns:
+        dict: 旧サブ要素名 → 新サブ要素名（対応する要素が見つからない参照は含まない）
+    """
+    new_shape = building_obj.Shape
+    mapping = {}
+
+    def _new_name(sub):
+        if sub in mapping:
+            return mapping[sub]
+        index = int(sub[4:] if sub.startswith('Face') else sub[6:]) - 1
+        if sub.startswith('Face'):
+            j = _match_face(old_shape.Faces[index], new_shape.Faces, tolerance)
+            new = f"Face{j + 1}" if j is not None else None
+        else:
+            j = _match_vertex(old_shape.Vertexes[index], new_shape.Vertexes, tolerance)
+            new = f"Vertex{j + 1}" if j is not None else None
+        if new is not None:
+            mapping[sub] = new
+        return new
+
+    for obj in doc.Objects:
+        refs = getattr(obj, 'References', None)
+        if not refs:
+            continue
+        new_refs, changed = [], False
+        for ref_obj, subs in refs:
+            for sub in ((subs,) if isinstance(subs, str) else subs):
+                if ref_obj is not building_obj:
+                    new_refs.append((ref_obj, sub))
+                    continue
+                new = _new_name(sub)
+                changed = True
+                if new is not None and (ref_obj, new) not in new_refs:
+                    new_refs.append((ref_obj, new))
+        if changed:
+            obj.References = new_refs
+    return mapping
+
+
+def remap_load_case_references(load_cases, face_map, obj_name):
+    """
+    荷重ケース定義（components の references）を remap_face_references の対応表で更新
+
+    Args:
+        load_cases: define_multi_load_cases 形式の荷重ケース定義（その場で更新）
+        face_map: 旧サブ要素名 → 新サブ要素名
+        obj_name: 形状を置き換えたオブジェクト名
+    """
+    for component in load_cases.get('components', {}).values():
+        refs = []
+        for ref_obj, sub in component['references']:
+            if ref_obj != obj_name:
+                refs.append([ref_obj, sub])
+            elif sub in face_map and [ref_obj, face_map[sub]] not in refs:
+                refs.append([ref_obj, face_map[sub]])
+        component['references'] = refs
+
+
+def _fix_tolerance(shape, tolerance):
+    fixed = shape.copy()
+    fixed.fix(tolerance, tolerance * 0.1, tolerance * 10)
+    return fixed
+
+
+def _remove_small_edges(shape, tolerance):
+    try:
+        fixer = Part.ShapeFix.Wireframe(shape)
+        fixer.ModeDropSmallEdges = True
+        fixer.Precision = tolerance
+        fixer.fixSmallEdges()
+        fixer.fixWireGaps()
+        return fixer.shape()
+    except (AttributeError, Part.OCCError):
+        # ShapeFix のバインディングがない FreeCAD では許容差を広げた修正で代用
+        return _fix_tolerance(shape, tolerance * 10)
+
+
+def heal_invalid_shape(shape, tolerance):
+    """
+    不正な形状を段階的に修復
+
+    HEALING_STAGES の順に修復を重ね、isValid() になった時点で打ち切る。
+    体積が HEALING_VOLUME_TOLERANCE を超えて変わった場合は不採用とする。
+
+    Args:
+        shape: isValid() が False の形状
+        tolerance: 修復の許容差 [mm]
+
+    Returns:
+        tuple: (修復した形状 or None, 成功した段階名 or None)
+    """
+    original_volume = abs(shape.Volume)
+    stages = {
+        'fix_tolerance': lambda s: _fix_tolerance(s, tolerance),
+        'remove_small_edges': lambda s: _remove_small_edges(s, tolerance),
+        'remove_splitter': lambda s: s.removeSplitter(),
+        'fuzzy_refuse': lambda s: heal_shape(s, tolerance),
+    }
+    current = shape
+    for stage in HEALING_STAGES:
+        try:
+            current = stages[stage](current)
+        except Exception:
+            continue
+        if not current.isValid() or not current.Solids:
+            continue
+        if original_volume > 0 and abs(abs(current.Volume) - original_volume) > HEALING_VOLUME_TOLERANCE * original_volume:
+            return None, None
+        return current, stage
+    return None, None
+
+
+class ShapeHealingStats:
+    """形状修復の試行回数・救済できた件数・所要時間（プロセス内で集計）"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.rescued = 0
+        self.seconds = 0.0
+        self.rescued_by_stage = {stage: 0 for stage in HEALING_STAGES}
+
+    def record(self, stage, elapsed):
+        self.attempts += 1
+        self.seconds += elapsed
+        if stage is not None:
+            self.rescued += 1
+            self.rescued_by_stage[stage] += 1
+
+    def summary(self):
+        """集計結果を辞書で返す"""
+        return {
+            'attempts': self.attempts,
+            'rescued': self.rescued,
+            'total_seconds': round(self.seconds, 2),
+            'mean_seconds': round(self.seconds / self.attempts, 2) if self.attempts else 0.0,
+            'rescued_by_stage': dict(self.rescued_by_stage),
+        }
+
+    def merge(self, summary):
+        """別プロセス（並列評価のワーカー）の summary() を加算"""
+        self.attempts += summary.get('attempts', 0)
+        self.rescued += summary.get('rescued', 0)
+        self.seconds += summary.get('total_seconds', 0.0)
+        for stage, count in summary.get('rescued_by_stage', {}).items():
+            if stage in self.rescued_by_stage:
+                self.rescued_by_stage[stage] += count
+
+    def print_summary(self):
+        print(f"形状修復: 救済 {self.rescued}/{self.attempts} 件 / "
+              f"平均 {self.seconds / max(self.attempts, 1):.2f} 秒")
+        for stage, count in self.rescued_by_stage.items():
+            if count:
+                print(f"  {stage:<20s}: {count} 件")
+
+
+_stats = None
+
+
+def get_shape_healing_stats():
+    """プロセス内で共有する ShapeHealingStats を返す"""
+    global _stats
+    if _stats is None:
+        _stats = ShapeHealingStats()
+    return _stats
+
+
+def take_shape_healing_stats():
+    """プロセス内の集計結果（summary()）を返して集計をやり直す（並列評価のワーカーが評価ごとに親へ送る）"""
+    global _stats
+    summary = get_shape_healing_stats().summary()
+    _stats = ShapeHealingStats()
+    return summary
+
+
+def heal_building_object(building_obj, tolerance):
+    """
+    建物オブジェクトの不正な形状を修復して置き換え、統計に記録
+
+    Args:
+        building_obj: 形状が不正な建物オブジェクト
+        tolerance: 修復の許容差 [mm]
+
+    Returns:
+        str or None: 成功した段階名（修復できなかった場合は None）
+    """
+    start = time.perf_counter()
+    healed, stage = heal_invalid_shape(building_obj.Shape, tolerance)
+    if healed is not None:
+        building_obj.Shape = healed
+    get_shape_healing_stats().record(stage, time.perf_counter() - start)
+    return stage
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+surrogate_model.py
+==================
+PSO の適応度を予測するガウス過程サロゲート
+
+評価済みの設計（評価アーカイブの過去の実行と現在の実行の真の評価）から適応度の予測値と
+不確かさを求め、期待改善量（EI）の大きい設計だけを FEM 解析に回すために使う。
+
+- 入力は設計変数（材料コード・整数化後の値）を変数範囲で [0, 1] に正規化したベクトル
+- カーネルは等方性のガウスカーネル（RBF）。長さスケールとノイズ分散は対数周辺尤度が
+  最大となる値をグリッドから選ぶ
+- 評価を追加するたびにコレスキー分解を1行ずつ拡張し、refit_interval 件ごとに
+  標準化とハイパーパラメータを含めて分解し直す
+- 失敗した評価（適応度 inf）と枝刈りした評価（下限のみ）は学習に使わない
+
+NumPy のみを使用（scipy 不要）。
+"""
+
+import math
+
+import numpy as np
+
+
+LENGTH_SCALES = tuple(np.geomspace(0.15, 4.0, 12))
+NOISE_VARIANCES = (1e-6, 1e-4, 1e-2, 1e-1)
+
+
+def _normal_cdf(z):
+    return 0.5 * (1.0 + np.array([math.erf(v / math.sqrt(2.0)) for v in np.ravel(z)]).reshape(np.shape(z)))
+
+
+def _normal_pdf(z):
+    return np.exp(-0.5 * np.asarray(z) ** 2) / math.sqrt(2.0 * math.pi)
+
+
+def expected_improvement(mean, std, best):
+    """
+    最小化問題の期待改善量 E[max(best - f, 0)]
+
+    Args:
+        mean, std: 予測平均と予測標準偏差の配列
+        best: 現在の最良値（gbest）
+
+    Returns:
+        np.ndarray: 各設計の期待改善量（std が0の場合は max(best - mean, 0)）
+    """
+    mean = np.asarray(mean, dtype=float)
+    std = np.asarray(std, dtype=float)
+    improvement = best - mean
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(std > 0, improvement / np.where(std > 0, std, 1.0), 0.0)
+    ei = improvement * _normal_cdf(z) + std * _normal_pdf(z)
+    return np.where(std > 0, np.maximum(ei, 0.0), np.maximum(improvement, 0.0))
+
+
+class GaussianProcessSurrogate:
+    """評価を逐次追加できるガウス過程回帰"""
+
+    def __init__(self, lower, upper, refit_interval=10, max_samples=1000):
+        """
+        Args:
+            lower, upper: 設計変数の下限・上限（正規化に使う）
+            refit_interval: この件数を追加するごとに標準化とハイパーパラメータを更新
+            max_samples: 保持する評価の上限（超えた場合は古い評価から捨てる）
+        """
+        self.lower = np.asarray(lower, dtype=float)
+        span = np.asarray(upper, dtype=float) - self.lower
+        self.span = np.where(span > 0, span, 1.0)
+        self.refit_interval = refit_interval
+        self.max_samples = max_samples
+        self.X = np.empty((0, len(self.lower)))
+        self.y = np.empty(0)
+        self.length_scale = 1.0
+        self.noise = 1e-4
+        self._y_mean = 0.0
+        self._y_std = 1.0
+        self._L = np.empty((0, 0))
+        self._added_since_fit = 0
+
+    @property
+    def num_samples(self):
+        return len(self.y)
+
+    def _normalize(self, X):
+        return (np.atleast_2d(np.asarray(X, dtype=float)) - self.lower) / self.span
+
+    def _kernel(self, A, B, length_scale=None):
+        length_scale = self.length_scale if length_scale is None else length_scale
+        sq = np.sum(A ** 2, axis=1)[:, None] + np.sum(B ** 2, axis=1)[None, :] - 2.0 * A @ B.T
+        return np.exp(-0.5 * np.maximum(sq, 0.0) / length_scale ** 2)
+
+    def _standardized(self):
+        return (self.y - self._y_mean) / self._y_std
+
+    def add(self, x, fitness):
+        """
+        評価を1件追加（非有限の適応度、学習済みの設計と同じ位置の評価は無視）
+
+        Returns:
+            bool: 追加した場合 True
+        """
+        if not np.isfinite(fitness):
+            return False
+        xn = self._normalize(x)
+        if self.num_samples:
+            k = self._kernel(self.X, xn)[:, 0]
+            l = np.linalg.solve(self._L, k)
+            d2 = 1.0 + self.noise - l @ l
+            if d2 <= 1e-10 or np.min(np.sum((self.X - xn) ** 2, axis=1)) < 1e-18:
+                return False
+        self.X = np.vstack([self.X, xn])
+        self.y = np.append(self.y, float(fitness))
+        self._added_since_fit += 1
+        if (self.num_samples > self.max_samples or self._added_since_fit >= self.refit_interval
+                or self.num_samples <= 2):
+            self.X = self.X[-self.max_samples:]
+            self.y = self.y[-self.max_samples:]
+            self.fit()
+        else:
+            # コレスキー分解を1行拡張（標準化とハイパーパラメータは前回の値のまま）
+            n = len(self._L)
+            L = np.zeros((n + 1, n + 1))
+            L[:n, :n] = self._L
+            L[n, :n] = l
+            L[n, n] = math.sqrt(d2)
+            self._L = L
+        return True
+
+    def fit(self):
+        """標準化・ハイパーパラメータを更新してコレスキー分解をやり直す"""
+        self._added_since_fit = 0
+        if not self.num_samples:
+            return
+        self._y_mean = float(np.mean(self.y))
+        std = float(np.std(self.y))
+        self._y_std = std if std > 0 else 1.0
+        y = self._standardized()
+        best = None
+        for length_scale in LENGTH_SCALES:
+            K = self._kernel(self.X, self.X, length_scale)
+            for noise in NOISE_VARIANCES:
+                try:
+                    L = np.linalg.cholesky(K + noise * np.eye(len(y)))
+                except np.linalg.LinAlgError:
+                    continue
+                alpha = np.linalg.solve(L.T, np.linalg.solve(L, y))
+                log_likelihood = -0.5 * y @ alpha - np.sum(np.log(np.diag(L)))
+                if best is None or log_likelihood > best[0]:
+                    best = (log_likelihood, length_scale, noise, L)
+        if best is not None:
+            _, self.length_scale, self.noise, self._L = best
+
+    def predict(self, X):
+        """
+        適応度の予測
+
+        Args:
+            X: 設計変数ベクトルの配列（行が設計）
+
+        Returns:
+            tuple: (予測平均, 予測標準偏差) の配列。評価がない場合は (nan, inf)
+        """
+        Xn = self._normalize(X)
+        if not self.num_samples:
+            return np.full(len(Xn), np.nan), np.full(len(Xn), np.inf)
+        Ks = self._kernel(Xn, self.X)
+        alpha = np.linalg.solve(self._L.T, np.linalg.solve(self._L, self._standardized()))
+        v = np.linalg.solve(self._L, Ks.T)
+        variance = np.maximum(1.0 - np.sum(v ** 2, axis=0), 0.0)
+        return Ks @ alpha * self._y_std + self._y_mean, np.sqrt(variance) * self._y_std
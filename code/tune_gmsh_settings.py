@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tune_gmsh_settings.py
+=====================
+Gmsh メッシュ設定の自動チューニング用スクリプト
+形状区分（屋根: 平ら/かまぼこ × 外壁: 鉛直/傾斜 × バルコニー: 有/無）ごとに参照設計を作り、
+3Dアルゴリズム（Delaunay / Frontal / MMG3D / 並列HXT）と最適化設定の組み合わせで
+メッシュだけを生成して成功率・要素品質・所要時間を比較する。
+区分ごとに、従来設定以上の成功率と同等以上の品質を保つ中で最速の設定を
+gmsh_tuning.json に保存する（run_mesh_generation が自動で参照）
+"""
+
+import sys
+import os
+import csv
+import shutil
+import tempfile
+import time
+
+# 現在のディレクトリのみをPythonパスに追加（親ディレクトリは追加しない）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+import numpy as np
+import FreeCAD as App
+import Fem
+
+from generate_building_fem_analyze import (create_realistic_building_model, run_mesh_generation,
+                                           setup_basic_fem_analysis, setup_deterministic_fem)
+from ccx_inp_writer import read_abaqus_mesh
+from gmsh_tuning import DEFAULT_MESH_SETTINGS, DEFAULT_TUNING_FILE, candidate_settings, save_tuning_table
+from mesh_morphing import tet_quality
+
+OUTPUT_CSV = "gmsh_tuning.csv"
+OUTPUT_JSON = os.environ.get('FEM_GMSH_TUNING', '') or DEFAULT_TUNING_FILE
+
+# 従来設定の平均品質に対して許容する品質の低下
+QUALITY_TOLERANCE = 0.95
+
+_BASE_PARAMS = {
+    'Lx': 8.5, 'Ly': 9.0, 'H1': 3.0, 'H2': 3.0,
+    'tf': 400, 'tr': 450, 'bc': 450, 'hc': 450, 'tw_ext': 350,
+    'wall_tilt_angle': 0, 'window_ratio_2f': 0.4,
+    'roof_morph': 0.5, 'roof_shift': 0.0, 'balcony_depth': 0.0,
+}
+
+# 区分ごとの形状パラメータと、寸法を振った2設計
+_CLASS_SHAPES = {
+    'roof': {'flat': {'roof_morph': 0.2}, 'barrel': {'roof_morph': 0.75, 'roof_shift': 0.3}},
+    'wall': {'vertical': {'wall_tilt_angle': 0}, 'tilted': {'wall_tilt_angle': -25, 'window_ratio_2f': 0.6}},
+    'balcony': {'nobalcony': {'balcony_depth': 0.0}, 'balcony': {'balcony_depth': 2.0}},
+}
+_SIZE_VARIANTS = [{}, {'Lx': 12.0, 'Ly': 7.0, 'H1': 3.6, 'bc': 350, 'hc': 350}]
+
+
+def _reference_designs():
+    """8区分 × 寸法違いの参照設計を作る"""
+    designs = []
+    for roof, roof_params in _CLASS_SHAPES['roof'].items():
+        for wall, wall_params in _CLASS_SHAPES['wall'].items():
+            for balcony, balcony_params in _CLASS_SHAPES['balcony'].items():
+                for i, size in enumerate(_SIZE_VARIANTS):
+                    params = dict(_BASE_PARAMS, **roof_params, **wall_params, **balcony_params, **size)
+                    designs.append((f"{roof}-{wall}-{balcony}", i, params))
+    return designs
+
+
+def _mesh_quality(mesh_obj, work_dir):
+    """生成したメッシュを書き出して四面体品質（最小・平均・0.1未満の割合）を返す"""
+    mesh_path = os.path.join(work_dir, 'quality_mesh.inp')
+    mesh_obj.FemMesh.writeABAQUS(mesh_path, 1, False)
+    mesh = read_abaqus_mesh(mesh_path)
+    node_index = np.zeros(int(mesh['node_ids'].max()) + 1, dtype=np.int64)
+    node_index[mesh['node_ids']] = np.arange(len(mesh['node_ids']))
+    _, quality = tet_quality(mesh['coords'], mesh['connectivity'], node_index)
+    return float(quality.min()), float(quality.mean()), float(np.mean(quality < 0.1))
+
+
+def _mesh_with_settings(doc, mesh_obj, settings, work_dir):
+    """1つの設定でメッシュを生成し、評価値の辞書を返す"""
+    os.makedirs(work_dir, exist_ok=True)
+    mesh_obj.FemMesh = Fem.FemMesh()  # 前の設定のメッシュが残って成功扱いにならないように
+    start = time.perf_counter()
+    success = run_mesh_generation(doc, mesh_obj, work_dir, settings)
+    elapsed = time.perf_counter() - start
+    result = {'success': success and mesh_obj.FemMesh.NodeCount > 0, 'time_s': round(elapsed, 2)}
+    if result['success']:
+        result['nodes'] = mesh_obj.FemMesh.NodeCount
+        result['min_quality'], result['mean_quality'], result['poor_ratio'] = _mesh_quality(mesh_obj, work_dir)
+    return result
+
+
+def _summarize(class_rows):
+    """同じ設定の行をまとめて成功率・平均時間・平均品質を計算"""
+    succeeded = [r for r in class_rows if r['success']]
+    return {
+        'success_rate': len(succeeded) / len(class_rows),
+        'mean_time_s': float(np.mean([r['time_s'] for r in class_rows])),
+        'mean_quality': float(np.mean([r['mean_quality'] for r in succeeded])) if succeeded else 0.0,
+        'min_quality': float(min(r['min_quality'] for r in succeeded)) if succeeded else 0.0,
+    }
+
+
+print("=== Gmsh メッシュ設定のチューニング開始 ===")
+setup_deterministic_fem()
+os.environ['FEM_MESH_RECOVERY'] = '0'  # 設定そのものの成功率を測るため回復ラダーは使わない
+candidates = [dict(DEFAULT_MESH_SETTINGS, label='default')] + candidate_settings()
+bench_root = tempfile.mkdtemp(prefix='gmsh_tuning_')
+
+rows = []
+try:
+    for class_name, variant, params in _reference_designs():
+        print(f"\n[{class_name} #{variant}]")
+        if App.ActiveDocument:
+            App.closeDocument(App.ActiveDocument.Name)
+        doc, building_obj, building_info = create_realistic_building_model(**params)
+        if not (doc and building_obj):
+            print("  建物モデルの生成に失敗しました")
+            continue
+        building_info['balcony_depth'] = params['balcony_depth']
+        _, mesh_obj = setup_basic_fem_analysis(doc, building_obj, building_info)
+        if mesh_obj is None:
+            print("  FEM解析設定に失敗しました")
+            continue
+
+        for settings in candidates:
+            work_dir = os.path.join(bench_root, f"{class_name}_{variant}_{settings['label'].replace('/', '_')}")
+            result = _mesh_with_settings(doc, mesh_obj, settings, work_dir)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            row = dict(result, geometry_class=class_name, variant=variant, label=settings['label'],
+                       algorithm3d=settings['algorithm3d'], optimize=settings['optimize'],
+                       optimize_netgen=settings['optimize_netgen'], smoothing=settings['smoothing'])
+            rows.append(row)
+            if row['success']:
+                print(f"  ✅ {settings['label']:<18s}: {row['time_s']:6.1f} 秒 / 節点 {row['nodes']:,} / "
+                      f"品質 最小 {row['min_quality']:.3f} 平均 {row['mean_quality']:.3f}")
+            else:
+                print(f"  ❌ {settings['label']:<18s}: {row['time_s']:6.1f} 秒")
+finally:
+    shutil.rmtree(bench_root, ignore_errors=True)
+
+if not rows:
+    print("\n❌ メッシュ生成を実行できませんでした")
+    sys.exit(1)
+
+fieldnames = ['geometry_class', 'variant', 'label', 'algorithm3d', 'optimize', 'optimize_netgen',
+              'smoothing', 'success', 'time_s', 'nodes', 'min_quality', 'mean_quality', 'poor_ratio']
+with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.DictWriter(f, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+print("\n=== 区分ごとの採用設定 ===")
+table = {}
+for class_name in sorted({r['geometry_class'] for r in rows}):
+    summaries = []
+    for settings in candidates:
+        class_rows = [r for r in rows if r['geometry_class'] == class_name and r['label'] == settings['label']]
+        if class_rows:
+            summaries.append((settings, _summarize(class_rows)))
+    baseline = next(s for settings, s in summaries if settings['label'] == 'default')
+    accepted = [(settings, s) for settings, s in summaries
+                if s['success_rate'] >= baseline['success_rate']
+                and s['mean_quality'] >= baseline['mean_quality'] * QUALITY_TOLERANCE]
+    best_settings, best = min(accepted, key=lambda item: item[1]['mean_time_s'])
+    table[class_name] = dict({k: best_settings[k] for k in DEFAULT_MESH_SETTINGS},
+                             label=best_settings['label'], **best)
+    print(f"  {class_name:<26s}: {best_settings['label']:<18s} 成功率 {best['success_rate'] * 100:.0f}% / "
+          f"{best['mean_time_s']:.1f} 秒（従来 {baseline['mean_time_s']:.1f} 秒） / 平均品質 {best['mean_quality']:.3f}")
+
+save_tuning_table(OUTPUT_JSON, table)
+print(f"\n結果を {OUTPUT_CSV} / {OUTPUT_JSON} に保存しました")
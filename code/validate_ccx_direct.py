@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+validate_ccx_direct.py
+======================
+直接 .inp 書き出しパス（FEM_DIRECT_INP=1）と CcxTools パスの比較検証スクリプト
+参照設計ごとに両パスで解析し、最大応力・最大変位の相対差と実行時間をCSVに出力
+"""
+
+import sys
+import os
+import csv
+import time
+
+# 現在のディレクトリのみをPythonパスに追加（親ディレクトリは追加しない）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from generate_building_fem_analyze import evaluate_building_from_params
+
+# 許容相対差（同一メッシュ・同一荷重なので丸め誤差程度に一致するはず）
+RELATIVE_TOLERANCE = 1e-3
+
+OUTPUT_CSV = "ccx_direct_validation.csv"
+
+# 参照設計（コンクリート主体・木造主体・混構造、屋根形状と壁傾斜を振る）
+_BASE_PARAMS = {
+    'Lx': 8.5, 'Ly': 9.0, 'H1': 3.0, 'H2': 3.0,
+    'tf': 400, 'tr': 450, 'bc': 450, 'hc': 450, 'tw_ext': 350,
+    'wall_tilt_angle': -25, 'window_ratio_2f': 0.7,
+    'roof_morph': 0.9, 'roof_shift': 0.4, 'balcony_depth': 1.8,
+    'material_columns': 0, 'material_floor1': 0, 'material_floor2': 0,
+    'material_roof': 0, 'material_walls': 1, 'material_balcony': 0,
+}
+
+REFERENCE_DESIGNS = [
+    ('base', {}),
+    ('flat_roof_concrete', {'roof_morph': 0.1, 'roof_shift': 0.0, 'wall_tilt_angle': 0,
+                            'material_walls': 0}),
+    ('wood_frame', {'material_columns': 1, 'material_floor1': 1, 'material_floor2': 1,
+                    'material_roof': 1, 'bc': 700, 'hc': 700}),
+    ('large_tilted', {'Lx': 11.5, 'Ly': 11.0, 'H1': 3.4, 'H2': 3.2,
+                      'wall_tilt_angle': 28, 'roof_morph': 0.5, 'balcony_depth': 3.0}),
+]
+
+
+def _evaluate(params, direct):
+    """指定パスで評価し、(最大応力, 最大変位, 実行時間) を返す"""
+    os.environ['FEM_DIRECT_INP'] = '1' if direct else '0'
+    start = time.time()
+    results = evaluate_building_from_params(params)
+    elapsed = time.time() - start
+    if results.get('status') != 'Success':
+        return None, None, elapsed
+    safety = results['safety']
+    return safety.get('max_stress_mpa'), safety.get('max_displacement_mm'), elapsed
+
+
+def _relative_diff(a, b):
+    if a is None or b is None:
+        return None
+    return abs(a - b) / max(abs(b), 1e-12)
+
+
+print("=== 直接 .inp パス 検証開始 ===")
+
+rows = []
+all_passed = True
+for name, overrides in REFERENCE_DESIGNS:
+    params = dict(_BASE_PARAMS, **overrides)
+    print(f"\n[{name}]")
+
+    ref_stress, ref_disp, ref_time = _evaluate(params, direct=False)
+    dir_stress, dir_disp, dir_time = _evaluate(params, direct=True)
+
+    stress_diff = _relative_diff(dir_stress, ref_stress)
+    disp_diff = _relative_diff(dir_disp, ref_disp)
+    passed = (stress_diff is not None and disp_diff is not None
+              and stress_diff <= RELATIVE_TOLERANCE and disp_diff <= RELATIVE_TOLERANCE)
+    all_passed = all_passed and passed
+
+    print(f"  CcxTools: 応力 {ref_stress} MPa / 変位 {ref_disp} mm / {ref_time:.1f} 秒")
+    print(f"  直接パス: 応力 {dir_stress} MPa / 変位 {dir_disp} mm / {dir_time:.1f} 秒")
+    print(f"  判定: {'✅ 一致' if passed else '❌ 不一致'}")
+
+    rows.append({
+        'design': name,
+        'ccxtools_max_stress': ref_stress,
+        'direct_max_stress': dir_stress,
+        'stress_rel_diff': stress_diff,
+        'ccxtools_max_displacement': ref_disp,
+        'direct_max_displacement': dir_disp,
+        'displacement_rel_diff': disp_diff,
+        'ccxtools_time_s': round(ref_time, 2),
+        'direct_time_s': round(dir_time, 2),
+        'passed': passed,
+    })
+
+os.environ.pop('FEM_DIRECT_INP', None)
+
+with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+    writer.writeheader()
+    writer.writerows(rows)
+
+print(f"\n結果を {OUTPUT_CSV} に保存しました")
+print("=== 検証結果: " + ("すべて一致 ✅" if all_passed else "不一致あり ❌") + " ===")